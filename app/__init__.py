@@ -1,8 +1,8 @@
 from flask_login import LoginManager
-from app.models.usuario import Usuario
+from app.servicios.cache_usuarios import cargar_usuario
 
 login_manager = LoginManager()
 
 @login_manager.user_loader
 def load_user(user_id):
-    return db.session.get(Usuario, int(user_id))
+    return cargar_usuario(user_id)
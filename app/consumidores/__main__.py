@@ -0,0 +1,4 @@
+# python -m app.consumidores --colas boleta factura --workers 2
+from app.consumidores.supervisor import main
+
+main()
@@ -0,0 +1,131 @@
+# Marco común de los consumidores: recursos compartidos (sesión HTTP y conexión SMTP),
+# el flujo ack/reintento de cualquier manejador y un manejador base de comprobantes;
+# boleta y factura solo definen lo que cambia.
+import json
+import os
+import traceback
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from app.consumidores.idempotencia import crear_almacen_idempotencia
+from app.consumidores.registro import crear_registro
+from app.servicios.colas import rechazar_mensaje
+from app.servicios.correos import ClienteSMTP
+from app.servicios.metricas import MENSAJES_CONSUMIDOS, PROCESAMIENTO_CONSUMIDOR, cronometrar
+
+
+class RecursosCompartidos:
+    """Conexiones reutilizadas por todos los manejadores de un mismo proceso."""
+
+    def __init__(self):
+        # Sesión persistente con pool de conexiones para la API de DNI/RUC
+        self.http = requests.Session()
+        self.http.mount("https://", HTTPAdapter(pool_connections=4, pool_maxsize=10))
+        self.http.headers.update({
+            "Accept": "application/json",
+            "Content-Type": "application/json",
+            "Authorization": f"Bearer {os.getenv('SUNAT_TOKEN')}",
+        })
+        self.smtp = ClienteSMTP()
+
+    # POST JSON a la API; los errores se devuelven como {"error": ...} sin lanzar
+    def post_json(self, url, payload, timeout=6):
+        try:
+            response = self.http.post(url, data=json.dumps(payload), timeout=timeout)
+            if response.status_code == 200:
+                return response.json()
+            return {"error": f"HTTP {response.status_code}"}
+        except requests.RequestException:
+            return {"error": f"Error de conexión con {url}"}
+
+    def enviar_correo(self, destino, asunto, cuerpo):
+        try:
+            self.smtp.enviar([destino], asunto, texto=cuerpo)
+        except Exception as e:
+            print(f"[EMAIL] Error al enviar correo: {e}")
+            raise
+
+    def cerrar(self):
+        self.smtp.cerrar()
+        self.http.close()
+
+
+class ManejadorBase:
+    """Callback de pika para una cola: procesa el mensaje, hace ack y, si falla, lo reintenta
+    o lo manda a la cola de errores. Las subclases definen `procesar(body)`."""
+
+    tipo = None
+    cola = None
+
+    @property
+    def etiqueta(self):
+        return self.tipo.upper()
+
+    def procesar(self, body):
+        raise NotImplementedError
+
+    def __call__(self, ch, method, properties, body):
+        try:
+            with cronometrar(PROCESAMIENTO_CONSUMIDOR, cola=self.cola, fase="total"):
+                resultado = self.procesar(body)
+            ch.basic_ack(method.delivery_tag)
+        except Exception as e:
+            print(f"[{self.etiqueta}] Error procesando mensaje: {e}")
+            traceback.print_exc()
+            resultado = rechazar_mensaje(ch, method, properties, body, self.cola)
+        MENSAJES_CONSUMIDOS.inc(cola=self.cola, resultado=resultado)
+
+
+class ManejadorComprobante(ManejadorBase):
+    """Procesa los mensajes de una cola: deduplica, consulta el documento, registra y envía el correo."""
+
+    tipo = None            # "boleta" | "factura"
+    cola = None
+    campo_documento = None  # "dni" | "ruc"
+    fase_consulta = None
+    clave_error = None
+
+    def __init__(self, recursos, registro=None, idempotencia=None):
+        self.recursos = recursos
+        self.registro = registro or crear_registro(self.tipo)
+        self.idempotencia = idempotencia or crear_almacen_idempotencia()
+
+    def consultar_documento(self, documento):
+        raise NotImplementedError
+
+    def asunto(self, data):
+        raise NotImplementedError
+
+    def cuerpo(self, data):
+        return f"Detalle de la {self.tipo}:\n\n" + "\n".join(f"{k}: {v}" for k, v in data.items())
+
+    def procesar(self, body):
+        data = json.loads(body)
+
+        if data.get("tipo_comprobante") != self.tipo:
+            return "descartado"
+
+        documento = data.get(self.campo_documento)
+        if not documento:
+            return "descartado"
+
+        # Mensaje repetido (reintento del publicador o redelivery): no se reprocesa
+        compra_id = data.get("compra_id")
+        if compra_id is not None and self.idempotencia.ya_procesado(self.cola, compra_id):
+            return "duplicado"
+
+        with cronometrar(PROCESAMIENTO_CONSUMIDOR, cola=self.cola, fase=self.fase_consulta):
+            datos = self.consultar_documento(documento)
+        data.update(datos.get("data", {self.clave_error: datos.get("error")}))
+
+        # Si el registro falla, la excepción sigue el camino de reintento (DLX/TTL) sin marcar el mensaje
+        self.registro.registrar(data)
+
+        if email := data.get("email_destino"):
+            with cronometrar(PROCESAMIENTO_CONSUMIDOR, cola=self.cola, fase="smtp"):
+                self.recursos.enviar_correo(email, self.asunto(data), self.cuerpo(data))
+
+        if compra_id is not None:
+            self.idempotencia.marcar(self.cola, compra_id)
+        return "procesado"
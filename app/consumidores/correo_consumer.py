@@ -0,0 +1,40 @@
+# Manejador de correos transaccionales (bienvenida, etc.): renderiza la plantilla y la envía
+# por la conexión SMTP compartida del proceso, que se mantiene abierta entre mensajes.
+import json
+
+from app.consumidores.base import ManejadorBase
+from app.consumidores.idempotencia import crear_almacen_idempotencia
+from app.servicios.colas import COLA_CORREOS
+from app.servicios.correos import enviar_mensaje
+from app.servicios.metricas import PROCESAMIENTO_CONSUMIDOR, cronometrar
+
+
+class ManejadorCorreo(ManejadorBase):
+    tipo = "correo"
+    cola = COLA_CORREOS
+    registro = None
+
+    def __init__(self, recursos, idempotencia=None):
+        self.recursos = recursos
+        self.idempotencia = idempotencia or crear_almacen_idempotencia()
+
+    def procesar(self, body):
+        mensaje = json.loads(body)
+        if not mensaje.get("destinatarios") or not mensaje.get("plantilla"):
+            return "descartado"
+
+        correo_id = mensaje.get("correo_id")
+        if correo_id and self.idempotencia.ya_procesado(self.cola, correo_id):
+            return "duplicado"
+
+        with cronometrar(PROCESAMIENTO_CONSUMIDOR, cola=self.cola, fase="smtp"):
+            enviar_mensaje(self.recursos.smtp, mensaje)
+
+        if correo_id:
+            self.idempotencia.marcar(self.cola, correo_id)
+        return "procesado"
+
+
+if __name__ == "__main__":
+    from app.consumidores.supervisor import main
+    main(["--colas", "correo"])
@@ -0,0 +1,71 @@
+# Deduplicación de mensajes por compra_id: se consulta antes de llamar a la API DNI/RUC
+# y al SMTP, y se marca solo cuando el mensaje se procesó por completo.
+import os
+import threading
+from collections import OrderedDict
+from datetime import datetime
+
+from sqlalchemy import create_engine, select
+from sqlalchemy.exc import IntegrityError
+
+from app.models.mensaje_procesado import MensajeProcesado
+
+
+class AlmacenIdempotenciaMemoria:
+    """Claves recientes en memoria (LRU acotado); no sobrevive a reinicios."""
+
+    def __init__(self, capacidad=10000):
+        self.capacidad = capacidad
+        self._claves = OrderedDict()
+        self._lock = threading.Lock()
+
+    def ya_procesado(self, cola, clave):
+        with self._lock:
+            if (cola, str(clave)) in self._claves:
+                self._claves.move_to_end((cola, str(clave)))
+                return True
+            return False
+
+    def marcar(self, cola, clave):
+        with self._lock:
+            self._claves[(cola, str(clave))] = True
+            self._claves.move_to_end((cola, str(clave)))
+            while len(self._claves) > self.capacidad:
+                self._claves.popitem(last=False)
+
+
+class AlmacenIdempotenciaBD:
+    """Tabla mensajes_procesados con restricción única (cola, clave)."""
+
+    def __init__(self, url):
+        self.engine = create_engine(url, pool_pre_ping=True)
+        self.tabla = MensajeProcesado.__table__
+        # Caché local para no consultar la BD dos veces por la misma clave
+        self._cache = AlmacenIdempotenciaMemoria()
+
+    def ya_procesado(self, cola, clave):
+        if self._cache.ya_procesado(cola, clave):
+            return True
+        consulta = select(self.tabla.c.id).where(
+            self.tabla.c.cola == cola, self.tabla.c.clave == str(clave)
+        ).limit(1)
+        with self.engine.connect() as conn:
+            existe = conn.execute(consulta).first() is not None
+        if existe:
+            self._cache.marcar(cola, clave)
+        return existe
+
+    def marcar(self, cola, clave):
+        try:
+            with self.engine.begin() as conn:
+                conn.execute(self.tabla.insert(), {"cola": cola, "clave": str(clave), "fecha": datetime.utcnow()})
+        except IntegrityError:
+            pass  # Otro consumidor ya la marcó
+        self._cache.marcar(cola, clave)
+
+
+def crear_almacen_idempotencia():
+    url = os.getenv("COMPROBANTES_DATABASE_URL") or os.getenv("DATABASE_URL")
+    if url:
+        return AlmacenIdempotenciaBD(url)
+    return AlmacenIdempotenciaMemoria()
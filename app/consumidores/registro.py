@@ -0,0 +1,95 @@
+# Registro durable de comprobantes procesados. Cada comprobante se escribe antes del ack del
+# mensaje, así una caída del proceso no pierde filas ya confirmadas a RabbitMQ.
+# En memoria solo se conserva un buffer circular acotado para depuración.
+import json
+import os
+from collections import deque
+from datetime import datetime
+
+from sqlalchemy import create_engine
+
+from app.models.comprobante_emitido import ComprobanteEmitido
+
+
+# Convierte el mensaje enriquecido en una fila de comprobantes_emitidos
+def _a_fila(tipo, data):
+    return {
+        "compra_id": data.get("compra_id"),
+        "tipo_comprobante": tipo,
+        "documento": data.get("dni") or data.get("ruc"),
+        "email_destino": data.get("email_destino"),
+        "total": data.get("total"),
+        "datos": json.dumps(data, ensure_ascii=False, default=str),
+        "fecha_emision": datetime.utcnow(),
+    }
+
+
+class DestinoArchivo:
+    """Archivo JSONL de solo escritura al final (una línea por comprobante)."""
+
+    def __init__(self, ruta):
+        self.ruta = ruta
+
+    def escribir(self, filas):
+        directorio = os.path.dirname(self.ruta)
+        if directorio:
+            os.makedirs(directorio, exist_ok=True)
+        lineas = "".join(json.dumps(fila, ensure_ascii=False, default=str) + "\n" for fila in filas)
+        with open(self.ruta, "a", encoding="utf-8") as archivo:
+            archivo.write(lineas)
+            archivo.flush()
+            os.fsync(archivo.fileno())
+
+
+class DestinoBaseDatos:
+    """Tabla comprobantes_emitidos; las filas recibidas se insertan en una sola transacción.
+    Un reintento del mismo (compra_id, tipo_comprobante) no duplica la fila."""
+
+    def __init__(self, url):
+        self.engine = create_engine(url, pool_pre_ping=True)
+        self.tabla = ComprobanteEmitido.__table__
+
+    def _insert(self):
+        dialecto = self.engine.dialect.name
+        if dialecto == "postgresql":
+            from sqlalchemy.dialects.postgresql import insert as insert_dialecto
+        elif dialecto == "sqlite":
+            from sqlalchemy.dialects.sqlite import insert as insert_dialecto
+        else:
+            return self.tabla.insert()
+        return insert_dialecto(self.tabla).on_conflict_do_nothing(
+            index_elements=["compra_id", "tipo_comprobante"]
+        )
+
+    def escribir(self, filas):
+        with self.engine.begin() as conn:
+            conn.execute(self._insert(), filas)
+
+
+class RegistroComprobantes:
+    def __init__(self, tipo, destino, capacidad_memoria=100):
+        self.tipo = tipo
+        self.destino = destino
+        self.recientes = deque(maxlen=capacidad_memoria)
+
+    # Escritura síncrona: si el destino falla, la excepción llega al manejador y el mensaje se reintenta
+    def registrar(self, data):
+        self.destino.escribir([_a_fila(self.tipo, data)])
+        self.recientes.append(data)
+
+
+# Crea el registro según el entorno: base de datos si hay DATABASE_URL, si no archivo JSONL
+def crear_registro(tipo):
+    url = os.getenv("COMPROBANTES_DATABASE_URL") or os.getenv("DATABASE_URL")
+    if url:
+        destino = DestinoBaseDatos(url)
+    else:
+        directorio = os.getenv("COMPROBANTES_DIR", "data")
+        destino = DestinoArchivo(os.path.join(directorio, f"comprobantes_{tipo}.jsonl"))
+
+    return RegistroComprobantes(
+        tipo,
+        destino,
+        capacidad_memoria=int(os.getenv("COMPROBANTES_MEMORIA", 100)),
+    )
+
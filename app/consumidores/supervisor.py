@@ -0,0 +1,142 @@
+# Supervisor de consumidores: varias colas en un solo proceso (una conexión, SMTP y sesión HTTP
+# compartidos) o N procesos worker con --workers. SIGTERM/SIGINT detienen el consumo cuando
+# termina el mensaje en curso y se cierran las conexiones.
+import argparse
+import multiprocessing
+import os
+import signal
+import time
+import traceback
+
+import pika
+from dotenv import load_dotenv
+
+from app.consumidores.base import RecursosCompartidos
+from app.consumidores.boleta_consumer import ManejadorBoleta
+from app.consumidores.correo_consumer import ManejadorCorreo
+from app.consumidores.factura_consumer import ManejadorFactura
+from app.consumidores.idempotencia import crear_almacen_idempotencia
+from app.servicios.colas import declarar_cola
+from app.servicios.metricas import iniciar_servidor_metricas
+
+MANEJADORES = {
+    "boleta": ManejadorBoleta,
+    "factura": ManejadorFactura,
+    "correo": ManejadorCorreo,
+}
+
+
+class Supervisor:
+    def __init__(self, nombres, prefetch=10, intentos_conexion=10):
+        self.recursos = RecursosCompartidos()
+        idempotencia = crear_almacen_idempotencia()
+        self.manejadores = [MANEJADORES[nombre](self.recursos, idempotencia=idempotencia) for nombre in nombres]
+        self.prefetch = prefetch
+        self.intentos_conexion = intentos_conexion
+        self.connection = None
+        self.channel = None
+        self._detenido = False
+
+    def _conectar(self):
+        self.connection = pika.BlockingConnection(
+            pika.ConnectionParameters(
+                os.getenv('RABBITMQ_HOST', 'localhost'),
+                5672,
+                heartbeat=300,
+                blocked_connection_timeout=200,
+            )
+        )
+        self.channel = self.connection.channel()
+        # prefetch por canal: el total en vuelo se reparte entre todas las colas
+        self.channel.basic_qos(prefetch_count=self.prefetch)
+        for manejador in self.manejadores:
+            declarar_cola(self.channel, manejador.cola)
+            self.channel.basic_consume(queue=manejador.cola, on_message_callback=manejador, auto_ack=False)
+
+    def consumir(self):
+        colas = ", ".join(m.cola for m in self.manejadores)
+        for intento in range(self.intentos_conexion):
+            if self._detenido:
+                break
+            try:
+                print(f"[SUPERVISOR] Conectando a RabbitMQ ({intento + 1}/{self.intentos_conexion})…")
+                self._conectar()
+                print(f"[SUPERVISOR] Esperando mensajes en {colas}…")
+                self.channel.start_consuming()
+                break
+            except pika.exceptions.AMQPConnectionError:
+                print("[RabbitMQ] Error de conexión, reintentando en 3s…")
+                time.sleep(3)
+            except Exception as e:
+                print(f"[RabbitMQ] Error inesperado: {e}")
+                traceback.print_exc()
+                break
+        self.cerrar()
+
+    # Se puede llamar desde un manejador de señales: el consumo se detiene al terminar el mensaje en curso
+    def detener(self, *_):
+        self._detenido = True
+        if self.connection is not None and self.connection.is_open:
+            self.connection.add_callback_threadsafe(self._detener_consumo)
+
+    def _detener_consumo(self):
+        if self.channel is not None and self.channel.is_open:
+            self.channel.stop_consuming()
+
+    def cerrar(self):
+        try:
+            if self.connection is not None and self.connection.is_open:
+                self.connection.close()
+        except Exception:
+            pass
+        self.recursos.cerrar()
+        print("[SUPERVISOR] Consumidor detenido.")
+
+
+def ejecutar_worker(nombres, metricas_puerto=None, prefetch=10):
+    load_dotenv()
+    if metricas_puerto:
+        iniciar_servidor_metricas(metricas_puerto)
+    supervisor = Supervisor(nombres, prefetch=prefetch)
+    signal.signal(signal.SIGTERM, supervisor.detener)
+    signal.signal(signal.SIGINT, supervisor.detener)
+    supervisor.consumir()
+
+
+# Lanza N procesos worker y les reenvía las señales de parada
+def ejecutar_workers(nombres, workers, metricas_puerto=None, prefetch=10):
+    procesos = []
+    for i in range(workers):
+        puerto = metricas_puerto + i if metricas_puerto else None
+        proceso = multiprocessing.Process(
+            target=ejecutar_worker, args=(nombres, puerto, prefetch), name=f"consumidor-{i}"
+        )
+        proceso.start()
+        procesos.append(proceso)
+
+    def _propagar(signum, _frame):
+        for proceso in procesos:
+            if proceso.is_alive():
+                os.kill(proceso.pid, signal.SIGTERM)
+
+    signal.signal(signal.SIGTERM, _propagar)
+    signal.signal(signal.SIGINT, _propagar)
+
+    for proceso in procesos:
+        proceso.join()
+
+
+def main(argv=None):
+    load_dotenv()
+    parser = argparse.ArgumentParser(description="Consumidores de comprobantes (boletas y facturas) y correos")
+    parser.add_argument("--colas", nargs="+", choices=sorted(MANEJADORES), default=sorted(MANEJADORES))
+    parser.add_argument("--workers", type=int, default=int(os.getenv("CONSUMIDOR_WORKERS", 1)))
+    parser.add_argument("--prefetch", type=int, default=int(os.getenv("CONSUMIDOR_PREFETCH", 10)))
+    parser.add_argument("--metricas-puerto", type=int, default=int(os.getenv("METRICAS_PUERTO", 9101)))
+    args = parser.parse_args(argv)
+
+    print(f"[SUPERVISOR] Iniciando {args.workers} worker(s) para: {', '.join(args.colas)}")
+    if args.workers <= 1:
+        ejecutar_worker(args.colas, args.metricas_puerto, args.prefetch)
+    else:
+        ejecutar_workers(args.colas, args.workers, args.metricas_puerto, args.prefetch)
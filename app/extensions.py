@@ -2,8 +2,12 @@ from flask_sqlalchemy import SQLAlchemy
 from flask_jwt_extended import JWTManager
 from flask_mail import Mail
 from flask_login import LoginManager
+from app.servicios.perfilado import PerfiladorPeticiones
+from app.servicios.replicas import EnrutadorReplicas, SesionEnrutada
 
-db = SQLAlchemy()
+db = SQLAlchemy(session_options={"class_": SesionEnrutada})
 jwt = JWTManager()
 mail = Mail()
 login_manager = LoginManager() 
+perfilador = PerfiladorPeticiones()
+replicas = EnrutadorReplicas()
@@ -1,12 +1,17 @@
 import os
+import threading
+import click
 from flask import Flask, redirect, url_for, render_template, session, flash
 from dotenv import load_dotenv
 from flask_login import LoginManager, login_user, logout_user, login_required, current_user
 from flask_dance.contrib.google import make_google_blueprint, google
 
-from app.extensions import db, jwt, mail
+from app.extensions import db, jwt, mail, perfilador, replicas
 from app.models.usuario import Usuario  # Usamos directamente el modelo
 from app.routes.categoria import bp_categoria
+from app.servicios import metricas, purga, ranking, reservas
+from app.servicios.cache_usuarios import cargar_usuario
+from app.servicios.tokens import configurar_jwt
 
 load_dotenv()
 os.environ['OAUTHLIB_INSECURE_TRANSPORT'] = '1'
@@ -15,7 +20,14 @@ login_manager = LoginManager()
 
 @login_manager.user_loader
 def load_user(user_id):
-    return db.session.get(Usuario, int(user_id))
+    return cargar_usuario(user_id)
+
+# Barrido de reservas, consolidación del ranking y purgas que quedaron sin terminar en una
+# ejecución anterior. Solo para el proceso que sirve peticiones.
+def iniciar_tareas_fondo(app):
+    reservas.iniciar_barrido(app)
+    ranking.iniciar_consolidacion(app)
+    purga.reanudar_en_segundo_plano(app)
 
 def create_app(testing=False):
     app = Flask(__name__)
@@ -42,9 +54,28 @@ def create_app(testing=False):
 
     # Inicializar extensiones
     db.init_app(app)
+    replicas.init_app(app)
     jwt.init_app(app)
+    configurar_jwt(jwt)
     mail.init_app(app)
     login_manager.init_app(app)
+    perfilador.init_app(app)
+    metricas.init_app(app)
+    reservas.init_app(app)
+    ranking.init_app(app)
+    if not testing:
+        # Los hilos de fondo arrancan con la primera petición: importar app.main o ejecutar un
+        # comando `flask ...` no deja hilos escribiendo en la BD
+        iniciar = threading.Lock()
+
+        @app.before_request
+        def iniciar_tareas_fondo_una_vez():
+            if app.extensions.get("tareas_fondo"):
+                return
+            with iniciar:
+                if not app.extensions.get("tareas_fondo"):
+                    app.extensions["tareas_fondo"] = True
+                    iniciar_tareas_fondo(app)
 
     # Login con Google (solo en modo normal)
     if not testing:
@@ -104,7 +135,7 @@ def create_app(testing=False):
         @app.route('/perfil/usuario')
         @login_required
         def perfil_usuario():
-            usuario_db = Usuario.query.filter_by(email=current_user.email).first()
+            usuario_db = db.session.get(Usuario, int(current_user.id))
             if not usuario_db:
                 flash("Usuario no encontrado.", "error")
                 return redirect(url_for('index'))
@@ -121,18 +152,22 @@ def create_app(testing=False):
     from app.routes.admin import bp_admin
     from app.routes.cliente import bp_cliente
     from app.routes.auth import auth_bp
+    from app.routes.api_jwt import api_jwt_bp
     from app.routes.compra import compra_bp
     from app.routes.producto import producto_bp
     from app.routes.historial_ventas import historial_ventas_bp, dashboard_ventas_bp
+    from app.routes.analitica import analitica_bp
 
     app.register_blueprint(bp_admin)
     app.register_blueprint(bp_cliente)
     app.register_blueprint(bp_categoria)
     app.register_blueprint(historial_ventas_bp)
     app.register_blueprint(auth_bp, url_prefix='/api')
+    app.register_blueprint(api_jwt_bp, url_prefix='/api/v1')
     app.register_blueprint(compra_bp, url_prefix='/api')
     app.register_blueprint(producto_bp, url_prefix='/api')
     app.register_blueprint(dashboard_ventas_bp)
+    app.register_blueprint(analitica_bp)
 
     @app.cli.command("create-db")
     def create_db():
@@ -140,6 +175,102 @@ def create_app(testing=False):
             db.create_all()
             print("✅ Base de datos creada correctamente.")
 
+    @app.cli.command("importar-clientes")
+    @click.argument("archivo", type=click.Path(exists=True, dir_okay=False))
+    @click.option("--formato", type=click.Choice(["csv", "jsonl"]), default=None)
+    @click.option("--lote", default=500, show_default=True, help="Filas por INSERT")
+    @click.option("--sin-correos", is_flag=True, help="No enviar correos de bienvenida")
+    def importar_clientes_cli(archivo, formato, lote, sin_correos):
+        from app.servicios.importacion import detectar_formato, importar_clientes, leer_filas
+        from app.servicios.tareas import tareas
+
+        with open(archivo, "rb") as f:
+            resultado = importar_clientes(leer_filas(f, formato or detectar_formato(archivo)),
+                                          tamano_lote=lote, enviar_correos=not sin_correos)
+        tareas.esperar(timeout=120)  # correos encolados antes de salir
+        print(f"✅ {resultado['creados']} creados, {resultado['duplicados']} duplicados, "
+              f"{resultado['invalidos']} inválidos de {resultado['procesados']} filas")
+        for error in resultado["errores"]:
+            print(f"  fila {error['fila']}: {error['error']}")
+
+    @app.cli.command("generar-datos")
+    @click.option("--escala", type=click.Choice(["pequena", "media", "grande"]), default="pequena", show_default=True)
+    @click.option("--usuarios", type=int, help="Sobrescribe el valor de la escala")
+    @click.option("--categorias", type=int)
+    @click.option("--productos", type=int)
+    @click.option("--compras", type=int)
+    @click.option("--dias", default=365, show_default=True, help="Días de historial hacia atrás")
+    @click.option("--zipf", default=1.1, show_default=True, help="Exponente de popularidad (mayor = más concentrado)")
+    @click.option("--semilla", default=42, show_default=True)
+    @click.option("--lote", default=50_000, show_default=True, help="Filas por COPY/executemany")
+    @click.option("--password", default="Cliente2025!", show_default=True, help="Contraseña de todos los usuarios generados")
+    def generar_datos_cli(escala, usuarios, categorias, productos, compras, dias, zipf, semilla, lote, password):
+        from app.servicios.generador_datos import ESCALAS, analizar_tablas, generar_datos
+
+        valores = dict(ESCALAS[escala])
+        for clave, valor in (("usuarios", usuarios), ("categorias", categorias),
+                             ("productos", productos), ("compras", compras)):
+            if valor is not None:
+                valores[clave] = valor
+        from app.servicios.ranking import reconstruir
+
+        resultado = generar_datos(**valores, semilla=semilla, s=zipf, dias=dias, password=password, lote=lote)
+        reconstruir(lote)
+        analizar_tablas()
+        for tabla, filas in resultado.items():
+            print(f"  {tabla:<17} {filas:>12,}")
+        print(f"✅ {sum(resultado.values()):,} filas generadas")
+
+    @app.cli.command("reconstruir-resumen")
+    @click.option("--lote", default=50_000, show_default=True, help="Filas de historial por bloque")
+    def reconstruir_resumen_cli(lote):
+        filas = ranking.reconstruir(lote)
+        print(f"✅ resumen_ventas reconstruido: {filas:,} filas")
+
+    @app.cli.command("consolidar-ranking")
+    def consolidar_ranking_cli():
+        consolidados = ranking.consolidar_pendientes()
+        print(f"✅ {consolidados:,} deltas de ventas consolidados en resumen_ventas")
+
+    @app.cli.command("liberar-reservas")
+    def liberar_reservas_cli():
+        aplicadas = reservas.aplicar_confirmadas()
+        liberadas = reservas.liberar_vencidas()
+        print(f"✅ {aplicadas} reservas confirmadas restadas del stock, {liberadas} vencidas liberadas")
+
+    @app.cli.command("reanudar-purgas")
+    @click.option("--todas", is_flag=True, help="Incluye las reclamadas hace poco (tras una caída del proceso)")
+    def reanudar_purgas_cli(todas):
+        from app.servicios.purga import REANUDAR_TRAS, reanudar_purgas
+
+        terminadas = reanudar_purgas(reanudar_tras=0 if todas else REANUDAR_TRAS)
+        print(f"✅ {terminadas} purgas pendientes terminadas")
+
+    @app.cli.command("exportar-ventas")
+    @click.argument("salida", type=click.Path(dir_okay=False))
+    @click.option("--formato", type=click.Choice(["csv.gz", "parquet", "arrow"]), default="parquet", show_default=True)
+    @click.option("--marca", "archivo_marca", type=click.Path(dir_okay=False),
+                  help="JSON con la marca (fecha_venta, id) de la última exportación; se actualiza al terminar")
+    @click.option("--lote", default=50_000, show_default=True, help="Filas por bloque (row group)")
+    def exportar_ventas_cli(salida, formato, archivo_marca, lote):
+        import json
+
+        from app.servicios.exportacion import ErrorExportacion, Marca, exportar
+
+        desde = Marca()
+        if archivo_marca and os.path.exists(archivo_marca):
+            with open(archivo_marca) as f:
+                anterior = json.load(f)
+            desde = Marca.desde_texto(anterior.get("fecha_venta"), anterior.get("id"))
+        try:
+            filas, marca = exportar(salida, formato, desde=desde, tamano_lote=lote)
+        except ErrorExportacion as e:
+            raise click.ClickException(str(e))
+        if archivo_marca:
+            with open(archivo_marca, "w") as f:
+                json.dump(marca.a_dict(), f)
+        print(f"✅ {filas:,} ventas exportadas a {salida} (marca: {marca.a_dict()})")
+
     return app
 
 # Ejecutar
@@ -8,6 +8,11 @@ from .compra_producto import CompraProducto
 from .usuario import Usuario
 from .categoria import Categoria
 from .tipo_comprobante import TipoComprobante
+from .comprobante_emitido import ComprobanteEmitido
+from .mensaje_procesado import MensajeProcesado
+from .resumen_venta import ResumenVenta, ResumenVentaPendiente
+from .reserva_stock import ReservaStock
+from .purga_pendiente import PurgaPendiente
 
 __all__ = [
     "Producto",
@@ -15,5 +20,11 @@ __all__ = [
     "CompraProducto",
     "Usuario",
     "Categoria",
-    "TipoComprobante"
+    "TipoComprobante",
+    "ComprobanteEmitido",
+    "MensajeProcesado",
+    "ResumenVenta",
+    "ResumenVentaPendiente",
+    "ReservaStock",
+    "PurgaPendiente"
 ]
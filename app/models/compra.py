@@ -17,10 +17,13 @@ class Compra(db.Model):
     total = db.Column(db.Float, nullable=False)
     email_destino = db.Column(db.String(120), nullable=False)
 
+    # Compras de un cliente (su historial y la purga al eliminarlo)
+    __table_args__ = (db.Index("ix_compras_cliente_id", "cliente_id"),)
+
     # Relaciones
     tipo_comprobante = relationship('TipoComprobante', back_populates='compras')
     cliente = db.relationship('Usuario', back_populates='compras')
-    productos = db.relationship('CompraProducto', back_populates='compra', lazy='subquery', cascade="all, delete")
+    productos = db.relationship('CompraProducto', back_populates='compra', lazy='subquery', cascade="all, delete", passive_deletes=True)
 
     # Validación de reglas de negocio
     def validar_entidad(self):
@@ -7,9 +7,15 @@ class CompraProducto(db.Model):
     # Columnas principales
     id = db.Column(db.Integer, primary_key=True)
     compra_id = db.Column(db.Integer, db.ForeignKey('compras.id', ondelete='CASCADE'), nullable=False)
-    producto_id = db.Column(db.Integer, db.ForeignKey('productos.id'), nullable=False)
+    producto_id = db.Column(db.Integer, db.ForeignKey('productos.id', ondelete='CASCADE'), nullable=False)
     cantidad = db.Column(db.Integer, nullable=False)
 
+    # Líneas de una compra y líneas que referencian un producto (detalle, ventas y purga)
+    __table_args__ = (
+        db.Index("ix_compra_producto_compra_id", "compra_id"),
+        db.Index("ix_compra_producto_producto_id", "producto_id"),
+    )
+
     # Relaciones con Compra y Producto
     compra = db.relationship('Compra', back_populates='productos')
     producto = db.relationship('Producto', back_populates='compra_productos')
@@ -0,0 +1,35 @@
+# Modelo ComprobanteEmitido: registro durable de las boletas/facturas procesadas por los consumidores
+from datetime import datetime
+from app.extensions import db
+
+class ComprobanteEmitido(db.Model):
+    __tablename__ = "comprobantes_emitidos"
+    __table_args__ = (
+        # Un comprobante por compra y tipo: los reintentos del consumidor no duplican filas
+        db.UniqueConstraint("compra_id", "tipo_comprobante", name="uq_comprobantes_emitidos_compra_tipo"),
+    )
+
+    # Columnas principales
+    id = db.Column(db.Integer, primary_key=True)
+    compra_id = db.Column(db.Integer, index=True)
+    tipo_comprobante = db.Column(db.String(20), nullable=False)
+    documento = db.Column(db.String(11))  # DNI o RUC
+    email_destino = db.Column(db.String(120))
+    total = db.Column(db.Float)
+    datos = db.Column(db.Text)  # Mensaje completo enriquecido, en JSON
+    fecha_emision = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
+    # Conversión a diccionario
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "compra_id": self.compra_id,
+            "tipo_comprobante": self.tipo_comprobante,
+            "documento": self.documento,
+            "email_destino": self.email_destino,
+            "total": self.total,
+            "fecha_emision": self.fecha_emision.isoformat() if self.fecha_emision else None,
+        }
+
+    def __repr__(self):
+        return f"<ComprobanteEmitido id={self.id} compra_id={self.compra_id} tipo={self.tipo_comprobante}>"
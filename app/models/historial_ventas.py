@@ -1,21 +1,39 @@
 # Modelo HistorialVenta con relaciones a cliente, producto y tipo de comprobante
+from sqlalchemy import event
+from sqlalchemy.orm import Session
 from app.extensions import db
+from app.models.producto import Producto
 
 class HistorialVenta(db.Model):
     __tablename__ = "historial_ventas"
 
     # Columnas principales
     id = db.Column(db.Integer, primary_key=True)
-    cliente_id = db.Column(db.Integer, db.ForeignKey("usuarios.id"), nullable=False)
-    producto_id = db.Column(db.Integer, db.ForeignKey("productos.id"), nullable=False)
+    # Se conserva el historial al borrar el cliente o el producto (ON DELETE SET NULL)
+    cliente_id = db.Column(db.Integer, db.ForeignKey("usuarios.id", ondelete="SET NULL"), nullable=True)
+    producto_id = db.Column(db.Integer, db.ForeignKey("productos.id", ondelete="SET NULL"), nullable=True)
+    # Dueño del producto al momento de la venta (copiado de productos.cliente_id al insertar)
+    vendedor_id = db.Column(db.Integer, db.ForeignKey("usuarios.id", ondelete="SET NULL"), nullable=True)
     cantidad = db.Column(db.Integer, nullable=False)
     total_venta = db.Column(db.Float, nullable=False)
     tipo_comprobante_id = db.Column(db.Integer, db.ForeignKey("tipos_comprobante.id"))
     fecha_venta = db.Column(db.DateTime, server_default=db.func.now())
 
+    # Consultas por rango de fechas (analítica y dashboard); INCLUDE permite index-only scans
+    __table_args__ = (
+        db.Index("ix_historial_ventas_fecha_venta", "fecha_venta", postgresql_include=["total_venta", "cantidad"]),
+        # Ventas de un producto en orden (fecha_venta, id)
+        db.Index("ix_historial_ventas_producto_fecha", "producto_id", "fecha_venta", "id"),
+        # Historial de un vendedor en orden (fecha_venta, id) para paginar por cursor
+        db.Index("ix_historial_ventas_vendedor_fecha", "vendedor_id", "fecha_venta", "id"),
+        # Ventas de un cliente (purga al eliminarlo)
+        db.Index("ix_historial_ventas_cliente_id", "cliente_id"),
+    )
+
     # Relaciones
-    cliente = db.relationship("Usuario", backref="historial_ventas")
-    producto = db.relationship("Producto", backref="historial_ventas")
+    cliente = db.relationship("Usuario", foreign_keys=[cliente_id],
+                              backref=db.backref("historial_ventas", passive_deletes=True))
+    producto = db.relationship("Producto", backref=db.backref("historial_ventas", passive_deletes=True))
     tipo_comprobante = db.relationship("TipoComprobante")
 
     # Conversión a diccionario
@@ -24,6 +42,7 @@ class HistorialVenta(db.Model):
             "id": self.id,
             "cliente_id": self.cliente_id,
             "producto_id": self.producto_id,
+            "vendedor_id": self.vendedor_id,
             "cantidad": self.cantidad,
             "total_venta": self.total_venta,
             "tipo_comprobante_id": self.tipo_comprobante_id,
@@ -33,3 +52,19 @@ class HistorialVenta(db.Model):
     # Representación legible
     def __repr__(self):
         return f"<HistorialVenta id={self.id} total_venta={self.total_venta}>"
+
+# Cada venta nueva guarda el vendedor del producto, para leer su historial sin pasar por productos
+@event.listens_for(Session, "before_flush")
+def asignar_vendedor(session, flush_context, instances):
+    for obj in session.new:
+        if isinstance(obj, HistorialVenta) and obj.vendedor_id is None and obj.producto_id is not None:
+            producto = obj.producto or session.get(Producto, obj.producto_id)
+            obj.vendedor_id = producto.cliente_id if producto is not None else None
+
+# Cada venta nueva deja sus deltas para los rankings (resumen_ventas_pendientes) en el mismo flush
+@event.listens_for(Session, "before_flush")
+def acumular_ventas_nuevas(session, flush_context, instances):
+    ventas = [obj for obj in session.new if isinstance(obj, HistorialVenta)]
+    if ventas:
+        from app.servicios.ranking import acumular_ventas
+        acumular_ventas(session, ventas)
@@ -0,0 +1,16 @@
+# Modelo MensajeProcesado: claves de idempotencia de los consumidores (una fila por compra y cola)
+from datetime import datetime
+from app.extensions import db
+
+class MensajeProcesado(db.Model):
+    __tablename__ = "mensajes_procesados"
+    __table_args__ = (db.UniqueConstraint("cola", "clave", name="uq_mensajes_procesados_cola_clave"),)
+
+    # Columnas principales
+    id = db.Column(db.Integer, primary_key=True)
+    cola = db.Column(db.String(50), nullable=False)
+    clave = db.Column(db.String(64), nullable=False)  # compra_id del mensaje
+    fecha = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
+    def __repr__(self):
+        return f"<MensajeProcesado cola={self.cola} clave={self.clave}>"
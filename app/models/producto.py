@@ -13,19 +13,26 @@ class Producto(db.Model):
     precio = db.Column(db.Float, nullable=False)
     stock = db.Column(db.Integer, nullable=False)
     imagen_url = db.Column(db.String(255))
+    # Bloqueo optimista: cada UPDATE del ORM exige la versión leída y la incrementa
+    version = db.Column(db.Integer, nullable=False, default=1, server_default="1")
 
     # Relaciones
-    cliente_id = db.Column(BigInteger, db.ForeignKey("usuarios.id"), nullable=False)
+    cliente_id = db.Column(BigInteger, db.ForeignKey("usuarios.id", ondelete="CASCADE"), nullable=False)
     cliente = db.relationship("Usuario", back_populates="productos")
 
-    categoria_id = db.Column(BigInteger, db.ForeignKey("categorias.id"), nullable=True)
+    categoria_id = db.Column(BigInteger, db.ForeignKey("categorias.id", ondelete="SET NULL"), nullable=True)
     categoria = db.relationship("Categoria", back_populates="productos")
 
+    # Productos de un vendedor (historial de ventas por vendedor, listados del cliente)
+    __table_args__ = (db.Index("ix_productos_cliente_id", "cliente_id"),)
+    __mapper_args__ = {"version_id_col": version}
+
     compra_productos = db.relationship(
         "CompraProducto",
         back_populates="producto",
         lazy="dynamic",
-        cascade="all, delete"
+        cascade="all, delete",
+        passive_deletes=True
     )
 
     # Conversión a diccionario
@@ -40,6 +47,7 @@ class Producto(db.Model):
             "imagen_url": self.imagen_url,
             "cliente_id": self.cliente_id,
             "categoria_id": self.categoria_id,
+            "version": self.version,
             "categoria_nombre": self.categoria.nombre if self.categoria else None
         }
 
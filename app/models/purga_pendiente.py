@@ -0,0 +1,27 @@
+# Modelo PurgaPendiente: registro durable de las purgas en segundo plano (app/servicios/purga.py).
+# La fila se crea en la misma transacción que marca el registro como "eliminando" y se borra al
+# terminar; si el proceso cae a mitad de la purga, `flask reanudar-purgas` la retoma.
+from datetime import datetime
+from app.extensions import db
+
+USUARIO = "usuario"
+PRODUCTO = "producto"
+
+class PurgaPendiente(db.Model):
+    __tablename__ = "purgas_pendientes"
+    __table_args__ = (
+        db.UniqueConstraint("tipo", "objetivo_id", name="uq_purgas_pendientes_tipo_objetivo"),
+    )
+
+    # Columnas principales
+    id = db.Column(db.Integer, primary_key=True)
+    tipo = db.Column(db.String(20), nullable=False)  # usuario | producto
+    objetivo_id = db.Column(db.BigInteger, nullable=False)
+    creada = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    # Momento en que un proceso la tomó; una purga tomada hace mucho se da por abandonada
+    reclamada = db.Column(db.DateTime, nullable=True)
+    intentos = db.Column(db.Integer, nullable=False, default=0)
+    error = db.Column(db.Text, nullable=True)
+
+    def __repr__(self):
+        return f"<PurgaPendiente {self.tipo}={self.objetivo_id} intentos={self.intentos}>"
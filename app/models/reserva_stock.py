@@ -0,0 +1,44 @@
+# Modelo ReservaStock: registro de las reservas temporales de stock (carrito y checkout).
+# Una reserva activa retiene unidades hasta que se confirma en una compra, se libera o vence.
+# Las confirmadas son unidades vendidas que aún no se restaron de productos.stock; el barrido
+# las resta por lotes y las marca como aplicadas.
+from datetime import datetime
+from app.extensions import db
+
+ACTIVA = "activa"
+CONFIRMADA = "confirmada"
+APLICADA = "aplicada"
+LIBERADA = "liberada"
+VENCIDA = "vencida"
+
+class ReservaStock(db.Model):
+    __tablename__ = "reservas_stock"
+    __table_args__ = (
+        db.Index("ix_reservas_stock_cliente_producto", "cliente_id", "producto_id", "estado"),
+        db.Index("ix_reservas_stock_producto_estado", "producto_id", "estado"),
+        db.Index("ix_reservas_stock_estado_expira", "estado", "expira"),
+    )
+
+    # Columnas principales
+    id = db.Column(db.Integer, primary_key=True)
+    producto_id = db.Column(db.Integer, db.ForeignKey("productos.id", ondelete="CASCADE"), nullable=False)
+    cliente_id = db.Column(db.Integer, db.ForeignKey("usuarios.id", ondelete="CASCADE"), nullable=False)
+    cantidad = db.Column(db.Integer, nullable=False)
+    estado = db.Column(db.String(20), nullable=False, default=ACTIVA)  # activa | confirmada | aplicada | liberada | vencida
+    expira = db.Column(db.DateTime, nullable=False)
+    creada = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    compra_id = db.Column(db.Integer, db.ForeignKey("compras.id", ondelete="SET NULL"), nullable=True)
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "producto_id": self.producto_id,
+            "cliente_id": self.cliente_id,
+            "cantidad": self.cantidad,
+            "estado": self.estado,
+            "expira": self.expira.isoformat(),
+            "compra_id": self.compra_id,
+        }
+
+    def __repr__(self):
+        return f"<ReservaStock producto={self.producto_id} cliente={self.cliente_id} cantidad={self.cantidad} {self.estado}>"
@@ -0,0 +1,57 @@
+# Modelo ResumenVenta: acumulados de ventas por dimensión (producto, marca, categoría,
+# tipo de comprobante), clave y periodo. Alimenta los rankings sin recorrer historial_ventas.
+from app.extensions import db
+
+class ResumenVenta(db.Model):
+    __tablename__ = "resumen_ventas"
+
+    # Columnas principales
+    id = db.Column(db.Integer, primary_key=True)
+    dimension = db.Column(db.String(20), nullable=False)
+    clave = db.Column(db.String(120), nullable=False)
+    etiqueta = db.Column(db.String(120), nullable=False)
+    periodo = db.Column(db.String(10), nullable=False)  # dia | mes | total
+    inicio = db.Column(db.Date, nullable=False)  # fecha local (Lima) en que empieza el periodo
+    monto = db.Column(db.Float, nullable=False, default=0)
+    cantidad = db.Column(db.Integer, nullable=False, default=0)
+    ventas = db.Column(db.Integer, nullable=False, default=0)
+
+    # Top-N de ranking.top: una ventana de un solo periodo se lee del índice de su métrica ya ordenada
+    __table_args__ = (
+        db.UniqueConstraint("dimension", "periodo", "inicio", "clave", name="uq_resumen_ventas_periodo_clave"),
+        db.Index("ix_resumen_ventas_top_monto", "dimension", "periodo", "inicio", monto.desc(), "clave"),
+        db.Index("ix_resumen_ventas_top_cantidad", "dimension", "periodo", "inicio", cantidad.desc(), "clave"),
+        db.Index("ix_resumen_ventas_top_ventas", "dimension", "periodo", "inicio", ventas.desc(), "clave"),
+    )
+
+    def to_dict(self):
+        return {
+            "dimension": self.dimension,
+            "clave": self.clave,
+            "etiqueta": self.etiqueta,
+            "periodo": self.periodo,
+            "inicio": self.inicio.isoformat(),
+            "monto": self.monto,
+            "cantidad": self.cantidad,
+            "ventas": self.ventas,
+        }
+
+    def __repr__(self):
+        return f"<ResumenVenta {self.dimension}={self.clave} {self.periodo} {self.inicio} monto={self.monto}>"
+
+
+# Líneas de venta aún sin sumar a resumen_ventas: una fila por línea, sin claves ni etiquetas.
+# La compra solo inserta aquí (sin bloquear filas compartidas); `ranking.consolidar_pendientes`
+# las expande por dimensión y periodo y las suma cada pocos segundos.
+class ResumenVentaPendiente(db.Model):
+    __tablename__ = "resumen_ventas_pendientes"
+
+    id = db.Column(db.Integer, primary_key=True)
+    producto_id = db.Column(db.Integer)
+    tipo_comprobante_id = db.Column(db.Integer)
+    dia = db.Column(db.Date, nullable=False)  # fecha local (Lima) de la venta
+    monto = db.Column(db.Float, nullable=False, default=0)
+    cantidad = db.Column(db.Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f"<ResumenVentaPendiente producto={self.producto_id} {self.dia} monto={self.monto}>"
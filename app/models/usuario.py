@@ -1,7 +1,7 @@
 from app.extensions import db
-from werkzeug.security import generate_password_hash, check_password_hash
+from app.servicios.hashing import hashing
 from flask_login import UserMixin
-from sqlalchemy import exc, BigInteger
+from sqlalchemy import exc, func, BigInteger
 
 class Usuario(UserMixin, db.Model):  # ✅ Hereda de UserMixin
     __tablename__ = 'usuarios'
@@ -15,28 +15,53 @@ class Usuario(UserMixin, db.Model):  # ✅ Hereda de UserMixin
     rol = db.Column(db.String(20), nullable=False, default='cliente')
     estado = db.Column(db.String(20), nullable=False, default='activo')
 
-    # Relaciones
+    # Búsqueda por prefijo (lower(x) LIKE 'texto%') en el listado del admin
+    __table_args__ = (
+        db.Index('ix_usuarios_rol_nombre_lower', 'rol', func.lower(nombre).label('nombre_lower'),
+                 postgresql_ops={'nombre_lower': 'text_pattern_ops'}),
+        db.Index('ix_usuarios_rol_email_lower', 'rol', func.lower(email).label('email_lower'),
+                 postgresql_ops={'email_lower': 'text_pattern_ops'}),
+        # Búsqueda exacta sin distinguir mayúsculas (importación masiva) y unicidad del correo
+        db.Index('ix_usuarios_email_lower', func.lower(email), unique=True),
+        # Orden del listado del admin (ORDENES_CLIENTES): rol, clave de orden e id de desempate
+        db.Index('ix_usuarios_rol_id_orden', 'rol', 'id'),
+        db.Index('ix_usuarios_rol_nombre_orden', 'rol', func.lower(nombre), 'id'),
+        db.Index('ix_usuarios_rol_email_orden', 'rol', func.lower(email), 'id'),
+        db.Index('ix_usuarios_rol_estado_orden', 'rol', 'estado', 'id'),
+    )
+
+    # Relaciones (passive_deletes: el borrado de hijos lo hace la BD con ON DELETE o
+    # app/servicios/purga.py por lotes, sin cargarlos en memoria)
     compras = db.relationship(
         'Compra',
         back_populates='cliente',
         lazy='dynamic',
-        cascade="all, delete"
+        cascade="all, delete",
+        passive_deletes=True
     )
     productos = db.relationship(
         'Producto',
         back_populates='cliente',
         lazy='dynamic',
-        cascade="all, delete"
+        cascade="all, delete",
+        passive_deletes=True
     )
 
     # Métodos de autenticación
     def set_password(self, password):
-        self.password_hash = generate_password_hash(password)
+        self.password_hash = hashing.generar(password)
 
     def check_password(self, password):
         if self.password_hash is None:
             return False
-        return check_password_hash(self.password_hash, password)
+        return hashing.verificar(self.password_hash, password)
+
+    # Tras un login correcto: regenera el hash si cambió el algoritmo o el coste configurado
+    def actualizar_hash(self, password):
+        if self.password_hash and hashing.necesita_rehash(self.password_hash):
+            self.set_password(password)
+            return True
+        return False
 
     # Flask-Login: ya no necesitas definir is_authenticated, is_anonymous ni get_id()
     @property
@@ -1,11 +1,16 @@
-from flask import Blueprint, render_template, request, redirect, url_for, flash, abort, current_app
+from flask import Blueprint, render_template, request, redirect, url_for, flash, abort, jsonify
 from flask_login import login_required, current_user
-from werkzeug.security import generate_password_hash
 from functools import wraps
-from flask_mail import Message
+from sqlalchemy import func, or_
 
-from app.extensions import db, mail
+from app.extensions import db
 from app.models.usuario import Usuario as UsuarioDB
+from app.servicios.cache_usuarios import invalidar_usuario
+from app.servicios.tokens import revocar_tokens_usuario
+from app.servicios.correos import encolar_correo
+from app.servicios.purga import eliminar_usuario
+from app.servicios.paginacion import paginar, patron_prefijo
+from app.servicios.importacion import ErrorImportacion, cambiar_estado_masivo, detectar_formato, importar_clientes, leer_filas
 
 bp_admin = Blueprint("bp_admin", __name__, url_prefix="/admin")
 
@@ -19,12 +24,45 @@ def admin_required(func):
         return func(*args, **kwargs)
     return wrapper
 
-# Listar todos los clientes
+# Tras modificar un usuario: descarta su identidad cacheada y los JWT con claims antiguos
+def invalidar_sesiones(id):
+    invalidar_usuario(id)
+    revocar_tokens_usuario(id)
+
+# Columnas por las que se permite ordenar el listado; cada una, con rol e id, tiene su índice
+# en usuarios (ix_usuarios_rol_*_orden) para que la página salga del índice sin ordenar la tabla
+ORDENES_CLIENTES = {
+    "id": UsuarioDB.id,
+    "nombre": func.lower(UsuarioDB.nombre),
+    "email": func.lower(UsuarioDB.email),
+    "estado": UsuarioDB.estado,
+}
+
+# Listar clientes: paginado, con búsqueda por prefijo de nombre/email y orden
 @bp_admin.route("/clientes")
 @admin_required
 def listar_clientes():
-    clientes = UsuarioDB.query.filter_by(rol="cliente").all()
-    return render_template("admin_clientes.html", clientes=clientes)
+    busqueda = request.args.get("q", "").strip()
+    orden = request.args.get("orden", "id")
+    direccion = "desc" if request.args.get("dir") == "desc" else "asc"
+    if orden not in ORDENES_CLIENTES:
+        orden = "id"
+
+    query = UsuarioDB.query.filter_by(rol="cliente")
+    if busqueda:
+        patron = patron_prefijo(busqueda)
+        query = query.filter(or_(
+            func.lower(UsuarioDB.nombre).like(patron, escape="\\"),
+            func.lower(UsuarioDB.email).like(patron, escape="\\"),
+        ))
+    columnas = [ORDENES_CLIENTES[orden]]
+    if orden != "id":
+        columnas.append(UsuarioDB.id)
+    query = query.order_by(*(c.desc() if direccion == "desc" else c.asc() for c in columnas))
+
+    pagina = paginar(query, request.args.get("pagina", 1, type=int), request.args.get("por_pagina", 20, type=int))
+    return render_template("admin_clientes.html", clientes=pagina.items, pagina=pagina,
+                           q=busqueda, orden=orden, dir=direccion)
 
 # Crear nuevo cliente (formulario + alta)
 @bp_admin.route("/clientes/nuevo", methods=["GET", "POST"])
@@ -36,41 +74,21 @@ def nuevo_cliente():
         estado = request.form.get("estado", "activo")
         passwd = request.form.get("password")
 
-        if UsuarioDB.query.filter_by(email=email).first():
+        if UsuarioDB.query.filter(func.lower(UsuarioDB.email) == email.lower()).first():
             flash("El correo ya existe", "error")
             return redirect(url_for("bp_admin.nuevo_cliente"))
 
         nuevo = UsuarioDB(nombre=nombre, email=email, rol="cliente", estado=estado)
         if passwd:
-            nuevo.password_hash = generate_password_hash(passwd)
+            nuevo.set_password(passwd)
 
         db.session.add(nuevo)
         db.session.commit()
 
-        # ---------- Enviar correo de confirmación ----------
-        try:
-            msg = Message(
-                subject="¡Registro exitoso en la tienda!",
-                sender=("Tienda Virtual", current_app.config["MAIL_USERNAME"]),
-                recipients=[email],
-            )
-            msg.html = f"""
-            <html>
-            <body style="font-family: Arial, sans-serif; color: #333;">
-                <h2 style="color: #2c3e50;">¡Bienvenido/a, {nombre}!</h2>
-                <p>Tu cuenta ha sido creada exitosamente en nuestra prestigiosa tienda.</p>
-
-                <p><strong>Correo:</strong> {email}<br>
-                <strong>Rol:</strong> {nuevo.rol.capitalize()}</p>
-
-                <p>Gracias por formar parte de nuestra comunidad.</p>
-                <p style="margin-top: 30px;">Atentamente,<br><strong>El equipo de Sheriff Store</strong></p>
-            </body>
-            </html>
-            """
-            mail.send(msg)
-        except Exception as e:
-            flash(f"No se pudo enviar el correo: {e}", "error")
+        # Correo de bienvenida en segundo plano: la respuesta no espera al SMTP
+        if not encolar_correo("bienvenida.html", "¡Registro exitoso en la tienda!", [email],
+                              nombre=nombre, email=email, rol=nuevo.rol):
+            flash("No se pudo programar el correo de bienvenida", "error")
 
         flash("Cliente creado ✅")
         return redirect(url_for("bp_admin.listar_clientes"))
@@ -95,6 +113,7 @@ def editar_cliente(id):
         cliente.email = request.form["email"]
         cliente.estado = request.form.get("estado", cliente.estado)
         db.session.commit()
+        invalidar_sesiones(id)
         flash("Cliente actualizado ✅")
         return redirect(url_for("bp_admin.detalle_cliente", id=id))
 
@@ -104,10 +123,11 @@ def editar_cliente(id):
 @bp_admin.route("/clientes/<int:id>/borrar", methods=["POST"])
 @admin_required
 def borrar_cliente(id):
-    cliente = UsuarioDB.query.get_or_404(id)
-    db.session.delete(cliente)
-    db.session.commit()
-    flash("Cliente eliminado")
+    UsuarioDB.query.get_or_404(id)
+    # Con historial grande la purga sigue en segundo plano (app/servicios/purga.py)
+    inmediato = eliminar_usuario(id)
+    invalidar_sesiones(id)
+    flash("Cliente eliminado" if inmediato else "Cliente en eliminación; su historial se está borrando en segundo plano")
     return redirect(url_for("bp_admin.listar_clientes"))
 
 # Cambiar estado (activo/inactivo)
@@ -117,5 +137,47 @@ def cambiar_estado(id):
     cliente = UsuarioDB.query.get_or_404(id)
     cliente.estado = request.form["estado"]
     db.session.commit()
+    invalidar_sesiones(id)
     flash("Estado actualizado")
     return redirect(url_for("bp_admin.listar_clientes"))
+
+# Respuesta JSON para clientes de API; flash + redirección para el panel
+def _responder(datos, mensaje, status=200):
+    if request.accept_mimetypes.best == "application/json":
+        return jsonify(datos), status
+    flash(mensaje, "error" if status >= 400 else "message")
+    return redirect(url_for("bp_admin.listar_clientes"))
+
+# Importación masiva de clientes (CSV o JSONL)
+@bp_admin.route("/clientes/importar", methods=["POST"])
+@admin_required
+def importar_clientes_archivo():
+    archivo = request.files.get("archivo")
+    if not archivo or not archivo.filename:
+        return _responder({"msg": "Debe adjuntar un archivo"}, "Debe adjuntar un archivo", 400)
+    try:
+        formato = request.form.get("formato") or detectar_formato(archivo.filename)
+        resultado = importar_clientes(leer_filas(archivo.stream, formato))
+    except ErrorImportacion as e:
+        return _responder({"msg": str(e)}, str(e), 400)
+    return _responder(resultado, (
+        f"Importación completada: {resultado['creados']} creados, "
+        f"{resultado['duplicados']} duplicados, {resultado['invalidos']} inválidos"
+    ))
+
+# Activar/desactivar varios clientes a la vez
+@bp_admin.route("/clientes/estado-masivo", methods=["POST"])
+@admin_required
+def cambiar_estado_clientes():
+    ids = [int(i) for i in request.form.getlist("ids") if i.isdigit()]
+    estado = request.form.get("estado", "")
+    if not ids:
+        return _responder({"msg": "No se seleccionaron clientes"}, "No se seleccionaron clientes", 400)
+    try:
+        actualizados = cambiar_estado_masivo(ids, estado)
+    except ErrorImportacion as e:
+        return _responder({"msg": str(e)}, str(e), 400)
+    for id in ids:
+        invalidar_sesiones(id)
+    return _responder({"actualizados": actualizados}, f"Estado actualizado en {actualizados} cliente(s)")
+
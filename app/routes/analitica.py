@@ -0,0 +1,54 @@
+# API de analítica para administradores: GET /api/analytics/ventas?desde=&hasta=&granularidad=&dimension=&limite=
+# y exportación del historial: GET /api/analytics/ventas/exportar?formato=&desde_fecha=&desde_id=
+import logging
+
+from flask import Blueprint, Response, jsonify, request, stream_with_context
+from flask_login import current_user, login_required
+
+from app.servicios import exportacion
+from app.servicios.analitica import ErrorAnalitica, parsear_parametros, ventas
+from app.servicios.exportacion import ErrorExportacion, Marca
+
+analitica_bp = Blueprint("analitica", __name__)
+
+logger = logging.getLogger("flask_backend")
+
+
+@analitica_bp.route("/api/analytics/ventas")
+@login_required
+def analitica_ventas():
+    if current_user.rol != "administrador":
+        return jsonify({"msg": "Solo los administradores pueden consultar la analítica"}), 403
+    try:
+        desde, hasta, granularidad, dimension, limite = parsear_parametros(request.args)
+        resultado = ventas(desde, hasta, granularidad, dimension, limite)
+    except ErrorAnalitica as e:
+        return jsonify({"msg": str(e)}), 400
+
+    logger.info(f"[analitica_ventas] {desde}..{hasta} por {granularidad} / {dimension}: "
+                f"{len(resultado['periodos'])} periodos, {len(resultado['series'])} series")
+    return jsonify(resultado), 200
+
+
+# Respuesta en streaming: la nueva marca va en las cabeceras X-Marca-Fecha / X-Marca-Id
+# para pedir la siguiente exportación incremental
+@analitica_bp.route("/api/analytics/ventas/exportar")
+@login_required
+def exportar_ventas():
+    if current_user.rol != "administrador":
+        return jsonify({"msg": "Solo los administradores pueden exportar el historial"}), 403
+    formato = request.args.get("formato", "csv.gz")
+    try:
+        desde = Marca.desde_texto(request.args.get("desde_fecha"), request.args.get("desde_id"))
+        hasta = exportacion.marca_actual()
+        cuerpo = exportacion.generar(formato, exportacion.lotes(desde, hasta))
+    except ErrorExportacion as e:
+        return jsonify({"msg": str(e)}), 400
+
+    tipo, extension = exportacion.FORMATOS[formato]
+    marca = hasta if hasta else desde
+    cabeceras = {"Content-Disposition": f"attachment; filename=historial_ventas.{extension}"}
+    if marca:
+        cabeceras.update({"X-Marca-Fecha": marca.fecha.isoformat(), "X-Marca-Id": str(marca.id)})
+    logger.info(f"[exportar_ventas] {formato} desde {desde.a_dict()} hasta {marca.a_dict()}")
+    return Response(stream_with_context(cuerpo), mimetype=tipo, headers=cabeceras)
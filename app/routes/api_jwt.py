@@ -0,0 +1,132 @@
+# API para clientes con token JWT: catálogo, carrito y compras autorizados solo con los
+# claims del token (rol, estado). El carrito se guarda en el almacén clave-valor, no en la sesión,
+# y sus unidades quedan reservadas por un tiempo (app/servicios/reservas.py).
+import os
+
+from flask import Blueprint, request, jsonify
+from flask_jwt_extended import get_jwt, get_jwt_identity
+from sqlalchemy.orm import joinedload
+
+from app.extensions import db
+from app.models.compra import Compra
+from app.models.producto import Producto
+from app.servicios import reservas
+from app.servicios.almacen import crear_almacen
+from app.servicios.compras import ErrorCompra, publicar_comprobante, registrar_compra
+from app.servicios.inventario import etag
+from app.servicios.tokens import claims_requeridos
+
+api_jwt_bp = Blueprint("api_jwt", __name__)
+
+CARRITO_TTL = int(os.getenv("CARRITO_TTL", 24 * 3600))
+carritos = crear_almacen("carritos")
+
+
+def _carrito():
+    return carritos.obtener(get_jwt_identity()) or {}
+
+
+def _guardar_carrito(carrito):
+    if carrito:
+        carritos.guardar(get_jwt_identity(), carrito, ttl=CARRITO_TTL)
+    else:
+        carritos.eliminar(get_jwt_identity())
+
+
+# Catálogo completo (categoría cargada en la misma consulta)
+@api_jwt_bp.route("/productos", methods=["GET"])
+@claims_requeridos()
+def listar_productos():
+    productos = Producto.query.options(joinedload(Producto.categoria)).order_by(Producto.id).all()
+    return jsonify([p.to_dict() for p in productos]), 200
+
+
+@api_jwt_bp.route("/productos/<int:producto_id>", methods=["GET"])
+@claims_requeridos()
+def obtener_producto(producto_id):
+    producto = db.session.get(Producto, producto_id)
+    if not producto:
+        return jsonify({"msg": "Producto no encontrado"}), 404
+    respuesta = jsonify(producto.to_dict())
+    respuesta.headers["ETag"] = etag(producto)
+    return respuesta, 200
+
+
+@api_jwt_bp.route("/mis-productos", methods=["GET"])
+@claims_requeridos(rol="cliente")
+def mis_productos():
+    productos = (Producto.query.options(joinedload(Producto.categoria))
+                 .filter_by(cliente_id=int(get_jwt_identity())).all())
+    return jsonify([p.to_dict() for p in productos]), 200
+
+
+@api_jwt_bp.route("/carrito", methods=["GET"])
+@claims_requeridos(rol="cliente")
+def ver_carrito():
+    return jsonify(_carrito()), 200
+
+
+# Añade (o suma) unidades de un producto: {"producto_id": 1, "cantidad": 2}
+@api_jwt_bp.route("/carrito", methods=["POST"])
+@claims_requeridos(rol="cliente")
+def agregar_al_carrito():
+    data = request.get_json(silent=True) or {}
+    try:
+        producto_id = int(data["producto_id"])
+        cantidad = int(data.get("cantidad", 1))
+    except (KeyError, ValueError, TypeError):
+        return jsonify({"msg": "producto_id o cantidad no numéricos"}), 400
+    if cantidad < 1:
+        return jsonify({"msg": "Cantidad inválida"}), 400
+
+    carrito = _carrito()
+    str_id = str(producto_id)
+    if not reservas.reservar(int(get_jwt_identity()), producto_id, carrito.get(str_id, 0) + cantidad):
+        return jsonify({"msg": f"Stock insuficiente para producto {producto_id}"}), 409
+    carrito[str_id] = carrito.get(str_id, 0) + cantidad
+    _guardar_carrito(carrito)
+    return jsonify(carrito), 200
+
+
+@api_jwt_bp.route("/carrito/<int:producto_id>", methods=["DELETE"])
+@claims_requeridos(rol="cliente")
+def eliminar_del_carrito(producto_id):
+    carrito = _carrito()
+    if carrito.pop(str(producto_id), None) is not None:
+        reservas.reservar(int(get_jwt_identity()), producto_id, 0)
+    _guardar_carrito(carrito)
+    return jsonify(carrito), 200
+
+
+@api_jwt_bp.route("/comprar", methods=["POST"])
+@claims_requeridos(rol="cliente")
+def comprar():
+    data = request.get_json(silent=True) or {}
+    tipo_nombre = data.get("tipo_comprobante")
+    try:
+        compra = registrar_compra(
+            cliente_id=int(get_jwt_identity()),
+            tipo_nombre=tipo_nombre,
+            items=_carrito(),
+            email_destino=data.get("email_destino") or get_jwt().get("email"),
+            dni=data.get("dni", ""),
+            ruc=data.get("ruc", ""),
+        )
+    except ErrorCompra as e:
+        db.session.rollback()
+        return jsonify(e.respuesta()), e.status
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({"msg": "Error procesando la compra", "error": str(e)}), 500
+
+    _guardar_carrito({})
+    publicado = publicar_comprobante(compra, tipo_nombre)
+    return jsonify({"compra_id": compra.id, "total": compra.total, "publicado": publicado}), 201 if publicado else 202
+
+
+@api_jwt_bp.route("/compras", methods=["GET"])
+@claims_requeridos(rol="cliente")
+def mis_compras():
+    compras = (Compra.query.options(joinedload(Compra.tipo_comprobante))
+               .filter_by(cliente_id=int(get_jwt_identity())).order_by(Compra.id.desc()).all())
+    return jsonify([c.to_dict() for c in compras]), 200
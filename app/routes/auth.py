@@ -2,24 +2,33 @@
 import os
 from flask import Blueprint, request, jsonify
 from flask_login import login_user
-from flask_jwt_extended import create_access_token, jwt_required, get_jwt_identity
-from google.oauth2 import id_token
-from google.auth.transport import requests as google_requests
+from flask_jwt_extended import jwt_required, get_jwt, get_jwt_identity
+from sqlalchemy import func
 
 from app.models.usuario import Usuario
 from app.extensions import db
+from app.servicios.hashing import HashingSaturado
+from app.servicios.tokens import crear_token, revocar_token
+from app.servicios.verificador_google import verificador
+from app.servicios.limitador import LOGIN_POR_EMAIL, LOGIN_POR_IP, REGISTRO_POR_IP, limitar
 
 auth_bp = Blueprint("auth", __name__)
 
+# Pool de hashing lleno: se pide al cliente que reintente en lugar de bloquear el hilo
+@auth_bp.errorhandler(HashingSaturado)
+def hashing_saturado(e):
+    return jsonify({"msg": "Servicio ocupado, intente nuevamente"}), 503, {"Retry-After": "1"}
+
 # Registro de usuario
 @auth_bp.route("/register", methods=["POST"])
+@limitar(REGISTRO_POR_IP)
 def register():
     data = request.get_json()
 
     if not data.get("email") or not data.get("password") or not data.get("nombre"):
         return jsonify({"msg": "Faltan datos obligatorios"}), 400
 
-    if Usuario.query.filter_by(email=data["email"]).first():
+    if Usuario.query.filter(func.lower(Usuario.email) == data["email"].lower()).first():
         return jsonify({"msg": "El correo ya está registrado"}), 400
 
     nuevo_usuario = Usuario(
@@ -27,8 +36,8 @@ def register():
         email=data["email"],
         rol=data.get("rol", "cliente")
     )
+    nuevo_usuario.set_password(data["password"])
     try:
-        nuevo_usuario.set_password(data["password"])
         db.session.add(nuevo_usuario)
         db.session.commit()
         return jsonify({"msg": "Usuario registrado exitosamente"}), 201
@@ -38,6 +47,7 @@ def register():
 
 # Login con Google OAuth (bypass por email solo en entorno de prueba)
 @auth_bp.route("/login/google", methods=["POST"])
+@limitar(LOGIN_POR_IP, LOGIN_POR_EMAIL)
 def login_google():
     data = request.get_json(silent=True) or {}
 
@@ -47,7 +57,7 @@ def login_google():
         if not usuario:
             return jsonify({"msg": "Usuario no registrado"}), 401
         login_user(usuario)
-        access_token = create_access_token(identity=usuario.id)
+        access_token = crear_token(usuario)
         return jsonify({"access_token": access_token, "rol": usuario.rol}), 200
 
     token_google = data.get("credential")
@@ -55,7 +65,7 @@ def login_google():
         return jsonify({"msg": "Token de Google no proporcionado"}), 400
 
     try:
-        id_info = id_token.verify_oauth2_token(token_google, google_requests.Request())
+        id_info = verificador.verificar(token_google)
         email = id_info.get("email")
 
         if not email:
@@ -66,7 +76,7 @@ def login_google():
             return jsonify({"msg": "Usuario no registrado"}), 401
 
         login_user(usuario)
-        access_token = create_access_token(identity=usuario.id)
+        access_token = crear_token(usuario)
         return jsonify({"access_token": access_token, "rol": usuario.rol}), 200
 
     except ValueError:
@@ -76,6 +86,15 @@ def login_google():
 @auth_bp.route("/profile", methods=["GET"])
 @jwt_required()
 def profile():
+    # Tokens con claims: se responde sin consultar la tabla usuarios
+    claims = get_jwt()
+    if "rol" in claims:
+        return jsonify({
+            "nombre": claims["nombre"],
+            "email": claims["email"],
+            "rol": claims["rol"],
+        }), 200
+
     user_id = get_jwt_identity()
     usuario = db.session.get(Usuario, int(user_id))
     if not usuario:
@@ -91,10 +110,12 @@ def profile():
 @auth_bp.route("/logout", methods=["POST"])
 @jwt_required()
 def logout():
+    revocar_token(get_jwt())
     return jsonify({"msg": "Sesión cerrada. Elimine el token del cliente."}), 200
 
 # Login tradicional
 @auth_bp.route("/login", methods=["POST"])
+@limitar(LOGIN_POR_IP, LOGIN_POR_EMAIL)
 def login():
     data = request.get_json()
 
@@ -105,6 +126,9 @@ def login():
     if not usuario or not usuario.check_password(data["password"]):
         return jsonify({"msg": "Credenciales inválidas"}), 401
 
+    if usuario.actualizar_hash(data["password"]):
+        db.session.commit()
+
     login_user(usuario)
-    access_token = create_access_token(identity=usuario.id)
+    access_token = crear_token(usuario)
     return jsonify({"access_token": access_token, "rol": usuario.rol}), 200
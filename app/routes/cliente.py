@@ -5,10 +5,13 @@ from flask_mail import Message
 from app.extensions import db, mail
 from app.models.producto import Producto
 from app.models.historial_ventas import HistorialVenta
+from app.servicios import historial_vendedor, inventario
 # from app.models.cliente import Cliente  # Descomenta si tienes el modelo
 
 bp_cliente = Blueprint("bp_cliente", __name__, url_prefix="/cliente")
 
+CAMPOS_EDITABLES = ("nombre", "descripcion", "precio", "stock", "imagen_url", "marca")
+
 # Decorador para restringir rutas solo a clientes
 def cliente_required(func):
     @wraps(func)
@@ -44,7 +47,18 @@ def mis_productos():
     productos = Producto.query.filter_by(cliente_id=current_user.id).all()
     return jsonify([p.to_dict() for p in productos]), 200
 
-# Actualizar producto
+# Ver un producto propio; el ETag es su versión (para enviarla en If-Match al actualizar)
+@bp_cliente.route("/productos/<int:id>", methods=["GET"])
+@cliente_required
+def ver_producto(id):
+    prod = Producto.query.get_or_404(id)
+    if prod.cliente_id != current_user.id:
+        abort(403)
+    respuesta = jsonify(prod.to_dict())
+    respuesta.headers["ETag"] = inventario.etag(prod)
+    return respuesta, 200
+
+# Actualizar producto; con If-Match solo se aplica si la versión no cambió (412 si cambió)
 @bp_cliente.route("/productos/<int:id>", methods=["PUT"])
 @cliente_required
 def actualizar_producto(id):
@@ -52,14 +66,16 @@ def actualizar_producto(id):
     if prod.cliente_id != current_user.id:
         abort(403)
     data = request.get_json()
-    prod.nombre = data.get("nombre", prod.nombre)
-    prod.descripcion = data.get("descripcion", prod.descripcion)
-    prod.precio = data.get("precio", prod.precio)
-    prod.stock = data.get("stock", prod.stock)
-    prod.imagen_url = data.get("imagen_url", prod.imagen_url)
-    prod.marca = data.get("marca", prod.marca)
-    db.session.commit()
-    return jsonify({"msg": "Producto actualizado"}), 200
+    cambios = {campo: data[campo] for campo in CAMPOS_EDITABLES if campo in data}
+    try:
+        prod = inventario.actualizar_producto(id, cambios, inventario.version_de_if_match(request.if_match))
+    except inventario.ConflictoVersion as e:
+        respuesta = jsonify({"msg": "El producto cambió desde que se leyó", "version": e.producto.version})
+        respuesta.headers["ETag"] = inventario.etag(e.producto)
+        return respuesta, 412
+    respuesta = jsonify({"msg": "Producto actualizado", "version": prod.version})
+    respuesta.headers["ETag"] = inventario.etag(prod)
+    return respuesta, 200
 
 # Eliminar producto
 @bp_cliente.route("/productos/<int:id>", methods=["DELETE"])
@@ -85,6 +101,21 @@ def mi_historial_ventas():
         "fecha": v.fecha_venta.isoformat()
     } for v in ventas]), 200
 
+# Ventas de mis productos (como vendedor), paginadas por cursor y con totales por periodo
+@bp_cliente.route("/ventas/vendedor", methods=["GET"])
+@cliente_required
+def mis_ventas_como_vendedor():
+    try:
+        por_pagina = int(request.args.get("por_pagina", 20))
+        items, siguiente = historial_vendedor.pagina(current_user.id, request.args.get("cursor"), por_pagina)
+    except ValueError as e:
+        return jsonify({"msg": str(e)}), 400
+    return jsonify({
+        "ventas": items,
+        "siguiente": siguiente,
+        "totales": historial_vendedor.totales(current_user.id),
+    }), 200
+
 
 #Prueba locust 
 @bp_cliente.route("/test/productos_clientes", methods=["GET"])
@@ -2,10 +2,12 @@ from flask import Blueprint, request, render_template, jsonify
 from flask_login import login_required, current_user
 from app.models.historial_ventas import HistorialVenta
 from app.models.usuario import Usuario
-from collections import defaultdict, Counter
 from datetime import datetime
+from sqlalchemy import func, select
 from app.extensions import db
-import pytz
+from app.servicios import ranking
+from app.servicios.series_tiempo import agrupar, expresion_epoch, hoy_local, limites_utc, serie_dashboard, ventana
+import numpy as np
 import logging
 
 
@@ -22,6 +24,8 @@ if not logger.hasHandlers():
     logger.addHandler(handler)
 logger.setLevel(logging.DEBUG)
 
+LIMITE_GRAFICOS = 10
+
 
 @historial_ventas_bp.route("/historial_ventas")
 @login_required
@@ -37,107 +41,56 @@ def mostrar_historial_ventas():
     return render_template("historial_ventas.html", historial=historial)
 
 
+# Fechas (segundos epoch UTC) y montos de las ventas en [desde, hasta), como arreglos
+def _serie_ventas(desde, hasta):
+    epoch = expresion_epoch(HistorialVenta.fecha_venta, db.engine.dialect.name)
+    filas = db.session.execute(
+        select(epoch, HistorialVenta.total_venta)
+        .where(HistorialVenta.fecha_venta >= desde, HistorialVenta.fecha_venta < hasta)
+    ).all()
+    epochs = np.fromiter((f[0] for f in filas), dtype=np.int64, count=len(filas))
+    montos = np.fromiter((f[1] for f in filas), dtype=float, count=len(filas))
+    return epochs, montos
+
+
+def _porcentajes(valores):
+    total = sum(valores) or 1
+    return [round((v / total) * 100, 2) for v in valores]
+
+
 @dashboard_ventas_bp.route('/dashboard_ventas')
 @login_required
 def dashboard_ventas():
     agrupacion = request.args.get('agrupacion', 'dia')
-    ventas = db.session.query(HistorialVenta).all()
     filtro = request.args.get('filtro', 'tipo_comprobante')
-
-    datos_agrupados = defaultdict(float)
-    etiquetas = []
-
-    zona_local = pytz.timezone('America/Lima')
-    hoy = datetime.now(zona_local)
-
-    if agrupacion == 'dia':
-        etiquetas = [f'{hora:02d}:00' for hora in range(24)]
-        for venta in ventas:
-            fecha_local = venta.fecha_venta.astimezone(zona_local)
-            if fecha_local.date() == hoy.date():
-                hora = fecha_local.hour
-                datos_agrupados[f'{hora:02d}:00'] += venta.total_venta  
-
-    elif agrupacion == 'semana':
-        dias_semana = ['Lunes', 'Martes', 'Miércoles', 'Jueves', 'Viernes', 'Sábado', 'Domingo']
-        etiquetas = dias_semana
-        for venta in ventas:
-            fecha_local = venta.fecha_venta.astimezone(zona_local)
-            if (hoy - fecha_local).days < 7:
-                nombre_dia = fecha_local.strftime('%A')
-                traducciones = {
-                    'Monday': 'Lunes', 'Tuesday': 'Martes', 'Wednesday': 'Miércoles',
-                    'Thursday': 'Jueves', 'Friday': 'Viernes',
-                    'Saturday': 'Sábado', 'Sunday': 'Domingo'
-                }
-                nombre_dia = traducciones.get(nombre_dia, nombre_dia)
-                datos_agrupados[nombre_dia] += venta.total_venta  
-
-    elif agrupacion == 'mes':
-        etiquetas = ['Semana 1', 'Semana 2', 'Semana 3', 'Semana 4']
-        for venta in ventas:
-            fecha_local = venta.fecha_venta.astimezone(zona_local)
-            if fecha_local.month == hoy.month and fecha_local.year == hoy.year:
-                dia = fecha_local.day
-                if dia <= 7:
-                    semana = 'Semana 1'
-                elif dia <= 14:
-                    semana = 'Semana 2'
-                elif dia <= 21:
-                    semana = 'Semana 3'
-                else:
-                    semana = 'Semana 4'
-                datos_agrupados[semana] += venta.total_venta  
-
-    montos = [round(datos_agrupados.get(etiqueta, 0), 2) for etiqueta in etiquetas]
-
-    # Gráficos de comprobantes
-    comprobantes_montos = defaultdict(float)
-    comprobantes_conteo = Counter()
-
-    for venta in ventas:
-        if hasattr(venta, "tipo_comprobante") and venta.tipo_comprobante:
-            nombre = venta.tipo_comprobante.nombre
-            comprobantes_montos[nombre] += venta.total_venta
-            comprobantes_conteo[nombre] += 1
-
-    nombres_comprobantes = list(comprobantes_montos.keys())
-    totales_comprobantes = list(comprobantes_montos.values())
-
-    nombres_conteo = list(comprobantes_conteo.keys())
-    valores_conteo = list(comprobantes_conteo.values())
-    total_conteos = sum(valores_conteo) or 1
-    conteos = [round((v / total_conteos) * 100, 2) for v in valores_conteo]
-
-    # Gráfico dinámico 
-    agrupaciones_montos = defaultdict(float)
-    agrupaciones_conteo = Counter()
-
-    for venta in ventas:
-        key = None
-
-        if filtro == 'tipo_comprobante' and hasattr(venta, 'tipo_comprobante') and venta.tipo_comprobante:
-            key = venta.tipo_comprobante.nombre
-            if key:
-                agrupaciones_montos[key] += venta.total_venta
-                agrupaciones_conteo[key] += 1
-        elif filtro == 'producto' and hasattr(venta, 'producto') and venta.producto:
-            key = venta.producto.nombre
-        elif filtro == 'marca' and hasattr(venta, 'producto') and venta.producto and venta.producto.marca:
-            key = venta.producto.marca
-        elif filtro == 'categoria' and hasattr(venta, 'producto') and venta.producto and venta.producto.categoria:
-            key = venta.producto.categoria.nombre
-
-        if key and filtro != 'tipo_comprobante':
-            agrupaciones_montos[key] += venta.total_venta
-            agrupaciones_conteo[key] += venta.cantidad
-
-    nombres_grafico = list(agrupaciones_montos.keys())
-    montos_grafico = list(agrupaciones_montos.values())
-    valores_conteo_grafico = list(agrupaciones_conteo.values())
-    total_conteo_grafico = sum(valores_conteo_grafico) or 1
-    porcentajes_grafico = [round((v / total_conteo_grafico) * 100, 2) for v in valores_conteo_grafico]
-    cantidades_grafico = valores_conteo_grafico 
+    ventana_ranking = request.args.get('ventana', 'total')
+    if ventana_ranking not in ranking.VENTANAS:
+        ventana_ranking = 'total'
+
+    # Serie temporal: solo las ventas de la ventana, agrupadas en hora local de Lima
+    etiquetas, montos = [], []
+    if agrupacion in ('dia', 'semana', 'mes'):
+        hoy = hoy_local()
+        desde, hasta = limites_utc(*ventana(agrupacion, hoy))
+        epochs, totales = _serie_ventas(desde, hasta)
+        etiquetas, montos = serie_dashboard(epochs, totales, agrupacion, hoy)
+
+    # Gráficos de comprobantes y ranking por filtro: Top-N sobre los acumulados (resumen_ventas)
+    comprobantes = ranking.top('tipo_comprobante', n=LIMITE_GRAFICOS, ventana=ventana_ranking)
+    nombres_comprobantes = [c["etiqueta"] for c in comprobantes]
+    totales_comprobantes = [c["monto"] for c in comprobantes]
+    nombres_conteo = nombres_comprobantes
+    conteos = _porcentajes([c["ventas"] for c in comprobantes])
+
+    # Gráfico dinámico: por tipo de comprobante cuenta ventas; por producto/marca/categoría, unidades
+    mejores = []
+    if filtro in ranking.DIMENSIONES:
+        mejores = ranking.top(filtro, n=LIMITE_GRAFICOS, ventana=ventana_ranking)
+    metrica_conteo = 'ventas' if filtro == 'tipo_comprobante' else 'cantidad'
+    nombres_grafico = [m["etiqueta"] for m in mejores]
+    montos_grafico = [m["monto"] for m in mejores]
+    cantidades_grafico = [m[metrica_conteo] for m in mejores]
+    porcentajes_grafico = _porcentajes(cantidades_grafico)
 
     return render_template(
         'dashboard_ventas.html',
@@ -159,25 +112,31 @@ def dashboard_ventas():
 #Pruebas con locust
 @dashboard_ventas_bp.route('/api/dashboard/ventas')
 def api_dashboard_ventas():
-    from collections import defaultdict
-    from datetime import datetime
-    import pytz
-
-    zona_local = pytz.timezone('America/Lima')
-    hoy = datetime.now(zona_local)
-
-    ventas = HistorialVenta.query.all()
-    datos = defaultdict(float)
-
-    for venta in ventas:
-        fecha_local = venta.fecha_venta.astimezone(zona_local)
-        if fecha_local.date() == hoy.date():
-            hora = fecha_local.hour
-            datos[f'{hora:02d}:00'] += venta.total_venta
+    desde, hasta = limites_utc(*ventana('dia', hoy_local()))
+    epochs, totales = _serie_ventas(desde, hasta)
+    inicios, sumas, _ = agrupar(epochs, totales, 'hora')
+    fechas = [f"{inicio.astype(datetime).hour:02d}:00" for inicio in inicios]
+    montos = [round(float(m), 2) for m in sumas]
 
     return jsonify({
-        "fechas": list(datos.keys()),
-        "montos": list(datos.values()),
-        "total_ventas": round(sum(datos.values()), 2),
-        "cantidad_ventas": len(ventas)
+        "fechas": fechas,
+        "montos": montos,
+        "total_ventas": round(float(sumas.sum()), 2),
+        "cantidad_ventas": db.session.query(func.count(HistorialVenta.id)).scalar()
     }), 200
+
+
+# Top-N de ventas por dimensión y ventana, leído de los acumulados
+@dashboard_ventas_bp.route('/api/dashboard/ranking')
+@login_required
+def api_dashboard_ranking():
+    try:
+        mejores = ranking.top(
+            request.args.get('dimension', 'producto'),
+            n=int(request.args.get('n', ranking.LIMITE_POR_DEFECTO)),
+            ventana=request.args.get('ventana', 'total'),
+            metrica=request.args.get('metrica', 'monto'),
+        )
+    except ValueError as e:
+        return jsonify({"msg": str(e)}), 400
+    return jsonify(mejores), 200
@@ -9,6 +9,7 @@ from flask_login import login_required, current_user
 from app.models.producto import Producto
 from app.models.categoria import Categoria
 from app.extensions import db
+from app.servicios import inventario, purga, reservas
 
 producto_bp = Blueprint('producto', __name__)
 
@@ -177,6 +178,27 @@ def actualizar_producto(producto_id):
         logger.error(f"[actualizar_producto] Error en datos numéricos: {e}")
         return jsonify({'msg': 'Precio o stock inválidos'}), 400
 
+    # Versión que se mostró en el formulario: si cambió (otra edición o una compra), no se pisa
+    version = data.get('version', '')
+    version_esperada = int(version) if version.isdigit() else None
+    if version_esperada is not None and producto.version != version_esperada:
+        logger.warning(f"[actualizar_producto] Producto {producto_id} cambió desde que se abrió el formulario")
+        return jsonify({'msg': 'El producto cambió mientras lo editabas; vuelve a abrir el formulario',
+                        'version': producto.version}), 409
+
+    cambios = {
+        'nombre': data.get('nombre', producto.nombre).strip(),
+        'descripcion': data.get('descripcion', producto.descripcion).strip(),
+        'precio': precio,
+        'stock': stock,
+        'marca': data.get('marca', producto.marca).strip(),
+    }
+    categoria_id = data.get('categoria_id')
+    if categoria_id:
+        cambios['categoria_id'] = int(categoria_id)
+
+    imagen_anterior = None
+    upload_path = os.path.join(current_app.root_path, 'static/uploads')
     file = request.files.get('imagen')
     if file and allowed_file(file.filename):
         file.seek(0, os.SEEK_END)
@@ -186,28 +208,26 @@ def actualizar_producto(producto_id):
             logger.error("[actualizar_producto] Archivo excede el tamaño máximo")
             return jsonify({'msg': 'El archivo excede el tamaño máximo de 16MB'}), 400
         filename = secure_filename(file.filename)
-        upload_path = os.path.join(current_app.root_path, 'static/uploads')
         os.makedirs(upload_path, exist_ok=True)
-        file_path = os.path.join(upload_path, filename)
-        file.save(file_path)
-        if producto.imagen_url:
-            old_file_path = os.path.join(upload_path, producto.imagen_url)
-            if os.path.exists(old_file_path):
-                os.remove(old_file_path)
-                logger.info(f"[actualizar_producto] Imagen antigua eliminada: {old_file_path}")
-        producto.imagen_url = filename
+        file.save(os.path.join(upload_path, filename))
+        imagen_anterior = producto.imagen_url if producto.imagen_url != filename else None
+        cambios['imagen_url'] = filename
         logger.info(f"[actualizar_producto] Imagen actualizada para producto {producto_id}")
 
-    producto.nombre = data.get('nombre', producto.nombre).strip()
-    producto.descripcion = data.get('descripcion', producto.descripcion).strip()
-    producto.precio = precio
-    producto.stock = stock
-    categoria_id = data.get('categoria_id')
-    if categoria_id:
-        producto.categoria_id = int(categoria_id)
-    producto.marca = data.get('marca', producto.marca).strip()
+    try:
+        inventario.actualizar_producto(producto_id, cambios, version_esperada)
+    except inventario.ConflictoVersion as e:
+        logger.warning(f"[actualizar_producto] {e}")
+        return jsonify({'msg': 'El producto cambió mientras lo editabas; vuelve a abrir el formulario',
+                        'version': e.producto.version}), 409
+
+    # La imagen anterior se borra solo cuando el cambio ya se guardó
+    if imagen_anterior:
+        old_file_path = os.path.join(upload_path, imagen_anterior)
+        if os.path.exists(old_file_path):
+            os.remove(old_file_path)
+            logger.info(f"[actualizar_producto] Imagen antigua eliminada: {old_file_path}")
 
-    db.session.commit()
     logger.info(f"[actualizar_producto] Producto {producto_id} actualizado por usuario {current_user.id}")
     return redirect(url_for('producto.listar_mis_productos'))
 
@@ -230,9 +250,10 @@ def eliminar_producto(producto_id):
             except Exception as e:
                 logger.error(f"[eliminar_producto] Error eliminando archivo: {e}")
 
-    db.session.delete(producto)
-    db.session.commit()
-    logger.info(f"[eliminar_producto] Producto {producto_id} eliminado por usuario {current_user.id}")
+    if purga.eliminar_producto(producto_id):
+        logger.info(f"[eliminar_producto] Producto {producto_id} eliminado por usuario {current_user.id}")
+    else:
+        logger.info(f"[eliminar_producto] Producto {producto_id} en purga en segundo plano (usuario {current_user.id})")
     return redirect(url_for('producto.listar_mis_productos'))
 
 
@@ -243,7 +264,13 @@ def agregar_al_carrito(producto_id):
     producto = Producto.query.get_or_404(producto_id)
     carrito = session.get('carrito', {})
     str_id = str(producto_id)
-    carrito[str_id] = carrito.get(str_id, 0) + 1
+    cantidad = carrito.get(str_id, 0) + 1
+    # Las unidades del carrito quedan reservadas por un tiempo (ver app/servicios/reservas.py)
+    if not reservas.reservar(current_user.id, producto_id, cantidad):
+        flash('No hay stock disponible para este producto.', 'error')
+        logger.info(f"[agregar_al_carrito] Usuario {current_user.id} sin stock disponible para producto {producto_id}")
+        return redirect(url_for('producto.listar_mis_productos'))
+    carrito[str_id] = cantidad
     session['carrito'] = carrito
     session.modified = True
     flash('Producto añadido al estante virtual.', 'success')
@@ -286,6 +313,10 @@ def editar_cantidad_carrito(producto_id):
         return jsonify({'msg': 'Cantidad inválida'}), 400
 
     str_id = str(producto_id)
+    if not reservas.reservar(current_user.id, producto_id, max(cantidad, 0)):
+        flash('No hay stock disponible para esa cantidad.', 'error')
+        logger.info(f"[editar_cantidad_carrito] Usuario {current_user.id} sin stock disponible para {cantidad} de producto {producto_id}")
+        return redirect(url_for('producto.ver_carrito'))
     if cantidad < 1:
         carrito.pop(str_id, None)
     else:
@@ -305,6 +336,7 @@ def eliminar_producto_carrito(producto_id):
     carrito = session.get('carrito', {})
     str_id = str(producto_id)
     if str_id in carrito:
+        reservas.reservar(current_user.id, producto_id, 0)
         carrito.pop(str_id)
         session['carrito'] = carrito
         session.modified = True
@@ -0,0 +1,90 @@
+# Almacén clave-valor con expiración: en memoria por proceso o compartido en Redis
+# (ALMACEN_REDIS_URL). Lo usan las cachés y contadores que no necesitan ir a la BD.
+import json
+import logging
+import os
+import threading
+import time
+
+logger = logging.getLogger("flask_backend")
+
+
+class AlmacenMemoria:
+    """Diccionario con TTL por clave; acotado para no crecer sin límite."""
+
+    def __init__(self, capacidad=10000):
+        self.capacidad = capacidad
+        self._datos = {}
+        self._lock = threading.Lock()
+
+    def obtener(self, clave):
+        with self._lock:
+            entrada = self._datos.get(clave)
+            if entrada is None:
+                return None
+            valor, expira = entrada
+            if expira is not None and expira <= time.monotonic():
+                del self._datos[clave]
+                return None
+            return valor
+
+    def guardar(self, clave, valor, ttl=None):
+        expira = time.monotonic() + ttl if ttl else None
+        with self._lock:
+            if len(self._datos) >= self.capacidad and clave not in self._datos:
+                self._purgar()
+            self._datos[clave] = (valor, expira)
+
+    def eliminar(self, clave):
+        with self._lock:
+            self._datos.pop(clave, None)
+
+    def limpiar(self):
+        with self._lock:
+            self._datos.clear()
+
+    # Quita las entradas vencidas; si no basta, descarta las más antiguas
+    def _purgar(self):
+        ahora = time.monotonic()
+        for clave in [c for c, (_, expira) in self._datos.items() if expira is not None and expira <= ahora]:
+            del self._datos[clave]
+        while len(self._datos) >= self.capacidad:
+            del self._datos[next(iter(self._datos))]
+
+
+class AlmacenRedis:
+    """Mismo contrato que AlmacenMemoria sobre Redis; los valores se guardan como JSON."""
+
+    def __init__(self, url, prefijo="tienda"):
+        import redis  # dependencia opcional
+
+        self.cliente = redis.Redis.from_url(url)
+        self.prefijo = prefijo
+
+    def _clave(self, clave):
+        return f"{self.prefijo}:{clave}"
+
+    def obtener(self, clave):
+        valor = self.cliente.get(self._clave(clave))
+        return None if valor is None else json.loads(valor)
+
+    def guardar(self, clave, valor, ttl=None):
+        self.cliente.set(self._clave(clave), json.dumps(valor), ex=int(ttl) if ttl else None)
+
+    def eliminar(self, clave):
+        self.cliente.delete(self._clave(clave))
+
+    def limpiar(self):
+        for clave in self.cliente.scan_iter(f"{self.prefijo}:*"):
+            self.cliente.delete(clave)
+
+
+# Redis si está configurado y disponible; si no, memoria del proceso
+def crear_almacen(prefijo, capacidad=10000):
+    url = os.getenv("ALMACEN_REDIS_URL")
+    if url:
+        try:
+            return AlmacenRedis(url, prefijo=prefijo)
+        except ImportError:
+            logger.warning("ALMACEN_REDIS_URL definido pero el paquete redis no está instalado; se usa memoria")
+    return AlmacenMemoria(capacidad=capacidad)
@@ -0,0 +1,224 @@
+# Analítica de ventas por rango de fechas, granularidad y dimensión. Solo se leen las filas
+# del rango (índice ix_historial_ventas_fecha_venta) y la respuesta está acotada: como máximo
+# MAX_PERIODOS periodos y las `limite` claves con más ventas (el resto se suma en "Otros").
+# En PostgreSQL se agrupa en SQL (date_trunc en hora de Lima); en otros motores se agrupa con
+# NumPy (app/servicios/series_tiempo.py).
+from datetime import date, datetime, timedelta
+
+import numpy as np
+from sqlalchemy import func, select
+
+from app.extensions import db
+from app.models.categoria import Categoria
+from app.models.historial_ventas import HistorialVenta
+from app.models.producto import Producto
+from app.models.tipo_comprobante import TipoComprobante
+from app.models.usuario import Usuario
+from app.servicios import series_tiempo
+from app.servicios.series_tiempo import ZONA_LOCAL
+
+MAX_PERIODOS = 1000
+LIMITE_CLAVES = 10
+MAX_LIMITE_CLAVES = 50
+DIAS_POR_DEFECTO = 30
+OTROS = "Otros"
+
+# Se aceptan también los nombres en inglés
+ALIAS_GRANULARIDAD = {"hour": "hora", "day": "dia", "week": "semana", "month": "mes"}
+TRUNC_POSTGRES = {"hora": "hour", "dia": "day", "semana": "week", "mes": "month"}
+
+# dimensión -> (columna clave, columna etiqueta, joins desde historial_ventas)
+DIMENSIONES = {
+    "producto": (HistorialVenta.producto_id, Producto.nombre, [(Producto, HistorialVenta.producto_id == Producto.id)]),
+    "marca": (Producto.marca, Producto.marca, [(Producto, HistorialVenta.producto_id == Producto.id)]),
+    "categoria": (Categoria.id, Categoria.nombre, [(Producto, HistorialVenta.producto_id == Producto.id),
+                                                  (Categoria, Producto.categoria_id == Categoria.id)]),
+    "tipo_comprobante": (HistorialVenta.tipo_comprobante_id, TipoComprobante.nombre,
+                         [(TipoComprobante, HistorialVenta.tipo_comprobante_id == TipoComprobante.id)]),
+    "cliente": (HistorialVenta.cliente_id, Usuario.nombre, [(Usuario, HistorialVenta.cliente_id == Usuario.id)]),
+}
+
+
+class ErrorAnalitica(Exception):
+    pass
+
+
+def _fecha(texto, nombre):
+    try:
+        return date.fromisoformat(texto)
+    except (TypeError, ValueError):
+        raise ErrorAnalitica(f"'{nombre}' debe tener el formato AAAA-MM-DD")
+
+
+# Valida los parámetros de la petición; `hasta` es inclusivo
+def parsear_parametros(args, hoy=None):
+    hoy = hoy or series_tiempo.hoy_local()
+    hasta = _fecha(args["hasta"], "hasta") if args.get("hasta") else hoy
+    desde = _fecha(args["desde"], "desde") if args.get("desde") else hasta - timedelta(days=DIAS_POR_DEFECTO - 1)
+    if desde > hasta:
+        raise ErrorAnalitica("'desde' no puede ser posterior a 'hasta'")
+
+    granularidad = args.get("granularidad", "dia")
+    granularidad = ALIAS_GRANULARIDAD.get(granularidad, granularidad)
+    if granularidad not in series_tiempo.GRANULARIDADES:
+        raise ErrorAnalitica(f"granularidad debe ser una de: {', '.join(series_tiempo.GRANULARIDADES)}")
+
+    dimension = args.get("dimension") or None
+    if dimension is not None and dimension not in DIMENSIONES:
+        raise ErrorAnalitica(f"dimension debe ser una de: {', '.join(DIMENSIONES)}")
+
+    try:
+        limite = int(args.get("limite", LIMITE_CLAVES))
+    except ValueError:
+        raise ErrorAnalitica("'limite' debe ser un número")
+    limite = min(max(1, limite), MAX_LIMITE_CLAVES)
+    return desde, hasta + timedelta(days=1), granularidad, dimension, limite
+
+
+# Segundos "de pared" de una fecha u hora local (sin zona)
+def _segundos_pared(fecha):
+    if isinstance(fecha, datetime):
+        return series_tiempo.a_epoch(fecha)
+    return (fecha - date(1970, 1, 1)).days * 86400
+
+
+# Números de cubeta del rango local [desde, hasta)
+def periodos(desde, hasta, granularidad):
+    limites = np.array([_segundos_pared(desde), _segundos_pared(hasta) - 1], dtype=np.int64)
+    primera, ultima = series_tiempo.numero_cubeta(limites, granularidad)
+    if ultima - primera + 1 > MAX_PERIODOS:
+        raise ErrorAnalitica(
+            f"El rango produce {ultima - primera + 1} periodos (máximo {MAX_PERIODOS}); "
+            f"use una granularidad mayor o un rango más corto"
+        )
+    return np.arange(primera, ultima + 1, dtype=np.int64)
+
+
+def _filtro_rango(consulta, desde_utc, hasta_utc):
+    return consulta.where(HistorialVenta.fecha_venta >= desde_utc, HistorialVenta.fecha_venta < hasta_utc)
+
+
+def _con_joins(consulta, joins):
+    for modelo, condicion in joins:
+        consulta = consulta.join(modelo, condicion)
+    return consulta
+
+
+# Claves con más ventas en el rango: [(clave, etiqueta)]
+def principales(dimension, desde_utc, hasta_utc, limite):
+    clave, etiqueta, joins = DIMENSIONES[dimension]
+    total = func.sum(HistorialVenta.total_venta)
+    consulta = _con_joins(select(clave, etiqueta, total).select_from(HistorialVenta), joins)
+    consulta = _filtro_rango(consulta, desde_utc, hasta_utc).where(clave.is_not(None))
+    consulta = consulta.group_by(clave, etiqueta).order_by(total.desc(), clave).limit(limite)
+    return [(c, e) for c, e, _ in db.session.execute(consulta)]
+
+
+# Suma de montos y cantidades por (cubeta, clave); clave None = total
+def _agregados_sql(granularidad, desde_utc, hasta_utc, clave=None, joins=(), claves=None):
+    local = func.timezone(ZONA_LOCAL.zone, func.timezone("UTC", HistorialVenta.fecha_venta))
+    cubeta = func.date_trunc(TRUNC_POSTGRES[granularidad], local)
+    columnas = [cubeta, clave] if clave is not None else [cubeta]
+    consulta = select(*columnas, func.sum(HistorialVenta.total_venta), func.sum(HistorialVenta.cantidad),
+                      func.count()).select_from(HistorialVenta)
+    consulta = _filtro_rango(_con_joins(consulta, joins), desde_utc, hasta_utc)
+    if claves is not None:
+        consulta = consulta.where(clave.in_(claves))
+    consulta = consulta.group_by(*columnas)
+
+    resultado = {}
+    for fila in db.session.execute(consulta):
+        numero = int(series_tiempo.numero_cubeta(np.array([_segundos_pared(fila[0])]), granularidad)[0])
+        monto, cantidad, conteo = fila[-3:]
+        resultado[(numero, fila[1] if clave is not None else None)] = (float(monto), float(cantidad), int(conteo))
+    return resultado
+
+
+def _agregados_numpy(granularidad, desde_utc, hasta_utc, clave=None, joins=(), claves=None):
+    epoch = series_tiempo.expresion_epoch(HistorialVenta.fecha_venta, db.engine.dialect.name)
+    columnas = [epoch, HistorialVenta.total_venta, HistorialVenta.cantidad]
+    if clave is not None:
+        columnas.append(clave)
+    consulta = _filtro_rango(_con_joins(select(*columnas).select_from(HistorialVenta), joins), desde_utc, hasta_utc)
+    if claves is not None:
+        consulta = consulta.where(clave.in_(claves))
+    filas = db.session.execute(consulta).all()
+    if not filas:
+        return {}
+
+    epochs = np.fromiter((f[0] for f in filas), dtype=np.int64, count=len(filas))
+    montos = np.fromiter((f[1] for f in filas), dtype=float, count=len(filas))
+    cantidades = np.fromiter((f[2] for f in filas), dtype=float, count=len(filas))
+    numeros = series_tiempo.numero_cubeta(series_tiempo.a_local(epochs), granularidad)
+
+    # Índice combinado (cubeta, clave) para agrupar con un solo bincount
+    valores_clave = [f[3] for f in filas] if clave is not None else [None] * len(filas)
+    distintas = list(dict.fromkeys(valores_clave))
+    posicion = {c: i for i, c in enumerate(distintas)}
+    indices_clave = np.fromiter((posicion[c] for c in valores_clave), dtype=np.int64, count=len(filas))
+    primera = numeros.min()
+    combinado = (numeros - primera) * len(distintas) + indices_clave
+
+    conteos = np.bincount(combinado)
+    sumas = np.bincount(combinado, weights=montos, minlength=len(conteos))
+    unidades = np.bincount(combinado, weights=cantidades, minlength=len(conteos))
+    resultado = {}
+    for i in np.flatnonzero(conteos):
+        numero, indice = divmod(int(i), len(distintas))
+        resultado[(int(primera) + numero, distintas[indice])] = (float(sumas[i]), float(unidades[i]), int(conteos[i]))
+    return resultado
+
+
+def _agregados(*args, **kwargs):
+    if db.engine.dialect.name == "postgresql":
+        return _agregados_sql(*args, **kwargs)
+    return _agregados_numpy(*args, **kwargs)
+
+
+def _serie(clave, etiqueta, numeros, agregados):
+    montos = [round(float(agregados.get((n, clave), (0, 0, 0))[0]), 2) for n in numeros]
+    cantidades = [int(agregados.get((n, clave), (0, 0, 0))[1]) for n in numeros]
+    return {"clave": clave, "etiqueta": etiqueta, "montos": montos, "cantidades": cantidades}
+
+
+def ventas(desde, hasta, granularidad="dia", dimension=None, limite=LIMITE_CLAVES):
+    """Serie de ventas en [desde, hasta) (fechas locales de Lima), opcionalmente desglosada por dimensión."""
+    numeros = periodos(desde, hasta, granularidad)
+    desde_utc, hasta_utc = series_tiempo.limites_utc(desde, hasta)
+
+    totales = _agregados(granularidad, desde_utc, hasta_utc)
+    serie_total = _serie(None, "Total", numeros, totales)
+    series = [serie_total]
+
+    if dimension is not None:
+        clave, _, joins = DIMENSIONES[dimension]
+        top = principales(dimension, desde_utc, hasta_utc, limite)
+        series = []
+        if top:
+            por_clave = _agregados(granularidad, desde_utc, hasta_utc, clave=clave, joins=joins,
+                                   claves=[c for c, _ in top])
+            series = [_serie(c, e if e is not None else str(c), numeros, por_clave) for c, e in top]
+        # "Otros": lo que no cae en las claves principales (incluye filas sin clave)
+        otros = {
+            "clave": None, "etiqueta": OTROS,
+            "montos": [round(t - sum(s["montos"][i] for s in series), 2) for i, t in enumerate(serie_total["montos"])],
+            "cantidades": [t - sum(s["cantidades"][i] for s in series) for i, t in enumerate(serie_total["cantidades"])],
+        }
+        if any(otros["cantidades"]) or any(otros["montos"]):
+            series.append(otros)
+
+    inicios = series_tiempo.inicio_cubeta(numeros, granularidad)
+    return {
+        "desde": desde.isoformat(),
+        "hasta": (hasta - timedelta(days=1)).isoformat(),
+        "granularidad": granularidad,
+        "zona": ZONA_LOCAL.zone,
+        "dimension": dimension,
+        "periodos": [series_tiempo.etiqueta(i, granularidad) for i in inicios],
+        "series": series,
+        "totales": {
+            "monto": round(sum(v[0] for v in totales.values()), 2),
+            "cantidad": int(sum(v[1] for v in totales.values())),
+            "ventas": int(sum(v[2] for v in totales.values())),
+        },
+    }
@@ -0,0 +1,46 @@
+# Caché de identidad para Flask-Login: evita consultar la tabla usuarios en cada petición.
+# Guarda solo lo que usan las vistas (id, rol, estado, nombre, email) con un TTL corto;
+# las rutas de administración la invalidan al modificar o borrar un usuario.
+import os
+
+from flask_login import UserMixin
+
+from app.extensions import db
+from app.models.usuario import Usuario
+from app.servicios.almacen import crear_almacen
+
+CAMPOS = ("id", "rol", "estado", "nombre", "email")
+TTL_SEGUNDOS = float(os.getenv("USUARIOS_CACHE_TTL", 30))
+
+cache = crear_almacen("usuarios")
+
+
+class UsuarioCacheado(UserMixin):
+    """Identidad ligera del usuario autenticado (no es una instancia ORM)."""
+
+    def __init__(self, id, rol, estado, nombre, email):
+        self.id = id
+        self.rol = rol
+        self.estado = estado
+        self.nombre = nombre
+        self.email = email
+
+    @property
+    def is_active(self):
+        return self.estado == 'activo'
+
+
+def cargar_usuario(user_id):
+    user_id = int(user_id)
+    datos = cache.obtener(user_id)
+    if datos is None:
+        usuario = db.session.get(Usuario, user_id)
+        if usuario is None:
+            return None
+        datos = {campo: getattr(usuario, campo) for campo in CAMPOS}
+        cache.guardar(user_id, datos, ttl=TTL_SEGUNDOS)
+    return UsuarioCacheado(**datos)
+
+
+def invalidar_usuario(user_id):
+    cache.eliminar(int(user_id))
@@ -0,0 +1,98 @@
+# Topología de colas RabbitMQ compartida por el publicador (web) y los consumidores.
+# Cada cola tiene una cola de reintento (TTL + dead-letter de vuelta) y una de fallidos.
+import json
+import os
+
+import pika
+
+COLA_BOLETAS = "cola_boletas"
+COLA_FACTURAS = "cola_facturas"
+COLA_CORREOS = "cola_correos"
+
+REINTENTO_TTL_MS = int(os.getenv("COLAS_REINTENTO_TTL_MS", 30000))
+MAX_INTENTOS = int(os.getenv("COLAS_MAX_INTENTOS", 5))
+
+
+def cola_reintento(cola):
+    return f"{cola}.reintento"
+
+
+def cola_fallidos(cola):
+    return f"{cola}.fallidos"
+
+
+# Declara la cola principal con su DLX de reintento y la cola de fallidos.
+# Los argumentos deben coincidir en el publicador y en el consumidor.
+def declarar_cola(channel, cola, ttl_ms=REINTENTO_TTL_MS):
+    channel.queue_declare(queue=cola_fallidos(cola), durable=True)
+    channel.queue_declare(
+        queue=cola_reintento(cola),
+        durable=True,
+        arguments={
+            "x-message-ttl": ttl_ms,
+            "x-dead-letter-exchange": "",
+            "x-dead-letter-routing-key": cola,
+        },
+    )
+    channel.queue_declare(
+        queue=cola,
+        durable=True,
+        arguments={
+            "x-dead-letter-exchange": "",
+            "x-dead-letter-routing-key": cola_reintento(cola),
+        },
+    )
+
+
+# Número de veces que el mensaje fue rechazado en la cola (según la cabecera x-death)
+def contar_intentos(properties, cola):
+    headers = getattr(properties, "headers", None) or {}
+    intentos = 0
+    for muerte in headers.get("x-death", []):
+        if muerte.get("queue") == cola and muerte.get("reason") == "rejected":
+            intentos += int(muerte.get("count", 1))
+    return intentos
+
+
+def parametros_conexion():
+    return pika.ConnectionParameters(
+        host=os.getenv("RABBITMQ_HOST", "rabbitmq"),
+        port=5672,
+        credentials=pika.PlainCredentials("guest", "guest"),
+    )
+
+
+# Publica un mensaje persistente; message_id permite deduplicar en el consumidor
+def publicar_mensaje(cola, mensaje, message_id=None):
+    publicar_mensajes(cola, [(mensaje, message_id)])
+
+
+# Publica varios mensajes (mensaje, message_id) con una sola conexión
+def publicar_mensajes(cola, mensajes):
+    connection = pika.BlockingConnection(parametros_conexion())
+    try:
+        channel = connection.channel()
+        declarar_cola(channel, cola)
+        for mensaje, message_id in mensajes:
+            channel.basic_publish(
+                exchange="",
+                routing_key=cola,
+                body=json.dumps(mensaje),
+                properties=pika.BasicProperties(
+                    delivery_mode=2,
+                    message_id=str(message_id) if message_id is not None else None,
+                ),
+            )
+    finally:
+        connection.close()
+
+
+# Ante un fallo del consumidor: reintento diferido (nack → cola de reintento) o,
+# agotados los intentos, se aparca en la cola de fallidos. Nunca se pierde el mensaje.
+def rechazar_mensaje(ch, method, properties, body, cola, max_intentos=MAX_INTENTOS):
+    if contar_intentos(properties, cola) + 1 >= max_intentos:
+        ch.basic_publish(exchange="", routing_key=cola_fallidos(cola), body=body, properties=properties)
+        ch.basic_ack(method.delivery_tag)
+        return "fallido"
+    ch.basic_nack(method.delivery_tag, requeue=False)
+    return "reintento"
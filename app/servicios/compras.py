@@ -0,0 +1,166 @@
+# Lógica de compra compartida por la vista web (sesión Flask-Login) y la API JWT:
+# valida el comprobante y el carrito, confirma las reservas y descuenta stock, registra la compra
+# y publica el mensaje.
+import json
+
+from app.extensions import db
+from app.models.compra import Compra
+from app.models.compra_producto import CompraProducto
+from app.models.historial_ventas import HistorialVenta
+from app.models.producto import Producto
+from app.models.tipo_comprobante import TipoComprobante
+from app.servicios.colas import COLA_BOLETAS, COLA_FACTURAS, publicar_mensaje
+from app.servicios.metricas import COMPRAS_TOTAL, CONFLICTOS_STOCK, ERRORES_PUBLICACION, LATENCIA_PUBLICACION, cronometrar
+from app.servicios.perfilado import medir_externo
+from app.servicios.reservas import Consumo
+
+
+class ErrorCompra(Exception):
+    def __init__(self, msg, status=400, **extra):
+        super().__init__(msg)
+        self.msg = msg
+        self.status = status
+        self.extra = extra
+
+    def respuesta(self):
+        return {"msg": self.msg, **self.extra}
+
+
+def validar_comprobante(tipo_nombre, dni, ruc):
+    if tipo_nombre not in ["boleta", "factura"]:
+        raise ErrorCompra("Tipo de comprobante inválido")
+
+    if tipo_nombre == "factura":
+        if not ruc or len(ruc) != 11 or not ruc.isdigit():
+            raise ErrorCompra("RUC inválido (11 dígitos numéricos)")
+
+    if tipo_nombre == "boleta":
+        if not dni or len(dni) != 8 or not dni.isdigit():
+            raise ErrorCompra("DNI inválido (8 dígitos numéricos)")
+
+    tipo_comprobante = TipoComprobante.query.filter_by(nombre=tipo_nombre).first()
+    if not tipo_comprobante:
+        raise ErrorCompra(f'Tipo comprobante "{tipo_nombre}" no existe')
+    return tipo_comprobante
+
+
+# Acepta el carrito como {"id": cantidad}, lista de {"producto_id", "cantidad"} o JSON de cualquiera
+def normalizar_items(items):
+    if isinstance(items, str):
+        try:
+            items = json.loads(items)
+        except json.JSONDecodeError as e:
+            raise ErrorCompra("Formato del estante virtual inválido", error=str(e))
+    if isinstance(items, dict):
+        if "producto_id" in items:
+            items = [items]
+        else:
+            items = [{"producto_id": pid, "cantidad": cantidad} for pid, cantidad in items.items()]
+
+    if not items or not isinstance(items, list):
+        raise ErrorCompra("El estante virtual está vacío o tiene formato inválido")
+
+    normalizados = []
+    for item in items:
+        if not isinstance(item, dict):
+            raise ErrorCompra("Item inválido", item=str(item))
+
+        if "producto_id" not in item or "cantidad" not in item:
+            try:
+                pid, cantidad = next(iter(item.items()))
+                item = {"producto_id": pid, "cantidad": cantidad}
+            except Exception:
+                raise ErrorCompra("Estructura de item inválida")
+
+        try:
+            normalizados.append((int(item["producto_id"]), int(item["cantidad"])))
+        except (ValueError, TypeError):
+            raise ErrorCompra("producto_id o cantidad no numéricos")
+    return normalizados
+
+
+# Registra la compra en una transacción; lanza ErrorCompra si algo no cuadra
+def registrar_compra(cliente_id, tipo_nombre, items, email_destino, dni="", ruc=""):
+    tipo_comprobante = validar_comprobante(tipo_nombre, dni, ruc)
+    items = normalizar_items(items)
+
+    lineas = []
+    total = 0
+    for producto_id, cantidad in items:
+        prod = db.session.get(Producto, producto_id)
+        if not prod:
+            raise ErrorCompra(f"Producto {producto_id} no existe")
+
+        if prod.stock < cantidad:
+            CONFLICTOS_STOCK.inc(motivo="stock_insuficiente")
+            raise ErrorCompra(f"Stock insuficiente para producto {producto_id}")
+
+        total += prod.precio * cantidad
+        lineas.append((prod, cantidad))
+
+    compra = Compra(
+        cliente_id=cliente_id,
+        tipo_comprobante_id=tipo_comprobante.id,
+        ruc=ruc,
+        total=total,
+        email_destino=email_destino,
+        dni=dni if tipo_nombre == "boleta" else None
+    )
+    db.session.add(compra)
+    db.session.flush()  # Para obtener compra.id sin commit
+
+    # Se confirman las reservas del cliente y lo que no estaba reservado se toma del disponible, sin
+    # tocar productos (el barrido resta lo confirmado). Sin reservas activadas, el descuento
+    # condicional de stock va al final, tras escribir las líneas, para retener la fila lo mínimo
+    consumo = Consumo(cliente_id)
+    try:
+        for prod, cantidad in sorted(lineas, key=lambda linea: linea[0].id):
+            if not consumo.descontar(prod.id, cantidad, compra.id):
+                CONFLICTOS_STOCK.inc(motivo="stock_agotado")
+                raise ErrorCompra(f"Stock insuficiente para producto {prod.id}")
+            db.session.add(CompraProducto(compra_id=compra.id, producto_id=prod.id, cantidad=cantidad))
+            db.session.add(HistorialVenta(
+                cliente_id=cliente_id,
+                producto_id=prod.id,
+                cantidad=cantidad,
+                total_venta=prod.precio * cantidad,
+                tipo_comprobante_id=tipo_comprobante.id
+            ))
+        db.session.flush()
+        agotado = consumo.aplicar()
+        if agotado is not None:
+            CONFLICTOS_STOCK.inc(motivo="stock_agotado")
+            raise ErrorCompra(f"Stock insuficiente para producto {agotado}")
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        consumo.deshacer()
+        raise
+
+    consumo.completar()
+    COMPRAS_TOTAL.inc(tipo_comprobante=tipo_nombre)
+    return compra
+
+
+# Envía el comprobante a su cola; devuelve False si RabbitMQ no respondió
+def publicar_comprobante(compra, tipo_nombre):
+    msg = {
+        "compra_id": compra.id,
+        "tipo_comprobante": tipo_nombre,
+        "email_destino": compra.email_destino,
+        "total": compra.total
+    }
+    if tipo_nombre == "factura":
+        msg["ruc"] = compra.ruc
+    if tipo_nombre == "boleta":
+        msg["dni"] = compra.dni
+
+    queue_name = COLA_BOLETAS if tipo_nombre == "boleta" else COLA_FACTURAS
+    try:
+        with medir_externo("rabbitmq"), cronometrar(LATENCIA_PUBLICACION, cola=queue_name):
+            publicar_mensaje(queue_name, msg, message_id=compra.id)
+        return True
+    except Exception as e:
+        print(f"[PUBLISH] Error enviando a RabbitMQ: {e}")
+        ERRORES_PUBLICACION.inc(cola=queue_name)
+        return False
@@ -0,0 +1,143 @@
+# Correos transaccionales asíncronos: la vista solo encola y responde. Un hilo de fondo
+# publica los pendientes en cola_correos (una conexión por lote) y el consumidor los
+# renderiza y envía; si RabbitMQ no está disponible se envían directamente por SMTP.
+import logging
+import os
+import smtplib
+import threading
+import uuid
+from email.message import EmailMessage
+from email.utils import formataddr
+
+from jinja2 import Environment, FileSystemLoader, select_autoescape
+
+from app.servicios.colas import COLA_CORREOS, publicar_mensajes
+from app.servicios.tareas import tareas
+
+logger = logging.getLogger("flask_backend")
+
+PLANTILLAS_CORREO = os.path.join(os.path.dirname(os.path.dirname(__file__)), "templates", "correos")
+REMITENTE = os.getenv("MAIL_REMITENTE", "Tienda Virtual")
+
+entorno = Environment(loader=FileSystemLoader(PLANTILLAS_CORREO), autoescape=select_autoescape(["html"]))
+
+
+def renderizar(plantilla, contexto):
+    return entorno.get_template(plantilla).render(**contexto)
+
+
+class ClienteSMTP:
+    """Conexión SMTP perezosa y reutilizable entre envíos consecutivos."""
+
+    def __init__(self):
+        self.servidor = os.getenv('MAIL_SERVER', 'smtp.gmail.com')
+        self.puerto = int(os.getenv('MAIL_PORT', 587))
+        self.usuario = os.getenv('MAIL_USERNAME')
+        self.password = os.getenv('MAIL_PASSWORD')
+        self.usar_tls = os.getenv('MAIL_USE_TLS', 'true').lower() == 'true'
+        self._conexion = None
+
+    def conexion(self):
+        if self._conexion is None:
+            server = smtplib.SMTP(self.servidor, self.puerto, timeout=30)
+            server.ehlo()
+            if self.usar_tls:
+                server.starttls()
+                server.ehlo()
+            server.login(self.usuario, self.password)
+            self._conexion = server
+        return self._conexion
+
+    def enviar(self, destinatarios, asunto, texto=None, html=None, remitente=None):
+        msg = EmailMessage()
+        msg["Subject"] = asunto
+        msg["From"] = formataddr((remitente, self.usuario)) if remitente else self.usuario
+        msg["To"] = ", ".join(destinatarios) if isinstance(destinatarios, (list, tuple)) else destinatarios
+        msg.set_content(texto or "Este mensaje requiere un cliente de correo con soporte HTML.")
+        if html:
+            msg.add_alternative(html, subtype="html")
+        try:
+            self.conexion().send_message(msg)
+        except Exception:
+            # Se descarta la conexión para reconectar en el siguiente intento
+            self._conexion = None
+            raise
+
+    def cerrar(self):
+        if self._conexion is not None:
+            try:
+                self._conexion.quit()
+            except Exception:
+                pass
+            self._conexion = None
+
+
+# Renderiza y envía un mensaje de cola_correos
+def enviar_mensaje(cliente, mensaje):
+    html = renderizar(mensaje["plantilla"], mensaje.get("contexto", {}))
+    cliente.enviar(mensaje["destinatarios"], mensaje["asunto"], html=html, remitente=REMITENTE)
+
+
+_pendientes = []
+_programado = False  # hay una tarea de entrega encolada que aún no tomó los pendientes
+_lock = threading.Lock()
+
+
+def crear_mensaje(plantilla, asunto, destinatarios, **contexto):
+    return {
+        "correo_id": uuid.uuid4().hex,
+        "plantilla": plantilla,
+        "asunto": asunto,
+        "destinatarios": list(destinatarios),
+        "contexto": contexto,
+    }
+
+
+# Encola el correo sin esperar a la red; devuelve False si no hay espacio en la cola local
+def encolar_correo(plantilla, asunto, destinatarios, **contexto):
+    global _programado
+    mensaje = crear_mensaje(plantilla, asunto, destinatarios, **contexto)
+    with _lock:
+        _pendientes.append(mensaje)
+        programar = not _programado
+        _programado = True
+    if programar and not tareas.encolar(entregar_pendientes):
+        # Ninguna tarea entregará los pendientes (incluidos los que llegaron mientras se
+        # intentaba encolar): se descartan todos y el siguiente correo vuelve a programar
+        with _lock:
+            descartados = len(_pendientes)
+            _pendientes.clear()
+            _programado = False
+        logger.error(f"[correos] Cola de tareas llena; se descartan {descartados} correo(s)")
+        return False
+    return True
+
+
+# Tarea de fondo: toma todos los pendientes y los entrega como un lote
+def entregar_pendientes():
+    global _programado
+    with _lock:
+        lote = list(_pendientes)
+        _pendientes.clear()
+        _programado = False
+    if lote:
+        entregar_lote(lote)
+
+
+def entregar_lote(lote):
+    if os.getenv("CORREOS_VIA_COLA", "true").lower() == "true":
+        try:
+            publicar_mensajes(COLA_CORREOS, [(m, m["correo_id"]) for m in lote])
+            return
+        except Exception as e:
+            logger.warning(f"[correos] RabbitMQ no disponible ({e}); envío directo de {len(lote)} correo(s)")
+
+    cliente = ClienteSMTP()
+    try:
+        for mensaje in lote:
+            try:
+                enviar_mensaje(cliente, mensaje)
+            except Exception as e:
+                logger.error(f"[correos] No se pudo enviar '{mensaje['asunto']}' a {mensaje['destinatarios']}: {e}")
+    finally:
+        cliente.cerrar()
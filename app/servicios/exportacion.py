@@ -0,0 +1,221 @@
+# Exportación masiva de historial_ventas (con producto, marca, categoría y tipo de comprobante)
+# en CSV comprimido, Parquet o Arrow IPC. Las filas se leen con un cursor de servidor
+# (yield_per) y se escriben por bloques, así que la memoria no crece con el tamaño del historial.
+# Las exportaciones incrementales usan una marca (fecha_venta, id): se exportan las filas
+# posteriores a la marca anterior y hasta la última fila existente al empezar, sin pasar de
+# now() - RETRASO_SEGURIDAD: fecha_venta es la hora de inicio de la transacción, así que una
+# venta que confirma tarde puede aparecer con una fecha anterior a filas ya visibles.
+# Parquet y Arrow requieren pyarrow (dependencia opcional).
+import csv
+import gzip
+import io
+import os
+from datetime import datetime, timedelta
+
+from sqlalchemy import and_, func, or_, select
+
+from app.extensions import db
+from app.models.categoria import Categoria
+from app.models.historial_ventas import HistorialVenta
+from app.models.producto import Producto
+from app.models.tipo_comprobante import TipoComprobante
+
+FORMATOS = {
+    "csv.gz": ("application/gzip", "csv.gz"),
+    "parquet": ("application/vnd.apache.parquet", "parquet"),
+    "arrow": ("application/vnd.apache.arrow.stream", "arrows"),
+}
+TAMANO_LOTE = 50_000
+# Segundos que se dejan sin exportar; debe superar la duración de la transacción de compra más larga
+RETRASO_SEGURIDAD = int(os.getenv("EXPORTACION_RETRASO_SEGURIDAD", 300))
+
+COLUMNAS = [
+    ("id", HistorialVenta.id),
+    ("fecha_venta", HistorialVenta.fecha_venta),
+    ("cliente_id", HistorialVenta.cliente_id),
+    ("producto_id", HistorialVenta.producto_id),
+    ("producto", Producto.nombre),
+    ("marca", Producto.marca),
+    ("categoria", Categoria.nombre),
+    ("tipo_comprobante", TipoComprobante.nombre),
+    ("cantidad", HistorialVenta.cantidad),
+    ("total_venta", HistorialVenta.total_venta),
+]
+NOMBRES = [nombre for nombre, _ in COLUMNAS]
+
+
+class ErrorExportacion(Exception):
+    pass
+
+
+class Marca:
+    """Posición (fecha_venta, id) hasta la que ya se exportó."""
+
+    def __init__(self, fecha=None, id=None):
+        self.fecha = fecha
+        self.id = id
+
+    @classmethod
+    def desde_texto(cls, fecha, id):
+        if not fecha:
+            return cls()
+        try:
+            return cls(datetime.fromisoformat(fecha), int(id or 0))
+        except ValueError:
+            raise ErrorExportacion("Marca inválida: fecha ISO 8601 e id numérico")
+
+    def a_dict(self):
+        return {"fecha_venta": self.fecha.isoformat() if self.fecha else None, "id": self.id}
+
+    def condicion(self):
+        if self.fecha is None:
+            return None
+        return or_(HistorialVenta.fecha_venta > self.fecha,
+                   and_(HistorialVenta.fecha_venta == self.fecha, HistorialVenta.id > self.id))
+
+    def __bool__(self):
+        return self.fecha is not None
+
+
+# Última fila con más de `retraso` segundos (según el reloj de la BD): será la marca de esta
+# exportación (y su límite superior)
+def marca_actual(retraso=RETRASO_SEGURIDAD):
+    limite = db.session.execute(select(func.now())).scalar() - timedelta(seconds=retraso)
+    fila = db.session.execute(
+        select(HistorialVenta.fecha_venta, HistorialVenta.id)
+        .where(HistorialVenta.fecha_venta.is_not(None), HistorialVenta.fecha_venta <= limite)
+        .order_by(HistorialVenta.fecha_venta.desc(), HistorialVenta.id.desc()).limit(1)
+    ).first()
+    return Marca(*fila) if fila else Marca()
+
+
+def consulta(desde=None, hasta=None):
+    sentencia = (
+        select(*[columna for _, columna in COLUMNAS])
+        .select_from(HistorialVenta)
+        .outerjoin(Producto, HistorialVenta.producto_id == Producto.id)
+        .outerjoin(Categoria, Producto.categoria_id == Categoria.id)
+        .outerjoin(TipoComprobante, HistorialVenta.tipo_comprobante_id == TipoComprobante.id)
+        .where(HistorialVenta.fecha_venta.is_not(None))
+        .order_by(HistorialVenta.fecha_venta, HistorialVenta.id)
+    )
+    if desde:
+        sentencia = sentencia.where(desde.condicion())
+    if hasta:
+        sentencia = sentencia.where(~hasta.condicion())
+    return sentencia
+
+
+# Bloques de filas leídos con cursor de servidor (en PostgreSQL, un cursor con nombre)
+def lotes(desde=None, hasta=None, tamano_lote=TAMANO_LOTE):
+    resultado = db.session.execute(consulta(desde, hasta), execution_options={"yield_per": tamano_lote})
+    for particion in resultado.partitions():
+        yield particion
+
+
+class _Sumidero(io.RawIOBase):
+    """Archivo de solo escritura que acumula bytes hasta que se vacían con `tomar()`."""
+
+    def __init__(self):
+        self._partes = []
+
+    def writable(self):
+        return True
+
+    def write(self, datos):
+        self._partes.append(bytes(datos))
+        return len(datos)
+
+    def tomar(self):
+        datos = b"".join(self._partes)
+        self._partes = []
+        return datos
+
+
+def generar_csv_gz(bloques):
+    sumidero = _Sumidero()
+    with gzip.GzipFile(fileobj=sumidero, mode="wb") as comprimido:
+        texto = io.TextIOWrapper(comprimido, encoding="utf-8", newline="")
+        escritor = csv.writer(texto)
+        escritor.writerow(NOMBRES)
+        for bloque in bloques:
+            escritor.writerows(
+                (f[0], f[1].isoformat(sep=" "), *f[2:]) for f in bloque
+            )
+            texto.flush()
+            yield sumidero.tomar()
+        texto.flush()
+        texto.detach()
+    yield sumidero.tomar()
+
+
+def _pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.parquet
+        return pyarrow
+    except ImportError:
+        raise ErrorExportacion("Los formatos parquet y arrow requieren el paquete pyarrow")
+
+
+def _esquema(pa):
+    return pa.schema([
+        ("id", pa.int64()), ("fecha_venta", pa.timestamp("us")), ("cliente_id", pa.int64()),
+        ("producto_id", pa.int64()), ("producto", pa.string()), ("marca", pa.string()),
+        ("categoria", pa.string()), ("tipo_comprobante", pa.string()), ("cantidad", pa.int64()),
+        ("total_venta", pa.float64()),
+    ])
+
+
+def _tabla(pa, esquema, bloque):
+    columnas = list(zip(*bloque))
+    return pa.Table.from_arrays(
+        [pa.array([float(v) if v is not None else None for v in col]) if nombre == "total_venta"
+         else pa.array(col, type=esquema.field(nombre).type)
+         for nombre, col in zip(NOMBRES, columnas)],
+        schema=esquema,
+    )
+
+
+# Un row group de Parquet (o un record batch de Arrow) por bloque leído
+def generar_pyarrow(bloques, formato):
+    pa = _pyarrow()
+    esquema = _esquema(pa)
+    sumidero = _Sumidero()
+    if formato == "parquet":
+        escritor = pa.parquet.ParquetWriter(sumidero, esquema, compression="zstd")
+    else:
+        escritor = pa.ipc.new_stream(sumidero, esquema)
+    try:
+        for bloque in bloques:
+            escritor.write_table(_tabla(pa, esquema, bloque))
+            yield sumidero.tomar()
+    finally:
+        escritor.close()
+    yield sumidero.tomar()
+
+
+def generar(formato, bloques):
+    if formato not in FORMATOS:
+        raise ErrorExportacion(f"Formato no soportado: {formato} (use {', '.join(FORMATOS)})")
+    if formato == "csv.gz":
+        return generar_csv_gz(bloques)
+    _pyarrow()  # falla antes de empezar a responder si no está instalado
+    return generar_pyarrow(bloques, formato)
+
+
+def exportar(salida, formato="csv.gz", desde=None, tamano_lote=TAMANO_LOTE):
+    """Escribe la exportación en el archivo `salida`; devuelve (filas, nueva marca)."""
+    hasta = marca_actual()
+    filas = 0
+
+    def contar(bloques):
+        nonlocal filas
+        for bloque in bloques:
+            filas += len(bloque)
+            yield bloque
+
+    with open(salida, "wb") as f:
+        for datos in generar(formato, contar(lotes(desde, hasta, tamano_lote))):
+            f.write(datos)
+    return filas, (hasta if hasta else desde or Marca())
@@ -0,0 +1,290 @@
+# Generador de datos sintéticos para pruebas de carga y capacidad: usuarios, categorías,
+# productos, compras, compra_producto e historial_ventas con distribuciones realistas
+# (popularidad Zipf de productos y compradores, estacionalidad horaria, crecimiento en el
+# tiempo). En PostgreSQL escribe con COPY; en otros motores con executemany por lotes.
+# Añade filas a continuación de los ids existentes, así que puede ejecutarse varias veces.
+import csv
+import io
+import itertools
+import logging
+import math
+import random
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import func, insert, select, text
+
+from app.extensions import db
+from app.models.categoria import Categoria
+from app.models.compra import Compra
+from app.models.compra_producto import CompraProducto
+from app.models.historial_ventas import HistorialVenta
+from app.models.producto import Producto
+from app.models.tipo_comprobante import TipoComprobante
+from app.models.usuario import Usuario
+from app.servicios.hashing import hashing
+
+logger = logging.getLogger("flask_backend")
+
+# Tamaños predefinidos (número de compras; cada compra tiene de 1 a 5 líneas)
+ESCALAS = {
+    "pequena": {"usuarios": 1_000, "categorias": 20, "productos": 2_000, "compras": 20_000},
+    "media": {"usuarios": 50_000, "categorias": 60, "productos": 50_000, "compras": 1_000_000},
+    "grande": {"usuarios": 500_000, "categorias": 150, "productos": 500_000, "compras": 10_000_000},
+}
+
+NOMBRES = ["Ana", "Luis", "María", "José", "Carmen", "Jorge", "Rosa", "Carlos", "Lucía", "Miguel",
+           "Elena", "Pedro", "Sofía", "Diego", "Valeria", "Andrés", "Camila", "Raúl", "Paola", "Hugo"]
+APELLIDOS = ["Torres", "Díaz", "Quispe", "Flores", "Rojas", "Vargas", "Castillo", "Mendoza", "Ramos",
+             "Huamán", "Chávez", "García", "Ruiz", "Paredes", "Salazar", "Gutiérrez", "Romero", "Cruz"]
+CATEGORIAS = ["Periféricos", "Laptops", "Monitores", "Audio", "Celulares", "Accesorios", "Redes",
+              "Almacenamiento", "Componentes", "Impresoras", "Gaming", "Tablets", "Cámaras", "Software",
+              "Hogar inteligente", "Oficina", "Cables", "Energía", "Wearables", "Televisores"]
+MARCAS = ["Logitech", "HP", "Lenovo", "Samsung", "LG", "Asus", "Acer", "Sony", "Xiaomi", "Kingston",
+          "Redragon", "TP-Link", "Epson", "Dell", "Corsair", "JBL", "Huawei", "Apple", "Razer", "MSI"]
+ADJETIVOS = ["Pro", "Max", "Lite", "Plus", "Ultra", "Mini", "X", "S", "Air", "Neo"]
+
+# Peso relativo de las ventas por hora del día (picos al mediodía y por la noche)
+PESOS_HORA = [1, 1, 1, 1, 1, 2, 3, 5, 7, 8, 9, 11, 12, 10, 9, 9, 10, 11, 13, 15, 16, 13, 8, 4]
+PROPORCION_VENDEDORES = 0.05
+PROPORCION_INACTIVOS = 0.03
+PROPORCION_BOLETAS = 0.75
+
+
+def _acumulados(pesos):
+    return list(itertools.accumulate(pesos))
+
+
+class SelectorZipf:
+    """Elige ids con probabilidad proporcional a 1/rango^s. El rango se asigna a los ids en
+    orden aleatorio, para que los más populares no sean siempre los primeros ids."""
+
+    def __init__(self, ids, s, azar):
+        self.ids = list(ids)
+        azar.shuffle(self.ids)
+        self.acumulados = _acumulados(1 / (rango ** s) for rango in range(1, len(self.ids) + 1))
+        self.azar = azar
+
+    def elegir(self, k=1):
+        return self.azar.choices(self.ids, cum_weights=self.acumulados, k=k)
+
+
+class EscritorCopy:
+    """COPY ... FROM STDIN (PostgreSQL) con un buffer CSV por lote."""
+
+    def __init__(self, conexion):
+        self.conexion = conexion
+
+    def escribir(self, tabla, columnas, filas):
+        if not filas:
+            return
+        buffer = io.StringIO()
+        csv.writer(buffer).writerows(filas)
+        buffer.seek(0)
+        with self.conexion.cursor() as cursor:
+            cursor.copy_expert(f"COPY {tabla} ({', '.join(columnas)}) FROM STDIN WITH (FORMAT csv)", buffer)
+
+    def terminar(self, tablas):
+        with self.conexion.cursor() as cursor:
+            for tabla in tablas:
+                cursor.execute(
+                    f"SELECT setval(pg_get_serial_sequence('{tabla}', 'id'), "
+                    f"COALESCE((SELECT MAX(id) FROM {tabla}), 1))"
+                )
+        self.conexion.commit()
+
+
+class EscritorInsert:
+    """executemany por lotes con SQLAlchemy Core (SQLite y otros motores)."""
+
+    def __init__(self, sesion):
+        self.sesion = sesion
+        self.tablas = {m.__table__.name: m.__table__ for m in (
+            Usuario, Categoria, Producto, Compra, CompraProducto, HistorialVenta)}
+
+    def escribir(self, tabla, columnas, filas):
+        if filas:
+            self.sesion.execute(insert(self.tablas[tabla]), [dict(zip(columnas, f)) for f in filas])
+
+    def terminar(self, tablas):
+        self.sesion.commit()
+
+
+def crear_escritor():
+    if db.engine.dialect.name == "postgresql":
+        return EscritorCopy(db.session.connection().connection.dbapi_connection)
+    return EscritorInsert(db.session)
+
+
+def _siguiente_id(modelo):
+    return (db.session.execute(select(func.max(modelo.id))).scalar() or 0) + 1
+
+
+def _tipos_comprobante():
+    tipos = {t.nombre: t.id for t in TipoComprobante.query.all()}
+    for nombre in ("boleta", "factura"):
+        if nombre not in tipos:
+            tipo = TipoComprobante(nombre=nombre)
+            db.session.add(tipo)
+            db.session.flush()
+            tipos[nombre] = tipo.id
+    db.session.commit()
+    return tipos
+
+
+def _digitos(azar, n):
+    return str(azar.randrange(10 ** (n - 1), 10 ** n))
+
+
+# Devuelve {usuario_id: email}
+def generar_usuarios(escritor, azar, cantidad, password_hash, lote):
+    primero = _siguiente_id(Usuario)
+    columnas = ("id", "nombre", "email", "password_hash", "rol", "estado")
+    emails = {}
+    filas = []
+    for uid in range(primero, primero + cantidad):
+        nombre, apellido = azar.choice(NOMBRES), azar.choice(APELLIDOS)
+        estado = "inactivo" if azar.random() < PROPORCION_INACTIVOS else "activo"
+        email = emails[uid] = f"{nombre.lower()}.{apellido.lower()}.{uid}@ejemplo.com"
+        filas.append((uid, f"{nombre} {apellido}", email, password_hash, "cliente", estado))
+        if len(filas) >= lote:
+            escritor.escribir("usuarios", columnas, filas)
+            filas = []
+    escritor.escribir("usuarios", columnas, filas)
+    return emails
+
+
+def generar_categorias(escritor, cantidad):
+    existentes = {nombre for (nombre,) in db.session.query(Categoria.nombre)}
+    primero = _siguiente_id(Categoria)
+    nombres = [n for n in CATEGORIAS if n not in existentes]
+    nombres += [f"Categoría {i}" for i in range(primero, primero + cantidad) if f"Categoría {i}" not in existentes]
+    filas = [(primero + i, nombre) for i, nombre in enumerate(nombres[:cantidad])]
+    escritor.escribir("categorias", ("id", "nombre"), filas)
+    return [cid for cid, _ in filas]
+
+
+# Devuelve {producto_id: (precio, vendedor_id)}
+def generar_productos(escritor, azar, cantidad, vendedores, categorias, s, stock, lote):
+    primero = _siguiente_id(Producto)
+    elegir_vendedor = SelectorZipf(vendedores, s, azar)
+    elegir_categoria = SelectorZipf(categorias, s, azar)
+    columnas = ("id", "nombre", "marca", "descripcion", "precio", "stock", "cliente_id", "categoria_id")
+    precios = {}
+    filas = []
+    for pid in range(primero, primero + cantidad):
+        marca = azar.choice(MARCAS)
+        # Precios log-normales: muchos productos baratos y pocos muy caros
+        precio = round(min(10_000.0, max(1.0, math.exp(azar.gauss(4.0, 1.1)))), 2)
+        fila = (
+            pid, f"{marca} {azar.choice(ADJETIVOS)} {pid}", marca, f"Producto {pid} de {marca}",
+            precio, stock if stock is not None else azar.randint(0, 1000),
+            elegir_vendedor.elegir()[0], elegir_categoria.elegir()[0],
+        )
+        precios[pid] = (precio, fila[6])
+        filas.append(fila)
+        if len(filas) >= lote:
+            escritor.escribir("productos", columnas, filas)
+            filas = []
+    escritor.escribir("productos", columnas, filas)
+    return precios
+
+
+def generar_compras(escritor, azar, cantidad, emails, precios, tipos, s, dias, ahora, lote):
+    elegir_cliente = SelectorZipf(emails.keys(), s, azar)
+    elegir_producto = SelectorZipf(precios.keys(), s, azar)
+    # Más ventas en los días recientes (crecimiento lineal) y según la hora del día
+    acumulado_dias = _acumulados(1 + 2 * d / max(1, dias - 1) for d in range(dias))
+    acumulado_horas = _acumulados(PESOS_HORA)
+    inicio = ahora.replace(hour=0, minute=0, second=0, microsecond=0) - timedelta(days=dias - 1)
+
+    compra_id = _siguiente_id(Compra)
+    linea_id = _siguiente_id(CompraProducto)
+    venta_id = _siguiente_id(HistorialVenta)
+    columnas_compra = ("id", "cliente_id", "tipo_comprobante_id", "ruc", "dni", "fecha", "total", "email_destino")
+    columnas_linea = ("id", "compra_id", "producto_id", "cantidad")
+    columnas_venta = ("id", "cliente_id", "producto_id", "vendedor_id", "cantidad", "total_venta",
+                      "tipo_comprobante_id", "fecha_venta")
+
+    lineas_total = 0
+    restantes = cantidad
+    while restantes > 0:
+        n = min(lote, restantes)
+        restantes -= n
+        compradores = elegir_cliente.elegir(n)
+        dias_elegidos = azar.choices(range(dias), cum_weights=acumulado_dias, k=n)
+        horas = azar.choices(range(24), cum_weights=acumulado_horas, k=n)
+
+        compras, lineas, ventas = [], [], []
+        for cliente_id, dia, hora in zip(compradores, dias_elegidos, horas):
+            fecha = inicio + timedelta(days=dia, hours=hora, seconds=azar.randrange(3600))
+            if fecha > ahora:
+                fecha = ahora - timedelta(seconds=azar.randrange(3600))
+            boleta = azar.random() < PROPORCION_BOLETAS
+            tipo_id = tipos["boleta" if boleta else "factura"]
+
+            # Número de líneas geométrico: la mayoría de compras tiene uno o dos productos
+            n_lineas = 1
+            while n_lineas < 5 and azar.random() < 0.35:
+                n_lineas += 1
+
+            total = 0.0
+            for producto_id in set(elegir_producto.elegir(n_lineas)):
+                unidades = 1 if azar.random() < 0.7 else azar.randint(2, 4)
+                precio, vendedor_id = precios[producto_id]
+                subtotal = round(precio * unidades, 2)
+                total += subtotal
+                lineas.append((linea_id, compra_id, producto_id, unidades))
+                ventas.append((venta_id, cliente_id, producto_id, vendedor_id, unidades, subtotal, tipo_id, fecha))
+                linea_id += 1
+                venta_id += 1
+
+            compras.append((
+                compra_id, cliente_id, tipo_id, None if boleta else "20" + _digitos(azar, 9),
+                _digitos(azar, 8) if boleta else None, fecha, round(total, 2), emails[cliente_id],
+            ))
+            compra_id += 1
+
+        escritor.escribir("compras", columnas_compra, compras)
+        escritor.escribir("compra_producto", columnas_linea, lineas)
+        escritor.escribir("historial_ventas", columnas_venta, ventas)
+        lineas_total += len(lineas)
+    return lineas_total
+
+
+# Genera el conjunto completo y devuelve el número de filas escritas por tabla
+def generar_datos(usuarios, categorias, productos, compras, semilla=42, s=1.1, dias=365,
+                  password="Cliente2025!", stock=None, lote=50_000, ahora=None):
+    if productos and not (usuarios and categorias):
+        raise ValueError("Para generar productos hacen falta usuarios (vendedores) y categorías")
+    if compras and not (usuarios and productos):
+        raise ValueError("Para generar compras hacen falta usuarios y productos")
+    azar = random.Random(semilla)
+    ahora = ahora or datetime.now()
+    inicio = time.perf_counter()
+
+    tipos = _tipos_comprobante()
+    # Todo lo demás va en una sola transacción sobre la misma conexión
+    escritor = crear_escritor()
+    # Un único hash compartido: calcular millones de hashes no aporta nada a la prueba
+    emails = generar_usuarios(escritor, azar, usuarios, hashing.generar(password), lote)
+    ids_categorias = generar_categorias(escritor, categorias)
+    vendedores = list(emails)[:max(1, int(usuarios * PROPORCION_VENDEDORES))]
+    precios = generar_productos(escritor, azar, productos, vendedores, ids_categorias, s, stock, lote)
+    lineas = generar_compras(escritor, azar, compras, emails, precios, tipos, s, dias, ahora, lote)
+
+    escritor.terminar(["usuarios", "categorias", "productos", "compras", "compra_producto", "historial_ventas"])
+    db.session.commit()
+    resultado = {
+        "usuarios": usuarios, "categorias": len(ids_categorias), "productos": productos,
+        "compras": compras, "compra_producto": lineas, "historial_ventas": lineas,
+    }
+    logger.info(f"[generar_datos] {sum(resultado.values())} filas en {time.perf_counter() - inicio:.1f} s")
+    return resultado
+
+
+# Tras una carga masiva en PostgreSQL conviene actualizar las estadísticas del planificador
+def analizar_tablas():
+    if db.engine.dialect.name == "postgresql":
+        db.session.execute(text("ANALYZE"))
+        db.session.commit()
@@ -0,0 +1,84 @@
+# Hash de contraseñas fuera del hilo de la petición: un pool de procesos con cola acotada
+# evita que scrypt/PBKDF2 (CPU pura, retienen el GIL) bloqueen a los demás hilos web en
+# ráfagas de login. Sin HASH_WORKERS se calcula en línea, como antes.
+import logging
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from werkzeug.security import DEFAULT_PBKDF2_ITERATIONS, check_password_hash, generate_password_hash
+
+logger = logging.getLogger("flask_backend")
+
+# Parámetros por defecto de Werkzeug para cada algoritmo (así se escriben en el hash guardado)
+_PARAMETROS_POR_DEFECTO = {
+    "scrypt": "scrypt:32768:8:1",
+    "pbkdf2": f"pbkdf2:sha256:{DEFAULT_PBKDF2_ITERATIONS}",
+}
+
+
+class HashingSaturado(Exception):
+    """La cola de hashing está llena; la petición debe reintentarse más tarde."""
+
+
+# "scrypt" -> "scrypt:32768:8:1", "pbkdf2:sha512" -> "pbkdf2:sha512:<iteraciones>"
+def normalizar_metodo(metodo):
+    partes = metodo.split(":")
+    if partes[0] == "pbkdf2" and len(partes) == 2:
+        return f"{metodo}:{DEFAULT_PBKDF2_ITERATIONS}"
+    return _PARAMETROS_POR_DEFECTO.get(metodo, metodo)
+
+
+class ServicioHashing:
+    def __init__(self, metodo=None, workers=None, max_pendientes=None, espera_max=None):
+        self.metodo = normalizar_metodo(metodo or os.getenv("HASH_METODO", "scrypt"))
+        self.workers = int(workers if workers is not None else os.getenv("HASH_WORKERS", 0))
+        max_pendientes = max_pendientes or int(os.getenv("HASH_MAX_PENDIENTES", max(self.workers, 1) * 4))
+        self.espera_max = float(espera_max if espera_max is not None else os.getenv("HASH_ESPERA_MAX", 2))
+        self._cupos = threading.BoundedSemaphore(max_pendientes)
+        self._pool = None
+        self._lock = threading.Lock()
+
+    def _executor(self):
+        with self._lock:
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(max_workers=self.workers)
+            return self._pool
+
+    # Ejecuta en el pool respetando el límite de trabajos en espera
+    def _ejecutar(self, funcion, *args):
+        if not self.workers:
+            return funcion(*args)
+        if not self._cupos.acquire(timeout=self.espera_max):
+            raise HashingSaturado("Demasiadas solicitudes de autenticación en curso")
+        try:
+            try:
+                return self._executor().submit(funcion, *args).result()
+            except BrokenProcessPool:
+                # Un worker murió: se recrea el pool y se reintenta una vez
+                logger.warning("[hashing] Pool de procesos roto, recreando")
+                with self._lock:
+                    self._pool = None
+                return self._executor().submit(funcion, *args).result()
+        finally:
+            self._cupos.release()
+
+    def generar(self, password):
+        return self._ejecutar(generate_password_hash, password, self.metodo)
+
+    def verificar(self, password_hash, password):
+        return self._ejecutar(check_password_hash, password_hash, password)
+
+    # El hash se generó con otro algoritmo o coste que el configurado
+    def necesita_rehash(self, password_hash):
+        return password_hash.split("$", 1)[0] != self.metodo
+
+    def cerrar(self):
+        with self._lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=False, cancel_futures=True)
+                self._pool = None
+
+
+hashing = ServicioHashing()
@@ -0,0 +1,66 @@
+# Historial de ventas de un vendedor (ventas de los productos que publicó), paginado por cursor
+# sobre (fecha_venta, id) de la más reciente a la más antigua. historial_ventas guarda el
+# vendedor de cada venta, así que cada página es un solo recorrido del índice
+# ix_historial_ventas_vendedor_fecha desde el cursor, sin OFFSET ni conteo: cuesta lo mismo en
+# la primera página que en la milésima. Los totales por periodo se leen de los acumulados de
+# los rankings (dimensión "vendedor").
+import base64
+from datetime import datetime
+
+from sqlalchemy import and_, or_, select
+
+from app.extensions import db
+from app.models.historial_ventas import HistorialVenta
+from app.models.producto import Producto
+from app.models.tipo_comprobante import TipoComprobante
+from app.servicios import ranking
+from app.servicios.paginacion import POR_PAGINA_MAXIMO
+
+
+def codificar_cursor(fecha, id):
+    return base64.urlsafe_b64encode(f"{fecha.isoformat()}|{id}".encode()).decode().rstrip("=")
+
+
+def decodificar_cursor(texto):
+    try:
+        fecha, id = base64.urlsafe_b64decode(texto + "=" * (-len(texto) % 4)).decode().split("|")
+        return datetime.fromisoformat(fecha), int(id)
+    except (ValueError, UnicodeDecodeError):
+        raise ValueError("Cursor inválido")
+
+
+def pagina(vendedor_id, cursor=None, por_pagina=20):
+    """Ventas del vendedor anteriores al cursor: (items, cursor de la página siguiente o None)."""
+    por_pagina = min(max(1, por_pagina), POR_PAGINA_MAXIMO)
+    consulta = (
+        select(HistorialVenta.id, HistorialVenta.fecha_venta, HistorialVenta.producto_id, Producto.nombre,
+               HistorialVenta.cliente_id, HistorialVenta.cantidad, HistorialVenta.total_venta,
+               TipoComprobante.nombre)
+        .select_from(HistorialVenta)
+        .outerjoin(Producto, HistorialVenta.producto_id == Producto.id)
+        .outerjoin(TipoComprobante, HistorialVenta.tipo_comprobante_id == TipoComprobante.id)
+        .where(HistorialVenta.vendedor_id == vendedor_id, HistorialVenta.fecha_venta.is_not(None))
+        .order_by(HistorialVenta.fecha_venta.desc(), HistorialVenta.id.desc())
+        .limit(por_pagina + 1)
+    )
+    if cursor:
+        fecha, id = decodificar_cursor(cursor)
+        consulta = consulta.where(or_(HistorialVenta.fecha_venta < fecha,
+                                      and_(HistorialVenta.fecha_venta == fecha, HistorialVenta.id < id)))
+
+    filas = db.session.execute(consulta).all()
+    items = [
+        {"id": id, "fecha": fecha.isoformat(), "producto_id": producto_id, "producto": producto,
+         "comprador_id": comprador_id, "cantidad": cantidad, "total_venta": total_venta,
+         "tipo_comprobante": tipo}
+        for id, fecha, producto_id, producto, comprador_id, cantidad, total_venta, tipo in filas[:por_pagina]
+    ]
+    siguiente = None
+    if len(filas) > por_pagina:
+        ultima = filas[por_pagina - 1]
+        siguiente = codificar_cursor(ultima[1], ultima[0])
+    return items, siguiente
+
+
+def totales(vendedor_id, hoy=None):
+    return ranking.totales("vendedor", vendedor_id, hoy=hoy)
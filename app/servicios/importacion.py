@@ -0,0 +1,153 @@
+# Importación masiva de clientes desde CSV o JSONL: lee el archivo en streaming, valida cada
+# fila, descarta emails repetidos (en el archivo y ya registrados, con una consulta por lote),
+# inserta por lotes y encola los correos de bienvenida.
+import csv
+import io
+import json
+import re
+
+from sqlalchemy import func, insert
+from sqlalchemy.exc import IntegrityError
+
+from app.extensions import db
+from app.models.usuario import Usuario
+from app.servicios.correos import encolar_correo
+from app.servicios.hashing import hashing
+
+EMAIL_VALIDO = re.compile(r"^[^@\s]+@[^@\s]+\.[^@\s]+$")
+ESTADOS = ("activo", "inactivo")
+MAX_ERRORES_REPORTADOS = 100
+
+
+class ErrorImportacion(Exception):
+    pass
+
+
+# Filas del archivo como diccionarios, sin cargarlo entero en memoria
+def leer_filas(stream, formato):
+    if isinstance(stream, (bytes, bytearray)):
+        stream = io.BytesIO(stream)
+    texto = stream if isinstance(stream, io.TextIOBase) else io.TextIOWrapper(stream, encoding="utf-8-sig")
+
+    if formato == "csv":
+        yield from csv.DictReader(texto)
+    elif formato == "jsonl":
+        for linea in texto:
+            if linea.strip():
+                try:
+                    yield json.loads(linea)
+                except json.JSONDecodeError:
+                    yield {"_error": "JSON inválido"}
+    else:
+        raise ErrorImportacion(f"Formato no soportado: {formato}")
+
+
+def detectar_formato(nombre_archivo):
+    extension = (nombre_archivo or "").rsplit(".", 1)[-1].lower()
+    if extension in ("csv", "jsonl"):
+        return extension
+    if extension in ("ndjson", "json"):
+        return "jsonl"
+    raise ErrorImportacion("El archivo debe ser .csv o .jsonl")
+
+
+# Devuelve (cliente, None) o (None, motivo del rechazo)
+def validar_fila(fila):
+    if not isinstance(fila, dict):
+        return None, "Fila inválida"
+    if "_error" in fila:
+        return None, fila["_error"]
+    nombre = (fila.get("nombre") or "").strip()
+    email = (fila.get("email") or "").strip().lower()
+    estado = (fila.get("estado") or "activo").strip().lower()
+
+    if not nombre:
+        return None, "Falta el nombre"
+    if len(nombre) > 100:
+        return None, "Nombre demasiado largo"
+    if not EMAIL_VALIDO.match(email) or len(email) > 120:
+        return None, f"Email inválido: {email or '(vacío)'}"
+    if estado not in ESTADOS:
+        return None, f"Estado inválido: {estado}"
+    return {"nombre": nombre, "email": email, "estado": estado, "password": fila.get("password") or None}, None
+
+
+# Inserta los clientes del lote que aún no existen; si otra importación registra alguno
+# entre la consulta y el INSERT, se reintenta el lote una vez con la consulta actualizada
+def _insertar_lote(lote, resultado, enviar_correos, reintentar=True):
+    emails = [c["email"] for c in lote]
+    existentes = {
+        e.lower() for (e,) in db.session.query(Usuario.email).filter(func.lower(Usuario.email).in_(emails))
+    }
+
+    nuevos = []
+    for cliente in lote:
+        if cliente["email"] in existentes:
+            resultado["duplicados"] += 1
+            continue
+        password = cliente["password"]
+        nuevos.append({
+            **{k: v for k, v in cliente.items() if k != "password"},
+            "rol": "cliente",
+            "password_hash": hashing.generar(password) if password else None,
+        })
+
+    if not nuevos:
+        return
+    try:
+        db.session.execute(insert(Usuario), nuevos)
+        db.session.commit()
+    except IntegrityError:
+        db.session.rollback()
+        if reintentar:
+            return _insertar_lote([c for c in lote if c["email"] not in existentes], resultado,
+                                  enviar_correos, reintentar=False)
+        resultado["duplicados"] += len(nuevos)
+        return
+
+    resultado["creados"] += len(nuevos)
+    if enviar_correos:
+        for cliente in nuevos:
+            encolar_correo("bienvenida.html", "¡Registro exitoso en la tienda!", [cliente["email"]],
+                           nombre=cliente["nombre"], email=cliente["email"], rol="cliente")
+
+
+def importar_clientes(filas, tamano_lote=500, enviar_correos=True):
+    resultado = {"procesados": 0, "creados": 0, "duplicados": 0, "invalidos": 0, "errores": []}
+    vistos = set()
+    lote = []
+
+    for numero, fila in enumerate(filas, start=1):
+        resultado["procesados"] += 1
+        cliente, error = validar_fila(fila)
+        if error is None and cliente["email"] in vistos:
+            resultado["duplicados"] += 1
+            continue
+        if error:
+            resultado["invalidos"] += 1
+            if len(resultado["errores"]) < MAX_ERRORES_REPORTADOS:
+                resultado["errores"].append({"fila": numero, "error": error})
+            continue
+
+        vistos.add(cliente["email"])
+        lote.append(cliente)
+        if len(lote) >= tamano_lote:
+            _insertar_lote(lote, resultado, enviar_correos)
+            lote = []
+
+    if lote:
+        _insertar_lote(lote, resultado, enviar_correos)
+    return resultado
+
+
+# Activa/desactiva varios clientes con un único UPDATE; devuelve cuántas filas cambiaron
+def cambiar_estado_masivo(ids, estado):
+    if estado not in ESTADOS:
+        raise ErrorImportacion(f"Estado inválido: {estado}")
+    actualizados = (
+        Usuario.query
+        .filter(Usuario.id.in_(ids), Usuario.rol == "cliente")
+        .update({Usuario.estado: estado}, synchronize_session=False)
+    )
+    db.session.commit()
+    return actualizados
@@ -0,0 +1,81 @@
+# Actualización de productos con bloqueo optimista (Producto.version). Nadie bloquea la fila
+# mientras el vendedor tiene abierto el formulario: al guardar se compara la versión que vio con
+# la actual y el UPDATE del ORM solo se aplica si nadie la cambió entre la lectura y el commit.
+# Las compras descuentan stock con un UPDATE condicional que también incrementa la versión, así
+# que una edición basada en un stock anterior se detecta en lugar de pisar el descuento.
+import logging
+
+from sqlalchemy import update
+from sqlalchemy.orm.exc import StaleDataError
+
+from app.extensions import db
+from app.models.producto import Producto
+
+logger = logging.getLogger("flask_backend")
+
+REINTENTOS = 3
+
+
+class ConflictoVersion(Exception):
+    """La versión del producto no es la que el cliente leyó."""
+
+    def __init__(self, producto):
+        super().__init__(f"El producto {producto.id} cambió (versión actual {producto.version})")
+        self.producto = producto
+
+
+def etag(producto):
+    return f'"{producto.version}"'
+
+
+# Versión pedida en If-Match ('"3"', 'W/"3"' o '3'); None si no hay o es "*"
+def version_de_if_match(if_match):
+    if not if_match or if_match.star_tag:
+        return None
+    for valor in if_match.as_set(include_weak=True):
+        try:
+            return int(valor)
+        except ValueError:
+            continue
+    return None
+
+
+def actualizar_producto(producto_id, cambios, version_esperada=None, reintentos=REINTENTOS):
+    """Aplica `cambios` (campo -> valor) y hace commit. Con `version_esperada` lanza ConflictoVersion
+    si el producto ya no está en esa versión; sin ella, si otra transacción lo cambia entre la lectura
+    y el UPDATE se vuelve a leer y se reintenta. Devuelve el producto o None si no existe."""
+    for intento in range(1, reintentos + 1):
+        producto = db.session.get(Producto, producto_id, populate_existing=True)
+        if producto is None:
+            return None
+        if version_esperada is not None and producto.version != version_esperada:
+            raise ConflictoVersion(producto)
+        for campo, valor in cambios.items():
+            setattr(producto, campo, valor)
+        try:
+            db.session.commit()
+        except StaleDataError:
+            db.session.rollback()
+            logger.info(f"[productos] Producto {producto_id} cambió durante la actualización (intento {intento})")
+            continue
+        if "stock" in cambios:
+            from app.servicios import reservas  # import diferido: reservas importa este módulo
+
+            reservas.invalidar(producto_id)
+        return producto
+    raise ConflictoVersion(db.session.get(Producto, producto_id, populate_existing=True))
+
+
+def descontar_stock(producto_id, cantidad):
+    """Resta `cantidad` solo si hay stock suficiente, en un único UPDATE (sin commit).
+    Devuelve False si no alcanzó."""
+    resultado = db.session.execute(
+        update(Producto)
+        .where(Producto.id == producto_id, Producto.stock >= cantidad)
+        .values(stock=Producto.stock - cantidad, version=Producto.version + 1)
+        .execution_options(synchronize_session=False)
+    )
+    producto = db.session.identity_map.get(db.session.identity_key(Producto, producto_id))
+    if producto is not None:
+        db.session.expire(producto, ["stock", "version"])
+    return resultado.rowcount == 1
@@ -0,0 +1,158 @@
+# Limitación de peticiones con token bucket (por IP, por email...) para frenar ráfagas de
+# login/registro antes de llegar al hash de contraseña o a la BD. El backend es la memoria
+# del proceso o Redis (LIMITADOR_REDIS_URL / ALMACEN_REDIS_URL) si hay varios workers.
+import logging
+import math
+import os
+import threading
+import time
+from functools import wraps
+
+from flask import current_app, jsonify, request
+
+from app.servicios.metricas import LIMITES_EXCEDIDOS
+
+logger = logging.getLogger("flask_backend")
+
+
+class CubetasMemoria:
+    """Cubetas por clave en un diccionario del proceso."""
+
+    def __init__(self, max_claves=50000):
+        self.max_claves = max_claves
+        self._cubetas = {}
+        self._lock = threading.Lock()
+
+    # Devuelve (permitido, segundos de espera hasta tener `costo` fichas)
+    def consumir(self, clave, capacidad, tasa, costo=1):
+        ahora = time.monotonic()
+        with self._lock:
+            fichas, ultimo = self._cubetas.get(clave, (capacidad, ahora))
+            fichas = min(capacidad, fichas + (ahora - ultimo) * tasa)
+            if fichas >= costo:
+                self._guardar(clave, fichas - costo, ahora)
+                return True, 0.0
+            self._guardar(clave, fichas, ahora)
+            return False, (costo - fichas) / tasa
+
+    def _guardar(self, clave, fichas, ahora):
+        if len(self._cubetas) >= self.max_claves and clave not in self._cubetas:
+            # Se descarta la clave más antigua: en el peor caso vuelve con la cubeta llena
+            del self._cubetas[next(iter(self._cubetas))]
+        self._cubetas[clave] = (fichas, ahora)
+
+    def limpiar(self):
+        with self._lock:
+            self._cubetas.clear()
+
+
+# Misma lógica que CubetasMemoria ejecutada atómicamente en Redis
+_SCRIPT_REDIS = """
+local datos = redis.call('HMGET', KEYS[1], 'f', 't')
+local capacidad = tonumber(ARGV[1])
+local tasa = tonumber(ARGV[2])
+local ahora = tonumber(ARGV[3])
+local costo = tonumber(ARGV[4])
+local fichas = tonumber(datos[1]) or capacidad
+local ultimo = tonumber(datos[2]) or ahora
+fichas = math.min(capacidad, fichas + math.max(0, ahora - ultimo) * tasa)
+local permitido = 0
+local espera = 0
+if fichas >= costo then
+  fichas = fichas - costo
+  permitido = 1
+else
+  espera = (costo - fichas) / tasa
+end
+redis.call('HSET', KEYS[1], 'f', fichas, 't', ahora)
+redis.call('EXPIRE', KEYS[1], math.ceil(capacidad / tasa) + 1)
+return {permitido, tostring(espera)}
+"""
+
+
+class CubetasRedis:
+    def __init__(self, url, prefijo="limite"):
+        import redis  # dependencia opcional
+
+        self.cliente = redis.Redis.from_url(url)
+        self.prefijo = prefijo
+        self._script = self.cliente.register_script(_SCRIPT_REDIS)
+
+    def consumir(self, clave, capacidad, tasa, costo=1):
+        permitido, espera = self._script(keys=[f"{self.prefijo}:{clave}"],
+                                         args=[capacidad, tasa, time.time(), costo])
+        return bool(permitido), float(espera)
+
+    def limpiar(self):
+        for clave in self.cliente.scan_iter(f"{self.prefijo}:*"):
+            self.cliente.delete(clave)
+
+
+def crear_backend():
+    url = os.getenv("LIMITADOR_REDIS_URL") or os.getenv("ALMACEN_REDIS_URL")
+    if url:
+        try:
+            return CubetasRedis(url)
+        except ImportError:
+            logger.warning("Redis configurado para el limitador pero el paquete redis no está instalado; se usa memoria")
+    return CubetasMemoria()
+
+
+backend = crear_backend()
+
+
+# "10/60" -> 10 peticiones de ráfaga, recarga de 10 cada 60 segundos
+def parsear_limite(texto):
+    cantidad, segundos = texto.split("/")
+    return int(cantidad), float(segundos)
+
+
+class Regla:
+    def __init__(self, nombre, limite, clave):
+        self.nombre = nombre
+        self.capacidad, periodo = parsear_limite(limite)
+        self.tasa = self.capacidad / periodo
+        self.clave = clave
+
+    def consumir(self):
+        valor = self.clave()
+        if valor is None:
+            return True, 0.0
+        return backend.consumir(f"{self.nombre}:{valor}", self.capacidad, self.tasa)
+
+
+def por_ip():
+    return request.remote_addr or "desconocida"
+
+
+def por_email():
+    data = request.get_json(silent=True) or {}
+    email = data.get("email")
+    return email.strip().lower() if isinstance(email, str) and email.strip() else None
+
+
+# Desactivado en TESTING salvo que se active explícitamente con LIMITADOR_ACTIVO
+def _activo():
+    return current_app.config.get("LIMITADOR_ACTIVO", not current_app.testing)
+
+
+def limitar(*reglas):
+    def decorador(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            if _activo():
+                for regla in reglas:
+                    permitido, espera = regla.consumir()
+                    if not permitido:
+                        LIMITES_EXCEDIDOS.inc(regla=regla.nombre)
+                        logger.warning(f"[limitador] {regla.nombre} excedido por {request.remote_addr}")
+                        return (jsonify({"msg": "Demasiados intentos, intente más tarde"}), 429,
+                                {"Retry-After": str(max(1, math.ceil(espera)))})
+            return func(*args, **kwargs)
+        return wrapper
+    return decorador
+
+
+LOGIN_POR_IP = Regla("login_ip", os.getenv("LIMITE_LOGIN_IP", "20/60"), por_ip)
+LOGIN_POR_EMAIL = Regla("login_email", os.getenv("LIMITE_LOGIN_EMAIL", "5/60"), por_email)
+REGISTRO_POR_IP = Regla("registro_ip", os.getenv("LIMITE_REGISTRO_IP", "5/60"), por_ip)
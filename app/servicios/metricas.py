@@ -0,0 +1,221 @@
+# Métricas en formato de texto de Prometheus, sin depender de prometheus_client
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from flask import Response, g, request
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Límites (segundos) por defecto de los histogramas de latencia
+LIMITES_SEGUNDOS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _escapar(valor):
+    return str(valor).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _formatear_etiquetas(nombres, valores, extra=None):
+    pares = list(zip(nombres, valores))
+    if extra:
+        pares.append(extra)
+    if not pares:
+        return ""
+    return "{" + ",".join(f'{k}="{_escapar(v)}"' for k, v in pares) + "}"
+
+
+class Metrica:
+    tipo = None
+
+    def __init__(self, nombre, descripcion, etiquetas=()):
+        self.nombre = nombre
+        self.descripcion = descripcion
+        self.etiquetas = tuple(etiquetas)
+        self._valores = {}
+        self._lock = threading.Lock()
+
+    def _clave(self, etiquetas):
+        if set(etiquetas) != set(self.etiquetas):
+            raise ValueError(f"{self.nombre} espera las etiquetas {self.etiquetas}")
+        return tuple(str(etiquetas[nombre]) for nombre in self.etiquetas)
+
+    def limpiar(self):
+        with self._lock:
+            self._valores.clear()
+
+    def exponer(self):
+        lineas = [f"# HELP {self.nombre} {self.descripcion}", f"# TYPE {self.nombre} {self.tipo}"]
+        with self._lock:
+            lineas.extend(self._lineas())
+        return lineas
+
+
+class Contador(Metrica):
+    tipo = "counter"
+
+    def inc(self, valor=1, **etiquetas):
+        clave = self._clave(etiquetas)
+        with self._lock:
+            self._valores[clave] = self._valores.get(clave, 0) + valor
+
+    def valor(self, **etiquetas):
+        return self._valores.get(self._clave(etiquetas), 0)
+
+    def _lineas(self):
+        return [
+            f"{self.nombre}{_formatear_etiquetas(self.etiquetas, clave)} {valor}"
+            for clave, valor in sorted(self._valores.items())
+        ]
+
+
+class Histograma(Metrica):
+    tipo = "histogram"
+
+    def __init__(self, nombre, descripcion, etiquetas=(), limites=LIMITES_SEGUNDOS):
+        super().__init__(nombre, descripcion, etiquetas)
+        self.limites = tuple(limites)
+
+    def observar(self, valor, **etiquetas):
+        clave = self._clave(etiquetas)
+        with self._lock:
+            estado = self._valores.setdefault(clave, [[0] * len(self.limites), 0, 0.0])
+            for i, limite in enumerate(self.limites):
+                if valor <= limite:
+                    estado[0][i] += 1
+            estado[1] += 1
+            estado[2] += valor
+
+    def cantidad(self, **etiquetas):
+        estado = self._valores.get(self._clave(etiquetas))
+        return estado[1] if estado else 0
+
+    def _lineas(self):
+        lineas = []
+        for clave, (cubetas, cantidad, suma) in sorted(self._valores.items()):
+            for limite, acumulado in zip(self.limites, cubetas):
+                etiquetas = _formatear_etiquetas(self.etiquetas, clave, ("le", limite))
+                lineas.append(f"{self.nombre}_bucket{etiquetas} {acumulado}")
+            etiquetas = _formatear_etiquetas(self.etiquetas, clave, ("le", "+Inf"))
+            lineas.append(f"{self.nombre}_bucket{etiquetas} {cantidad}")
+            etiquetas = _formatear_etiquetas(self.etiquetas, clave)
+            lineas.append(f"{self.nombre}_count{etiquetas} {cantidad}")
+            lineas.append(f"{self.nombre}_sum{etiquetas} {suma}")
+        return lineas
+
+
+class RegistroMetricas:
+    def __init__(self):
+        self._metricas = {}
+        self._lock = threading.Lock()
+
+    def _registrar(self, metrica):
+        with self._lock:
+            return self._metricas.setdefault(metrica.nombre, metrica)
+
+    def contador(self, nombre, descripcion, etiquetas=()):
+        return self._registrar(Contador(nombre, descripcion, etiquetas))
+
+    def histograma(self, nombre, descripcion, etiquetas=(), limites=LIMITES_SEGUNDOS):
+        return self._registrar(Histograma(nombre, descripcion, etiquetas, limites))
+
+    def limpiar(self):
+        for metrica in self._metricas.values():
+            metrica.limpiar()
+
+    def exponer(self):
+        lineas = []
+        for metrica in self._metricas.values():
+            lineas.extend(metrica.exponer())
+        return "\n".join(lineas) + "\n"
+
+
+registro = RegistroMetricas()
+
+# --- Aplicación web ---
+LATENCIA_RUTAS = registro.histograma(
+    "tienda_http_peticion_segundos", "Latencia de las peticiones HTTP por ruta",
+    ("endpoint", "metodo", "estado"))
+COMPRAS_TOTAL = registro.contador(
+    "tienda_compras_total", "Compras confirmadas", ("tipo_comprobante",))
+CONFLICTOS_STOCK = registro.contador(
+    "tienda_stock_conflictos_total", "Compras rechazadas al descontar stock", ("motivo",))
+LATENCIA_PUBLICACION = registro.histograma(
+    "tienda_cola_publicacion_segundos", "Latencia de publicación en RabbitMQ", ("cola",))
+ERRORES_PUBLICACION = registro.contador(
+    "tienda_cola_publicacion_errores_total", "Publicaciones fallidas en RabbitMQ", ("cola",))
+RESERVAS_TOTAL = registro.contador(
+    "tienda_reservas_total", "Reservas de stock por resultado (creada, rechazada, confirmada, liberada, vencida)",
+    ("resultado",))
+LIMITES_EXCEDIDOS = registro.contador(
+    "tienda_limite_excedido_total", "Peticiones rechazadas con 429 por regla de limitación", ("regla",))
+
+# --- Consumidores ---
+PROCESAMIENTO_CONSUMIDOR = registro.histograma(
+    "tienda_consumidor_procesamiento_segundos",
+    "Tiempo de procesamiento de un mensaje por fase (consulta DNI/RUC, SMTP, total)",
+    ("cola", "fase"))
+MENSAJES_CONSUMIDOS = registro.contador(
+    "tienda_consumidor_mensajes_total", "Mensajes procesados por los consumidores", ("cola", "resultado"))
+
+
+# Cronometra un bloque y lo registra en el histograma indicado
+@contextmanager
+def cronometrar(histograma, **etiquetas):
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        histograma.observar(time.perf_counter() - inicio, **etiquetas)
+
+
+def _inicio_peticion():
+    g._metricas_inicio = time.perf_counter()
+
+
+def _fin_peticion(response):
+    inicio = g.pop("_metricas_inicio", None)
+    if inicio is not None and request.endpoint != "metricas":
+        LATENCIA_RUTAS.observar(
+            time.perf_counter() - inicio,
+            endpoint=request.endpoint or "desconocido",
+            metodo=request.method,
+            estado=response.status_code,
+        )
+    return response
+
+
+def exponer_metricas():
+    return Response(registro.exponer(), content_type=CONTENT_TYPE)
+
+
+# Registra la latencia por ruta y expone GET /metrics en la app Flask
+def init_app(app):
+    app.before_request(_inicio_peticion)
+    app.after_request(_fin_peticion)
+    app.add_url_rule("/metrics", "metricas", exponer_metricas)
+
+
+class _ManejadorMetricas(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_response(404)
+            self.end_headers()
+            return
+        cuerpo = registro.exponer().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", CONTENT_TYPE)
+        self.send_header("Content-Length", str(len(cuerpo)))
+        self.end_headers()
+        self.wfile.write(cuerpo)
+
+    def log_message(self, format, *args):
+        pass
+
+
+# Servidor HTTP mínimo (hilo daemon) para exponer /metrics desde los consumidores
+def iniciar_servidor_metricas(puerto, host="0.0.0.0"):
+    servidor = ThreadingHTTPServer((host, puerto), _ManejadorMetricas)
+    hilo = threading.Thread(target=servidor.serve_forever, name="servidor-metricas", daemon=True)
+    hilo.start()
+    return servidor
@@ -0,0 +1,66 @@
+# Paginación en servidor con conteo acotado: se cuentan como máximo CONTEO_MAXIMO filas y,
+# por encima, se usa la estimación del planificador (PostgreSQL) para no recorrer la tabla.
+import json
+import math
+
+from sqlalchemy import func, select, text
+
+from app.extensions import db
+
+POR_PAGINA_MAXIMO = 100
+CONTEO_MAXIMO = 10000
+
+
+class Pagina:
+    def __init__(self, items, pagina, por_pagina, total, estimado, hay_siguiente):
+        self.items = items
+        self.pagina = pagina
+        self.por_pagina = por_pagina
+        self.total = total
+        self.estimado = estimado
+        self.hay_siguiente = hay_siguiente
+
+    @property
+    def hay_anterior(self):
+        return self.pagina > 1
+
+    @property
+    def paginas(self):
+        return max(1, math.ceil(self.total / self.por_pagina))
+
+
+# Escapa % y _ para usar el texto del usuario como prefijo en LIKE
+def patron_prefijo(texto):
+    escapado = texto.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return f"{escapado.lower()}%"
+
+
+def contar_acotado(query, limite=CONTEO_MAXIMO):
+    subconsulta = query.order_by(None).limit(limite + 1).subquery()
+    return db.session.execute(select(func.count()).select_from(subconsulta)).scalar()
+
+
+# Filas estimadas por el planificador de PostgreSQL (None en otros motores)
+def estimar_filas(query):
+    if db.session.get_bind().dialect.name != "postgresql":
+        return None
+    sentencia = query.order_by(None).statement.compile(db.session.get_bind(), compile_kwargs={"literal_binds": True})
+    plan = db.session.execute(text(f"EXPLAIN (FORMAT JSON) {sentencia}")).scalar()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]["Plan"]["Plan Rows"])
+
+
+def paginar(query, pagina=1, por_pagina=20):
+    pagina = max(1, pagina)
+    por_pagina = min(max(1, por_pagina), POR_PAGINA_MAXIMO)
+
+    # Se pide una fila de más para saber si hay página siguiente sin contar
+    filas = query.limit(por_pagina + 1).offset((pagina - 1) * por_pagina).all()
+    hay_siguiente = len(filas) > por_pagina
+
+    total = contar_acotado(query)
+    estimado = total > CONTEO_MAXIMO
+    if estimado:
+        total = max(estimar_filas(query) or 0, total)
+    return Pagina(filas[:por_pagina], pagina, por_pagina, total, estimado, hay_siguiente)
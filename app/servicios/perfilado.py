@@ -0,0 +1,224 @@
+# Perfilado por petición: tiempo total, consultas SQL, plantillas y llamadas externas
+import cProfile
+import io
+import os
+import pstats
+import threading
+import time
+from contextlib import contextmanager
+
+from flask import abort, g, has_request_context, request, jsonify, make_response, current_app
+from flask_login import current_user
+from flask.signals import before_render_template, template_rendered
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# Límites (ms) de los histogramas agregados por endpoint
+LIMITES_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+_eventos_sql_registrados = False
+_lock_eventos = threading.Lock()
+
+
+# Perfil de la petición en curso (None si no hay perfilado activo)
+def _perfil_actual():
+    if not has_request_context():
+        return None
+    return g.get("_perfil")
+
+
+# El muestreo y el resumen exponen detalles internos: solo para una sesión de administrador
+def _es_administrador():
+    if getattr(current_app, "login_manager", None) is None:
+        return False
+    return current_user.is_authenticated and getattr(current_user, "rol", None) == "administrador"
+
+
+# Mide una llamada externa (RabbitMQ, WeasyPrint, SMTP...) y la suma al perfil
+@contextmanager
+def medir_externo(nombre):
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        perfil = _perfil_actual()
+        if perfil is not None:
+            transcurrido = time.perf_counter() - inicio
+            perfil["externo"][nombre] = perfil["externo"].get(nombre, 0.0) + transcurrido
+
+
+def _antes_de_sql(conn, cursor, statement, parameters, context, executemany):
+    if _perfil_actual() is not None:
+        conn.info.setdefault("_perfil_inicio", []).append(time.perf_counter())
+
+
+def _despues_de_sql(conn, cursor, statement, parameters, context, executemany):
+    perfil = _perfil_actual()
+    inicios = conn.info.get("_perfil_inicio")
+    if perfil is None or not inicios:
+        return
+    perfil["sql_consultas"] += 1
+    perfil["sql"] += time.perf_counter() - inicios.pop()
+
+
+# Los eventos se registran una sola vez sobre la clase Engine (cubre todos los motores)
+def _registrar_eventos_sql():
+    global _eventos_sql_registrados
+    with _lock_eventos:
+        if _eventos_sql_registrados:
+            return
+        event.listen(Engine, "before_cursor_execute", _antes_de_sql)
+        event.listen(Engine, "after_cursor_execute", _despues_de_sql)
+        _eventos_sql_registrados = True
+
+
+class Histograma:
+    def __init__(self, limites=LIMITES_MS):
+        self.limites = limites
+        self.cubetas = [0] * (len(limites) + 1)
+        self.cantidad = 0
+        self.suma = 0.0
+
+    def observar(self, valor):
+        for i, limite in enumerate(self.limites):
+            if valor <= limite:
+                self.cubetas[i] += 1
+                break
+        else:
+            self.cubetas[-1] += 1
+        self.cantidad += 1
+        self.suma += valor
+
+    def to_dict(self):
+        etiquetas = [f"<={limite}" for limite in self.limites] + [f">{self.limites[-1]}"]
+        return {
+            "cantidad": self.cantidad,
+            "promedio": round(self.suma / self.cantidad, 3) if self.cantidad else 0,
+            "cubetas": dict(zip(etiquetas, self.cubetas)),
+        }
+
+
+class PerfiladorPeticiones:
+    """Middleware opcional de perfilado (PERFILADO_ACTIVO=true para activarlo; el muestreo con
+    ?_perfil=cprofile|pyinstrument requiere además PERFILADO_MUESTREO=true)."""
+
+    def __init__(self, app=None):
+        self._lock = threading.Lock()
+        self.histogramas = {}
+        self.consultas = {}
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault("PERFILADO_ACTIVO", os.getenv("PERFILADO_ACTIVO", "false").lower() == "true")
+        app.config.setdefault("PERFILADO_MUESTREO", os.getenv("PERFILADO_MUESTREO", "false").lower() == "true")
+        app.extensions["perfilado"] = self
+
+        if not app.config["PERFILADO_ACTIVO"]:
+            return
+
+        _registrar_eventos_sql()
+        app.before_request(self._iniciar)
+        app.after_request(self._finalizar)
+        before_render_template.connect(self._antes_de_plantilla, app)
+        template_rendered.connect(self._despues_de_plantilla, app)
+        app.add_url_rule("/_perfilado", "perfilado_resumen", self.resumen)
+
+    def _iniciar(self):
+        g._perfil = {
+            "inicio": time.perf_counter(),
+            "sql": 0.0,
+            "sql_consultas": 0,
+            "plantilla": 0.0,
+            "plantillas_pendientes": [],
+            "externo": {},
+            "profiler": None,
+        }
+
+        modo = request.args.get("_perfil")
+        if modo and current_app.config["PERFILADO_MUESTREO"] and _es_administrador():
+            g._perfil["profiler"] = self._crear_profiler(modo)
+
+    @staticmethod
+    def _crear_profiler(modo):
+        if modo == "pyinstrument":
+            try:
+                from pyinstrument import Profiler
+            except ImportError:
+                return None
+            profiler = Profiler()
+            profiler.start()
+            return ("pyinstrument", profiler)
+        profiler = cProfile.Profile()
+        profiler.enable()
+        return ("cprofile", profiler)
+
+    def _antes_de_plantilla(self, sender, template, context, **extra):
+        perfil = _perfil_actual()
+        if perfil is not None:
+            perfil["plantillas_pendientes"].append(time.perf_counter())
+
+    def _despues_de_plantilla(self, sender, template, context, **extra):
+        perfil = _perfil_actual()
+        if perfil is not None and perfil["plantillas_pendientes"]:
+            perfil["plantilla"] += time.perf_counter() - perfil["plantillas_pendientes"].pop()
+
+    def _finalizar(self, response):
+        perfil = _perfil_actual()
+        if perfil is None:
+            return response
+
+        total = time.perf_counter() - perfil["inicio"]
+        endpoint = request.endpoint or "desconocido"
+
+        tiempos = {"total": total, "sql": perfil["sql"], "plantilla": perfil["plantilla"]}
+        for nombre, segundos in perfil["externo"].items():
+            tiempos[f"ext-{nombre}"] = segundos
+        self._agregar(endpoint, tiempos, perfil["sql_consultas"])
+
+        partes = [f"{nombre};dur={segundos * 1000:.2f}" for nombre, segundos in tiempos.items()]
+        partes[1] += f';desc="{perfil["sql_consultas"]} consultas"'
+        response.headers["Server-Timing"] = ", ".join(partes)
+
+        if perfil["profiler"] is not None:
+            muestreo = self._respuesta_muestreo(perfil["profiler"])
+            muestreo.status_code = response.status_code
+            muestreo.headers["Server-Timing"] = response.headers["Server-Timing"]
+            return muestreo
+        return response
+
+    @staticmethod
+    def _respuesta_muestreo(profiler):
+        tipo, instancia = profiler
+        if tipo == "pyinstrument":
+            instancia.stop()
+            respuesta = make_response(instancia.output_html())
+            respuesta.headers["Content-Type"] = "text/html; charset=utf-8"
+            return respuesta
+
+        instancia.disable()
+        salida = io.StringIO()
+        pstats.Stats(instancia, stream=salida).sort_stats("cumulative").print_stats(40)
+        respuesta = make_response(salida.getvalue())
+        respuesta.headers["Content-Type"] = "text/plain; charset=utf-8"
+        return respuesta
+
+    def _agregar(self, endpoint, tiempos, consultas):
+        with self._lock:
+            for nombre, segundos in tiempos.items():
+                clave = (endpoint, nombre)
+                if clave not in self.histogramas:
+                    self.histogramas[clave] = Histograma()
+                self.histogramas[clave].observar(segundos * 1000)
+            self.consultas[endpoint] = self.consultas.get(endpoint, 0) + consultas
+
+    # Resumen JSON de los histogramas por endpoint
+    def resumen(self):
+        if not _es_administrador():
+            abort(403)
+        with self._lock:
+            datos = {}
+            for (endpoint, nombre), histograma in self.histogramas.items():
+                datos.setdefault(endpoint, {"sql_consultas_total": self.consultas.get(endpoint, 0)})
+                datos[endpoint][nombre] = histograma.to_dict()
+        return jsonify(datos), 200
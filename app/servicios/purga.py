@@ -0,0 +1,260 @@
+# Borrado de clientes y productos con historial grande: en lugar de que el ORM cargue y borre
+# cada hijo en la petición, se borra por lotes de ids con sentencias DELETE/UPDATE y un commit
+# por lote. Por debajo de PURGA_UMBRAL_SINCRONO filas dependientes se hace en la petición; por
+# encima, el registro se marca como "eliminando", la purga se registra en purgas_pendientes y
+# sigue en segundo plano; `reanudar_purgas` retoma las que no terminaron.
+import logging
+import os
+from datetime import datetime, timedelta
+
+from flask import current_app
+from sqlalchemy import delete, func, or_, select, update
+
+from app.extensions import db
+from app.models.compra import Compra
+from app.models.compra_producto import CompraProducto
+from app.models.historial_ventas import HistorialVenta
+from app.models.producto import Producto
+from app.models.purga_pendiente import PRODUCTO, USUARIO, PurgaPendiente
+from app.models.reserva_stock import ACTIVA, ReservaStock
+from app.models.usuario import Usuario
+from app.servicios import reservas
+from app.servicios.tareas import tareas
+
+logger = logging.getLogger("flask_backend")
+
+TAMANO_LOTE = int(os.getenv("PURGA_TAMANO_LOTE", 1000))
+UMBRAL_SINCRONO = int(os.getenv("PURGA_UMBRAL_SINCRONO", 500))
+REANUDAR_TRAS = int(os.getenv("PURGA_REANUDAR_TRAS", 3600))
+ESTADO_ELIMINANDO = "eliminando"
+
+
+def _ids(consulta, tamano_lote):
+    return db.session.execute(consulta.limit(tamano_lote)).scalars().all()
+
+
+# Aplica `sentencia(ids)` a los ids que devuelve `consulta`, lote a lote, hasta agotarlos
+def _por_lotes(consulta, sentencia, tamano_lote):
+    total = 0
+    while True:
+        ids = _ids(consulta, tamano_lote)
+        if not ids:
+            return total
+        db.session.execute(sentencia(ids))
+        db.session.commit()
+        total += len(ids)
+
+
+def _purgar_lineas_de_productos(producto_ids, tamano_lote):
+    _por_lotes(
+        select(ReservaStock.id).where(ReservaStock.producto_id.in_(producto_ids)),
+        lambda ids: delete(ReservaStock).where(ReservaStock.id.in_(ids)),
+        tamano_lote,
+    )
+    _por_lotes(
+        select(CompraProducto.id).where(CompraProducto.producto_id.in_(producto_ids)),
+        lambda ids: delete(CompraProducto).where(CompraProducto.id.in_(ids)),
+        tamano_lote,
+    )
+    _por_lotes(
+        select(HistorialVenta.id).where(HistorialVenta.producto_id.in_(producto_ids)),
+        lambda ids: update(HistorialVenta).where(HistorialVenta.id.in_(ids)).values(producto_id=None),
+        tamano_lote,
+    )
+
+
+def purgar_producto(producto_id, tamano_lote=TAMANO_LOTE):
+    _purgar_lineas_de_productos([producto_id], tamano_lote)
+    db.session.execute(delete(Producto).where(Producto.id == producto_id))
+    db.session.commit()
+    reservas.invalidar(producto_id)
+
+
+def purgar_usuario(usuario_id, tamano_lote=TAMANO_LOTE):
+    # Sus compras aún sin restar del stock se aplican antes de borrar sus reservas
+    reservas.aplicar_confirmadas(tamano_lote, cliente_id=usuario_id)
+
+    # Historial: se conserva sin el cliente (como comprador y como vendedor)
+    _por_lotes(
+        select(HistorialVenta.id).where(HistorialVenta.cliente_id == usuario_id),
+        lambda ids: update(HistorialVenta).where(HistorialVenta.id.in_(ids)).values(cliente_id=None),
+        tamano_lote,
+    )
+    _por_lotes(
+        select(HistorialVenta.id).where(HistorialVenta.vendedor_id == usuario_id),
+        lambda ids: update(HistorialVenta).where(HistorialVenta.id.in_(ids)).values(vendedor_id=None),
+        tamano_lote,
+    )
+
+    # Reservas del cliente; el disponible de los productos que tenía reservados se vuelve a leer
+    reservados = db.session.execute(
+        select(ReservaStock.producto_id).where(ReservaStock.cliente_id == usuario_id,
+                                               ReservaStock.estado == ACTIVA).distinct()
+    ).scalars().all()
+    _por_lotes(
+        select(ReservaStock.id).where(ReservaStock.cliente_id == usuario_id),
+        lambda ids: delete(ReservaStock).where(ReservaStock.id.in_(ids)),
+        tamano_lote,
+    )
+    for producto_id in reservados:
+        reservas.invalidar(producto_id)
+
+    # Productos del cliente, con las líneas de compra que los referencian
+    while True:
+        producto_ids = _ids(select(Producto.id).where(Producto.cliente_id == usuario_id), tamano_lote)
+        if not producto_ids:
+            break
+        _purgar_lineas_de_productos(producto_ids, tamano_lote)
+        db.session.execute(delete(Producto).where(Producto.id.in_(producto_ids)))
+        db.session.commit()
+
+    # Compras del cliente con sus líneas
+    while True:
+        compra_ids = _ids(select(Compra.id).where(Compra.cliente_id == usuario_id), tamano_lote)
+        if not compra_ids:
+            break
+        _por_lotes(
+            select(CompraProducto.id).where(CompraProducto.compra_id.in_(compra_ids)),
+            lambda ids: delete(CompraProducto).where(CompraProducto.id.in_(ids)),
+            tamano_lote,
+        )
+        db.session.execute(delete(Compra).where(Compra.id.in_(compra_ids)))
+        db.session.commit()
+
+    db.session.execute(delete(Usuario).where(Usuario.id == usuario_id))
+    db.session.commit()
+    logger.info(f"[purga] Usuario {usuario_id} eliminado")
+
+
+def _contar(consulta, limite):
+    return db.session.execute(select(func.count()).select_from(consulta.limit(limite).subquery())).scalar()
+
+
+def filas_dependientes_usuario(usuario_id, limite=UMBRAL_SINCRONO + 1):
+    compras = _contar(select(Compra.id).where(Compra.cliente_id == usuario_id), limite)
+    productos = _contar(select(Producto.id).where(Producto.cliente_id == usuario_id), limite)
+    return compras + productos
+
+
+def filas_dependientes_producto(producto_id, limite=UMBRAL_SINCRONO + 1):
+    return _contar(select(CompraProducto.id).where(CompraProducto.producto_id == producto_id), limite)
+
+
+# Registra la purga en la transacción en curso (la confirma quien marca el registro)
+def _registrar(tipo, objetivo_id):
+    existente = db.session.execute(
+        select(PurgaPendiente).where(PurgaPendiente.tipo == tipo, PurgaPendiente.objetivo_id == objetivo_id)
+    ).scalar_one_or_none()
+    purga = existente or PurgaPendiente(tipo=tipo, objetivo_id=objetivo_id)
+    purga.reclamada = datetime.utcnow()
+    db.session.add(purga)
+    return purga
+
+
+# Ejecuta una purga registrada y borra su registro; si falla, queda para reanudar
+def ejecutar_purga(purga_id):
+    purga = db.session.get(PurgaPendiente, purga_id)
+    if purga is None:
+        return False
+    tipo, objetivo_id = purga.tipo, purga.objetivo_id
+    try:
+        if tipo == USUARIO:
+            purgar_usuario(objetivo_id)
+        else:
+            purgar_producto(objetivo_id)
+    except Exception as e:
+        db.session.rollback()
+        db.session.execute(
+            update(PurgaPendiente).where(PurgaPendiente.id == purga_id)
+            .values(reclamada=None, intentos=PurgaPendiente.intentos + 1, error=str(e)[:1000])
+        )
+        db.session.commit()
+        raise
+    db.session.execute(delete(PurgaPendiente).where(PurgaPendiente.id == purga_id))
+    db.session.commit()
+    return True
+
+
+def _en_segundo_plano(purga_id):
+    app = current_app._get_current_object()
+
+    def ejecutar():
+        with app.app_context():
+            ejecutar_purga(purga_id)
+    if tareas.encolar(ejecutar):
+        return True
+    # Sigue registrada: la retoma `flask reanudar-purgas`
+    logger.warning(f"[purga] No se pudo programar la purga {purga_id}; queda pendiente")
+    return False
+
+
+# Retoma las purgas sin terminar (proceso caído, cola llena, error): las no reclamadas o
+# reclamadas hace más de `reanudar_tras` segundos. Devuelve cuántas terminó.
+def reanudar_purgas(reanudar_tras=REANUDAR_TRAS):
+    # Usuarios marcados sin registro de purga (p. ej. de antes de existir la tabla)
+    sin_registro = db.session.execute(
+        select(Usuario.id).where(
+            Usuario.estado == ESTADO_ELIMINANDO,
+            ~select(PurgaPendiente.id).where(PurgaPendiente.tipo == USUARIO,
+                                             PurgaPendiente.objetivo_id == Usuario.id).exists(),
+        )
+    ).scalars().all()
+    db.session.add_all(PurgaPendiente(tipo=USUARIO, objetivo_id=usuario_id) for usuario_id in sin_registro)
+    db.session.commit()
+
+    limite = datetime.utcnow() - timedelta(seconds=reanudar_tras)
+    abandonada = or_(PurgaPendiente.reclamada.is_(None), PurgaPendiente.reclamada < limite)
+    terminadas = 0
+    for purga_id in db.session.execute(select(PurgaPendiente.id).where(abandonada).order_by(PurgaPendiente.id)).scalars().all():
+        # Reclamo condicional: otro proceso puede estar reanudando a la vez
+        reclamada = db.session.execute(
+            update(PurgaPendiente).where(PurgaPendiente.id == purga_id, abandonada)
+            .values(reclamada=datetime.utcnow())
+            .execution_options(synchronize_session=False)
+        ).rowcount
+        db.session.commit()
+        if not reclamada:
+            continue
+        try:
+            terminadas += ejecutar_purga(purga_id)
+        except Exception as e:
+            logger.error(f"[purga] La purga {purga_id} volvió a fallar: {e}")
+    return terminadas
+
+
+# Al arrancar el proceso: retoma en segundo plano las purgas abandonadas
+def reanudar_en_segundo_plano(app):
+    def ejecutar():
+        with app.app_context():
+            terminadas = reanudar_purgas()
+            if terminadas:
+                logger.info(f"[purga] {terminadas} purgas pendientes terminadas al iniciar")
+    return tareas.encolar(ejecutar)
+
+
+# Devuelve True si se borró en la petición o False si quedó programado en segundo plano
+def eliminar_usuario(usuario_id):
+    if filas_dependientes_usuario(usuario_id) <= UMBRAL_SINCRONO:
+        purgar_usuario(usuario_id)
+        return True
+    # Marcado como "eliminando" (deja de poder iniciar sesión) y purga registrada, en una transacción
+    db.session.execute(update(Usuario).where(Usuario.id == usuario_id).values(estado=ESTADO_ELIMINANDO))
+    purga = _registrar(USUARIO, usuario_id)
+    db.session.commit()
+    _en_segundo_plano(purga.id)
+    return False
+
+
+def eliminar_producto(producto_id):
+    if filas_dependientes_producto(producto_id) <= UMBRAL_SINCRONO:
+        purgar_producto(producto_id)
+        return True
+    # Sin stock para que no se pueda comprar mientras se purga
+    db.session.execute(
+        update(Producto).where(Producto.id == producto_id).values(stock=0, version=Producto.version + 1)
+    )
+    purga = _registrar(PRODUCTO, producto_id)
+    db.session.commit()
+    reservas.invalidar(producto_id)
+    _en_segundo_plano(purga.id)
+    return False
@@ -0,0 +1,325 @@
+# Rankings (Top-N) de ventas por producto, marca, categoría, tipo de comprobante y vendedor (dueño
+# del producto), y totales por periodo de cada clave. Cada venta que se inserta en
+# historial_ventas por el ORM deja una fila (producto, tipo, día local de Lima, monto, cantidad)
+# en resumen_ventas_pendientes en el mismo flush: un solo INSERT por línea, sin bloquear filas
+# compartidas por todas las compras. `consolidar_pendientes` las expande por dimensión y periodo
+# (día, mes y total) y las suma a resumen_ventas cada pocos segundos fuera de la compra. Los
+# rankings leen solo resumen_ventas (con hasta RANKING_INTERVALO_CONSOLIDACION de retraso), nunca
+# historial_ventas, así que su costo depende de `n` y no del tamaño del historial. Las cargas
+# masivas fuera del ORM se recalculan con `reconstruir`.
+import logging
+import os
+from collections import defaultdict
+from datetime import date, timedelta
+
+import numpy as np
+from sqlalchemy import delete, func, insert, select, update
+
+from app.extensions import db
+from app.models.categoria import Categoria
+from app.models.historial_ventas import HistorialVenta
+from app.models.producto import Producto
+from app.models.resumen_venta import ResumenVenta, ResumenVentaPendiente
+from app.models.tipo_comprobante import TipoComprobante
+from app.models.usuario import Usuario
+from app.servicios import series_tiempo
+from app.servicios.tareas import TareaPeriodica
+
+logger = logging.getLogger("flask_backend")
+
+DIMENSIONES = ("producto", "marca", "categoria", "tipo_comprobante", "vendedor")
+VENTANAS = ("dia", "semana", "mes", "anio", "total")
+# Ventanas que caen en una sola fila por clave de resumen_ventas (se leen ordenadas del índice)
+VENTANAS_UN_PERIODO = ("dia", "mes", "total")
+METRICAS = ("monto", "cantidad", "ventas")
+INICIO_TOTAL = date(1970, 1, 1)
+LIMITE_POR_DEFECTO = 10
+MAX_LIMITE = 100
+TAMANO_LOTE = 50_000
+
+
+# Periodos que acumula una venta del día local `dia`
+def _periodos(dia):
+    return [("dia", dia), ("mes", dia.replace(day=1)), ("total", INICIO_TOTAL)]
+
+
+# Claves (dimensión, clave, etiqueta) de una línea de venta
+def _claves(producto_id, nombre, marca, categoria_id, categoria, tipo_id, tipo, vendedor_id=None, vendedor=None):
+    claves = []
+    if producto_id is not None:
+        claves.append(("producto", str(producto_id), nombre or str(producto_id)))
+    if marca:
+        claves.append(("marca", marca, marca))
+    if categoria_id is not None:
+        claves.append(("categoria", str(categoria_id), categoria or str(categoria_id)))
+    if tipo_id is not None:
+        claves.append(("tipo_comprobante", str(tipo_id), tipo or str(tipo_id)))
+    if vendedor_id is not None:
+        claves.append(("vendedor", str(vendedor_id), vendedor or str(vendedor_id)))
+    return claves
+
+
+class _Acumulador:
+    """Suma monto/cantidad/ventas por (dimensión, periodo, inicio, clave)."""
+
+    def __init__(self):
+        self.filas = defaultdict(lambda: [None, 0.0, 0, 0])
+
+    def sumar(self, dia, claves, monto, cantidad):
+        for periodo, inicio in _periodos(dia):
+            for dimension, clave, etiqueta in claves:
+                self.sumar_fila(dimension, periodo, inicio, clave, etiqueta, monto, cantidad, 1)
+
+    def sumar_fila(self, dimension, periodo, inicio, clave, etiqueta, monto, cantidad, ventas):
+        fila = self.filas[(dimension, periodo, inicio, clave)]
+        fila[0] = etiqueta
+        fila[1] += monto
+        fila[2] += cantidad
+        fila[3] += ventas
+
+    def parametros(self):
+        # Orden fijo para que compras concurrentes bloqueen las filas en el mismo orden
+        return [
+            {"dimension": d, "periodo": p, "inicio": i, "clave": c,
+             "etiqueta": e, "monto": m, "cantidad": q, "ventas": v}
+            for (d, p, i, c), (e, m, q, v) in sorted(self.filas.items())
+        ]
+
+
+def _upsert(session, parametros):
+    tabla = ResumenVenta.__table__
+    dialecto = session.get_bind(mapper=ResumenVenta.__mapper__).dialect.name
+    if dialecto in ("postgresql", "sqlite"):
+        if dialecto == "postgresql":
+            from sqlalchemy.dialects.postgresql import insert as insert_dialecto
+        else:
+            from sqlalchemy.dialects.sqlite import insert as insert_dialecto
+        sentencia = insert_dialecto(tabla)
+        sentencia = sentencia.on_conflict_do_update(
+            index_elements=["dimension", "periodo", "inicio", "clave"],
+            set_={
+                "etiqueta": sentencia.excluded.etiqueta,
+                "monto": tabla.c.monto + sentencia.excluded.monto,
+                "cantidad": tabla.c.cantidad + sentencia.excluded.cantidad,
+                "ventas": tabla.c.ventas + sentencia.excluded.ventas,
+            },
+        )
+        session.execute(sentencia, parametros)
+        return
+
+    # Otros motores: UPDATE y, si no existía la fila, INSERT
+    for fila in parametros:
+        resultado = session.execute(
+            update(tabla)
+            .where(tabla.c.dimension == fila["dimension"], tabla.c.periodo == fila["periodo"],
+                   tabla.c.inicio == fila["inicio"], tabla.c.clave == fila["clave"])
+            .values(etiqueta=fila["etiqueta"], monto=tabla.c.monto + fila["monto"],
+                    cantidad=tabla.c.cantidad + fila["cantidad"], ventas=tabla.c.ventas + fila["ventas"])
+        )
+        if not resultado.rowcount:
+            session.execute(insert(tabla), [fila])
+
+
+def _dia_local(fecha):
+    if fecha is None:
+        return series_tiempo.hoy_local()
+    return series_tiempo.desde_epoch(series_tiempo.a_local([series_tiempo.a_epoch(fecha)])[0]).date()
+
+
+def acumular_ventas(session, ventas):
+    """Inserta una fila pendiente por venta (HistorialVenta aún sin guardar), sin commit."""
+    filas = [
+        {"producto_id": venta.producto_id, "tipo_comprobante_id": venta.tipo_comprobante_id,
+         "dia": _dia_local(venta.fecha_venta), "monto": float(venta.total_venta), "cantidad": venta.cantidad}
+        for venta in ventas
+    ]
+    if filas:
+        session.execute(insert(ResumenVentaPendiente.__table__), filas)
+
+
+# Etiquetas actuales de los productos (con categoría y vendedor) y tipos de comprobante de un lote
+def _etiquetas(producto_ids, tipo_ids):
+    productos = {
+        fila[0]: fila[1:] for fila in db.session.execute(
+            select(Producto.id, Producto.nombre, Producto.marca, Producto.categoria_id, Categoria.nombre,
+                   Producto.cliente_id, Usuario.nombre)
+            .outerjoin(Categoria, Producto.categoria_id == Categoria.id)
+            .outerjoin(Usuario, Producto.cliente_id == Usuario.id)
+            .where(Producto.id.in_(producto_ids))
+        )
+    } if producto_ids else {}
+    tipos = dict(db.session.execute(
+        select(TipoComprobante.id, TipoComprobante.nombre).where(TipoComprobante.id.in_(tipo_ids))
+    ).all()) if tipo_ids else {}
+    return productos, tipos
+
+
+def consolidar_pendientes(tamano_lote=TAMANO_LOTE):
+    """Suma las ventas pendientes a resumen_ventas por lotes (un commit por lote); devuelve cuántas
+    consolidó. Cada lote se borra y se suma en la misma transacción, así que una venta se suma una
+    sola vez aunque consoliden varios procesos a la vez."""
+    tabla = ResumenVentaPendiente.__table__
+    columnas = (tabla.c.producto_id, tabla.c.tipo_comprobante_id, tabla.c.dia, tabla.c.monto, tabla.c.cantidad)
+    dialecto = db.session.get_bind(mapper=ResumenVenta.__mapper__).dialect
+    total = 0
+    while True:
+        ids = select(tabla.c.id).order_by(tabla.c.id).limit(tamano_lote).with_for_update(skip_locked=True)
+        if dialecto.delete_returning:
+            filas = db.session.execute(
+                delete(tabla).where(tabla.c.id.in_(ids.scalar_subquery())).returning(*columnas)
+            ).all()
+        else:
+            lote = db.session.execute(select(tabla.c.id, *columnas).where(tabla.c.id.in_(ids.scalar_subquery()))).all()
+            db.session.execute(delete(tabla).where(tabla.c.id.in_([f[0] for f in lote])))
+            filas = [f[1:] for f in lote]
+        if not filas:
+            db.session.commit()
+            return total
+
+        productos, tipos = _etiquetas({f[0] for f in filas if f[0] is not None},
+                                      {f[1] for f in filas if f[1] is not None})
+        acumulador = _Acumulador()
+        for producto_id, tipo_id, dia, monto, cantidad in filas:
+            claves = []
+            if producto_id in productos:
+                nombre, marca, categoria_id, categoria, vendedor_id, vendedor = productos[producto_id]
+                claves += _claves(producto_id, nombre, marca, categoria_id, categoria, None, None,
+                                  vendedor_id, vendedor)
+            if tipo_id is not None:
+                claves += _claves(None, None, None, None, None, tipo_id, tipos.get(tipo_id))
+            acumulador.sumar(dia, claves, float(monto), cantidad)
+        _upsert(db.session, acumulador.parametros())
+        db.session.commit()
+        total += len(filas)
+
+
+consolidacion = TareaPeriodica("consolidar-ranking", consolidar_pendientes,
+                               float(os.getenv("RANKING_INTERVALO_CONSOLIDACION", 5)))
+
+
+def init_app(app):
+    app.config.setdefault("RANKING_CONSOLIDACION_ACTIVA", not app.testing)
+
+
+# Inicia la consolidación periódica del proceso que sirve peticiones; no en TESTING salvo con
+# RANKING_CONSOLIDACION_ACTIVA
+def iniciar_consolidacion(app):
+    if app.config["RANKING_CONSOLIDACION_ACTIVA"]:
+        consolidacion.iniciar(app)
+
+
+# Primer día del mes que empieza `meses` meses atrás contando el actual
+def _primer_mes(hoy, meses):
+    primero = hoy.replace(day=1)
+    for _ in range(meses - 1):
+        primero = (primero - timedelta(days=1)).replace(day=1)
+    return primero
+
+
+# Filtro de periodo/inicio de cada ventana sobre las columnas `c` de resumen_ventas
+def _filtro_ventana(ventana, hoy, c):
+    if ventana == "dia":
+        return c.periodo == "dia", c.inicio == hoy
+    if ventana == "semana":
+        return c.periodo == "dia", c.inicio.between(hoy - timedelta(days=6), hoy)
+    if ventana == "mes":
+        return c.periodo == "mes", c.inicio == hoy.replace(day=1)
+    if ventana == "anio":
+        return c.periodo == "mes", c.inicio.between(_primer_mes(hoy, 12), hoy)
+    if ventana == "total":
+        return c.periodo == "total", c.inicio == INICIO_TOTAL
+    raise ValueError(f"ventana debe ser una de: {', '.join(VENTANAS)}")
+
+
+def top(dimension, n=LIMITE_POR_DEFECTO, ventana="total", metrica="monto", hoy=None):
+    """Las `n` claves con mayor `metrica` en la ventana: [{clave, etiqueta, monto, cantidad, ventas}].
+    El orden y el límite se resuelven en SQL; en dia/mes/total, sobre ix_resumen_ventas_top_<metrica>."""
+    if dimension not in DIMENSIONES:
+        raise ValueError(f"dimension debe ser una de: {', '.join(DIMENSIONES)}")
+    if metrica not in METRICAS:
+        raise ValueError(f"metrica debe ser una de: {', '.join(METRICAS)}")
+    c = ResumenVenta.__table__.c
+    filtros = _filtro_ventana(ventana, hoy or series_tiempo.hoy_local(), c)
+
+    if ventana in VENTANAS_UN_PERIODO:
+        consulta = select(c.clave, c.etiqueta, c.monto, c.cantidad, c.ventas)
+        orden = c[metrica]
+    else:
+        # Varias filas por clave (días de la semana, meses del año): se suman antes de ordenar
+        sumas = {m: func.sum(c[m]) for m in METRICAS}
+        consulta = select(c.clave, func.max(c.etiqueta), sumas["monto"], sumas["cantidad"], sumas["ventas"]).group_by(c.clave)
+        orden = sumas[metrica]
+    filas = db.session.execute(
+        consulta.where(c.dimension == dimension, *filtros)
+        .order_by(orden.desc(), c.clave)
+        .limit(max(1, min(int(n), MAX_LIMITE)))
+    )
+    return [
+        {"clave": clave, "etiqueta": etiqueta, "monto": round(float(monto), 2),
+         "cantidad": int(cantidad), "ventas": int(ventas)}
+        for clave, etiqueta, monto, cantidad, ventas in filas
+    ]
+
+
+def totales(dimension, clave, hoy=None, meses=12):
+    """Acumulados de una clave: hoy, últimos 7 días, mes actual, total y los últimos `meses` meses."""
+    hoy = hoy or series_tiempo.hoy_local()
+    c = ResumenVenta.__table__.c
+    resultado = {}
+    for ventana in ("dia", "semana", "mes", "total"):
+        fila = db.session.execute(
+            select(func.sum(c.monto), func.sum(c.cantidad), func.sum(c.ventas))
+            .where(c.dimension == dimension, c.clave == str(clave), *_filtro_ventana(ventana, hoy, c))
+        ).one()
+        resultado[ventana] = {"monto": round(float(fila[0] or 0), 2), "cantidad": int(fila[1] or 0),
+                              "ventas": int(fila[2] or 0)}
+
+    filas = db.session.execute(
+        select(c.inicio, func.sum(c.monto), func.sum(c.cantidad), func.sum(c.ventas))
+        .where(c.dimension == dimension, c.clave == str(clave),
+               c.periodo == "mes", c.inicio.between(_primer_mes(hoy, meses), hoy))
+        .group_by(c.inicio)
+        .order_by(c.inicio)
+    )
+    resultado["meses"] = [
+        {"mes": inicio.strftime("%Y-%m"), "monto": round(float(monto), 2), "cantidad": cantidad, "ventas": ventas}
+        for inicio, monto, cantidad, ventas in filas
+    ]
+    return resultado
+
+
+def reconstruir(tamano_lote=TAMANO_LOTE):
+    """Recalcula resumen_ventas desde historial_ventas (carga inicial o tras importar datos).
+    Lee el historial por bloques con cursor de servidor; conviene ejecutarlo sin compras en curso."""
+    epoch = series_tiempo.expresion_epoch(HistorialVenta.fecha_venta, db.engine.dialect.name)
+    consulta = (
+        select(epoch, HistorialVenta.total_venta, HistorialVenta.cantidad,
+               HistorialVenta.producto_id, Producto.nombre, Producto.marca,
+               Producto.categoria_id, Categoria.nombre,
+               HistorialVenta.tipo_comprobante_id, TipoComprobante.nombre,
+               Producto.cliente_id, Usuario.nombre)
+        .select_from(HistorialVenta)
+        .outerjoin(Producto, HistorialVenta.producto_id == Producto.id)
+        .outerjoin(Categoria, Producto.categoria_id == Categoria.id)
+        .outerjoin(TipoComprobante, HistorialVenta.tipo_comprobante_id == TipoComprobante.id)
+        .outerjoin(Usuario, Producto.cliente_id == Usuario.id)
+        .where(HistorialVenta.fecha_venta.is_not(None))
+    )
+
+    acumulador = _Acumulador()
+    resultado = db.session.execute(consulta, execution_options={"yield_per": tamano_lote})
+    for bloque in resultado.partitions():
+        epochs = np.fromiter((f[0] for f in bloque), dtype=np.int64, count=len(bloque))
+        dias = np.floor_divide(series_tiempo.a_local(epochs), 86400)
+        for dia, fila in zip(dias.tolist(), bloque):
+            acumulador.sumar(INICIO_TOTAL + timedelta(days=dia), _claves(*fila[3:]), float(fila[1]), fila[2])
+
+    parametros = acumulador.parametros()
+    db.session.execute(delete(ResumenVenta))
+    # Las ventas pendientes ya están incluidas en el recálculo
+    db.session.execute(delete(ResumenVentaPendiente))
+    for i in range(0, len(parametros), tamano_lote):
+        db.session.execute(insert(ResumenVenta.__table__), parametros[i:i + tamano_lote])
+    db.session.commit()
+    logger.info(f"[ranking] resumen_ventas reconstruido: {len(parametros)} filas")
+    return len(parametros)
@@ -0,0 +1,158 @@
+# Réplicas de lectura opcionales. Con SQLALCHEMY_REPLICAS (URLs separadas por comas) se crea un
+# motor por réplica ("replica_N"), fuera de los binds de Flask-SQLAlchemy para que create_all no
+# intente crear tablas en ellas, y las consultas SELECT de las peticiones
+# GET de los blueprints de solo lectura (historial, dashboard, catálogo, categorías, analítica)
+# se envían a una réplica. Todo lo demás va al primario: escrituras, flush, SELECT ... FOR UPDATE,
+# CLI y tareas en segundo plano.
+# Una réplica se descarta mientras su retraso supere REPLICA_MAX_RETRASO segundos o no responda
+# (se comprueba como mucho cada REPLICA_INTERVALO_CHEQUEO segundos); sin réplicas sanas se lee
+# del primario. Tras escribir, el mismo cliente lee del primario durante REPLICA_MAX_RETRASO
+# segundos para ver sus propios cambios.
+import itertools
+import logging
+import math
+import os
+import threading
+import time
+
+from flask import current_app, g, has_request_context, request, session
+from flask_sqlalchemy.session import Session
+from sqlalchemy import create_engine, inspect, text
+from sqlalchemy.sql import CompoundSelect, Select
+from sqlalchemy.sql.dml import UpdateBase
+
+logger = logging.getLogger("flask_backend")
+
+PREFIJO_BIND = "replica_"
+BLUEPRINTS_LECTURA = ("historial_ventas", "dashboard_ventas", "producto", "bp_categoria", "analitica")
+CLAVE_ESCRITURA = "_ultima_escritura"
+
+# En un standby de PostgreSQL: segundos desde la última transacción aplicada (0 si ya aplicó todo lo recibido)
+SQL_RETRASO_POSTGRES = text(
+    "SELECT CASE WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+    "ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()) END"
+)
+
+
+def binds_replicas(urls):
+    if isinstance(urls, str):
+        urls = [u.strip() for u in urls.split(",")]
+    return {f"{PREFIJO_BIND}{i}": url for i, url in enumerate((u for u in urls if u), start=1)}
+
+
+def medir_retraso(motor):
+    """Retraso de replicación en segundos (0 en motores sin replicación que consultar)."""
+    with motor.connect() as conexion:
+        if motor.dialect.name == "postgresql":
+            en_recuperacion = conexion.execute(text("SELECT pg_is_in_recovery()")).scalar()
+            return float(conexion.execute(SQL_RETRASO_POSTGRES).scalar() or 0) if en_recuperacion else 0.0
+        conexion.execute(text("SELECT 1"))
+        return 0.0
+
+
+class EnrutadorReplicas:
+    """Extensión que elige la réplica de cada petición de solo lectura."""
+
+    def __init__(self, app=None):
+        self._lock = threading.Lock()
+        self.claves = []
+        self.motores = {}
+        self.estado = {}  # clave -> (momento del chequeo, retraso)
+        self._turno = itertools.count()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault("SQLALCHEMY_REPLICAS", os.getenv("SQLALCHEMY_REPLICAS", ""))
+        app.config.setdefault("REPLICA_MAX_RETRASO", float(os.getenv("REPLICA_MAX_RETRASO", 5)))
+        app.config.setdefault("REPLICA_INTERVALO_CHEQUEO", float(os.getenv("REPLICA_INTERVALO_CHEQUEO", 5)))
+        app.config.setdefault("REPLICA_BLUEPRINTS", BLUEPRINTS_LECTURA)
+        app.extensions["replicas"] = self
+
+        binds = binds_replicas(app.config["SQLALCHEMY_REPLICAS"])
+        self.claves = list(binds)
+        self.motores = {clave: create_engine(url, pool_pre_ping=True) for clave, url in binds.items()}
+        if not binds:
+            return
+        app.before_request(self._marcar_lectura)
+        app.after_request(self._recordar_escritura)
+        logger.info(f"[replicas] {len(self.claves)} réplicas de lectura configuradas")
+
+    def _marcar_lectura(self):
+        g._solo_lectura = (
+            request.method in ("GET", "HEAD")
+            and request.blueprint in current_app.config["REPLICA_BLUEPRINTS"]
+            and not self._escritura_reciente()
+        )
+
+    def _escritura_reciente(self):
+        ultima = session.get(CLAVE_ESCRITURA)
+        return ultima is not None and time.time() - ultima < current_app.config["REPLICA_MAX_RETRASO"]
+
+    def _recordar_escritura(self, response):
+        if g.get("_escribio"):
+            session[CLAVE_ESCRITURA] = time.time()
+        return response
+
+    def retraso(self, clave, motor):
+        config = current_app.config
+        ahora = time.monotonic()
+        chequeo = self.estado.get(clave)
+        if chequeo is not None and ahora - chequeo[0] < config["REPLICA_INTERVALO_CHEQUEO"]:
+            return chequeo[1]
+        with self._lock:
+            chequeo = self.estado.get(clave)
+            if chequeo is not None and ahora - chequeo[0] < config["REPLICA_INTERVALO_CHEQUEO"]:
+                return chequeo[1]
+            try:
+                retraso = medir_retraso(motor)
+            except Exception as e:
+                logger.warning(f"[replicas] {clave} no responde: {e}")
+                retraso = math.inf
+            anterior = chequeo[1] if chequeo else 0.0
+            sana, estaba_sana = retraso <= config["REPLICA_MAX_RETRASO"], anterior <= config["REPLICA_MAX_RETRASO"]
+            if sana != estaba_sana:
+                logger.warning(f"[replicas] {clave} {'vuelve a usarse' if sana else 'descartada'} (retraso {retraso:.1f}s)")
+            self.estado[clave] = (ahora, retraso)
+            return retraso
+
+    def sanas(self):
+        maximo = current_app.config["REPLICA_MAX_RETRASO"]
+        return [c for c in self.claves if self.retraso(c, self.motores[c]) <= maximo]
+
+    # Réplica para la petición en curso (la misma durante toda la petición) o None para el primario
+    def elegir(self):
+        if not self.claves or not has_request_context() or not g.get("_solo_lectura"):
+            return None
+        if "_replica" not in g:
+            sanas = self.sanas()
+            g._replica = sanas[next(self._turno) % len(sanas)] if sanas else None
+        return self.motores[g._replica] if g._replica else None
+
+
+def _es_lectura(clausula):
+    if isinstance(clausula, (Select, CompoundSelect)):
+        return getattr(clausula, "_for_update_arg", None) is None
+    return False
+
+
+# Los modelos con __bind_key__ propio no se enrutan
+def _bind_por_defecto(mapper):
+    return mapper is None or inspect(mapper).local_table.metadata.info.get("bind_key") is None
+
+
+class SesionEnrutada(Session):
+    """Sesión de Flask-SQLAlchemy que envía los SELECT de las peticiones de solo lectura a una réplica."""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if self._flushing or isinstance(clause, UpdateBase):
+            self.info["escribio"] = True
+            if has_request_context():
+                g._escribio = True
+        elif bind is None and _es_lectura(clause) and not self.info.get("escribio") and _bind_por_defecto(mapper):
+            enrutador = current_app.extensions.get("replicas") if has_request_context() else None
+            if enrutador is not None:
+                motor = enrutador.elegir()
+                if motor is not None:
+                    return motor
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
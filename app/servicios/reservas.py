@@ -0,0 +1,533 @@
+# Reservas temporales de stock. Al añadir al carrito (web o API) se retienen unidades durante
+# RESERVA_TTL segundos y la compra confirma las reservas del cliente: el rechazo por falta de stock
+# ocurre al reservar, no en el commit de la compra. La compra no toca productos: lo vendido queda
+# como reservas confirmadas y el barrido en segundo plano lo resta del stock por lotes (un UPDATE
+# condicional por producto y lote, fuera de la transacción de compra), además de liberar las
+# vencidas. Lo que la compra toma sin reserva se comprueba también contra la tabla.
+# El disponible de cada producto (stock - reservas activas y confirmadas) se lleva en un contador
+# rápido: en la memoria del proceso, repartido en shards con su propio lock, o en Redis
+# (RESERVAS_REDIS_URL / ALMACEN_REDIS_URL) si hay varios workers. La tabla reservas_stock es el
+# registro durable: el contador se inicializa desde ella cuando falta y solo se ajusta cuando el
+# cambio ya se guardó. Los contadores en memoria se vuelven a leer de la tabla en cada barrido,
+# para corregir lo que otros procesos (otro worker, `flask liberar-reservas`) cambiaron, salvo los
+# productos con una operación de este proceso en curso (retener/soltar): su ajuste aún no está en
+# la tabla o todavía no se aplicó al contador.
+# Sin init_app las reservas están desactivadas y la compra descuenta el stock justo antes del commit.
+import logging
+import os
+import threading
+from collections import Counter, defaultdict
+from datetime import datetime, timedelta
+
+from flask import current_app, has_app_context
+from sqlalchemy import func, select, update
+
+from app.extensions import db
+from app.models.producto import Producto
+from app.models.reserva_stock import ACTIVA, APLICADA, CONFIRMADA, LIBERADA, VENCIDA, ReservaStock
+from app.servicios.inventario import descontar_stock
+from app.servicios.metricas import CONFLICTOS_STOCK, RESERVAS_TOTAL
+from app.servicios.tareas import TareaPeriodica
+
+logger = logging.getLogger("flask_backend")
+
+LOTE_BARRIDO = 1000
+
+
+class _Shard:
+    __slots__ = ("valores", "en_vuelo", "generaciones", "lock")
+
+    def __init__(self):
+        self.valores = {}
+        self.en_vuelo = Counter()  # operaciones en curso por producto (entre retener y soltar)
+        self.generaciones = {}     # cambia con cada operación o invalidación del producto
+        self.lock = threading.Lock()
+
+
+class ContadoresMemoria:
+    """Disponible por producto en el proceso. Cada shard tiene su diccionario y su lock, así que
+    las reservas de productos distintos no compiten entre sí."""
+
+    def __init__(self, shards=64):
+        self._shards = [_Shard() for _ in range(shards)]
+
+    def _shard(self, producto_id):
+        return self._shards[producto_id % len(self._shards)]
+
+    # True si había disponible y se descontó, False si no alcanza, None si el producto no está cargado
+    def tomar(self, producto_id, cantidad):
+        shard = self._shard(producto_id)
+        with shard.lock:
+            disponible = shard.valores.get(producto_id)
+            if disponible is None:
+                return None
+            if disponible < cantidad:
+                return False
+            shard.valores[producto_id] = disponible - cantidad
+            return True
+
+    # Sin el producto cargado no hay nada que ajustar: se leerá de la BD al volver a usarlo
+    def devolver(self, producto_id, cantidad):
+        shard = self._shard(producto_id)
+        with shard.lock:
+            if producto_id in shard.valores:
+                shard.valores[producto_id] += cantidad
+
+    def inicializar(self, producto_id, disponible):
+        shard = self._shard(producto_id)
+        with shard.lock:
+            shard.valores.setdefault(producto_id, disponible)
+
+    def invalidar(self, producto_id):
+        shard = self._shard(producto_id)
+        with shard.lock:
+            shard.valores.pop(producto_id, None)
+            shard.generaciones[producto_id] = shard.generaciones.get(producto_id, 0) + 1
+
+    # Marca una operación sobre el producto: desde antes de cambiar la tabla hasta ajustar el contador
+    def retener(self, producto_id):
+        shard = self._shard(producto_id)
+        with shard.lock:
+            shard.en_vuelo[producto_id] += 1
+            shard.generaciones[producto_id] = shard.generaciones.get(producto_id, 0) + 1
+
+    def soltar(self, producto_id):
+        shard = self._shard(producto_id)
+        with shard.lock:
+            shard.en_vuelo[producto_id] -= 1
+            if shard.en_vuelo[producto_id] <= 0:
+                del shard.en_vuelo[producto_id]
+
+    def disponible(self, producto_id):
+        return self._shard(producto_id).valores.get(producto_id)
+
+    def limpiar(self):
+        for shard in self._shards:
+            with shard.lock:
+                shard.valores.clear()
+
+    def resincronizar(self, leer):
+        """Vuelve a leer con `leer(ids) -> {id: disponible}` los productos cargados sin operaciones en
+        curso. Solo se escribe el valor leído si el producto siguió sin operaciones (misma generación)
+        mientras se leía; si no, se corrige en el siguiente barrido."""
+        candidatos = {}
+        for shard in self._shards:
+            with shard.lock:
+                for producto_id in shard.valores:
+                    if producto_id not in shard.en_vuelo:
+                        candidatos[producto_id] = shard.generaciones.get(producto_id, 0)
+        if not candidatos:
+            return 0
+        leidos = leer(list(candidatos))
+        corregidos = 0
+        for producto_id, generacion in candidatos.items():
+            shard = self._shard(producto_id)
+            with shard.lock:
+                if (producto_id in shard.en_vuelo or producto_id not in shard.valores
+                        or shard.generaciones.get(producto_id, 0) != generacion):
+                    continue
+                if producto_id in leidos:
+                    shard.valores[producto_id] = leidos[producto_id]
+                else:
+                    shard.valores.pop(producto_id)  # producto borrado
+                corregidos += 1
+        return corregidos
+
+
+# Misma lógica que ContadoresMemoria ejecutada atómicamente en Redis
+_SCRIPT_TOMAR = """
+local disponible = redis.call('GET', KEYS[1])
+if not disponible then return -1 end
+if tonumber(disponible) < tonumber(ARGV[1]) then return 0 end
+redis.call('DECRBY', KEYS[1], ARGV[1])
+return 1
+"""
+
+_SCRIPT_DEVOLVER = """
+if redis.call('EXISTS', KEYS[1]) == 1 then
+  redis.call('INCRBY', KEYS[1], ARGV[1])
+end
+return 1
+"""
+
+
+class ContadoresRedis:
+    def __init__(self, url, prefijo="disponible"):
+        import redis  # dependencia opcional
+
+        self.cliente = redis.Redis.from_url(url)
+        self.prefijo = prefijo
+        self._tomar = self.cliente.register_script(_SCRIPT_TOMAR)
+        self._devolver = self.cliente.register_script(_SCRIPT_DEVOLVER)
+
+    def _clave(self, producto_id):
+        return f"{self.prefijo}:{producto_id}"
+
+    def tomar(self, producto_id, cantidad):
+        resultado = int(self._tomar(keys=[self._clave(producto_id)], args=[cantidad]))
+        return None if resultado < 0 else bool(resultado)
+
+    def devolver(self, producto_id, cantidad):
+        self._devolver(keys=[self._clave(producto_id)], args=[cantidad])
+
+    def inicializar(self, producto_id, disponible):
+        self.cliente.set(self._clave(producto_id), disponible, nx=True)
+
+    def invalidar(self, producto_id):
+        self.cliente.delete(self._clave(producto_id))
+
+    def disponible(self, producto_id):
+        valor = self.cliente.get(self._clave(producto_id))
+        return None if valor is None else int(valor)
+
+    def limpiar(self):
+        for clave in self.cliente.scan_iter(f"{self.prefijo}:*"):
+            self.cliente.delete(clave)
+
+    # Compartido por todos los procesos: no se desvía ni hay que proteger operaciones en curso
+    def retener(self, producto_id):
+        pass
+
+    def soltar(self, producto_id):
+        pass
+
+    def resincronizar(self, leer):
+        return 0
+
+
+def crear_contadores(shards=64):
+    url = os.getenv("RESERVAS_REDIS_URL") or os.getenv("ALMACEN_REDIS_URL")
+    if url:
+        try:
+            return ContadoresRedis(url)
+        except ImportError:
+            logger.warning("Redis configurado para las reservas pero el paquete redis no está instalado; se usa memoria")
+    return ContadoresMemoria(shards)
+
+
+class GestorReservas:
+    """Contadores de disponible de una app y el hilo que aplica las confirmadas y libera las vencidas."""
+
+    def __init__(self, contadores):
+        self.contadores = contadores
+        self._barrido = None
+
+    def iniciar_barrido(self, app):
+        if self._barrido is None:
+            self._barrido = TareaPeriodica("barrido-reservas", self.barrer, app.config["RESERVA_INTERVALO_BARRIDO"])
+        self._barrido.iniciar(app)
+
+    def barrer(self):
+        aplicar_confirmadas()
+        liberar_vencidas()
+        self.contadores.resincronizar(_disponibles_en_bd)
+
+
+# Activa las reservas en la app. El barrido no arranca aquí: lo inicia iniciar_barrido()
+def init_app(app):
+    app.config.setdefault("RESERVA_TTL", int(os.getenv("RESERVA_TTL", 900)))
+    app.config.setdefault("RESERVA_INTERVALO_BARRIDO", float(os.getenv("RESERVA_INTERVALO_BARRIDO", 10)))
+    app.config.setdefault("RESERVA_SHARDS", int(os.getenv("RESERVA_SHARDS", 64)))
+    app.config.setdefault("RESERVA_BARRIDO_ACTIVO", not app.testing)
+    gestor = GestorReservas(crear_contadores(app.config["RESERVA_SHARDS"]))
+    app.extensions["reservas"] = gestor
+    return gestor
+
+
+# Inicia el hilo de barrido del proceso que sirve peticiones; no en TESTING salvo con RESERVA_BARRIDO_ACTIVO
+def iniciar_barrido(app):
+    gestor = app.extensions.get("reservas")
+    if gestor is not None and app.config["RESERVA_BARRIDO_ACTIVO"]:
+        gestor.iniciar_barrido(app)
+
+
+def _gestor():
+    return current_app.extensions.get("reservas") if has_app_context() else None
+
+
+# Stock menos reservas activas y confirmadas (vendidas sin restar aún) según lo ya guardado: se lee
+# en una conexión aparte para no contar los cambios aún sin commit de la transacción en curso
+def _disponible_en_bd(producto_id):
+    reservado = (
+        select(func.coalesce(func.sum(ReservaStock.cantidad), 0))
+        .where(ReservaStock.producto_id == producto_id, ReservaStock.estado.in_((ACTIVA, CONFIRMADA)))
+        .scalar_subquery()
+    )
+    with db.engine.connect() as conexion:
+        disponible = conexion.execute(select(Producto.stock - reservado).where(Producto.id == producto_id)).scalar()
+    return disponible if disponible is not None else 0
+
+
+# Lo mismo para varios productos a la vez (resincronización del barrido): {producto_id: disponible}
+def _disponibles_en_bd(producto_ids, tamano_lote=LOTE_BARRIDO):
+    disponibles = {}
+    with db.engine.connect() as conexion:
+        for i in range(0, len(producto_ids), tamano_lote):
+            lote = producto_ids[i:i + tamano_lote]
+            reservado = (
+                select(ReservaStock.producto_id, func.sum(ReservaStock.cantidad).label("cantidad"))
+                .where(ReservaStock.producto_id.in_(lote), ReservaStock.estado.in_((ACTIVA, CONFIRMADA)))
+                .group_by(ReservaStock.producto_id)
+                .subquery()
+            )
+            filas = conexion.execute(
+                select(Producto.id, Producto.stock - func.coalesce(reservado.c.cantidad, 0))
+                .outerjoin(reservado, reservado.c.producto_id == Producto.id)
+                .where(Producto.id.in_(lote))
+            )
+            disponibles.update({producto_id: int(disponible) for producto_id, disponible in filas})
+    return disponibles
+
+
+def _tomar(contadores, producto_id, cantidad):
+    resultado = contadores.tomar(producto_id, cantidad)
+    if resultado is None:
+        contadores.inicializar(producto_id, _disponible_en_bd(producto_id))
+        resultado = contadores.tomar(producto_id, cantidad)
+    return bool(resultado)
+
+
+def _activas(cliente_id, producto_id):
+    return db.session.execute(
+        select(ReservaStock.id, ReservaStock.cantidad)
+        .where(ReservaStock.cliente_id == cliente_id, ReservaStock.producto_id == producto_id,
+               ReservaStock.estado == ACTIVA)
+    ).all()
+
+
+# Cambia el estado solo si sigue en `desde`: la compra y el barrido no pueden cerrar la misma dos veces
+def _cerrar(reserva_id, estado, desde=ACTIVA, **valores):
+    resultado = db.session.execute(
+        update(ReservaStock)
+        .where(ReservaStock.id == reserva_id, ReservaStock.estado == desde)
+        .values(estado=estado, **valores)
+        .execution_options(synchronize_session=False)
+    )
+    return resultado.rowcount == 1
+
+
+def reservar(cliente_id, producto_id, cantidad, ttl=None):
+    """Deja reservadas `cantidad` unidades del producto para el cliente (0 libera su reserva) y
+    renueva el vencimiento. Devuelve False, sin tocar la reserva anterior, si no hay disponible.
+    Hace commit."""
+    gestor = _gestor()
+    if gestor is None:
+        return True
+
+    gestor.contadores.retener(producto_id)
+    try:
+        liberada = sum(c for id, c in _activas(cliente_id, producto_id) if _cerrar(id, LIBERADA))
+        faltante = cantidad - liberada
+        if faltante > 0 and not _tomar(gestor.contadores, producto_id, faltante):
+            db.session.rollback()
+            RESERVAS_TOTAL.inc(resultado="rechazada")
+            return False
+        if cantidad > 0:
+            ttl = ttl or current_app.config["RESERVA_TTL"]
+            db.session.add(ReservaStock(cliente_id=cliente_id, producto_id=producto_id, cantidad=cantidad,
+                                        expira=datetime.utcnow() + timedelta(seconds=ttl)))
+        try:
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            if faltante > 0:
+                gestor.contadores.devolver(producto_id, faltante)
+            raise
+        if faltante < 0:
+            gestor.contadores.devolver(producto_id, -faltante)
+    finally:
+        gestor.contadores.soltar(producto_id)
+    if cantidad > 0 or liberada:
+        RESERVAS_TOTAL.inc(resultado="creada" if cantidad > 0 else "liberada")
+    return True
+
+
+def reservadas(cliente_id):
+    filas = db.session.execute(
+        select(ReservaStock.producto_id, func.sum(ReservaStock.cantidad))
+        .where(ReservaStock.cliente_id == cliente_id, ReservaStock.estado == ACTIVA)
+        .group_by(ReservaStock.producto_id)
+    )
+    return {producto_id: int(cantidad) for producto_id, cantidad in filas}
+
+
+def liberar_vencidas(ahora=None, tamano_lote=LOTE_BARRIDO):
+    """Marca como vencidas las reservas activas cuyo plazo pasó y devuelve sus unidades al
+    disponible, por lotes con un commit cada uno. Devuelve cuántas liberó."""
+    ahora = ahora or datetime.utcnow()
+    gestor = _gestor()
+    total = 0
+    while True:
+        filas = db.session.execute(
+            select(ReservaStock.id, ReservaStock.producto_id, ReservaStock.cantidad)
+            .where(ReservaStock.estado == ACTIVA, ReservaStock.expira <= ahora)
+            .order_by(ReservaStock.expira)
+            .limit(tamano_lote)
+        ).all()
+        if not filas:
+            break
+        productos = sorted({producto_id for _, producto_id, _ in filas}) if gestor is not None else []
+        for producto_id in productos:
+            gestor.contadores.retener(producto_id)
+        try:
+            devueltas = Counter()
+            for id, producto_id, cantidad in filas:
+                if _cerrar(id, VENCIDA):
+                    devueltas[producto_id] += cantidad
+                    total += 1
+            db.session.commit()
+            if gestor is not None:
+                for producto_id, cantidad in devueltas.items():
+                    gestor.contadores.devolver(producto_id, cantidad)
+        finally:
+            for producto_id in productos:
+                gestor.contadores.soltar(producto_id)
+        if len(filas) < tamano_lote:
+            break
+    if total:
+        RESERVAS_TOTAL.inc(total, resultado="vencida")
+        logger.info(f"[reservas] {total} reservas vencidas liberadas")
+    return total
+
+
+def aplicar_confirmadas(tamano_lote=LOTE_BARRIDO, cliente_id=None):
+    """Resta del stock las unidades de las reservas confirmadas (compras ya guardadas) y las marca
+    como aplicadas, por lotes con un commit cada uno: un UPDATE de productos por producto y lote,
+    condicionado a que el stock alcance. Si no alcanza (sobreventa: otro proceso con contadores en
+    memoria, o el vendedor bajó el stock) las reservas del producto quedan confirmadas, siguen
+    restando del disponible y se reintentan en el siguiente barrido. Devuelve cuántas aplicó."""
+    total = 0
+    ultimo_id = 0
+    while True:
+        consulta = (
+            select(ReservaStock.id, ReservaStock.producto_id, ReservaStock.cantidad)
+            .where(ReservaStock.estado == CONFIRMADA, ReservaStock.id > ultimo_id)
+            .order_by(ReservaStock.id)
+            .limit(tamano_lote)
+        )
+        if cliente_id is not None:
+            consulta = consulta.where(ReservaStock.cliente_id == cliente_id)
+        filas = db.session.execute(consulta).all()
+        if not filas:
+            break
+        ultimo_id = filas[-1][0]
+        por_producto = defaultdict(list)
+        for id, producto_id, cantidad in filas:
+            por_producto[producto_id].append((id, cantidad))
+
+        sin_stock = []
+        # En orden de id, como la compra, para que dos barridos no se bloqueen en cruz
+        for producto_id in sorted(por_producto):
+            cerradas = [(id, c) for id, c in por_producto[producto_id] if _cerrar(id, APLICADA, desde=CONFIRMADA)]
+            vendidas = sum(c for _, c in cerradas)
+            if not vendidas:
+                continue
+            resultado = db.session.execute(
+                update(Producto).where(Producto.id == producto_id, Producto.stock >= vendidas)
+                .values(stock=Producto.stock - vendidas, version=Producto.version + 1)
+                .execution_options(synchronize_session=False)
+            )
+            if resultado.rowcount == 1:
+                total += len(cerradas)
+                continue
+            for id, _ in cerradas:
+                _cerrar(id, CONFIRMADA, desde=APLICADA)
+            sin_stock.append((producto_id, vendidas))
+        db.session.commit()
+
+        for producto_id, vendidas in sin_stock:
+            CONFLICTOS_STOCK.inc(motivo="sobreventa")
+            logger.error(f"[reservas] Stock insuficiente para aplicar {vendidas} unidades vendidas del producto "
+                         f"{producto_id}: las reservas quedan confirmadas hasta corregir el stock")
+            invalidar(producto_id)
+        if len(filas) < tamano_lote:
+            break
+    return total
+
+
+# El stock cambió fuera de las reservas (edición del vendedor, purga): se vuelve a leer de la BD
+def invalidar(producto_id):
+    gestor = _gestor()
+    if gestor is not None:
+        gestor.contadores.invalidar(producto_id)
+
+
+class Consumo:
+    """Descuento de stock de una compra: primero con las reservas del cliente y lo que falte con el
+    disponible (contador y tabla), todo como reservas confirmadas que el barrido restará del stock. Los ajustes del
+    contador se aplican con completar() tras el commit o se revierten con deshacer() tras el
+    rollback. Sin reservas activadas, aplicar() descuenta el stock justo antes del commit."""
+
+    def __init__(self, cliente_id):
+        self.cliente_id = cliente_id
+        self.gestor = _gestor()
+        self._tomadas = Counter()    # unidades sin reserva tomadas del disponible
+        self._sobrantes = Counter()  # unidades reservadas de más que vuelven al disponible
+        self._confirmadas = 0
+        self._sin_reservas = Counter()  # unidades a descontar en aplicar() (sin reservas activadas)
+        self._retenidos = set()  # productos con la operación en curso hasta completar()/deshacer()
+
+    def descontar(self, producto_id, cantidad, compra_id=None):
+        if self.gestor is None:
+            self._sin_reservas[producto_id] += cantidad
+            return True
+
+        if producto_id not in self._retenidos:
+            self.gestor.contadores.retener(producto_id)
+            self._retenidos.add(producto_id)
+        restante = cantidad
+        for id, reserva in _activas(self.cliente_id, producto_id):
+            usada = min(reserva, restante)
+            if usada:
+                cerrada = _cerrar(id, CONFIRMADA, compra_id=compra_id, cantidad=usada)
+            else:
+                cerrada = _cerrar(id, LIBERADA)
+            if cerrada:
+                restante -= usada
+                self._sobrantes[producto_id] += reserva - usada
+                self._confirmadas += bool(usada)
+        if restante > 0:
+            if not _tomar(self.gestor.contadores, producto_id, restante):
+                return False
+            # Red de seguridad: el contador puede ir por delante de la tabla (otro proceso con
+            # contadores en memoria); lo guardado también tiene que alcanzar
+            if _disponible_en_bd(producto_id) < restante:
+                self.gestor.contadores.invalidar(producto_id)
+                return False
+            self._tomadas[producto_id] += restante
+            db.session.add(ReservaStock(cliente_id=self.cliente_id, producto_id=producto_id, cantidad=restante,
+                                        estado=CONFIRMADA, expira=datetime.utcnow(), compra_id=compra_id))
+        return True
+
+    # Último paso antes del commit: con las líneas ya escritas, el UPDATE de cada producto retiene
+    # su fila el menor tiempo posible. Devuelve el producto sin stock suficiente o None.
+    def aplicar(self):
+        for producto_id in sorted(self._sin_reservas):
+            if not descontar_stock(producto_id, self._sin_reservas[producto_id]):
+                return producto_id
+        return None
+
+    def completar(self):
+        if self.gestor is None:
+            return
+        try:
+            for producto_id, cantidad in self._sobrantes.items():
+                self.gestor.contadores.devolver(producto_id, cantidad)
+        finally:
+            self._soltar()
+        if self._confirmadas:
+            RESERVAS_TOTAL.inc(self._confirmadas, resultado="confirmada")
+
+    def deshacer(self):
+        if self.gestor is None:
+            return
+        try:
+            for producto_id, cantidad in self._tomadas.items():
+                self.gestor.contadores.devolver(producto_id, cantidad)
+        finally:
+            self._soltar()
+
+    def _soltar(self):
+        for producto_id in self._retenidos:
+            self.gestor.contadores.soltar(producto_id)
+        self._retenidos.clear()
@@ -0,0 +1,187 @@
+# Agrupación de series de ventas en hora/día/semana ISO/mes de la zona local, sobre arreglos
+# NumPy de segundos epoch UTC. El desplazamiento de la zona se toma de la tabla de
+# transiciones de pytz (searchsorted), así que es correcto también con horario de verano.
+# Las fechas sin zona de la BD se interpretan como UTC.
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
+
+import numpy as np
+import pytz
+from sqlalchemy import BigInteger, cast, func
+
+ZONA_LOCAL = pytz.timezone("America/Lima")
+GRANULARIDADES = ("hora", "dia", "semana", "mes")
+DIAS_SEMANA = ["Lunes", "Martes", "Miércoles", "Jueves", "Viernes", "Sábado", "Domingo"]
+
+_EPOCH = datetime(1970, 1, 1)
+_DIA = 86400
+# Por encima de este número de cubetas posibles se agrupa ordenando (np.unique)
+MAX_CUBETAS_DENSAS = 10_000_000
+
+
+def a_epoch(fecha):
+    """Segundos epoch UTC de un datetime (sin zona = UTC)."""
+    if fecha.tzinfo is not None:
+        fecha = fecha.astimezone(timezone.utc).replace(tzinfo=None)
+    return int((fecha - _EPOCH).total_seconds())
+
+
+def desde_epoch(segundos):
+    """datetime UTC sin zona, como se guarda en la BD."""
+    return _EPOCH + timedelta(seconds=int(segundos))
+
+
+def arreglo_epoch(fechas):
+    """Convierte una secuencia de datetimes (o datetime64) a un arreglo int64 de segundos UTC."""
+    if isinstance(fechas, np.ndarray) and np.issubdtype(fechas.dtype, np.datetime64):
+        return fechas.astype("datetime64[s]").astype(np.int64)
+    return np.fromiter((a_epoch(f) for f in fechas), dtype=np.int64, count=len(fechas))
+
+
+# Expresión SQL que devuelve la fecha como segundos epoch, para leer la columna ya convertida
+def expresion_epoch(columna, dialecto):
+    if dialecto == "postgresql":
+        return cast(func.extract("epoch", columna), BigInteger)
+    if dialecto == "sqlite":
+        return cast(func.strftime("%s", columna), BigInteger)
+    return cast(func.unix_timestamp(columna), BigInteger)
+
+
+@lru_cache(maxsize=16)
+def _transiciones(zona):
+    instantes = getattr(zona, "_utc_transition_times", None)
+    if not instantes:
+        desplazamiento = int(zona.utcoffset(datetime(2000, 1, 1)).total_seconds())
+        return np.array([np.iinfo(np.int64).min], dtype=np.int64), np.array([desplazamiento], dtype=np.int64)
+    inicios = np.array([a_epoch(t) for t in instantes], dtype=np.int64)
+    inicios[0] = np.iinfo(np.int64).min
+    desplazamientos = np.array([int(info[0].total_seconds()) for info in zona._transition_info], dtype=np.int64)
+    return inicios, desplazamientos
+
+
+def desplazamientos(epochs, zona=ZONA_LOCAL):
+    """Desplazamiento UTC (segundos) vigente en cada instante."""
+    inicios, valores = _transiciones(zona)
+    if len(valores) == 1:
+        return np.full(len(epochs), valores[0], dtype=np.int64)
+    return valores[np.searchsorted(inicios, epochs, side="right") - 1]
+
+
+def a_local(epochs, zona=ZONA_LOCAL):
+    """Segundos "de pared" locales (epoch desplazado), aptos para truncar por día/hora."""
+    epochs = np.asarray(epochs, dtype=np.int64)
+    return epochs + desplazamientos(epochs, zona)
+
+
+# Número de cubeta de cada instante local (horas, días, semanas o meses desde 1970)
+def numero_cubeta(locales, granularidad):
+    if granularidad == "hora":
+        return np.floor_divide(locales, 3600)
+    if granularidad == "dia":
+        return np.floor_divide(locales, _DIA)
+    if granularidad == "semana":
+        # El 1970-01-01 fue jueves: se cuentan semanas desde el lunes 1969-12-29
+        return np.floor_divide(np.floor_divide(locales, _DIA) + 3, 7)
+    if granularidad == "mes":
+        return locales.astype("datetime64[s]").astype("datetime64[M]").astype(np.int64)
+    raise ValueError(f"Granularidad inválida: {granularidad}")
+
+
+def inicio_cubeta(cubetas, granularidad):
+    if granularidad == "hora":
+        return (cubetas * 3600).astype("datetime64[s]")
+    if granularidad == "dia":
+        return (cubetas * _DIA).astype("datetime64[s]")
+    if granularidad == "semana":
+        return ((cubetas * 7 - 3) * _DIA).astype("datetime64[s]")
+    return cubetas.astype("datetime64[M]").astype("datetime64[s]")
+
+
+def agrupar(epochs, valores, granularidad, zona=ZONA_LOCAL):
+    """Suma y cuenta `valores` por cubeta. Devuelve (inicios locales datetime64[s], sumas, conteos)
+    solo de las cubetas con datos, en orden cronológico."""
+    epochs = np.asarray(epochs, dtype=np.int64)
+    cubetas = numero_cubeta(a_local(epochs, zona), granularidad)
+    if not len(cubetas):
+        return np.array([], dtype="datetime64[s]"), np.array([], dtype=float), np.array([], dtype=np.int64)
+
+    valores = np.asarray(valores, dtype=float)
+    primera = cubetas.min()
+    if cubetas.max() - primera <= MAX_CUBETAS_DENSAS:
+        # Rango acotado: bincount directo, sin ordenar
+        posiciones = cubetas - primera
+        conteos = np.bincount(posiciones)
+        sumas = np.bincount(posiciones, weights=valores, minlength=len(conteos))
+        con_datos = np.flatnonzero(conteos)
+        claves, sumas, conteos = con_datos + primera, sumas[con_datos], conteos[con_datos]
+    else:
+        claves, indices = np.unique(cubetas, return_inverse=True)
+        sumas = np.bincount(indices, weights=valores, minlength=len(claves))
+        conteos = np.bincount(indices, minlength=len(claves))
+    return inicio_cubeta(claves, granularidad), sumas, conteos
+
+
+def etiqueta(inicio, granularidad):
+    """Texto de una cubeta a partir de su inicio local (datetime64 o datetime)."""
+    fecha = inicio.astype(datetime) if isinstance(inicio, np.datetime64) else inicio
+    if granularidad == "hora":
+        return fecha.strftime("%Y-%m-%d %H:00")
+    if granularidad == "dia":
+        return fecha.strftime("%Y-%m-%d")
+    if granularidad == "semana":
+        anio, semana, _ = fecha.isocalendar()
+        return f"{anio}-W{semana:02d}"
+    return fecha.strftime("%Y-%m")
+
+
+# ---------------------- Vistas fijas del dashboard ----------------------
+
+def hoy_local(zona=ZONA_LOCAL, ahora=None):
+    ahora = ahora or datetime.now(timezone.utc)
+    return ahora.astimezone(zona).date()
+
+
+def limites_utc(desde_local, hasta_local, zona=ZONA_LOCAL):
+    """Rango [desde, hasta) de fechas locales como datetimes UTC sin zona, para filtrar en SQL."""
+    def convertir(fecha):
+        local = zona.localize(datetime(fecha.year, fecha.month, fecha.day))
+        return local.astimezone(timezone.utc).replace(tzinfo=None)
+    return convertir(desde_local), convertir(hasta_local)
+
+
+def ventana(agrupacion, hoy):
+    """Fechas locales [desde, hasta) que cubre cada vista del dashboard."""
+    if agrupacion == "dia":
+        return hoy, hoy + timedelta(days=1)
+    if agrupacion == "semana":
+        return hoy - timedelta(days=6), hoy + timedelta(days=1)
+    if agrupacion == "mes":
+        inicio = hoy.replace(day=1)
+        siguiente = (inicio + timedelta(days=32)).replace(day=1)
+        return inicio, siguiente
+    raise ValueError(f"Agrupación inválida: {agrupacion}")
+
+
+def serie_dashboard(epochs, valores, agrupacion, hoy, zona=ZONA_LOCAL):
+    """Etiquetas y montos de las vistas "hoy por hora", "últimos 7 días por día de la semana"
+    y "mes actual por semana" (Semana 5 para los días 29 a 31)."""
+    desde, hasta = ventana(agrupacion, hoy)
+    locales = a_local(epochs, zona)
+    valores = np.asarray(valores, dtype=float)
+    dias = np.floor_divide(locales, _DIA)
+    dentro = (dias >= (desde - _EPOCH.date()).days) & (dias < (hasta - _EPOCH.date()).days)
+    locales, dias, valores = locales[dentro], dias[dentro], valores[dentro]
+
+    if agrupacion == "dia":
+        etiquetas = [f"{hora:02d}:00" for hora in range(24)]
+        posiciones = np.floor_divide(np.mod(locales, _DIA), 3600)
+    elif agrupacion == "semana":
+        etiquetas = DIAS_SEMANA
+        posiciones = np.mod(dias + 3, 7)
+    else:
+        semanas = (hasta - desde).days // 7 + (1 if (hasta - desde).days % 7 else 0)
+        etiquetas = [f"Semana {i}" for i in range(1, semanas + 1)]
+        posiciones = (dias - (desde - _EPOCH.date()).days) // 7
+
+    montos = np.bincount(posiciones.astype(np.int64), weights=valores, minlength=len(etiquetas))
+    return etiquetas, [round(float(m), 2) for m in montos]
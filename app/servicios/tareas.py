@@ -0,0 +1,92 @@
+# Cola de tareas en segundo plano dentro del proceso web: hilos daemon que ejecutan trabajo
+# que no debe retrasar la respuesta (envío de correos, purgas...). Acotada para no crecer sin límite.
+import logging
+import queue
+import threading
+import time
+
+logger = logging.getLogger("flask_backend")
+
+
+class ColaTareas:
+    def __init__(self, nombre, workers=1, max_pendientes=1000):
+        self.nombre = nombre
+        self.workers = workers
+        self._cola = queue.Queue(maxsize=max_pendientes)
+        self._hilos = []
+        self._lock = threading.Lock()
+
+    def _iniciar(self):
+        with self._lock:
+            self._hilos = [h for h in self._hilos if h.is_alive()]
+            for i in range(len(self._hilos), self.workers):
+                hilo = threading.Thread(target=self._trabajar, name=f"{self.nombre}-{i}", daemon=True)
+                hilo.start()
+                self._hilos.append(hilo)
+
+    # Devuelve False si la cola está llena (la tarea no se encola)
+    def encolar(self, funcion, *args, **kwargs):
+        if len(self._hilos) < self.workers:
+            self._iniciar()
+        try:
+            self._cola.put_nowait((funcion, args, kwargs))
+            return True
+        except queue.Full:
+            logger.error(f"[{self.nombre}] Cola llena, se descarta {getattr(funcion, '__name__', funcion)}")
+            return False
+
+    def _trabajar(self):
+        while True:
+            funcion, args, kwargs = self._cola.get()
+            try:
+                funcion(*args, **kwargs)
+            except Exception as e:
+                logger.exception(f"[{self.nombre}] Error en tarea {getattr(funcion, '__name__', funcion)}: {e}")
+            finally:
+                self._cola.task_done()
+
+    @property
+    def pendientes(self):
+        return self._cola.unfinished_tasks
+
+    # Espera a que terminen las tareas encoladas (pruebas, comandos CLI); False si vence el plazo
+    def esperar(self, timeout=None):
+        limite = None if timeout is None else time.monotonic() + timeout
+        with self._cola.all_tasks_done:
+            while self._cola.unfinished_tasks:
+                restante = None if limite is None else limite - time.monotonic()
+                if restante is not None and restante <= 0:
+                    return False
+                self._cola.all_tasks_done.wait(restante)
+        return True
+
+
+class TareaPeriodica:
+    """Hilo daemon que ejecuta `funcion()` cada `intervalo` segundos dentro del contexto de la app."""
+
+    def __init__(self, nombre, funcion, intervalo):
+        self.nombre = nombre
+        self.funcion = funcion
+        self.intervalo = intervalo
+        self._hilo = None
+
+    def iniciar(self, app):
+        if self._hilo is not None and self._hilo.is_alive():
+            return
+        self._hilo = threading.Thread(target=self._ejecutar, args=(app,), name=self.nombre, daemon=True)
+        self._hilo.start()
+
+    def _ejecutar(self, app):
+        from app.extensions import db
+
+        while True:
+            time.sleep(self.intervalo)
+            with app.app_context():
+                try:
+                    self.funcion()
+                except Exception as e:
+                    db.session.rollback()
+                    logger.exception(f"[{self.nombre}] Error: {e}")
+
+
+tareas = ColaTareas("tareas", workers=2)
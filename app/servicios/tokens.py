@@ -0,0 +1,91 @@
+# Tokens JWT con la identidad embebida (rol, estado, nombre, email) para autorizar las APIs
+# sin leer la tabla usuarios. La revocación (logout, cambios de estado desde el admin) se
+# guarda en memoria del proceso y en el almacén compartido, con TTL hasta que el token expire.
+import time
+import uuid
+from functools import wraps
+
+from flask import jsonify
+from flask_jwt_extended import create_access_token, get_jwt, jwt_required
+
+from app.servicios.almacen import AlmacenMemoria, crear_almacen
+
+CLAIMS_USUARIO = ("rol", "estado", "nombre", "email")
+# Vigencia máxima de una revocación por usuario (cubre tokens de larga duración)
+TTL_REVOCACION_USUARIO = 7 * 24 * 3600
+
+_locales = AlmacenMemoria()
+_compartidos = crear_almacen("tokens_revocados")
+
+
+def crear_token(usuario):
+    claims = {campo: getattr(usuario, campo) for campo in CLAIMS_USUARIO}
+    # Generación de revocación vigente al emitir: el token solo es válido mientras no cambie
+    claims["rev"] = _obtener(f"usuario:{usuario.id}")
+    return create_access_token(identity=str(usuario.id), additional_claims=claims)
+
+
+# Sin Redis el almacén "compartido" es otra memoria del proceso: basta con la local
+def _hay_compartido():
+    return not isinstance(_compartidos, AlmacenMemoria)
+
+
+def _guardar(clave, valor, ttl):
+    _locales.guardar(clave, valor, ttl=ttl)
+    if _hay_compartido():
+        _compartidos.guardar(clave, valor, ttl=ttl)
+
+
+# El almacén compartido manda: otro proceso puede haber revocado después que este
+def _obtener(clave):
+    valor = _compartidos.obtener(clave) if _hay_compartido() else None
+    if valor is None:
+        valor = _locales.obtener(clave)
+    return valor
+
+
+# Revoca un token concreto hasta su expiración
+def revocar_token(payload):
+    ttl = max(payload.get("exp", time.time()) - time.time(), 1)
+    _guardar(f"jti:{payload['jti']}", 1, ttl)
+
+
+# Invalida todos los tokens del usuario emitidos hasta ahora (cambio de estado, edición, borrado).
+# Se guarda una generación nueva en vez de la hora: un token emitido en el mismo segundo,
+# después de revocar, ya lleva la generación nueva y sigue siendo válido.
+def revocar_tokens_usuario(user_id):
+    _guardar(f"usuario:{user_id}", uuid.uuid4().hex, TTL_REVOCACION_USUARIO)
+
+
+def token_revocado(_jwt_header, payload):
+    if _obtener(f"jti:{payload.get('jti')}") is not None:
+        return True
+    generacion = _obtener(f"usuario:{payload.get('sub')}")
+    return generacion is not None and payload.get("rev") != generacion
+
+
+def limpiar_revocaciones():
+    _locales.limpiar()
+    _compartidos.limpiar()
+
+
+# Registra la comprobación de revocación en un JWTManager
+def configurar_jwt(jwt):
+    jwt.token_in_blocklist_loader(token_revocado)
+    return jwt
+
+
+# jwt_required + autorización solo con los claims del token (sin consultar usuarios)
+def claims_requeridos(rol=None):
+    def decorador(func):
+        @wraps(func)
+        @jwt_required()
+        def wrapper(*args, **kwargs):
+            claims = get_jwt()
+            if claims.get("estado") != "activo":
+                return jsonify({"msg": "Usuario inactivo"}), 403
+            if rol and claims.get("rol") != rol:
+                return jsonify({"msg": "No autorizado para este recurso"}), 403
+            return func(*args, **kwargs)
+        return wrapper
+    return decorador
@@ -0,0 +1,113 @@
+# Verificación de ID tokens de Google con los certificados en caché (según su Cache-Control),
+# una sesión HTTP reutilizada y memoización de los tokens ya verificados hasta su expiración.
+import hashlib
+import logging
+import os
+import re
+import threading
+import time
+
+import requests
+from google.auth import jwt as google_jwt
+from requests.adapters import HTTPAdapter
+
+from app.servicios.almacen import AlmacenMemoria
+
+logger = logging.getLogger("flask_backend")
+
+CERTS_URL = "https://www.googleapis.com/oauth2/v1/certs"
+EMISORES = ("accounts.google.com", "https://accounts.google.com")
+# Sin Cache-Control se asume una hora (Google rota las claves con días de margen)
+MAX_AGE_POR_DEFECTO = 3600
+# Mínimo entre recargas forzadas por un `kid` desconocido (el `kid` lo elige quien envía el token)
+INTERVALO_RECARGA_FORZADA = 300
+
+
+def max_age(cache_control):
+    encontrado = re.search(r"max-age=(\d+)", cache_control or "")
+    return int(encontrado.group(1)) if encontrado else MAX_AGE_POR_DEFECTO
+
+
+class VerificadorGoogle:
+    def __init__(self, audiencia=None, certs_url=CERTS_URL, sesion=None, margen_reloj=10,
+                 intervalo_recarga=INTERVALO_RECARGA_FORZADA):
+        self.audiencia = audiencia
+        self.certs_url = certs_url
+        self.margen_reloj = margen_reloj
+        self.intervalo_recarga = intervalo_recarga
+        if sesion is None:
+            sesion = requests.Session()
+            sesion.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=4))
+        self.sesion = sesion
+        self._certs = None
+        self._certs_expiran = 0.0
+        self._ultima_recarga_forzada = None
+        self._lock = threading.Lock()
+        self.verificados = AlmacenMemoria(capacidad=5000)
+
+    def _descargar_certs(self):
+        response = self.sesion.get(self.certs_url, timeout=5)
+        response.raise_for_status()
+        self._certs = response.json()
+        self._certs_expiran = time.monotonic() + max_age(response.headers.get("Cache-Control"))
+
+    # Con forzar=True solo se descarga si pasó `intervalo_recarga` desde la última recarga forzada;
+    # devuelve None si no se permitió recargar
+    def certs(self, forzar=False):
+        with self._lock:
+            ahora = time.monotonic()
+            if forzar:
+                if (self._ultima_recarga_forzada is not None
+                        and ahora - self._ultima_recarga_forzada < self.intervalo_recarga):
+                    return None
+                self._ultima_recarga_forzada = ahora
+            if forzar or self._certs is None or ahora >= self._certs_expiran:
+                try:
+                    self._descargar_certs()
+                except (requests.RequestException, ValueError) as e:
+                    # Si Google no responde se siguen usando los certificados vencidos
+                    if self._certs is None:
+                        raise ValueError(f"No se pudieron obtener los certificados de Google: {e}")
+                    logger.warning(f"[google] Usando certificados en caché vencidos: {e}")
+            return self._certs
+
+    def _decodificar(self, token, certs):
+        return google_jwt.decode(token, certs=certs, audience=self.audiencia,
+                                 clock_skew_in_seconds=self.margen_reloj)
+
+    # Devuelve el payload del token o lanza ValueError si no es válido
+    def verificar(self, token):
+        clave = hashlib.sha256(token.encode()).hexdigest()
+        id_info = self.verificados.obtener(clave)
+        if id_info is not None:
+            return id_info
+
+        try:
+            id_info = self._decodificar(token, self.certs())
+        except ValueError:
+            # Puede ser una clave recién rotada que aún no teníamos: se recarga, como mucho una vez
+            # cada `intervalo_recarga` segundos; mientras tanto los kid desconocidos se rechazan sin red
+            if self._kid(token) in (self._certs or {}):
+                raise
+            certs = self.certs(forzar=True)
+            if certs is None:
+                raise ValueError("Token firmado con una clave desconocida")
+            id_info = self._decodificar(token, certs)
+
+        if id_info.get("iss") not in EMISORES:
+            raise ValueError(f"Emisor inválido: {id_info.get('iss')}")
+
+        restante = id_info.get("exp", 0) - time.time()
+        if restante > 0:
+            self.verificados.guardar(clave, id_info, ttl=restante)
+        return id_info
+
+    @staticmethod
+    def _kid(token):
+        try:
+            return google_jwt.decode_header(token).get("kid")
+        except ValueError:
+            return None
+
+
+verificador = VerificadorGoogle(audiencia=os.getenv("GOOGLE_OAUTH_CLIENT_ID") or None)
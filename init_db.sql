@@ -11,6 +11,15 @@ CREATE TABLE IF NOT EXISTS usuarios (
     rol            VARCHAR(20) NOT NULL DEFAULT 'cliente',
     estado         VARCHAR(20) NOT NULL DEFAULT 'activo'
 );
+-- Búsqueda por prefijo de nombre/email en el listado paginado del admin
+CREATE INDEX IF NOT EXISTS ix_usuarios_rol_nombre_lower ON usuarios (rol, lower(nombre) text_pattern_ops);
+CREATE INDEX IF NOT EXISTS ix_usuarios_rol_email_lower ON usuarios (rol, lower(email) text_pattern_ops);
+CREATE UNIQUE INDEX IF NOT EXISTS ix_usuarios_email_lower ON usuarios (lower(email));
+-- Orden del listado de clientes del admin (rol, clave de orden, id)
+CREATE INDEX IF NOT EXISTS ix_usuarios_rol_id_orden ON usuarios (rol, id);
+CREATE INDEX IF NOT EXISTS ix_usuarios_rol_nombre_orden ON usuarios (rol, lower(nombre), id);
+CREATE INDEX IF NOT EXISTS ix_usuarios_rol_email_orden ON usuarios (rol, lower(email), id);
+CREATE INDEX IF NOT EXISTS ix_usuarios_rol_estado_orden ON usuarios (rol, estado, id);
 
 -- Crear secuencia para tipos_comprobante.id
 CREATE SEQUENCE IF NOT EXISTS tipos_comprobante_id_seq;
@@ -43,8 +52,12 @@ CREATE TABLE IF NOT EXISTS productos (
     descripcion  TEXT,
     precio       NUMERIC(10,2) NOT NULL,
     stock        INT NOT NULL,
-    imagen_url   VARCHAR(255)
+    imagen_url   VARCHAR(255),
+    version      INT NOT NULL DEFAULT 1
 );
+-- Bases creadas antes del bloqueo optimista
+ALTER TABLE productos ADD COLUMN IF NOT EXISTS version INT NOT NULL DEFAULT 1;
+CREATE INDEX IF NOT EXISTS ix_productos_cliente_id ON productos (cliente_id);
 
 -- Crear secuencia para compras.id
 CREATE SEQUENCE IF NOT EXISTS compras_id_seq;
@@ -60,6 +73,7 @@ CREATE TABLE IF NOT EXISTS compras (
     total               NUMERIC(10,2) NOT NULL,
     email_destino       VARCHAR(120) NOT NULL
 );
+CREATE INDEX IF NOT EXISTS ix_compras_cliente_id ON compras (cliente_id);
 
 -- Crear secuencia para compra_producto.id
 CREATE SEQUENCE IF NOT EXISTS compra_producto_id_seq;
@@ -71,6 +85,8 @@ CREATE TABLE IF NOT EXISTS compra_producto (
     producto_id BIGINT NOT NULL REFERENCES productos(id) ON DELETE CASCADE,
     cantidad    INT NOT NULL
 );
+CREATE INDEX IF NOT EXISTS ix_compra_producto_compra_id ON compra_producto (compra_id);
+CREATE INDEX IF NOT EXISTS ix_compra_producto_producto_id ON compra_producto (producto_id);
 
 -- Crear secuencia para historial_ventas.id
 CREATE SEQUENCE IF NOT EXISTS historial_ventas_id_seq;
@@ -80,11 +96,101 @@ CREATE TABLE IF NOT EXISTS historial_ventas (
     id                  BIGINT PRIMARY KEY DEFAULT nextval('historial_ventas_id_seq'),
     cliente_id          BIGINT REFERENCES usuarios(id) ON DELETE SET NULL,
     producto_id         BIGINT REFERENCES productos(id) ON DELETE SET NULL,
+    vendedor_id         BIGINT REFERENCES usuarios(id) ON DELETE SET NULL,
     cantidad            INT NOT NULL,
     total_venta         NUMERIC(10,2) NOT NULL,
     tipo_comprobante_id BIGINT REFERENCES tipos_comprobante(id),
     fecha_venta         TIMESTAMP DEFAULT CURRENT_TIMESTAMP
 );
+-- Bases creadas antes de guardar el vendedor en cada venta
+ALTER TABLE historial_ventas ADD COLUMN IF NOT EXISTS vendedor_id BIGINT REFERENCES usuarios(id) ON DELETE SET NULL;
+UPDATE historial_ventas h SET vendedor_id = p.cliente_id
+FROM productos p
+WHERE h.producto_id = p.id AND h.vendedor_id IS NULL;
+CREATE INDEX IF NOT EXISTS ix_historial_ventas_fecha_venta ON historial_ventas (fecha_venta) INCLUDE (total_venta, cantidad);
+CREATE INDEX IF NOT EXISTS ix_historial_ventas_producto_fecha ON historial_ventas (producto_id, fecha_venta, id);
+CREATE INDEX IF NOT EXISTS ix_historial_ventas_cliente_id ON historial_ventas (cliente_id);
+CREATE INDEX IF NOT EXISTS ix_historial_ventas_vendedor_fecha ON historial_ventas (vendedor_id, fecha_venta, id);
+
+-- Comprobantes emitidos por los consumidores (reemplaza las listas en memoria)
+CREATE TABLE IF NOT EXISTS comprobantes_emitidos (
+    id               BIGSERIAL PRIMARY KEY,
+    compra_id        BIGINT,
+    tipo_comprobante VARCHAR(20) NOT NULL,
+    documento        VARCHAR(11),
+    email_destino    VARCHAR(120),
+    total            NUMERIC(10,2),
+    datos            TEXT,
+    fecha_emision    TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    CONSTRAINT uq_comprobantes_emitidos_compra_tipo UNIQUE (compra_id, tipo_comprobante)
+);
+CREATE INDEX IF NOT EXISTS ix_comprobantes_emitidos_compra_id ON comprobantes_emitidos (compra_id);
+-- Tablas creadas antes de la restricción única
+CREATE UNIQUE INDEX IF NOT EXISTS uq_comprobantes_emitidos_compra_tipo ON comprobantes_emitidos (compra_id, tipo_comprobante);
+
+-- Claves de idempotencia de los consumidores (compra_id por cola)
+CREATE TABLE IF NOT EXISTS mensajes_procesados (
+    id     BIGSERIAL PRIMARY KEY,
+    cola   VARCHAR(50) NOT NULL,
+    clave  VARCHAR(64) NOT NULL,
+    fecha  TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    CONSTRAINT uq_mensajes_procesados_cola_clave UNIQUE (cola, clave)
+);
+
+-- Acumulados de ventas por dimensión y periodo (rankings del dashboard)
+CREATE TABLE IF NOT EXISTS resumen_ventas (
+    id         BIGSERIAL PRIMARY KEY,
+    dimension  VARCHAR(20) NOT NULL,
+    clave      VARCHAR(120) NOT NULL,
+    etiqueta   VARCHAR(120) NOT NULL,
+    periodo    VARCHAR(10) NOT NULL,
+    inicio     DATE NOT NULL,
+    monto      DOUBLE PRECISION NOT NULL DEFAULT 0,
+    cantidad   INT NOT NULL DEFAULT 0,
+    ventas     INT NOT NULL DEFAULT 0,
+    CONSTRAINT uq_resumen_ventas_periodo_clave UNIQUE (dimension, periodo, inicio, clave)
+);
+-- Top-N por métrica de una ventana de un solo periodo (dia, mes, total) sin ordenar en memoria
+CREATE INDEX IF NOT EXISTS ix_resumen_ventas_top_monto ON resumen_ventas (dimension, periodo, inicio, monto DESC, clave);
+CREATE INDEX IF NOT EXISTS ix_resumen_ventas_top_cantidad ON resumen_ventas (dimension, periodo, inicio, cantidad DESC, clave);
+CREATE INDEX IF NOT EXISTS ix_resumen_ventas_top_ventas ON resumen_ventas (dimension, periodo, inicio, ventas DESC, clave);
+
+-- Líneas de venta recientes aún sin consolidar en resumen_ventas (solo INSERT en la compra)
+CREATE TABLE IF NOT EXISTS resumen_ventas_pendientes (
+    id                  BIGSERIAL PRIMARY KEY,
+    producto_id         BIGINT,
+    tipo_comprobante_id BIGINT,
+    dia                 DATE NOT NULL,
+    monto               DOUBLE PRECISION NOT NULL DEFAULT 0,
+    cantidad            INT NOT NULL DEFAULT 0
+);
+
+-- Reservas temporales de stock (carrito y checkout); el barrido libera las vencidas
+CREATE TABLE IF NOT EXISTS reservas_stock (
+    id          BIGSERIAL PRIMARY KEY,
+    producto_id BIGINT NOT NULL REFERENCES productos(id) ON DELETE CASCADE,
+    cliente_id  BIGINT NOT NULL REFERENCES usuarios(id) ON DELETE CASCADE,
+    cantidad    INT NOT NULL,
+    estado      VARCHAR(20) NOT NULL DEFAULT 'activa',
+    expira      TIMESTAMP NOT NULL,
+    creada      TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    compra_id   BIGINT REFERENCES compras(id) ON DELETE SET NULL
+);
+CREATE INDEX IF NOT EXISTS ix_reservas_stock_cliente_producto ON reservas_stock (cliente_id, producto_id, estado);
+CREATE INDEX IF NOT EXISTS ix_reservas_stock_producto_estado ON reservas_stock (producto_id, estado);
+CREATE INDEX IF NOT EXISTS ix_reservas_stock_estado_expira ON reservas_stock (estado, expira);
+
+-- Purgas en segundo plano aún sin terminar (se reanudan con `flask reanudar-purgas`)
+CREATE TABLE IF NOT EXISTS purgas_pendientes (
+    id          BIGSERIAL PRIMARY KEY,
+    tipo        VARCHAR(20) NOT NULL,
+    objetivo_id BIGINT NOT NULL,
+    creada      TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    reclamada   TIMESTAMP,
+    intentos    INT NOT NULL DEFAULT 0,
+    error       TEXT,
+    CONSTRAINT uq_purgas_pendientes_tipo_objetivo UNIQUE (tipo, objetivo_id)
+);
 
 -- Insertar usuarios si no existen
 INSERT INTO usuarios (id, google_id, nombre, email, rol, estado)
@@ -0,0 +1,116 @@
+# Ejecuta los benchmarks sin red ni servicios externos:
+#   python -m test.benchmark --escala 1k                      # mide y guarda en resultados/
+#   python -m test.benchmark --escala 100k --guardar-base     # fija la línea base de la escala
+#   python -m test.benchmark --escala 100k --comparar         # falla (código 1) si hay regresiones
+import argparse
+import logging
+import os
+import shutil
+import sys
+import time
+from datetime import datetime
+
+from app.extensions import db
+from test.benchmark import datos, nucleo
+from test.benchmark.escenarios import ESCENARIOS, compra_bp, crear_app, sin_red
+
+DIRECTORIO = os.path.dirname(os.path.abspath(__file__))
+
+
+def preparar_bd(escala, semilla, directorio):
+    os.makedirs(directorio, exist_ok=True)
+    original = datos.ruta_bd(directorio, escala, semilla)
+    if not os.path.exists(original):
+        print(f"Generando datos {escala} (semilla {semilla})...")
+        inicio = time.perf_counter()
+        app = crear_app(original + ".tmp")
+        with app.app_context():
+            db.create_all()
+            datos.poblar(escala, semilla)
+            db.engine.dispose()
+        os.replace(original + ".tmp", original)
+        print(f"  listo en {time.perf_counter() - inicio:.1f} s")
+
+    # Se trabaja sobre una copia: el checkout modifica stock y compras
+    copia = os.path.join(directorio, f"ejecucion_{escala}_{semilla}.db")
+    shutil.copyfile(original, copia)
+    return copia
+
+
+def ejecutar(args):
+    ruta = preparar_bd(args.escala, args.semilla, args.datos)
+    dim = datos.dimensiones(args.escala)
+    app = crear_app(ruta)
+    seleccion = args.escenarios.split(",") if args.escenarios else list(ESCENARIOS)
+
+    resultados = {}
+    with app.app_context(), sin_red():
+        for nombre in seleccion:
+            constructor, requiere_compra = ESCENARIOS[nombre]
+            if requiere_compra and compra_bp is None:
+                print(f"  {nombre:<18} omitido (WeasyPrint no disponible)")
+                resultados[nombre] = {"omitido": "WeasyPrint no disponible"}
+                continue
+            funcion = constructor(app.test_client(), dim)
+            resultados[nombre] = nucleo.medir(funcion, args.repeticiones, args.calentamiento)
+            r = resultados[nombre]
+            print(f"  {nombre:<18} mediana {r['mediana_ms']:>10.2f} ms   p95 {r['p95_ms']:>10.2f} ms   "
+                  f"fallos {r['fallos']}/{r['repeticiones']}")
+        db.engine.dispose()
+    os.remove(ruta)
+    return nucleo.documento(args.escala, args.semilla, resultados)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m test.benchmark", description="Benchmarks de los endpoints críticos")
+    parser.add_argument("--escala", choices=list(datos.ESCALAS), default="1k")
+    parser.add_argument("--semilla", type=int, default=datos.SEMILLA)
+    parser.add_argument("--escenarios", help=f"Lista separada por comas ({','.join(ESCENARIOS)})")
+    parser.add_argument("--repeticiones", type=int, default=20)
+    parser.add_argument("--calentamiento", type=int, default=3)
+    parser.add_argument("--datos", default=os.path.join(DIRECTORIO, "instance"), help="Directorio de las BD generadas")
+    parser.add_argument("--salida", help="Archivo JSON de resultados (por defecto en resultados/)")
+    parser.add_argument("--base", help="Línea base a comparar (por defecto bases/<escala>.json)")
+    parser.add_argument("--comparar", action="store_true", help="Comparar con la línea base")
+    parser.add_argument("--guardar-base", action="store_true", help="Guardar esta ejecución como línea base")
+    parser.add_argument("--tolerancia", type=float, default=nucleo.TOLERANCIA)
+    args = parser.parse_args(argv)
+
+    desconocidos = set((args.escenarios or "").split(",")) - set(ESCENARIOS) - {""}
+    if desconocidos:
+        parser.error(f"Escenarios desconocidos: {', '.join(sorted(desconocidos))}")
+
+    # Los logs por petición de las vistas distorsionan las mediciones
+    logging.getLogger("flask_backend").setLevel(logging.WARNING)
+
+    resultado = ejecutar(args)
+
+    salida = args.salida or os.path.join(
+        DIRECTORIO, "resultados", f"{args.escala}_{datetime.now():%Y%m%d_%H%M%S}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(salida)), exist_ok=True)
+    nucleo.guardar(salida, resultado)
+    print(f"Resultados en {salida}")
+
+    base = args.base or os.path.join(DIRECTORIO, "bases", f"{args.escala}.json")
+    if args.guardar_base:
+        os.makedirs(os.path.dirname(os.path.abspath(base)), exist_ok=True)
+        nucleo.guardar(base, resultado)
+        print(f"Línea base guardada en {base}")
+        return 0
+
+    if not args.comparar:
+        return 0
+    if not os.path.exists(base):
+        print(f"No existe la línea base {base}; ejecute con --guardar-base")
+        return 2
+
+    filas = nucleo.comparar(resultado, nucleo.cargar(base), args.tolerancia)
+    for fila in filas:
+        marca = "REGRESIÓN" if fila["regresion"] else "ok"
+        print(f"  {fila['escenario']:<18} {fila['base_ms']:>10.2f} -> {fila['actual_ms']:>10.2f} ms "
+              f"({fila['cambio']:+.1%}) {marca}")
+    return 1 if any(f["regresion"] for f in filas) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
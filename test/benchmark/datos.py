@@ -0,0 +1,41 @@
+# Datos sintéticos deterministas para los benchmarks: la misma escala y semilla producen
+# siempre las mismas filas (app/servicios/generador_datos.py). La BD generada se reutiliza
+# entre ejecuciones (se identifica por escala y semilla).
+import os
+from datetime import datetime
+
+from app.servicios import ranking
+from app.servicios.generador_datos import generar_datos
+
+# Número de compras por escala; el resto de tablas se dimensiona a partir de él
+ESCALAS = {"1k": 1_000, "100k": 100_000, "1m": 1_000_000}
+SEMILLA = 42
+BLOQUE = 10_000
+PASSWORD = "Bench1234!"
+STOCK_INICIAL = 1_000_000
+DIAS_HISTORIAL = 90
+
+
+def dimensiones(escala):
+    ventas = ESCALAS[escala]
+    return {
+        "ventas": ventas,
+        "usuarios": max(10, ventas // 20),
+        "productos": max(20, min(ventas // 10, 50_000)),
+        "categorias": 20,
+    }
+
+
+# Puebla la BD vacía de la app activa; devuelve las dimensiones usadas
+def poblar(escala, semilla=SEMILLA, ahora=None):
+    dim = dimensiones(escala)
+    # Fechas relativas a medianoche para que la distribución no dependa de la hora de ejecución
+    ahora = ahora or datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+    generar_datos(dim["usuarios"], dim["categorias"], dim["productos"], dim["ventas"], semilla=semilla,
+                  dias=DIAS_HISTORIAL, password=PASSWORD, stock=STOCK_INICIAL, lote=BLOQUE, ahora=ahora)
+    ranking.reconstruir(BLOQUE)
+    return dim
+
+
+def ruta_bd(directorio, escala, semilla=SEMILLA):
+    return os.path.join(directorio, f"benchmark_{escala}_{semilla}.db")
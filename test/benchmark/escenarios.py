@@ -0,0 +1,163 @@
+# Escenarios medidos: cada uno recibe el cliente de pruebas y devuelve una función sin
+# argumentos que hace una petición y devuelve True si la respuesta es la esperada.
+import os
+import random
+from contextlib import contextmanager
+
+from flask import Flask
+from flask_jwt_extended import JWTManager
+from flask_login import LoginManager
+
+from app.extensions import db
+from app.models.usuario import Usuario
+from app.routes.api_jwt import api_jwt_bp, carritos
+from app.routes.auth import auth_bp
+from app.routes.historial_ventas import dashboard_ventas_bp
+from app.routes.producto import producto_bp
+from app.servicios import compras
+from app.servicios.cache_usuarios import cargar_usuario
+from app.servicios.tokens import configurar_jwt
+
+from test.benchmark.datos import PASSWORD, SEMILLA
+
+BASE_APP = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "app"))
+
+# La vista de compra importa WeasyPrint, que necesita Pango instalado en el sistema
+try:
+    from app.routes.compra import compra_bp
+except OSError:
+    compra_bp = None
+
+
+def crear_app(ruta_bd):
+    app = Flask(__name__, template_folder=os.path.join(BASE_APP, "templates"),
+                static_folder=os.path.join(BASE_APP, "static"))
+    app.config.update(
+        SQLALCHEMY_DATABASE_URI=f"sqlite:///{ruta_bd}",
+        SQLALCHEMY_TRACK_MODIFICATIONS=False,
+        SECRET_KEY="clave-benchmark",
+        JWT_SECRET_KEY="clave-benchmark-jwt-solo-para-mediciones",
+        TESTING=True,
+    )
+    db.init_app(app)
+    configurar_jwt(JWTManager(app))
+    login_manager = LoginManager(app)
+    login_manager.user_loader(cargar_usuario)
+
+    app.register_blueprint(auth_bp, url_prefix="/api")
+    app.register_blueprint(api_jwt_bp, url_prefix="/api/v1")
+    app.register_blueprint(producto_bp, url_prefix="/api")
+    app.register_blueprint(dashboard_ventas_bp)
+    if compra_bp is not None:
+        app.register_blueprint(compra_bp, url_prefix="/api")
+    return app
+
+
+# Sin red: los comprobantes no se publican en RabbitMQ, solo se cuentan
+@contextmanager
+def sin_red():
+    original = compras.publicar_mensaje
+    publicados = []
+    compras.publicar_mensaje = lambda cola, mensaje, message_id=None: publicados.append(cola)
+    try:
+        yield publicados
+    finally:
+        compras.publicar_mensaje = original
+        carritos.limpiar()
+
+
+# Clientes activos (id, email) de los datos generados, en orden de id
+def _clientes_activos():
+    return Usuario.query.with_entities(Usuario.id, Usuario.email).filter_by(estado="activo").order_by(Usuario.id).all()
+
+
+def _token(client, email):
+    res = client.post("/api/login", json={"email": email, "password": PASSWORD})
+    return res.get_json()["access_token"]
+
+
+def catalogo(client, dim):
+    def ejecutar():
+        res = client.get("/api/productos")
+        return res.status_code == 200 and len(res.get_json()) == dim["productos"]
+    return ejecutar
+
+
+def catalogo_jwt(client, dim):
+    cabeceras = {"Authorization": f"Bearer {_token(client, _clientes_activos()[0].email)}"}
+
+    def ejecutar():
+        return client.get("/api/v1/productos", headers=cabeceras).status_code == 200
+    return ejecutar
+
+
+def dashboard(client, dim):
+    def ejecutar():
+        res = client.get("/api/dashboard/ventas")
+        return res.status_code == 200 and res.get_json()["cantidad_ventas"] >= dim["ventas"]
+    return ejecutar
+
+
+def login(client, dim):
+    azar = random.Random(SEMILLA)
+    emails = [c.email for c in _clientes_activos()]
+
+    def ejecutar():
+        email = azar.choice(emails)
+        res = client.post("/api/login", json={"email": email, "password": PASSWORD})
+        return res.status_code == 200
+    return ejecutar
+
+
+# Carrito de un producto + compra por la API JWT (misma lógica que la vista web: registrar_compra)
+def checkout(client, dim):
+    azar = random.Random(SEMILLA)
+    cabeceras = {"Authorization": f"Bearer {_token(client, _clientes_activos()[0].email)}"}
+
+    def ejecutar():
+        producto_id = azar.randint(1, dim["productos"])
+        client.post("/api/v1/carrito", json={"producto_id": producto_id, "cantidad": 1}, headers=cabeceras)
+        res = client.post("/api/v1/comprar", json={"tipo_comprobante": "boleta", "dni": "12345678"},
+                          headers=cabeceras)
+        return res.status_code == 201
+    return ejecutar
+
+
+def _sesion(client):
+    with client.session_transaction() as sesion:
+        sesion["_user_id"] = str(_clientes_activos()[0].id)
+        sesion["_fresh"] = True
+
+
+# Carrito en la sesión + POST /api/comprar (requiere la vista de compra)
+def checkout_sesion(client, dim):
+    azar = random.Random(SEMILLA)
+    _sesion(client)
+
+    def ejecutar():
+        with client.session_transaction() as sesion:
+            sesion["carrito"] = {str(azar.randint(1, dim["productos"])): 1}
+        res = client.post("/api/comprar", data={"tipo_comprobante": "boleta", "dni": "12345678"})
+        return res.status_code == 200
+    return ejecutar
+
+
+def pdf(client, dim):
+    _sesion(client)
+
+    def ejecutar():
+        res = client.get("/api/compra/1/pdf")
+        return res.status_code == 200 and res.data.startswith(b"%PDF")
+    return ejecutar
+
+
+# Nombre -> (constructor, requiere la vista de compra)
+ESCENARIOS = {
+    "catalogo": (catalogo, False),
+    "catalogo_jwt": (catalogo_jwt, False),
+    "dashboard": (dashboard, False),
+    "login": (login, False),
+    "checkout": (checkout, False),
+    "checkout_sesion": (checkout_sesion, True),
+    "pdf": (pdf, True),
+}
@@ -0,0 +1,86 @@
+# Medición, almacenamiento en JSON y comparación contra una línea base.
+import json
+import platform
+import statistics
+import time
+from datetime import datetime, timezone
+
+# Tolerancia por defecto: se considera regresión si la mediana empeora más de un 20 %
+TOLERANCIA = 0.20
+
+
+def percentil(valores, p):
+    ordenados = sorted(valores)
+    indice = min(len(ordenados) - 1, max(0, round(p / 100 * (len(ordenados) - 1))))
+    return ordenados[indice]
+
+
+# Ejecuta `funcion` tras unas vueltas de calentamiento y devuelve estadísticas en milisegundos.
+# La función devuelve True/False según si la respuesta fue la esperada.
+def medir(funcion, repeticiones=20, calentamiento=3):
+    for _ in range(calentamiento):
+        funcion()
+
+    tiempos, fallos = [], 0
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        correcto = funcion()
+        tiempos.append((time.perf_counter() - inicio) * 1000)
+        if not correcto:
+            fallos += 1
+
+    return {
+        "repeticiones": repeticiones,
+        "fallos": fallos,
+        "min_ms": round(min(tiempos), 3),
+        "mediana_ms": round(statistics.median(tiempos), 3),
+        "media_ms": round(statistics.fmean(tiempos), 3),
+        "p95_ms": round(percentil(tiempos, 95), 3),
+        "max_ms": round(max(tiempos), 3),
+    }
+
+
+def documento(escala, semilla, resultados):
+    return {
+        "fecha": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "escala": escala,
+        "semilla": semilla,
+        "python": platform.python_version(),
+        "plataforma": platform.platform(),
+        "resultados": resultados,
+    }
+
+
+def guardar(ruta, datos):
+    with open(ruta, "w", encoding="utf-8") as f:
+        json.dump(datos, f, indent=2, ensure_ascii=False)
+
+
+def cargar(ruta):
+    with open(ruta, encoding="utf-8") as f:
+        return json.load(f)
+
+
+# Compara la mediana de cada escenario con la base; devuelve una fila por escenario común.
+# Solo tiene sentido entre ejecuciones de la misma escala y semilla.
+def comparar(actual, base, tolerancia=TOLERANCIA):
+    if (actual["escala"], actual["semilla"]) != (base["escala"], base["semilla"]):
+        raise ValueError(
+            f"La base es de escala {base['escala']} / semilla {base['semilla']} y la ejecución "
+            f"de {actual['escala']} / {actual['semilla']}"
+        )
+
+    filas = []
+    for nombre, medida in actual["resultados"].items():
+        anterior = base["resultados"].get(nombre)
+        if not anterior or "mediana_ms" not in medida or "mediana_ms" not in anterior:
+            continue
+        cambio = medida["mediana_ms"] / anterior["mediana_ms"] - 1 if anterior["mediana_ms"] else 0.0
+        filas.append({
+            "escenario": nombre,
+            "base_ms": anterior["mediana_ms"],
+            "actual_ms": medida["mediana_ms"],
+            "cambio": round(cambio, 4),
+            "regresion": cambio > tolerancia or medida.get("fallos", 0) > anterior.get("fallos", 0),
+        })
+    return filas
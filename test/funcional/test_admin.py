@@ -1,3 +1,4 @@
+import io
 import os
 import pytest
 from flask import Flask
@@ -6,6 +7,7 @@ from werkzeug.security import generate_password_hash
 from app.extensions import db
 from app.models.usuario import Usuario
 from app.routes.admin import bp_admin  
+from app.servicios.cache_usuarios import cache as cache_usuarios, cargar_usuario
 
 TEMPLATES_PATH = os.path.abspath("app/templates")
 
@@ -149,3 +151,80 @@ def test_cambiar_estado_cliente(login_admin):
 
     actualizado = Usuario.query.get(cliente.id)
     assert actualizado.estado == "inactivo"
+
+
+# Cambiar el estado invalida la identidad cacheada del cliente
+def test_cambiar_estado_invalida_cache(login_admin):
+    cliente = Usuario.query.filter_by(rol="cliente").first()
+    assert cargar_usuario(cliente.id).is_active
+
+    login_admin.post(f"/admin/clientes/{cliente.id}/estado", data={"estado": "inactivo"})
+    assert cache_usuarios.obtener(cliente.id) is None
+    assert not cargar_usuario(cliente.id).is_active
+    cache_usuarios.limpiar()
+
+
+# Importación masiva desde el panel con respuesta JSON
+def test_importar_clientes_csv(login_admin, monkeypatch):
+    monkeypatch.setattr("app.servicios.importacion.encolar_correo", lambda *args, **kwargs: True)
+    contenido = "nombre,email\nPedro Gómez,pedro.gomez@gmail.com\nMaría López,maria.lopez@gmail.com\n"
+    res = login_admin.post("/admin/clientes/importar",
+                           data={"archivo": (io.BytesIO(contenido.encode()), "clientes.csv")},
+                           headers={"Accept": "application/json"},
+                           content_type="multipart/form-data")
+    assert res.status_code == 200
+    assert res.get_json()["creados"] == 1
+    assert res.get_json()["duplicados"] == 1
+
+
+# Desactivar varios clientes seleccionados
+def test_cambiar_estado_masivo(login_admin):
+    cliente = Usuario.query.filter_by(rol="cliente").first()
+    res = login_admin.post("/admin/clientes/estado-masivo", data={"ids": [str(cliente.id)], "estado": "inactivo"},
+                           follow_redirects=True)
+    assert res.status_code == 200
+    assert b"Estado actualizado en 1 cliente(s)" in res.data
+    db.session.expire_all()
+    assert db.session.get(Usuario, cliente.id).estado == "inactivo"
+
+
+# Listado paginado con búsqueda por prefijo y orden
+def test_listar_clientes_paginado(login_admin):
+    db.session.add_all([Usuario(nombre=f"Cliente {i:02d}", email=f"cliente{i:02d}@gmail.com", rol="cliente")
+                        for i in range(25)])
+    db.session.commit()
+
+    res = login_admin.get("/admin/clientes?por_pagina=10&pagina=3&orden=email")
+    assert res.status_code == 200
+    assert b"26 cliente(s)" in res.data
+    assert b"cliente20@gmail.com" in res.data and b"cliente19@gmail.com" not in res.data
+
+    res = login_admin.get("/admin/clientes?q=MAR")
+    assert b"maria.lopez@gmail.com" in res.data
+    assert b"cliente01@gmail.com" not in res.data
+
+    res = login_admin.get("/admin/clientes?q=cliente_0")
+    assert b"0 cliente(s)" in res.data
+
+    res = login_admin.get("/admin/clientes?orden=password_hash&dir=desc&por_pagina=1")
+    assert res.status_code == 200
+    assert b"cliente24@gmail.com" in res.data
+
+
+
+# El orden por nombre no distingue mayúsculas y la página sale del índice (sin ordenar aparte)
+def test_listar_clientes_orden_por_indice(login_admin):
+    db.session.add_all([Usuario(nombre="ana Ruiz", email="ana.ruiz@gmail.com", rol="cliente"),
+                        Usuario(nombre="Bruno Paz", email="bruno.paz@gmail.com", rol="cliente")])
+    db.session.commit()
+
+    res = login_admin.get("/admin/clientes?orden=nombre")
+    texto = res.get_data(as_text=True)
+    assert texto.index("ana Ruiz") < texto.index("Bruno Paz") < texto.index("María López")
+
+    from app.routes.admin import ORDENES_CLIENTES
+    for orden, columna in ORDENES_CLIENTES.items():
+        consulta = Usuario.query.filter_by(rol="cliente").order_by(columna.desc(), Usuario.id.desc()).limit(20)
+        sql = str(consulta.statement.compile(db.engine, compile_kwargs={"literal_binds": True}))
+        plan = " ".join(str(fila) for fila in db.session.execute(db.text(f"EXPLAIN QUERY PLAN {sql}")))
+        assert "TEMP B-TREE" not in plan, orden
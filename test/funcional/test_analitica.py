@@ -0,0 +1,108 @@
+from datetime import datetime
+import pytest
+from flask import Flask
+from flask_login import LoginManager
+from app.extensions import db
+from app.models.categoria import Categoria
+from app.models.historial_ventas import HistorialVenta
+from app.models.producto import Producto
+from app.models.tipo_comprobante import TipoComprobante
+from app.models.usuario import Usuario
+from app.routes.analitica import analitica_bp
+
+
+@pytest.fixture
+def app():
+    app = Flask(__name__)
+    app.config['SECRET_KEY'] = 'clave-test'
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
+    app.config['TESTING'] = True
+    db.init_app(app)
+    login_manager = LoginManager(app)
+    login_manager.user_loader(lambda user_id: db.session.get(Usuario, int(user_id)))
+    app.register_blueprint(analitica_bp)
+
+    with app.app_context():
+        db.create_all()
+        admin = Usuario(id=1, nombre="Admin", email="admin@gmail.com", rol="administrador")
+        cliente = Usuario(id=2, nombre="Ana", email="ana@gmail.com", rol="cliente")
+        categoria = Categoria(id=1, nombre="Periféricos")
+        db.session.add_all([admin, cliente, categoria, TipoComprobante(id=1, nombre="boleta"),
+                            TipoComprobante(id=2, nombre="factura")])
+        db.session.flush()
+        db.session.add_all([
+            Producto(id=1, nombre="Teclado", marca="Logitech", precio=50, stock=5, cliente_id=2, categoria_id=1),
+            Producto(id=2, nombre="Mouse", marca="Redragon", precio=20, stock=5, cliente_id=2, categoria_id=1),
+        ])
+        # Fechas en UTC: 2025-06-02 04:30 UTC es todavía el 1 de junio en Lima
+        for producto_id, cantidad, total, fecha in [
+            (1, 1, 50.0, datetime(2025, 6, 2, 4, 30)),
+            (1, 2, 100.0, datetime(2025, 6, 2, 15, 0)),
+            (2, 1, 20.0, datetime(2025, 6, 2, 16, 0)),
+            (2, 3, 60.0, datetime(2025, 6, 9, 12, 0)),
+            (1, 1, 50.0, datetime(2025, 7, 1, 4, 0)),   # 30 de junio en Lima
+            (1, 1, 50.0, datetime(2025, 7, 1, 5, 0)),   # fuera del rango
+        ]:
+            db.session.add(HistorialVenta(cliente_id=2, producto_id=producto_id, cantidad=cantidad,
+                                          total_venta=total, tipo_comprobante_id=1, fecha_venta=fecha))
+        db.session.commit()
+        yield app
+
+
+@pytest.fixture
+def client(app):
+    client = app.test_client()
+    with client.session_transaction() as sesion:
+        sesion["_user_id"] = "1"
+    return client
+
+
+def test_ventas_por_dia(client):
+    data = client.get("/api/analytics/ventas?desde=2025-06-01&hasta=2025-06-30&granularidad=day").get_json()
+    assert data["granularidad"] == "dia"
+    assert len(data["periodos"]) == 30
+    assert data["periodos"][0] == "2025-06-01"
+    serie = data["series"][0]
+    assert serie["montos"][0] == 50.0          # 1 de junio (hora de Lima)
+    assert serie["montos"][1] == 120.0         # 2 de junio
+    assert serie["montos"][-1] == 50.0         # 30 de junio
+    assert data["totales"] == {"monto": 280.0, "cantidad": 8, "ventas": 5}
+
+
+def test_ventas_por_semana_y_marca(client):
+    data = client.get("/api/analytics/ventas?desde=2025-06-01&hasta=2025-06-30"
+                      "&granularidad=semana&dimension=marca&limite=1").get_json()
+    assert data["periodos"][:3] == ["2025-W22", "2025-W23", "2025-W24"]
+    logitech, otros = data["series"]
+    assert logitech["etiqueta"] == "Logitech"
+    assert logitech["montos"][:3] == [50.0, 100.0, 0]
+    assert otros["etiqueta"] == "Otros"
+    assert otros["montos"][:3] == [0, 20.0, 60.0]
+    assert otros["cantidades"][2] == 3
+
+
+def test_ventas_por_mes_y_categoria(client):
+    data = client.get("/api/analytics/ventas?desde=2025-06-01&hasta=2025-07-31&granularidad=mes"
+                      "&dimension=categoria").get_json()
+    assert data["periodos"] == ["2025-06", "2025-07"]
+    assert data["series"] == [{"clave": 1, "etiqueta": "Periféricos", "montos": [280.0, 50.0], "cantidades": [8, 1]}]
+
+
+@pytest.mark.parametrize("consulta", [
+    "granularidad=anio",
+    "dimension=color",
+    "desde=2025-07-01&hasta=2025-06-01",
+    "desde=01/06/2025",
+    "desde=2024-01-01&hasta=2025-06-30&granularidad=hora",
+])
+def test_parametros_invalidos(client, consulta):
+    res = client.get(f"/api/analytics/ventas?{consulta}")
+    assert res.status_code == 400
+    assert "msg" in res.get_json()
+
+
+def test_solo_administradores(app):
+    client = app.test_client()
+    with client.session_transaction() as sesion:
+        sesion["_user_id"] = "2"
+    assert client.get("/api/analytics/ventas").status_code == 403
@@ -0,0 +1,147 @@
+import pytest
+from flask import Flask
+from flask_jwt_extended import JWTManager
+from flask_login import LoginManager
+from sqlalchemy import event
+from app.extensions import db
+from app.models.usuario import Usuario
+from app.models.producto import Producto
+from app.models.categoria import Categoria
+from app.models.tipo_comprobante import TipoComprobante
+from app.routes.auth import auth_bp
+from app.routes.api_jwt import api_jwt_bp, carritos
+from app.servicios import compras
+from app.servicios.tokens import configurar_jwt, limpiar_revocaciones, revocar_tokens_usuario
+
+
+@pytest.fixture
+def app(monkeypatch):
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    app.config['JWT_SECRET_KEY'] = 'clave-secreta-test'
+    app.config['SECRET_KEY'] = 'clave-login-test'
+    app.config['TESTING'] = True
+
+    db.init_app(app)
+    configurar_jwt(JWTManager(app))
+    LoginManager(app)
+    app.register_blueprint(auth_bp, url_prefix="/api")
+    app.register_blueprint(api_jwt_bp, url_prefix="/api/v1")
+
+    # Sin RabbitMQ en las pruebas: se registran los mensajes publicados
+    publicados = []
+    monkeypatch.setattr(compras, "publicar_mensaje", lambda cola, msg, message_id=None: publicados.append(cola))
+    app.publicados = publicados
+
+    with app.app_context():
+        db.create_all()
+        cliente = Usuario(nombre="Ana Torres", email="ana.torres@gmail.com", rol="cliente", estado="activo")
+        cliente.set_password("Clave2025!")
+        admin = Usuario(nombre="Juan Pérez", email="juan.perez@gmail.com", rol="administrador", estado="activo")
+        admin.set_password("Admin2025!")
+        categoria = Categoria(nombre="Periféricos")
+        db.session.add_all([cliente, admin, categoria,
+                            TipoComprobante(id=1, nombre="boleta"), TipoComprobante(id=2, nombre="factura")])
+        db.session.flush()
+        db.session.add(Producto(nombre="Teclado", precio=50.0, stock=3, cliente_id=cliente.id, categoria_id=categoria.id))
+        db.session.commit()
+        yield app
+    carritos.limpiar()
+    limpiar_revocaciones()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+def token(client, email, password):
+    res = client.post("/api/login", json={"email": email, "password": password})
+    assert res.status_code == 200
+    return {"Authorization": f"Bearer {res.get_json()['access_token']}"}
+
+
+# Las lecturas con token no consultan la tabla usuarios
+def test_lecturas_sin_consultar_usuarios(client, app):
+    cabeceras = token(client, "ana.torres@gmail.com", "Clave2025!")
+    consultas = []
+
+    def registrar(conn, cursor, statement, *args):
+        consultas.append(statement)
+
+    event.listen(db.engine, "before_cursor_execute", registrar)
+    try:
+        perfil = client.get("/api/profile", headers=cabeceras)
+        productos = client.get("/api/v1/productos", headers=cabeceras)
+    finally:
+        event.remove(db.engine, "before_cursor_execute", registrar)
+
+    assert perfil.get_json() == {"nombre": "Ana Torres", "email": "ana.torres@gmail.com", "rol": "cliente"}
+    assert [p["nombre"] for p in productos.get_json()] == ["Teclado"]
+    assert not any("usuarios" in sql for sql in consultas)
+
+
+# Carrito guardado en el almacén y compra confirmada con el token
+def test_carrito_y_compra(client, app):
+    cabeceras = token(client, "ana.torres@gmail.com", "Clave2025!")
+    producto_id = Producto.query.first().id
+
+    res = client.post("/api/v1/carrito", json={"producto_id": producto_id, "cantidad": 2}, headers=cabeceras)
+    assert res.get_json() == {str(producto_id): 2}
+
+    res = client.post("/api/v1/comprar", json={"tipo_comprobante": "boleta", "dni": "72257140"}, headers=cabeceras)
+    assert res.status_code == 201
+    assert res.get_json()["total"] == 100.0
+    assert app.publicados == ["cola_boletas"]
+    assert db.session.get(Producto, producto_id).stock == 1
+    assert client.get("/api/v1/carrito", headers=cabeceras).get_json() == {}
+    assert len(client.get("/api/v1/compras", headers=cabeceras).get_json()) == 1
+
+
+def test_compra_sin_stock(client, app):
+    cabeceras = token(client, "ana.torres@gmail.com", "Clave2025!")
+    producto_id = Producto.query.first().id
+    client.post("/api/v1/carrito", json={"producto_id": producto_id, "cantidad": 5}, headers=cabeceras)
+
+    res = client.post("/api/v1/comprar", json={"tipo_comprobante": "boleta", "dni": "72257140"}, headers=cabeceras)
+    assert res.status_code == 400
+    assert "Stock insuficiente" in res.get_json()["msg"]
+
+
+# El rol se autoriza con el claim del token
+def test_rol_desde_claims(client):
+    cabeceras = token(client, "juan.perez@gmail.com", "Admin2025!")
+    assert client.get("/api/v1/productos", headers=cabeceras).status_code == 200
+    assert client.get("/api/v1/carrito", headers=cabeceras).status_code == 403
+
+
+# Tras el logout el token queda revocado
+def test_logout_revoca_token(client):
+    cabeceras = token(client, "ana.torres@gmail.com", "Clave2025!")
+    assert client.post("/api/logout", headers=cabeceras).status_code == 200
+    assert client.get("/api/v1/productos", headers=cabeceras).status_code == 401
+
+
+# Un cambio desde el admin invalida los tokens ya emitidos del usuario
+def test_revocar_tokens_usuario(client):
+    cabeceras = token(client, "ana.torres@gmail.com", "Clave2025!")
+    revocar_tokens_usuario(Usuario.query.filter_by(email="ana.torres@gmail.com").first().id)
+    assert client.get("/api/v1/productos", headers=cabeceras).status_code == 401
+
+
+# Un token emitido justo después de revocar (mismo segundo) sigue siendo válido
+def test_token_tras_revocacion_mismo_segundo(client):
+    revocar_tokens_usuario(Usuario.query.filter_by(email="ana.torres@gmail.com").first().id)
+    cabeceras = token(client, "ana.torres@gmail.com", "Clave2025!")
+    assert client.get("/api/v1/productos", headers=cabeceras).status_code == 200
+
+
+# Sin Redis la revocación se guarda una sola vez, en la memoria local
+def test_revocacion_sin_redis_no_duplica(client):
+    from app.servicios import tokens
+
+    user_id = Usuario.query.filter_by(email="ana.torres@gmail.com").first().id
+    revocar_tokens_usuario(user_id)
+    assert tokens._locales.obtener(f"usuario:{user_id}") is not None
+    assert tokens._compartidos.obtener(f"usuario:{user_id}") is None
@@ -1,10 +1,11 @@
 import pytest
 from flask import Flask
-from flask_jwt_extended import JWTManager, create_access_token
+from flask_jwt_extended import JWTManager
 from flask_login import LoginManager
 from app.extensions import db
 from app.models.usuario import Usuario
 from app.routes.auth import auth_bp
+from app.servicios.tokens import crear_token
 
 
 @pytest.fixture
@@ -74,7 +75,7 @@ def test_logout_con_token(client, app):
         user.set_password("miClaveSecreta")
         db.session.add(user)
         db.session.commit()
-        token = create_access_token(identity=user.id)
+        token = crear_token(user)
 
     response = client.post("/logout", headers={"Authorization": f"Bearer {token}"})
     assert response.status_code == 200
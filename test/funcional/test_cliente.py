@@ -111,6 +111,34 @@ def test_actualizar_producto_cliente(client, app, cliente_autenticado):
         assert actualizado.stock == 4
 
 
+# Test de actualización condicional: If-Match con la versión leída (ETag)
+def test_actualizar_producto_con_if_match(client, app, cliente_autenticado):
+    with app.app_context():
+        producto = Producto(nombre="Parlante", precio=90, stock=5, cliente_id=cliente_autenticado.id)
+        db.session.add(producto)
+        db.session.commit()
+        db.session.refresh(producto)
+
+    with app.test_request_context():
+        login_user(cliente_autenticado)
+        leido = client.get(f"/cliente/productos/{producto.id}")
+        assert leido.headers["ETag"] == '"1"'
+
+        response = client.put(f"/cliente/productos/{producto.id}", json={"stock": 4},
+                              headers={"If-Match": leido.headers["ETag"]})
+        assert response.status_code == 200
+        assert response.headers["ETag"] == '"2"'
+
+        # Otro cliente que leyó la versión 1 no pisa el cambio
+        response = client.put(f"/cliente/productos/{producto.id}", json={"stock": 9},
+                              headers={"If-Match": leido.headers["ETag"]})
+        assert response.status_code == 412
+        assert response.headers["ETag"] == '"2"'
+
+    with app.app_context():
+        assert db.session.get(Producto, producto.id).stock == 4
+
+
 # Test para eliminar un producto propio
 def test_eliminar_producto_cliente(client, app, cliente_autenticado):
     with app.app_context():
@@ -153,3 +181,52 @@ def test_actualizar_producto_ajeno(client, app, cliente_autenticado):
             "precio": 180
         })
         assert response.status_code == 403  
+
+
+# Historial como vendedor: ventas de mis productos (no mis compras), por cursor y con totales
+def test_historial_como_vendedor_por_cursor(client, app, cliente_autenticado):
+    from datetime import date, datetime
+    from app.models.historial_ventas import HistorialVenta
+    from app.servicios import historial_vendedor, ranking
+
+    with app.app_context():
+        comprador = Usuario(nombre="Ana", email="ana@gmail.com", rol="cliente")
+        db.session.add(comprador)
+        db.session.flush()
+        propio = Producto(nombre="Teclado", precio=50, stock=10, cliente_id=cliente_autenticado.id)
+        ajeno = Producto(nombre="Mouse", precio=20, stock=10, cliente_id=comprador.id)
+        db.session.add_all([propio, ajeno])
+        db.session.flush()
+        # Cinco ventas propias (dos con la misma fecha) y una del otro vendedor
+        for producto, fecha in [(propio, datetime(2025, 6, 1, 12)), (propio, datetime(2025, 6, 2, 12)),
+                                (propio, datetime(2025, 6, 2, 12)), (ajeno, datetime(2025, 6, 3, 12)),
+                                (propio, datetime(2025, 6, 4, 12)), (propio, datetime(2025, 6, 5, 12))]:
+            db.session.add(HistorialVenta(cliente_id=comprador.id, producto_id=producto.id, cantidad=1,
+                                          total_venta=producto.precio, fecha_venta=fecha))
+        # Compra hecha por el vendedor: no es una venta suya
+        db.session.add(HistorialVenta(cliente_id=cliente_autenticado.id, producto_id=ajeno.id, cantidad=1,
+                                      total_venta=20, fecha_venta=datetime(2025, 6, 6, 12)))
+        db.session.commit()
+        ranking.consolidar_pendientes()
+
+    with app.test_request_context():
+        login_user(cliente_autenticado)
+        vistas, cursor = [], None
+        while True:
+            url = "/cliente/ventas/vendedor?por_pagina=2" + (f"&cursor={cursor}" if cursor else "")
+            data = client.get(url).get_json()
+            vistas += [v["id"] for v in data["ventas"]]
+            assert all(v["producto"] == "Teclado" for v in data["ventas"])
+            cursor = data["siguiente"]
+            if not cursor:
+                break
+
+        assert vistas == [6, 5, 3, 2, 1]
+        assert data["totales"]["total"] == {"monto": 250.0, "cantidad": 5, "ventas": 5}
+        assert client.get("/cliente/ventas/vendedor?cursor=roto").status_code == 400
+
+    with app.app_context():
+        totales = historial_vendedor.totales(cliente_autenticado.id, hoy=date(2025, 6, 5))
+    assert totales["dia"] == {"monto": 50.0, "cantidad": 1, "ventas": 1}
+    assert totales["semana"]["ventas"] == 5
+    assert totales["meses"] == [{"mes": "2025-06", "monto": 250.0, "cantidad": 5, "ventas": 5}]
@@ -0,0 +1,148 @@
+import csv
+import gzip
+import io
+from datetime import datetime
+import pytest
+from flask import Flask
+from flask_login import LoginManager
+from app.extensions import db
+from app.models.categoria import Categoria
+from app.models.historial_ventas import HistorialVenta
+from app.models.producto import Producto
+from app.models.tipo_comprobante import TipoComprobante
+from app.models.usuario import Usuario
+from app.routes.analitica import analitica_bp
+from app.servicios import exportacion
+from app.servicios.exportacion import Marca
+
+
+@pytest.fixture
+def app():
+    app = Flask(__name__)
+    app.config['SECRET_KEY'] = 'clave-test'
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
+    app.config['TESTING'] = True
+    db.init_app(app)
+    login_manager = LoginManager(app)
+    login_manager.user_loader(lambda user_id: db.session.get(Usuario, int(user_id)))
+    app.register_blueprint(analitica_bp)
+
+    with app.app_context():
+        db.create_all()
+        db.session.add_all([
+            Usuario(id=1, nombre="Admin", email="admin@gmail.com", rol="administrador"),
+            Usuario(id=2, nombre="Ana", email="ana@gmail.com", rol="cliente"),
+            Categoria(id=1, nombre="Periféricos"), TipoComprobante(id=1, nombre="boleta"),
+        ])
+        db.session.flush()
+        db.session.add_all([
+            Producto(id=1, nombre="Teclado", marca="Logitech", precio=50, stock=5, cliente_id=2, categoria_id=1),
+            Producto(id=2, nombre="Mouse", marca="Redragon", precio=20, stock=5, cliente_id=2, categoria_id=1),
+        ])
+        # Dos ventas con la misma fecha: la marca desempata por id
+        for producto_id, total, fecha in [
+            (1, 50.0, datetime(2025, 6, 1, 10, 0)),
+            (2, 20.0, datetime(2025, 6, 2, 10, 0)),
+            (1, 50.0, datetime(2025, 6, 2, 10, 0)),
+            (None, 30.0, datetime(2025, 6, 3, 10, 0)),   # producto ya eliminado
+            (2, 20.0, datetime(2025, 6, 4, 10, 0)),
+        ]:
+            db.session.add(HistorialVenta(cliente_id=2, producto_id=producto_id, cantidad=1,
+                                          total_venta=total, tipo_comprobante_id=1, fecha_venta=fecha))
+        db.session.commit()
+        yield app
+
+
+@pytest.fixture
+def client(app):
+    client = app.test_client()
+    with client.session_transaction() as sesion:
+        sesion["_user_id"] = "1"
+    return client
+
+
+def _filas_csv(contenido):
+    return list(csv.DictReader(io.StringIO(gzip.decompress(contenido).decode("utf-8"))))
+
+
+def test_exportar_csv_gz(client):
+    respuesta = client.get("/api/analytics/ventas/exportar?formato=csv.gz")
+    assert respuesta.status_code == 200
+    assert "historial_ventas.csv.gz" in respuesta.headers["Content-Disposition"]
+    filas = _filas_csv(respuesta.data)
+    assert [f["id"] for f in filas] == ["1", "2", "3", "4", "5"]
+    assert filas[0]["producto"] == "Teclado" and filas[0]["categoria"] == "Periféricos"
+    assert filas[0]["tipo_comprobante"] == "boleta"
+    assert filas[3]["producto"] == "" and filas[3]["total_venta"] == "30.0"
+    assert respuesta.headers["X-Marca-Fecha"] == "2025-06-04T10:00:00"
+    assert respuesta.headers["X-Marca-Id"] == "5"
+
+
+def test_exportacion_incremental_desde_marca(app, client):
+    primera = client.get("/api/analytics/ventas/exportar?formato=csv.gz&desde_fecha=2025-06-02T10:00:00&desde_id=2")
+    assert [f["id"] for f in _filas_csv(primera.data)] == ["3", "4", "5"]
+
+    with app.app_context():
+        db.session.add(HistorialVenta(cliente_id=2, producto_id=1, cantidad=1, total_venta=50.0,
+                                      tipo_comprobante_id=1, fecha_venta=datetime(2025, 6, 5, 10, 0)))
+        db.session.commit()
+    siguiente = client.get("/api/analytics/ventas/exportar?formato=csv.gz"
+                           f"&desde_fecha={primera.headers['X-Marca-Fecha']}&desde_id={primera.headers['X-Marca-Id']}")
+    assert [f["id"] for f in _filas_csv(siguiente.data)] == ["6"]
+    assert siguiente.headers["X-Marca-Id"] == "6"
+
+
+def test_exportar_parquet_por_row_groups(app, tmp_path):
+    pq = pytest.importorskip("pyarrow.parquet")
+    with app.app_context():
+        filas, marca = exportacion.exportar(tmp_path / "ventas.parquet", "parquet", tamano_lote=2)
+    archivo = pq.ParquetFile(tmp_path / "ventas.parquet")
+    assert filas == 5 and archivo.metadata.num_row_groups == 3
+    tabla = archivo.read()
+    assert tabla.column("id").to_pylist() == [1, 2, 3, 4, 5]
+    assert tabla.column("marca").to_pylist()[:2] == ["Logitech", "Redragon"]
+    assert tabla.column("total_venta").to_pylist()[0] == 50.0
+    assert (marca.fecha, marca.id) == (datetime(2025, 6, 4, 10, 0), 5)
+
+    # Sin ventas nuevas la marca se mantiene y el archivo queda vacío
+    with app.app_context():
+        filas, siguiente = exportacion.exportar(tmp_path / "vacio.parquet", "parquet", desde=marca)
+    assert filas == 0 and siguiente.id == 5
+    assert pq.read_table(tmp_path / "vacio.parquet").num_rows == 0
+
+
+# Las ventas más recientes que el retraso de seguridad quedan para la siguiente exportación
+def test_marca_excluye_ventas_recientes(app):
+    with app.app_context():
+        ahora = db.session.execute(db.select(db.func.now())).scalar()
+        db.session.add(HistorialVenta(cliente_id=2, producto_id=1, cantidad=1, total_venta=50.0,
+                                      tipo_comprobante_id=1, fecha_venta=ahora))
+        db.session.commit()
+        marca = exportacion.marca_actual(retraso=60)
+        assert marca.id == 5
+        assert exportacion.marca_actual(retraso=0).id == 6
+
+
+def test_exportar_arrow(client):
+    pa = pytest.importorskip("pyarrow")
+    respuesta = client.get("/api/analytics/ventas/exportar?formato=arrow&desde_fecha=2025-06-03T00:00:00")
+    tabla = pa.ipc.open_stream(respuesta.data).read_all()
+    assert tabla.column("id").to_pylist() == [4, 5]
+
+
+def test_exportar_parametros_invalidos(client):
+    assert client.get("/api/analytics/ventas/exportar?formato=xlsx").status_code == 400
+    assert client.get("/api/analytics/ventas/exportar?desde_fecha=ayer").status_code == 400
+
+
+def test_exportar_solo_admin(app):
+    client = app.test_client()
+    with client.session_transaction() as sesion:
+        sesion["_user_id"] = "2"
+    assert client.get("/api/analytics/ventas/exportar").status_code == 403
+
+
+def test_marca_en_texto():
+    marca = Marca.desde_texto("2025-06-02T10:00:00", "3")
+    assert marca.a_dict() == {"fecha_venta": "2025-06-02T10:00:00", "id": 3}
+    assert not Marca.desde_texto(None, None)
@@ -9,7 +9,8 @@ from app.models.producto import Producto
 from app.models.categoria import Categoria
 from app.models.tipo_comprobante import TipoComprobante
 from app.routes.historial_ventas import historial_ventas_bp, dashboard_ventas_bp
-from datetime import datetime
+from app.servicios import ranking
+from datetime import datetime, timedelta
 
 TEMPLATES_PATH = os.path.abspath("app/templates")
 
@@ -80,6 +81,8 @@ def cliente_autenticado(app):
         )
         db.session.add(venta)
         db.session.commit()
+        # Los rankings leen resumen_ventas: se consolida como lo haría la tarea periódica
+        ranking.consolidar_pendientes()
 
         return usuario.id
 
@@ -109,3 +112,21 @@ def test_dashboard_ventas_por_mes(client, app, cliente_autenticado):
     response = client.get("/api/dashboard_ventas?agrupacion=mes&filtro=tipo_comprobante")
     assert response.status_code == 200
     assert b"Enero" in response.data or b"Febrero" in response.data or b"Boleta" in response.data or b"Laptop" in response.data
+
+# La serie de hoy agrupa por hora de Lima y no incluye ventas de otros días
+def test_api_dashboard_ventas_hora_local(client, app, cliente_autenticado):
+    from app.servicios.series_tiempo import hoy_local, limites_utc
+    with app.app_context():
+        inicio_utc, _ = limites_utc(hoy_local(), hoy_local())
+        venta = HistorialVenta.query.first()
+        # 23:30 de ayer en Lima: fuera de la serie de hoy
+        venta.fecha_venta = inicio_utc - timedelta(minutes=30)
+        db.session.add(HistorialVenta(cliente_id=venta.cliente_id, producto_id=venta.producto_id, cantidad=1,
+                                      total_venta=150.5, fecha_venta=inicio_utc + timedelta(hours=9, minutes=15)))
+        db.session.commit()
+
+    data = client.get("/api/api/dashboard/ventas").get_json()
+    assert data["fechas"] == ["09:00"]
+    assert data["montos"] == [150.5]
+    assert data["total_ventas"] == 150.5
+    assert data["cantidad_ventas"] == 2
@@ -0,0 +1,128 @@
+import pytest
+from flask import Flask, jsonify, render_template_string
+from flask_login import LoginManager
+from app.extensions import db
+from app.models.categoria import Categoria
+from app.models.usuario import Usuario
+from app.servicios.perfilado import PerfiladorPeticiones, medir_externo
+
+
+@pytest.fixture
+def app():
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    app.config['SECRET_KEY'] = 'clave-test'
+    app.config['TESTING'] = True
+    app.config['PERFILADO_ACTIVO'] = True
+    app.config['PERFILADO_MUESTREO'] = True
+
+    db.init_app(app)
+    login_manager = LoginManager(app)
+    login_manager.user_loader(lambda user_id: db.session.get(Usuario, int(user_id)))
+    PerfiladorPeticiones(app)
+
+    @app.route("/categorias-perfil")
+    def categorias_perfil():
+        Categoria.query.all()
+        Categoria.query.count()
+        with medir_externo("rabbitmq"):
+            pass
+        return render_template_string("<p>{{ n }}</p>", n=2)
+
+    @app.route("/no-encontrado")
+    def no_encontrado():
+        return jsonify({"msg": "no existe"}), 404
+
+    with app.app_context():
+        db.create_all()
+        db.session.add_all([Usuario(id=1, nombre="Admin", email="admin@gmail.com", rol="administrador"),
+                            Usuario(id=2, nombre="Ana", email="ana@gmail.com", rol="cliente")])
+        db.session.commit()
+        yield app
+
+
+def cliente_con_sesion(app, user_id):
+    client = app.test_client()
+    with client.session_transaction() as sesion:
+        sesion["_user_id"] = str(user_id)
+    return client
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def admin(app):
+    return cliente_con_sesion(app, 1)
+
+
+# La cabecera Server-Timing incluye total, SQL (con número de consultas), plantilla y externos
+def test_cabecera_server_timing(client):
+    res = client.get("/categorias-perfil")
+    assert res.status_code == 200
+    timing = res.headers["Server-Timing"]
+    assert "total;dur=" in timing
+    assert 'sql;dur=' in timing and '"2 consultas"' in timing
+    assert "plantilla;dur=" in timing
+    assert "ext-rabbitmq;dur=" in timing
+
+
+# Los histogramas se agregan por endpoint
+def test_resumen_por_endpoint(app, client, admin):
+    client.get("/categorias-perfil")
+    client.get("/categorias-perfil")
+    # Contexto nuevo: flask_login guarda en g el usuario anónimo de las peticiones anteriores
+    with app.app_context():
+        res = admin.get("/_perfilado")
+    datos = res.get_json()
+    assert datos["categorias_perfil"]["total"]["cantidad"] == 2
+    assert datos["categorias_perfil"]["sql_consultas_total"] == 4
+
+
+# El muestreo con cProfile devuelve las estadísticas en texto plano
+def test_muestreo_cprofile(admin):
+    res = admin.get("/categorias-perfil?_perfil=cprofile")
+    assert res.status_code == 200
+    assert res.mimetype == "text/plain"
+    assert b"function calls" in res.data
+    assert "Server-Timing" in res.headers
+
+
+# La muestra conserva el código de estado de la respuesta original
+def test_muestreo_conserva_estado(admin):
+    res = admin.get("/no-encontrado?_perfil=cprofile")
+    assert res.status_code == 404
+    assert b"function calls" in res.data
+
+
+# Sin sesión de administrador se ignora el muestreo y el resumen responde 403
+def test_muestreo_y_resumen_solo_admin(app):
+    for client in (app.test_client(), cliente_con_sesion(app, 2)):
+        with app.app_context():
+            res = client.get("/categorias-perfil?_perfil=cprofile")
+            assert res.status_code == 200 and res.mimetype == "text/html"
+            assert client.get("/_perfilado").status_code == 403
+
+
+# El muestreo requiere PERFILADO_MUESTREO aunque el perfilado esté activo
+def test_muestreo_desactivado_por_defecto(monkeypatch):
+    monkeypatch.delenv("PERFILADO_MUESTREO", raising=False)
+    otra = Flask(__name__)
+    PerfiladorPeticiones(otra)
+    assert otra.config["PERFILADO_MUESTREO"] is False
+
+
+# Sin PERFILADO_ACTIVO no se añade ninguna cabecera
+def test_perfilado_desactivado():
+    app = Flask(__name__)
+    PerfiladorPeticiones(app)
+
+    @app.route("/ping")
+    def ping():
+        return jsonify({"ok": True})
+
+    res = app.test_client().get("/ping")
+    assert "Server-Timing" not in res.headers
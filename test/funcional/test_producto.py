@@ -143,6 +143,29 @@ def test_actualizar_producto_propio(client, app, cliente_autenticado):
     assert response.status_code in [200, 302]
 
 
+# Test: el formulario con una versión antigua no pisa cambios posteriores
+def test_actualizar_producto_version_antigua(client, app, cliente_autenticado):
+    with app.app_context():
+        producto = Producto(nombre="Monitor", precio=200, stock=3, cliente_id=cliente_autenticado)
+        db.session.add(producto)
+        db.session.commit()
+        producto_id = producto.id
+        # Una compra descuenta stock después de abrir el formulario
+        producto.stock = 2
+        db.session.commit()
+
+    with client.session_transaction() as sess:
+        sess['_user_id'] = str(cliente_autenticado)
+
+    data = {'nombre': 'Monitor', 'descripcion': '', 'precio': '200', 'stock': '3', 'marca': '', 'version': '1'}
+    response = client.post(f"/productos/{producto_id}", data=data)
+    assert response.status_code == 409
+    assert response.get_json()['version'] == 2
+
+    with app.app_context():
+        assert db.session.get(Producto, producto_id).stock == 2
+
+
 # Test: Eliminar producto propio del cliente
 def test_eliminar_producto_propio(client, app, cliente_autenticado):
     with app.app_context():
@@ -0,0 +1,68 @@
+# Configuración de los escenarios de carga (variables de entorno de Locust):
+#   CARGA_MEZCLA        navegacion | compras | mixta, o pesos propios "navegar=5,comprar=4,pdf=1"
+#   CARGA_CREDENCIALES  CSV email,password (python -m test.load.escenarios.credenciales)
+#   CARGA_PASSWORD      contraseña por defecto si el CSV solo trae emails
+#   CARGA_PRODUCTOS     ids de producto a usar (1..N), elegidos con popularidad Zipf
+#   CARGA_ZIPF          exponente de popularidad (0 = uniforme)
+#   CARGA_ESPERA        pausa entre recorridos en segundos, "min,max"
+import csv
+import itertools
+import os
+import random
+
+MEZCLAS = {
+    "navegacion": {"navegar": 8, "comprar": 1, "pdf": 1},
+    "compras": {"navegar": 3, "comprar": 6, "pdf": 1},
+    "mixta": {"navegar": 6, "comprar": 3, "pdf": 1},
+}
+RECORRIDOS = ("navegar", "comprar", "pdf")
+
+
+def parsear_mezcla(texto):
+    texto = (texto or "mixta").strip()
+    if texto in MEZCLAS:
+        return dict(MEZCLAS[texto])
+
+    pesos = {}
+    for parte in texto.split(","):
+        nombre, _, peso = parte.partition("=")
+        nombre = nombre.strip()
+        if nombre not in RECORRIDOS or not peso.strip().isdigit():
+            raise ValueError(f"Mezcla inválida: {parte!r} (use {', '.join(MEZCLAS)} o nombre=peso)")
+        pesos[nombre] = int(peso)
+    if not any(pesos.values()):
+        raise ValueError("La mezcla no tiene ningún recorrido con peso")
+    return pesos
+
+
+def parsear_espera(texto):
+    minimo, _, maximo = (texto or "1,3").partition(",")
+    return float(minimo), float(maximo or minimo)
+
+
+def cargar_credenciales(ruta, password_defecto):
+    with open(ruta, newline="", encoding="utf-8") as f:
+        filas = [fila for fila in csv.reader(f) if fila and fila[0] != "email"]
+    if not filas:
+        raise ValueError(f"{ruta} no tiene credenciales")
+    return [(fila[0], fila[1] if len(fila) > 1 and fila[1] else password_defecto) for fila in filas]
+
+
+class SelectorProductos:
+    """Ids 1..N con peso 1/id^s: los primeros productos concentran las compras (y la contención de stock)."""
+
+    def __init__(self, cantidad, s, azar=None):
+        self.ids = range(1, cantidad + 1)
+        self.acumulados = list(itertools.accumulate(1 / (i ** s) for i in self.ids))
+        self.azar = azar or random.Random()
+
+    def elegir(self, k=1):
+        return self.azar.choices(self.ids, cum_weights=self.acumulados, k=k)
+
+
+MEZCLA = parsear_mezcla(os.getenv("CARGA_MEZCLA"))
+ESPERA = parsear_espera(os.getenv("CARGA_ESPERA"))
+RUTA_CREDENCIALES = os.getenv("CARGA_CREDENCIALES", os.path.join(os.path.dirname(__file__), "usuarios.csv"))
+PASSWORD = os.getenv("CARGA_PASSWORD", "Cliente2025!")
+PRODUCTOS = int(os.getenv("CARGA_PRODUCTOS", 1000))
+ZIPF = float(os.getenv("CARGA_ZIPF", 1.1))
@@ -0,0 +1,31 @@
+# Exporta emails de clientes activos para los escenarios de carga:
+#   python -m test.load.escenarios.credenciales --limite 2000 --salida test/load/escenarios/usuarios.csv
+# Los usuarios de `flask generar-datos` comparten la contraseña indicada allí (--password).
+import argparse
+import csv
+import os
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m test.load.escenarios.credenciales")
+    parser.add_argument("--salida", default=os.path.join(os.path.dirname(__file__), "usuarios.csv"))
+    parser.add_argument("--limite", type=int, default=1000)
+    parser.add_argument("--password", default="", help="Se escribe en cada fila (vacío: CARGA_PASSWORD)")
+    args = parser.parse_args(argv)
+
+    from app.main import app
+    from app.models.usuario import Usuario
+
+    with app.app_context():
+        emails = [e for (e,) in Usuario.query.with_entities(Usuario.email)
+                  .filter_by(rol="cliente", estado="activo").order_by(Usuario.id).limit(args.limite)]
+
+    with open(args.salida, "w", newline="", encoding="utf-8") as f:
+        escritor = csv.writer(f)
+        escritor.writerow(["email", "password"])
+        escritor.writerows([email, args.password] for email in emails)
+    print(f"{len(emails)} credenciales en {args.salida}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,32 @@
+# Carga realista sobre el camino real de compra: login, filtros, carrito en sesión, checkout
+# y descarga del PDF, con una mezcla configurable (ver config.py).
+#   locust -f test/load/escenarios/locustfile.py --host http://localhost:5000
+# Levantar antes el entorno con correo y RabbitMQ locales (test/load/docker-compose.carga.yml)
+# y generar datos y credenciales (flask generar-datos; python -m test.load.escenarios.credenciales).
+import itertools
+
+from locust import HttpUser, between
+from locust.exception import StopUser
+
+from test.load.escenarios import config, recorridos
+
+_credenciales = itertools.cycle(config.cargar_credenciales(config.RUTA_CREDENCIALES, config.PASSWORD))
+_productos = config.SelectorProductos(config.PRODUCTOS, config.ZIPF)
+_recorridos = {"navegar": recorridos.navegar, "comprar": recorridos.comprar, "pdf": recorridos.descargar_pdf}
+
+
+class ClienteTienda(HttpUser):
+    wait_time = between(*config.ESPERA)
+    tasks = {_recorridos[nombre]: peso for nombre, peso in config.MEZCLA.items() if peso}
+
+    def on_start(self):
+        self.productos = _productos
+        email, password = next(_credenciales)
+        # /api/login abre la sesión de Flask-Login (cookie) y devuelve además el token JWT
+        with self.client.post("/api/login", json={"email": email, "password": password},
+                              catch_response=True) as r:
+            if r.status_code != 200 or "access_token" not in r.text:
+                r.failure(f"Login de {email} fallido: {r.status_code} {r.text[:200]}")
+                raise StopUser()
+            r.success()
+            self.cabeceras_jwt = {"Authorization": f"Bearer {r.json()['access_token']}"}
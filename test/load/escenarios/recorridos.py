@@ -0,0 +1,81 @@
+# Recorridos de un cliente autenticado. Cada petición valida el código y el contenido de la
+# respuesta; las compras rechazadas por stock se registran como fallo "Stock insuficiente"
+# para que la contención sea visible en las estadísticas de Locust.
+import random
+
+MARCAS = ["Logitech", "HP", "Lenovo", "Samsung", "LG", "Asus", "Sony", "Xiaomi"]
+
+
+def _validar(respuesta, estado, contiene=None):
+    if respuesta.status_code != estado:
+        respuesta.failure(f"Status {respuesta.status_code}: {respuesta.text[:200]}")
+        return False
+    if contiene and contiene not in respuesta.text:
+        respuesta.failure(f"Falta '{contiene}' en la respuesta")
+        return False
+    respuesta.success()
+    return True
+
+
+def navegar(usuario):
+    filtros = random.choice([
+        {"marca": random.choice(MARCAS)},
+        {"precio_min": 20, "precio_max": random.choice([100, 300, 1000])},
+        {"nombre": random.choice(["Pro", "Max", "Lite"]), "orden_stock": "desc"},
+    ])
+    with usuario.client.get("/api/filtro-productos", params=filtros, name="/api/filtro-productos",
+                            catch_response=True) as r:
+        _validar(r, 200, "Mis Productos")
+    with usuario.client.get("/api/carrito", catch_response=True) as r:
+        _validar(r, 200, "Estante Virtual")
+
+
+def _agregar(usuario, producto_id):
+    with usuario.client.post(f"/api/carrito/agregar/{producto_id}", name="/api/carrito/agregar/[id]",
+                             allow_redirects=False, catch_response=True) as r:
+        return _validar(r, 302)
+
+
+def _vaciar(usuario, producto_ids):
+    for producto_id in producto_ids:
+        usuario.client.post(f"/api/carrito/eliminar/{producto_id}", name="/api/carrito/eliminar/[id]",
+                            allow_redirects=False)
+
+
+def comprar(usuario):
+    productos = set(usuario.productos.elegir(random.choices([1, 2, 3], weights=[6, 3, 1])[0]))
+    agregados = [p for p in productos if _agregar(usuario, p)]
+    if not agregados:
+        return
+
+    with usuario.client.get("/api/carrito", catch_response=True) as r:
+        _validar(r, 200, "Estante Virtual")
+
+    if random.random() < 0.75:
+        datos = {"tipo_comprobante": "boleta", "dni": f"{random.randrange(10**7, 10**8)}"}
+    else:
+        datos = {"tipo_comprobante": "factura", "ruc": f"20{random.randrange(10**8, 10**9)}"}
+    with usuario.client.post("/api/comprar", data=datos, catch_response=True) as r:
+        if r.status_code == 400 and "Stock insuficiente" in r.text:
+            r.failure("Stock insuficiente")
+        elif r.status_code == 202:
+            r.failure("Compra guardada sin publicar en RabbitMQ")
+        else:
+            _validar(r, 200, "COMPRA CONFIRMADA")
+    if r.status_code != 200:
+        _vaciar(usuario, agregados)
+
+
+# Descarga el comprobante de la compra más reciente (la lista se obtiene por la API JWT)
+def descargar_pdf(usuario):
+    with usuario.client.get("/api/v1/compras", headers=usuario.cabeceras_jwt, catch_response=True) as r:
+        if not _validar(r, 200):
+            return
+        compras = r.json()
+    if not compras:
+        return
+
+    with usuario.client.get(f"/api/compra/{compras[0]['id']}/pdf", name="/api/compra/[id]/pdf",
+                            catch_response=True) as r:
+        if _validar(r, 200) and not r.content.startswith(b"%PDF"):
+            r.failure("La respuesta no es un PDF")
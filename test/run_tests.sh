@@ -3,3 +3,5 @@ pytest tests/unit
 pytest tests/concurrency
 pytest tests/performance
 locust -f tests/load/locustfile.py
+locust -f test/load/escenarios/locustfile.py --host http://localhost:5000
+python -m test.benchmark --escala 1k --comparar
@@ -0,0 +1,67 @@
+from datetime import datetime
+import pytest
+from flask import Flask
+from sqlalchemy import func
+from app.extensions import db
+from app.models.historial_ventas import HistorialVenta
+from app.models.producto import Producto
+from app.models.usuario import Usuario
+from test.benchmark import datos, nucleo
+
+
+def ejecucion(medianas, escala="1k", semilla=42, fallos=0):
+    resultados = {nombre: {"mediana_ms": m, "fallos": fallos} for nombre, m in medianas.items()}
+    return nucleo.documento(escala, semilla, resultados)
+
+
+def test_comparar_detecta_regresiones():
+    base = ejecucion({"catalogo": 10.0, "login": 100.0, "pdf": 50.0})
+    actual = ejecucion({"catalogo": 11.0, "login": 130.0, "checkout": 5.0})
+    actual["resultados"]["pdf"] = {"omitido": "WeasyPrint no disponible"}
+
+    filas = {f["escenario"]: f for f in nucleo.comparar(actual, base, tolerancia=0.2)}
+    # Solo se comparan los escenarios medidos en ambas ejecuciones
+    assert set(filas) == {"catalogo", "login"}
+    assert filas["catalogo"]["regresion"] is False
+    assert filas["login"]["regresion"] is True
+    assert filas["login"]["cambio"] == pytest.approx(0.3)
+
+
+def test_comparar_fallos_nuevos_son_regresion():
+    filas = nucleo.comparar(ejecucion({"login": 90.0}, fallos=2), ejecucion({"login": 100.0}))
+    assert filas[0]["regresion"] is True
+
+
+def test_comparar_exige_misma_escala():
+    with pytest.raises(ValueError):
+        nucleo.comparar(ejecucion({"login": 1.0}, escala="100k"), ejecucion({"login": 1.0}))
+
+
+def test_medir_cuenta_fallos():
+    respuestas = iter([True] * 3 + [True, False, True])
+    r = nucleo.medir(lambda: next(respuestas), repeticiones=3, calentamiento=3)
+    assert r["repeticiones"] == 3 and r["fallos"] == 1
+    assert r["min_ms"] <= r["mediana_ms"] <= r["max_ms"]
+
+
+def huella(semilla):
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
+    db.init_app(app)
+    with app.app_context():
+        db.create_all()
+        dim = datos.poblar("1k", semilla, ahora=datetime(2025, 1, 1))
+        return dim, (
+            Usuario.query.count(),
+            db.session.query(func.sum(Producto.precio)).scalar(),
+            db.session.query(func.sum(HistorialVenta.total_venta)).scalar(),
+            db.session.query(func.min(HistorialVenta.fecha_venta)).scalar(),
+        )
+
+
+# La misma semilla genera exactamente los mismos datos
+def test_datos_deterministas():
+    dim, primera = huella(7)
+    assert huella(7)[1] == primera
+    assert huella(8)[1] != primera
+    assert primera[0] == dim["usuarios"]
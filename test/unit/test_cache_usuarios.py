@@ -0,0 +1,59 @@
+import time
+import pytest
+from flask import Flask
+from app.extensions import db
+from app.models.usuario import Usuario
+from app.servicios.almacen import AlmacenMemoria
+from app.servicios import cache_usuarios
+from app.servicios.cache_usuarios import cargar_usuario, invalidar_usuario
+
+
+@pytest.fixture
+def app():
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
+    db.init_app(app)
+    cache_usuarios.cache.limpiar()
+    with app.app_context():
+        db.create_all()
+        usuario = Usuario(nombre="Ana Torres", email="ana.torres@gmail.com", rol="cliente", estado="activo")
+        db.session.add(usuario)
+        db.session.commit()
+        yield app
+    cache_usuarios.cache.limpiar()
+
+
+# Las entradas vencen al cumplirse su TTL
+def test_almacen_memoria_expira():
+    almacen = AlmacenMemoria()
+    almacen.guardar("clave", {"a": 1}, ttl=0.05)
+    assert almacen.obtener("clave") == {"a": 1}
+    time.sleep(0.06)
+    assert almacen.obtener("clave") is None
+
+
+# Con la capacidad llena se descarta la entrada más antigua
+def test_almacen_memoria_acotado():
+    almacen = AlmacenMemoria(capacidad=2)
+    for clave in ("a", "b", "c"):
+        almacen.guardar(clave, clave)
+    assert almacen.obtener("a") is None
+    assert almacen.obtener("c") == "c"
+
+
+# La segunda carga no consulta la BD hasta que se invalida
+def test_cargar_usuario_usa_cache(app):
+    usuario = Usuario.query.filter_by(email="ana.torres@gmail.com").first()
+    cargado = cargar_usuario(str(usuario.id))
+    assert (cargado.rol, cargado.is_active, cargado.get_id()) == ("cliente", True, str(usuario.id))
+
+    usuario.estado = "inactivo"
+    db.session.commit()
+    assert cargar_usuario(usuario.id).is_active
+
+    invalidar_usuario(usuario.id)
+    assert not cargar_usuario(usuario.id).is_active
+
+
+def test_cargar_usuario_inexistente(app):
+    assert cargar_usuario("999") is None
@@ -0,0 +1,127 @@
+import json
+import threading
+from types import SimpleNamespace
+import pytest
+from app.consumidores.correo_consumer import ManejadorCorreo
+from app.consumidores.idempotencia import AlmacenIdempotenciaMemoria
+from app.servicios import correos
+from app.servicios.correos import crear_mensaje, encolar_correo, renderizar
+from app.servicios.tareas import ColaTareas, tareas
+
+
+class SMTPFalso:
+    instancias = []
+
+    def __init__(self):
+        self.enviados = []
+        SMTPFalso.instancias.append(self)
+
+    def enviar(self, destinatarios, asunto, texto=None, html=None, remitente=None):
+        self.enviados.append((tuple(destinatarios), asunto, html))
+
+    def cerrar(self):
+        pass
+
+
+@pytest.fixture(autouse=True)
+def reiniciar():
+    SMTPFalso.instancias.clear()
+    yield
+    tareas.esperar(timeout=5)
+
+
+# Retiene los workers de la cola de tareas para que los correos se acumulen en un lote
+def bloquear_tareas():
+    liberar = threading.Event()
+    for _ in range(tareas.workers):
+        tareas.encolar(liberar.wait, 5)
+    return liberar
+
+
+def test_plantilla_bienvenida_escapa_html():
+    html = renderizar("bienvenida.html", {"nombre": "<b>Ana</b>", "email": "ana@gmail.com", "rol": "cliente"})
+    assert "&lt;b&gt;Ana&lt;/b&gt;" in html
+    assert "Cliente" in html
+
+
+# Varios correos encolados se publican en un solo lote
+def test_encolar_publica_en_lote(monkeypatch):
+    lotes = []
+    monkeypatch.setattr(correos, "publicar_mensajes", lambda cola, mensajes: lotes.append((cola, mensajes)))
+
+    liberar = bloquear_tareas()
+    for i in range(3):
+        assert encolar_correo("bienvenida.html", "Bienvenida", [f"user{i}@gmail.com"], nombre=f"User{i}")
+    liberar.set()
+    assert tareas.esperar(timeout=5)
+
+    assert len(lotes) == 1
+    cola, mensajes = lotes[0]
+    assert cola == "cola_correos"
+    assert [m["destinatarios"] for m, _ in mensajes] == [["user0@gmail.com"], ["user1@gmail.com"], ["user2@gmail.com"]]
+    assert all(message_id == m["correo_id"] for m, message_id in mensajes)
+
+
+# Sin RabbitMQ el lote se envía directamente con una sola conexión SMTP
+def test_envio_directo_si_falla_rabbitmq(monkeypatch):
+    def sin_rabbitmq(cola, mensajes):
+        raise ConnectionError("RabbitMQ caído")
+
+    monkeypatch.setattr(correos, "publicar_mensajes", sin_rabbitmq)
+    monkeypatch.setattr(correos, "ClienteSMTP", SMTPFalso)
+
+    liberar = bloquear_tareas()
+    encolar_correo("bienvenida.html", "Bienvenida", ["ana@gmail.com"], nombre="Ana", email="ana@gmail.com", rol="cliente")
+    encolar_correo("bienvenida.html", "Bienvenida", ["luis@gmail.com"], nombre="Luis", email="luis@gmail.com", rol="cliente")
+    liberar.set()
+    assert tareas.esperar(timeout=5)
+
+    assert len(SMTPFalso.instancias) == 1
+    assert [d for d, _, _ in SMTPFalso.instancias[0].enviados] == [("ana@gmail.com",), ("luis@gmail.com",)]
+
+
+# Si no se puede programar la entrega, los pendientes se descartan y el siguiente correo reprograma
+def test_encolar_reprograma_tras_fallo(monkeypatch):
+    lotes = []
+    monkeypatch.setattr(correos, "publicar_mensajes", lambda cola, mensajes: lotes.append(mensajes))
+    monkeypatch.setattr(tareas, "encolar", lambda *a, **k: False)
+    assert not encolar_correo("bienvenida.html", "Bienvenida", ["ana@gmail.com"], nombre="Ana")
+    assert correos._pendientes == [] and not correos._programado
+
+    monkeypatch.undo()
+    monkeypatch.setattr(correos, "publicar_mensajes", lambda cola, mensajes: lotes.append(mensajes))
+    assert encolar_correo("bienvenida.html", "Bienvenida", ["luis@gmail.com"], nombre="Luis")
+    assert tareas.esperar(timeout=5)
+    assert [[m["destinatarios"] for m, _ in lote] for lote in lotes] == [[["luis@gmail.com"]]]
+
+
+# El consumidor envía una sola vez aunque el mensaje se redistribuya
+def test_manejador_correo_idempotente():
+    canal = SimpleNamespace(acks=[], basic_ack=lambda tag: canal.acks.append(tag))
+    recursos = SimpleNamespace(smtp=SMTPFalso())
+    manejador = ManejadorCorreo(recursos, idempotencia=AlmacenIdempotenciaMemoria())
+    body = json.dumps(crear_mensaje("bienvenida.html", "Bienvenida", ["ana@gmail.com"], nombre="Ana"))
+
+    for tag in (1, 2):
+        manejador(canal, SimpleNamespace(delivery_tag=tag), SimpleNamespace(headers={}), body)
+
+    assert canal.acks == [1, 2]
+    assert len(recursos.smtp.enviados) == 1
+    assert "Ana" in recursos.smtp.enviados[0][2]
+
+
+def test_cola_tareas_acotada():
+    cola = ColaTareas("prueba", workers=1, max_pendientes=1)
+    liberar = threading.Event()
+    ocupado = threading.Event()
+
+    def bloquear():
+        ocupado.set()
+        liberar.wait(5)
+    assert cola.encolar(bloquear)
+    # Con el worker ocupado cabe una tarea pendiente y la siguiente se rechaza
+    assert ocupado.wait(5)
+    assert cola.encolar(liberar.wait, 5) is True
+    assert cola.encolar(liberar.wait, 5) is False
+    liberar.set()
+    assert cola.esperar(timeout=5)
@@ -0,0 +1,41 @@
+import random
+from collections import Counter
+import pytest
+from test.load.escenarios.config import (MEZCLAS, SelectorProductos, cargar_credenciales,
+                                         parsear_espera, parsear_mezcla)
+
+
+def test_parsear_mezcla():
+    assert parsear_mezcla(None) == MEZCLAS["mixta"]
+    assert parsear_mezcla("compras") == MEZCLAS["compras"]
+    assert parsear_mezcla("navegar=5, comprar=4,pdf=0") == {"navegar": 5, "comprar": 4, "pdf": 0}
+    with pytest.raises(ValueError):
+        parsear_mezcla("navegar=5,saltar=1")
+    with pytest.raises(ValueError):
+        parsear_mezcla("navegar=0")
+
+
+def test_parsear_espera():
+    assert parsear_espera(None) == (1.0, 3.0)
+    assert parsear_espera("0.5") == (0.5, 0.5)
+
+
+def test_cargar_credenciales(tmp_path):
+    ruta = tmp_path / "usuarios.csv"
+    ruta.write_text("email,password\nana@ejemplo.com,\nluis@ejemplo.com,Otra2025!\n", encoding="utf-8")
+    assert cargar_credenciales(ruta, "Cliente2025!") == [
+        ("ana@ejemplo.com", "Cliente2025!"), ("luis@ejemplo.com", "Otra2025!")]
+
+    vacio = tmp_path / "vacio.csv"
+    vacio.write_text("email,password\n", encoding="utf-8")
+    with pytest.raises(ValueError):
+        cargar_credenciales(vacio, "x")
+
+
+# Los primeros ids concentran las compras; con s=0 el reparto es uniforme
+def test_selector_productos():
+    conteo = Counter(SelectorProductos(100, 1.1, random.Random(1)).elegir(5000))
+    assert set(conteo) <= set(range(1, 101))
+    assert conteo[1] > 10 * conteo[50]
+    uniforme = Counter(SelectorProductos(10, 0, random.Random(1)).elegir(5000))
+    assert max(uniforme.values()) < 2 * min(uniforme.values())
@@ -0,0 +1,84 @@
+from datetime import datetime
+import pytest
+from flask import Flask
+from sqlalchemy import func
+from app.extensions import db
+from app.models.compra import Compra
+from app.models.compra_producto import CompraProducto
+from app.models.historial_ventas import HistorialVenta
+from app.models.producto import Producto
+from app.models.usuario import Usuario
+from app.servicios.generador_datos import SelectorZipf, generar_datos
+
+AHORA = datetime(2025, 6, 30, 18, 0)
+
+
+@pytest.fixture
+def app():
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
+    db.init_app(app)
+    with app.app_context():
+        db.create_all()
+        yield app
+
+
+def test_generar_datos_consistentes(app):
+    resultado = generar_datos(usuarios=200, categorias=5, productos=100, compras=2000, dias=30, ahora=AHORA)
+
+    assert Usuario.query.count() == 200
+    assert Producto.query.count() == 100
+    assert Compra.query.count() == 2000
+    assert CompraProducto.query.count() == HistorialVenta.query.count() == resultado["compra_producto"]
+    assert resultado["compra_producto"] >= 2000
+
+    # Toda línea apunta a una compra y un producto existentes
+    huerfanas = (CompraProducto.query.outerjoin(Producto, CompraProducto.producto_id == Producto.id)
+                 .filter(Producto.id.is_(None)).count())
+    assert huerfanas == 0
+    # Cada venta guarda el vendedor de su producto
+    distinto_vendedor = (HistorialVenta.query.join(Producto, HistorialVenta.producto_id == Producto.id)
+                         .filter(HistorialVenta.vendedor_id != Producto.cliente_id).count())
+    assert distinto_vendedor == 0 and HistorialVenta.query.filter_by(vendedor_id=None).count() == 0
+    # El total de cada compra coincide con la suma de sus ventas
+    compra = db.session.get(Compra, 1)
+    ventas = db.session.query(func.sum(HistorialVenta.total_venta)).filter(
+        HistorialVenta.cliente_id == compra.cliente_id, HistorialVenta.fecha_venta == compra.fecha).scalar()
+    assert ventas == pytest.approx(compra.total)
+    # Fechas dentro de la ventana pedida
+    assert db.session.query(func.max(Compra.fecha)).scalar() <= AHORA
+    assert db.session.query(func.min(Compra.fecha)).scalar() >= datetime(2025, 6, 1)
+    # Boletas con DNI y facturas con RUC
+    assert Compra.query.filter(Compra.tipo_comprobante_id == 1, Compra.dni.is_(None)).count() == 0
+    assert Compra.query.filter(Compra.tipo_comprobante_id == 2, Compra.ruc.is_(None)).count() == 0
+
+
+# La popularidad está concentrada: el producto más vendido supera con creces el promedio
+def test_popularidad_zipf(app):
+    generar_datos(usuarios=100, categorias=5, productos=200, compras=3000, ahora=AHORA)
+    conteos = [n for (n,) in db.session.query(func.count()).select_from(CompraProducto)
+               .group_by(CompraProducto.producto_id).order_by(func.count().desc())]
+    promedio = sum(conteos) / 200
+    assert conteos[0] > 10 * promedio
+
+
+def test_selector_zipf_reproducible():
+    import random
+    a = SelectorZipf(range(1, 51), 1.2, random.Random(3)).elegir(100)
+    b = SelectorZipf(range(1, 51), 1.2, random.Random(3)).elegir(100)
+    assert a == b and set(a) <= set(range(1, 51))
+
+
+# Una segunda ejecución añade filas a continuación de las existentes
+def test_generar_datos_incremental(app):
+    generar_datos(usuarios=20, categorias=3, productos=10, compras=50, ahora=AHORA)
+    generar_datos(usuarios=20, categorias=3, productos=10, compras=50, semilla=7, ahora=AHORA)
+    assert Usuario.query.count() == 40
+    assert Producto.query.count() == 20
+    assert Compra.query.count() == 100
+    assert db.session.query(func.count(func.distinct(Usuario.email))).scalar() == 40
+
+
+def test_generar_datos_requiere_dependencias(app):
+    with pytest.raises(ValueError):
+        generar_datos(usuarios=0, categorias=0, productos=10, compras=0)
@@ -0,0 +1,52 @@
+import pytest
+from werkzeug.security import generate_password_hash
+from app.models.usuario import Usuario
+from app.servicios.hashing import HashingSaturado, ServicioHashing, hashing, normalizar_metodo
+
+METODO_RAPIDO = "pbkdf2:sha256:1000"
+
+
+def test_normalizar_metodo():
+    assert normalizar_metodo("scrypt") == "scrypt:32768:8:1"
+    assert normalizar_metodo(METODO_RAPIDO) == METODO_RAPIDO
+    assert normalizar_metodo("pbkdf2:sha512").startswith("pbkdf2:sha512:")
+
+
+# Sin workers se calcula en línea
+def test_hash_en_linea():
+    servicio = ServicioHashing(metodo=METODO_RAPIDO, workers=0)
+    password_hash = servicio.generar("Secreta2025!")
+
+    assert password_hash.startswith(METODO_RAPIDO + "$")
+    assert servicio.verificar(password_hash, "Secreta2025!")
+    assert not servicio.verificar(password_hash, "otra")
+
+
+# Con workers el hash se calcula en el pool de procesos
+def test_hash_en_pool():
+    servicio = ServicioHashing(metodo=METODO_RAPIDO, workers=1)
+    try:
+        assert servicio.verificar(servicio.generar("Secreta2025!"), "Secreta2025!")
+    finally:
+        servicio.cerrar()
+
+
+# Con la cola llena se rechaza en lugar de bloquear el hilo indefinidamente
+def test_cola_llena_rechaza():
+    servicio = ServicioHashing(metodo=METODO_RAPIDO, workers=1, max_pendientes=1, espera_max=0)
+    servicio._cupos.acquire()
+    with pytest.raises(HashingSaturado):
+        servicio.generar("Secreta2025!")
+
+
+# Un login correcto regenera el hash si cambió el coste configurado
+def test_rehash_al_cambiar_coste(monkeypatch):
+    monkeypatch.setattr(hashing, "metodo", METODO_RAPIDO)
+    usuario = Usuario(nombre="Ana", email="ana@gmail.com")
+    usuario.password_hash = generate_password_hash("Secreta2025!", "pbkdf2:sha256:500")
+
+    assert usuario.check_password("Secreta2025!")
+    assert usuario.actualizar_hash("Secreta2025!")
+    assert usuario.password_hash.startswith(METODO_RAPIDO + "$")
+    assert usuario.check_password("Secreta2025!")
+    assert not usuario.actualizar_hash("Secreta2025!")
@@ -0,0 +1,142 @@
+import json
+from types import SimpleNamespace
+import pytest
+from flask import Flask
+from app.extensions import db
+from app.consumidores.boleta_consumer import ManejadorBoleta
+from app.consumidores.idempotencia import AlmacenIdempotenciaMemoria, AlmacenIdempotenciaBD
+from app.servicios.colas import contar_intentos, rechazar_mensaje
+
+
+class CanalFalso:
+    def __init__(self):
+        self.acks = []
+        self.nacks = []
+        self.publicados = []
+
+    def basic_ack(self, delivery_tag):
+        self.acks.append(delivery_tag)
+
+    def basic_nack(self, delivery_tag, requeue=True):
+        self.nacks.append((delivery_tag, requeue))
+
+    def basic_publish(self, exchange, routing_key, body, properties=None):
+        self.publicados.append(routing_key)
+
+
+def propiedades(muertes=0):
+    headers = {"x-death": [{"queue": "cola_boletas", "reason": "rejected", "count": muertes}]} if muertes else {}
+    return SimpleNamespace(headers=headers)
+
+
+# El almacén en memoria recuerda las claves y descarta las más antiguas
+def test_almacen_memoria_acotado():
+    almacen = AlmacenIdempotenciaMemoria(capacidad=2)
+    almacen.marcar("cola_boletas", 1)
+    almacen.marcar("cola_boletas", 2)
+    almacen.marcar("cola_boletas", 3)
+
+    assert almacen.ya_procesado("cola_boletas", 3)
+    assert not almacen.ya_procesado("cola_boletas", 1)
+    assert not almacen.ya_procesado("cola_facturas", 3)
+
+
+# El almacén en BD tolera marcar dos veces la misma clave
+def test_almacen_base_datos(tmp_path):
+    url = f"sqlite:///{tmp_path / 'idempotencia.db'}"
+    app = Flask(__name__)
+    app.config["SQLALCHEMY_DATABASE_URI"] = url
+    db.init_app(app)
+    with app.app_context():
+        db.create_all()
+
+    almacen = AlmacenIdempotenciaBD(url)
+    assert not almacen.ya_procesado("cola_facturas", 10)
+    almacen.marcar("cola_facturas", 10)
+    almacen.marcar("cola_facturas", 10)
+    assert AlmacenIdempotenciaBD(url).ya_procesado("cola_facturas", 10)
+
+
+# Los intentos se cuentan desde la cabecera x-death
+def test_contar_intentos():
+    assert contar_intentos(propiedades(0), "cola_boletas") == 0
+    assert contar_intentos(propiedades(3), "cola_boletas") == 3
+    assert contar_intentos(propiedades(3), "cola_facturas") == 0
+
+
+# Un fallo se reintenta con nack; agotados los intentos va a la cola de fallidos
+def test_rechazar_mensaje_reintento_y_fallidos():
+    canal = CanalFalso()
+    metodo = SimpleNamespace(delivery_tag=7)
+
+    assert rechazar_mensaje(canal, metodo, propiedades(0), b"{}", "cola_boletas", max_intentos=3) == "reintento"
+    assert canal.nacks == [(7, False)]
+
+    assert rechazar_mensaje(canal, metodo, propiedades(2), b"{}", "cola_boletas", max_intentos=3) == "fallido"
+    assert canal.publicados == ["cola_boletas.fallidos"]
+    assert canal.acks == [7]
+
+
+class RecursosFalsos:
+    def __init__(self, fallo_smtp=False):
+        self.fallo_smtp = fallo_smtp
+        self.llamadas = {"dni": 0, "correo": 0}
+
+    def post_json(self, url, payload):
+        self.llamadas["dni"] += 1
+        return {"data": {"nombres": "ANA"}}
+
+    def enviar_correo(self, destino, asunto, cuerpo):
+        if self.fallo_smtp:
+            raise ConnectionError("SMTP caído")
+        self.llamadas["correo"] += 1
+
+
+def crear_manejador(recursos):
+    registro = SimpleNamespace(registrar=lambda data: None)
+    return ManejadorBoleta(recursos, registro=registro, idempotencia=AlmacenIdempotenciaMemoria())
+
+
+def mensaje_boleta(compra_id):
+    return json.dumps({"compra_id": compra_id, "tipo_comprobante": "boleta", "dni": "72257140",
+                       "email_destino": "ana@gmail.com", "total": 20})
+
+
+# Un mensaje redistribuido no vuelve a consultar el DNI ni a enviar el correo
+def test_callback_no_reprocesa_duplicados():
+    recursos = RecursosFalsos()
+    manejador = crear_manejador(recursos)
+    canal = CanalFalso()
+    for tag in (1, 2):
+        manejador(canal, SimpleNamespace(delivery_tag=tag), propiedades(0), mensaje_boleta(99))
+
+    assert recursos.llamadas == {"dni": 1, "correo": 1}
+    assert canal.acks == [1, 2]
+
+
+# Si el SMTP falla, el mensaje va a reintento en lugar de confirmarse
+def test_callback_fallo_smtp_reintenta():
+    manejador = crear_manejador(RecursosFalsos(fallo_smtp=True))
+    canal = CanalFalso()
+    manejador(canal, SimpleNamespace(delivery_tag=5), propiedades(0), mensaje_boleta(100))
+
+    assert canal.acks == []
+    assert canal.nacks == [(5, False)]
+    assert not manejador.idempotencia.ya_procesado("cola_boletas", 100)
+
+
+# Si no se puede guardar el comprobante, no se envía el correo y el mensaje va a reintento
+def test_callback_fallo_registro_reintenta():
+    def registrar(data):
+        raise IOError("sin conexión")
+
+    recursos = RecursosFalsos()
+    manejador = ManejadorBoleta(recursos, registro=SimpleNamespace(registrar=registrar),
+                                idempotencia=AlmacenIdempotenciaMemoria())
+    canal = CanalFalso()
+    manejador(canal, SimpleNamespace(delivery_tag=6), propiedades(0), mensaje_boleta(101))
+
+    assert recursos.llamadas["correo"] == 0
+    assert canal.acks == []
+    assert canal.nacks == [(6, False)]
+    assert not manejador.idempotencia.ya_procesado("cola_boletas", 101)
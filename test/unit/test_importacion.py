@@ -0,0 +1,131 @@
+import io
+import pytest
+from flask import Flask
+from sqlalchemy import event, insert
+from app.extensions import db
+from app.models.usuario import Usuario
+from app.servicios import importacion
+from app.servicios.importacion import cambiar_estado_masivo, importar_clientes, leer_filas
+
+CSV = """nombre,email,estado,password
+Ana Torres,ana@gmail.com,activo,
+Luis Díaz,LUIS@gmail.com,inactivo,
+Repetida,ana@gmail.com,activo,
+Sin Email,,activo,
+Existente,existente@gmail.com,activo,
+Eva Ruiz,eva@gmail.com,suspendido,
+Rosa Paz,rosa@gmail.com,,
+"""
+
+
+@pytest.fixture
+def app(monkeypatch, tmp_path):
+    app = Flask(__name__)
+    # En archivo para que otra conexión pueda registrar usuarios en medio de una importación
+    app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{tmp_path / 'importacion.db'}"
+    db.init_app(app)
+    correos = []
+    monkeypatch.setattr(importacion, "encolar_correo", lambda plantilla, asunto, destinos, **ctx: correos.append(destinos[0]))
+    app.correos = correos
+    with app.app_context():
+        db.create_all()
+        db.session.add(Usuario(nombre="Existente", email="existente@gmail.com", rol="cliente"))
+        db.session.commit()
+        yield app
+
+
+def contar_consultas(funcion):
+    consultas = []
+    listener = lambda conn, cursor, statement, *args: consultas.append(statement)
+    event.listen(db.engine, "before_cursor_execute", listener)
+    try:
+        return funcion(), consultas
+    finally:
+        event.remove(db.engine, "before_cursor_execute", listener)
+
+
+# Valida, deduplica contra el archivo y la BD, e inserta por lotes
+def test_importar_csv(app):
+    filas = leer_filas(io.BytesIO(CSV.encode()), "csv")
+    resultado, consultas = contar_consultas(lambda: importar_clientes(filas, tamano_lote=2))
+
+    assert (resultado["procesados"], resultado["creados"], resultado["duplicados"], resultado["invalidos"]) == (7, 3, 2, 2)
+    assert [e["fila"] for e in resultado["errores"]] == [4, 6]
+    assert Usuario.query.filter_by(email="luis@gmail.com").one().estado == "inactivo"
+    assert app.correos == ["ana@gmail.com", "luis@gmail.com", "rosa@gmail.com"]
+    # Una consulta de duplicados y un INSERT por lote de 2 filas válidas
+    assert sum(sql.lstrip().upper().startswith("SELECT") for sql in consultas) == 2
+    assert sum(sql.lstrip().upper().startswith("INSERT") for sql in consultas) == 2
+
+
+def test_importar_jsonl_con_password(app):
+    contenido = b'{"nombre": "Ana", "email": "ana@gmail.com", "password": "Clave2025!"}\nno es json\n'
+    resultado = importar_clientes(leer_filas(contenido, "jsonl"))
+
+    assert (resultado["creados"], resultado["invalidos"]) == (1, 1)
+    assert Usuario.query.filter_by(email="ana@gmail.com").one().check_password("Clave2025!")
+
+
+# El cambio de estado masivo es un solo UPDATE y no toca administradores
+def test_cambiar_estado_masivo(app):
+    admin = Usuario(nombre="Admin", email="admin@gmail.com", rol="administrador")
+    db.session.add(admin)
+    db.session.commit()
+    ids = [u.id for u in Usuario.query.all()]
+
+    actualizados, consultas = contar_consultas(lambda: cambiar_estado_masivo(ids, "inactivo"))
+    assert actualizados == 1
+    assert [sql.split()[0].upper() for sql in consultas] == ["UPDATE"]
+    db.session.expire_all()
+    assert db.session.get(Usuario, admin.id).estado == "activo"
+
+
+# Los emails ya registrados se comparan sin distinguir mayúsculas
+def test_importar_email_registrado_con_mayusculas(app):
+    db.session.add(Usuario(nombre="Mixto", email="Mixto@Gmail.com", rol="cliente"))
+    db.session.commit()
+    resultado = importar_clientes([{"nombre": "Mixto", "email": "mixto@gmail.com"}])
+
+    assert (resultado["creados"], resultado["duplicados"]) == (0, 1)
+    assert Usuario.query.count() == 2
+
+
+# Si otro proceso registra un email del lote antes del INSERT, el lote se reintenta sin él
+def test_importar_lote_con_registro_concurrente(app):
+    registrado = []
+
+    def registrar_antes(conn, cursor, statement, *args):
+        if statement.lstrip().upper().startswith("INSERT") and not registrado:
+            registrado.append(True)
+            with db.engine.begin() as otra:
+                otra.execute(insert(Usuario), {"nombre": "Otra", "email": "rosa@gmail.com", "rol": "cliente"})
+
+    event.listen(db.engine, "before_cursor_execute", registrar_antes)
+    try:
+        resultado = importar_clientes([{"nombre": "Rosa", "email": "rosa@gmail.com"}, {"nombre": "Eva", "email": "eva@gmail.com"}])
+    finally:
+        event.remove(db.engine, "before_cursor_execute", registrar_antes)
+
+    assert (resultado["creados"], resultado["duplicados"]) == (1, 1)
+    assert app.correos == ["eva@gmail.com"]
+    assert Usuario.query.filter_by(email="rosa@gmail.com").one().nombre == "Otra"
+
+
+# El índice único sobre lower(email) también cubre un registro concurrente con otras mayúsculas
+def test_importar_lote_con_registro_concurrente_mayusculas(app):
+    registrado = []
+
+    def registrar_antes(conn, cursor, statement, *args):
+        if statement.lstrip().upper().startswith("INSERT") and not registrado:
+            registrado.append(True)
+            with db.engine.begin() as otra:
+                otra.execute(insert(Usuario), {"nombre": "Otra", "email": "Rosa@Gmail.com", "rol": "cliente"})
+
+    event.listen(db.engine, "before_cursor_execute", registrar_antes)
+    try:
+        resultado = importar_clientes([{"nombre": "Rosa", "email": "rosa@gmail.com"}])
+    finally:
+        event.remove(db.engine, "before_cursor_execute", registrar_antes)
+
+    assert (resultado["creados"], resultado["duplicados"]) == (0, 1)
+    assert Usuario.query.filter(db.func.lower(Usuario.email) == "rosa@gmail.com").count() == 1
@@ -0,0 +1,104 @@
+import pytest
+from flask import Flask
+from sqlalchemy import event, update
+from sqlalchemy.orm import Session
+from werkzeug.http import parse_etags
+from app.extensions import db
+from app.models.producto import Producto
+from app.models.tipo_comprobante import TipoComprobante
+from app.models.usuario import Usuario
+from app.servicios import inventario
+from app.servicios.compras import ErrorCompra, registrar_compra
+from app.servicios.inventario import ConflictoVersion
+
+
+@pytest.fixture
+def app(tmp_path):
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{tmp_path / 'inventario.db'}"
+    app.config['TESTING'] = True
+    db.init_app(app)
+    with app.app_context():
+        db.create_all()
+        db.session.add_all([Usuario(id=1, nombre="Ana", email="ana@gmail.com", rol="cliente"),
+                            TipoComprobante(id=1, nombre="boleta")])
+        db.session.flush()
+        db.session.add(Producto(id=1, nombre="Teclado", precio=50, stock=10, cliente_id=1))
+        db.session.commit()
+        yield app
+
+
+# Cambia el producto desde otra conexión justo antes del próximo flush de la sesión
+def _cambio_concurrente(**valores):
+    def cambiar(session, flush_context, instances):
+        with db.engine.begin() as conexion:
+            conexion.execute(update(Producto).where(Producto.id == 1)
+                             .values(version=Producto.version + 1, **valores))
+    event.listen(Session, "before_flush", cambiar, once=True)
+    return cambiar
+
+
+def test_version_sube_en_cada_actualizacion(app):
+    with app.app_context():
+        producto = db.session.get(Producto, 1)
+        assert producto.version == 1
+        inventario.actualizar_producto(1, {"precio": 45}, version_esperada=1)
+        assert db.session.get(Producto, 1).version == 2
+
+
+def test_version_esperada_distinta_es_conflicto(app):
+    with app.app_context():
+        inventario.actualizar_producto(1, {"precio": 45})
+        with pytest.raises(ConflictoVersion) as error:
+            inventario.actualizar_producto(1, {"stock": 3}, version_esperada=1)
+        assert error.value.producto.version == 2
+        assert db.session.get(Producto, 1).stock == 10
+
+
+def test_cambio_entre_lectura_y_commit(app):
+    with app.app_context():
+        # Con versión esperada: el cambio concurrente se detecta, no se pisa
+        _cambio_concurrente(stock=7)
+        with pytest.raises(ConflictoVersion):
+            inventario.actualizar_producto(1, {"stock": 20}, version_esperada=1)
+        producto = db.session.get(Producto, 1, populate_existing=True)
+        assert (producto.stock, producto.version) == (7, 2)
+
+        # Sin versión esperada: se vuelve a leer y se reintenta
+        _cambio_concurrente(precio=60)
+        producto = inventario.actualizar_producto(1, {"nombre": "Teclado RGB"})
+        assert (producto.nombre, producto.precio, producto.version) == ("Teclado RGB", 60, 4)
+
+
+def test_descontar_stock_condicional(app):
+    with app.app_context():
+        producto = db.session.get(Producto, 1)
+        assert inventario.descontar_stock(1, 4)
+        assert not inventario.descontar_stock(1, 7)
+        db.session.commit()
+        assert (producto.stock, producto.version) == (6, 2)
+
+
+def test_compra_invalida_la_edicion_basada_en_stock_anterior(app):
+    with app.app_context():
+        version_formulario = db.session.get(Producto, 1).version
+        registrar_compra(1, "boleta", {"1": 2}, "ana@gmail.com", dni="12345678")
+        with pytest.raises(ConflictoVersion):
+            inventario.actualizar_producto(1, {"stock": 10}, version_esperada=version_formulario)
+        assert db.session.get(Producto, 1).stock == 8
+
+
+def test_compra_sin_stock_tras_la_lectura(app):
+    with app.app_context():
+        # Otra compra se lleva el stock entre la validación y el descuento
+        _cambio_concurrente(stock=1)
+        with pytest.raises(ErrorCompra):
+            registrar_compra(1, "boleta", {"1": 5}, "ana@gmail.com", dni="12345678")
+        assert db.session.get(Producto, 1, populate_existing=True).stock == 1
+
+
+def test_version_de_if_match():
+    assert inventario.version_de_if_match(parse_etags('"3"')) == 3
+    assert inventario.version_de_if_match(parse_etags('W/"4"')) == 4
+    assert inventario.version_de_if_match(parse_etags('*')) is None
+    assert inventario.version_de_if_match(parse_etags('')) is None
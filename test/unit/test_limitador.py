@@ -0,0 +1,63 @@
+import pytest
+from flask import Flask, jsonify
+from app.servicios import limitador
+from app.servicios.limitador import CubetasMemoria, Regla, limitar, parsear_limite, por_email, por_ip
+
+
+@pytest.fixture(autouse=True)
+def limpiar_cubetas():
+    limitador.backend.limpiar()
+    yield
+    limitador.backend.limpiar()
+
+
+def test_parsear_limite():
+    assert parsear_limite("5/60") == (5, 60.0)
+
+
+# La cubeta permite la ráfaga y luego indica cuánto esperar
+def test_cubeta_rafaga_y_espera():
+    cubetas = CubetasMemoria()
+    resultados = [cubetas.consumir("ip:1", capacidad=3, tasa=1.0) for _ in range(4)]
+
+    assert [permitido for permitido, _ in resultados] == [True, True, True, False]
+    assert 0 < resultados[-1][1] <= 1.0
+    assert cubetas.consumir("ip:2", capacidad=3, tasa=1.0)[0]
+
+
+@pytest.fixture
+def app():
+    app = Flask(__name__)
+    app.config["LIMITADOR_ACTIVO"] = True
+
+    @app.route("/login", methods=["POST"])
+    @limitar(Regla("prueba_ip", "3/60", por_ip), Regla("prueba_email", "2/60", por_email))
+    def login():
+        return jsonify({"msg": "ok"})
+
+    return app
+
+
+# Superado el límite por email se responde 429 con Retry-After sin ejecutar la vista
+def test_limite_por_email(app):
+    client = app.test_client()
+    codigos = [client.post("/login", json={"email": "Ana@gmail.com"}).status_code for _ in range(3)]
+
+    assert codigos == [200, 200, 429]
+    res = client.post("/login", json={"email": "ana@gmail.com"})
+    assert res.status_code == 429
+    assert int(res.headers["Retry-After"]) >= 1
+
+
+# Con otros emails sigue aplicando el límite por IP
+def test_limite_por_ip(app):
+    client = app.test_client()
+    codigos = [client.post("/login", json={"email": f"user{i}@gmail.com"}).status_code for i in range(4)]
+    assert codigos == [200, 200, 200, 429]
+
+
+def test_desactivado_en_testing(app):
+    app.config.pop("LIMITADOR_ACTIVO")
+    app.testing = True
+    client = app.test_client()
+    assert all(client.post("/login", json={"email": "ana@gmail.com"}).status_code == 200 for _ in range(5))
@@ -0,0 +1,80 @@
+import urllib.request
+import pytest
+from flask import Flask, jsonify
+from app.servicios import metricas
+from app.servicios.metricas import RegistroMetricas, iniciar_servidor_metricas
+
+
+@pytest.fixture(autouse=True)
+def limpiar_registro():
+    metricas.registro.limpiar()
+    yield
+    metricas.registro.limpiar()
+
+
+# El contador se expone con sus etiquetas en formato Prometheus
+def test_contador_formato_texto():
+    registro = RegistroMetricas()
+    compras = registro.contador("compras_total", "Compras", ("tipo_comprobante",))
+    compras.inc(tipo_comprobante="boleta")
+    compras.inc(2, tipo_comprobante="factura")
+
+    texto = registro.exponer()
+    assert "# TYPE compras_total counter" in texto
+    assert 'compras_total{tipo_comprobante="boleta"} 1' in texto
+    assert 'compras_total{tipo_comprobante="factura"} 2' in texto
+
+
+# El histograma acumula las cubetas y expone _count y _sum
+def test_histograma_cubetas_acumuladas():
+    registro = RegistroMetricas()
+    latencia = registro.histograma("latencia", "Latencia", ("cola",), limites=(0.1, 1.0))
+    latencia.observar(0.05, cola="boletas")
+    latencia.observar(0.5, cola="boletas")
+    latencia.observar(3, cola="boletas")
+
+    texto = registro.exponer()
+    assert 'latencia_bucket{cola="boletas",le="0.1"} 1' in texto
+    assert 'latencia_bucket{cola="boletas",le="1.0"} 2' in texto
+    assert 'latencia_bucket{cola="boletas",le="+Inf"} 3' in texto
+    assert 'latencia_count{cola="boletas"} 3' in texto
+
+
+# Las etiquetas deben coincidir con las declaradas
+def test_etiquetas_invalidas():
+    registro = RegistroMetricas()
+    contador = registro.contador("errores_total", "Errores", ("cola",))
+    with pytest.raises(ValueError):
+        contador.inc(fase="smtp")
+
+
+# La app Flask registra la latencia por ruta y la expone en /metrics
+def test_endpoint_metrics_flask():
+    app = Flask(__name__)
+    metricas.init_app(app)
+
+    @app.route("/ping")
+    def ping():
+        return jsonify({"ok": True})
+
+    client = app.test_client()
+    client.get("/ping")
+    res = client.get("/metrics")
+
+    assert res.status_code == 200
+    assert res.content_type.startswith("text/plain")
+    assert 'tienda_http_peticion_segundos_count{endpoint="ping",metodo="GET",estado="200"} 1' in res.get_data(as_text=True)
+
+
+# El servidor de los consumidores se puede consultar localmente
+def test_servidor_metricas_consumidor():
+    metricas.PROCESAMIENTO_CONSUMIDOR.observar(0.2, cola="cola_boletas", fase="smtp")
+    servidor = iniciar_servidor_metricas(0, host="127.0.0.1")
+    try:
+        puerto = servidor.server_address[1]
+        with urllib.request.urlopen(f"http://127.0.0.1:{puerto}/metrics") as res:
+            texto = res.read().decode("utf-8")
+        assert 'tienda_consumidor_procesamiento_segundos_count{cola="cola_boletas",fase="smtp"} 1' in texto
+    finally:
+        servidor.shutdown()
+        servidor.server_close()
@@ -0,0 +1,38 @@
+import pytest
+from flask import Flask
+from app.extensions import db
+from app.models.usuario import Usuario
+from app.servicios import paginacion
+from app.servicios.paginacion import contar_acotado, paginar, patron_prefijo
+
+
+@pytest.fixture
+def app():
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
+    db.init_app(app)
+    with app.app_context():
+        db.create_all()
+        db.session.add_all([Usuario(nombre=f"U{i}", email=f"u{i}@gmail.com") for i in range(12)])
+        db.session.commit()
+        yield app
+
+
+def test_patron_prefijo_escapa_comodines():
+    assert patron_prefijo("Ana_%") == "ana\\_\\%%"
+
+
+def test_paginar(app):
+    pagina = paginar(Usuario.query.order_by(Usuario.id), pagina=3, por_pagina=5)
+    assert [u.nombre for u in pagina.items] == ["U10", "U11"]
+    assert (pagina.total, pagina.paginas, pagina.estimado) == (12, 3, False)
+    assert pagina.hay_anterior and not pagina.hay_siguiente
+
+
+# El conteo se corta en el límite y se marca como estimado
+def test_conteo_acotado(app, monkeypatch):
+    assert contar_acotado(Usuario.query, limite=5) == 6
+    monkeypatch.setattr(paginacion, "CONTEO_MAXIMO", 5)
+    pagina = paginar(Usuario.query.order_by(Usuario.id), por_pagina=5)
+    assert pagina.estimado
+    assert pagina.hay_siguiente
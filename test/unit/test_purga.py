@@ -0,0 +1,150 @@
+import pytest
+from flask import Flask
+from app.extensions import db
+from app.models.compra import Compra
+from app.models.compra_producto import CompraProducto
+from app.models.historial_ventas import HistorialVenta
+from app.models.producto import Producto
+from app.models.purga_pendiente import PurgaPendiente
+from app.models.tipo_comprobante import TipoComprobante
+from app.models.usuario import Usuario
+from app.servicios import purga
+from app.servicios.tareas import tareas
+
+
+@pytest.fixture
+def app(tmp_path):
+    app = Flask(__name__)
+    # Archivo y no :memory: para que el hilo de fondo vea los mismos datos
+    app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{tmp_path / 'purga.db'}"
+    db.init_app(app)
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+
+
+# Cliente con productos propios, compras y ventas; otro cliente le compra uno de sus productos
+def poblar(n_productos=5, n_compras=4):
+    tipo = TipoComprobante(nombre="boleta")
+    vendedor = Usuario(nombre="Vendedor", email="vendedor@gmail.com", rol="cliente")
+    comprador = Usuario(nombre="Comprador", email="comprador@gmail.com", rol="cliente")
+    db.session.add_all([tipo, vendedor, comprador])
+    db.session.flush()
+
+    productos = [Producto(nombre=f"P{i}", precio=10, stock=5, cliente_id=vendedor.id) for i in range(n_productos)]
+    ajeno = Producto(nombre="Ajeno", precio=5, stock=5, cliente_id=comprador.id)
+    db.session.add_all(productos + [ajeno])
+    db.session.flush()
+
+    for _ in range(n_compras):
+        compra = Compra(cliente_id=vendedor.id, tipo_comprobante_id=tipo.id, total=5, dni="12345678", email_destino="v@gmail.com")
+        db.session.add(compra)
+        db.session.flush()
+        db.session.add(CompraProducto(compra_id=compra.id, producto_id=ajeno.id, cantidad=1))
+
+    compra_ajena = Compra(cliente_id=comprador.id, tipo_comprobante_id=tipo.id, total=10, dni="87654321", email_destino="c@gmail.com")
+    db.session.add(compra_ajena)
+    db.session.flush()
+    db.session.add(CompraProducto(compra_id=compra_ajena.id, producto_id=productos[0].id, cantidad=1))
+    db.session.add(HistorialVenta(cliente_id=vendedor.id, producto_id=ajeno.id, cantidad=1, total_venta=5))
+    db.session.add(HistorialVenta(cliente_id=comprador.id, producto_id=productos[0].id, cantidad=1, total_venta=10))
+    db.session.commit()
+    return vendedor.id, comprador.id, ajeno.id, compra_ajena.id
+
+
+def verificar_purgado(vendedor_id, comprador_id, ajeno_id, compra_ajena_id):
+    db.session.expire_all()
+    assert db.session.get(Usuario, vendedor_id) is None
+    assert Producto.query.filter_by(cliente_id=vendedor_id).count() == 0
+    assert Compra.query.filter_by(cliente_id=vendedor_id).count() == 0
+    # Lo del otro cliente se conserva, salvo la línea que apuntaba al producto borrado
+    assert db.session.get(Producto, ajeno_id) is not None
+    assert db.session.get(Compra, compra_ajena_id) is not None
+    assert CompraProducto.query.filter_by(compra_id=compra_ajena_id).count() == 0
+    assert CompraProducto.query.count() == 0
+    # El historial queda, sin la referencia al cliente o al producto borrados
+    historial = HistorialVenta.query.order_by(HistorialVenta.id).all()
+    assert [(h.cliente_id, h.producto_id) for h in historial] == [(None, ajeno_id), (comprador_id, None)]
+    assert historial[0].vendedor_id == comprador_id and historial[1].vendedor_id is None
+
+
+# Lotes pequeños para recorrer varias iteraciones
+def test_purgar_usuario_por_lotes(app):
+    ids = poblar()
+    purga.purgar_usuario(ids[0], tamano_lote=2)
+    verificar_purgado(*ids)
+
+
+def test_eliminar_usuario_sincrono_bajo_umbral(app):
+    ids = poblar()
+    assert purga.eliminar_usuario(ids[0]) is True
+    verificar_purgado(*ids)
+
+
+# Por encima del umbral se marca como "eliminando" y se purga en segundo plano
+def test_eliminar_usuario_en_segundo_plano(app, monkeypatch):
+    monkeypatch.setattr(purga, "UMBRAL_SINCRONO", 3)
+    estados = []
+    original = purga.purgar_usuario
+
+    def purgar(usuario_id):
+        estados.append(db.session.get(Usuario, usuario_id).estado)
+        original(usuario_id, tamano_lote=2)
+    monkeypatch.setattr(purga, "purgar_usuario", purgar)
+
+    ids = poblar()
+    assert purga.eliminar_usuario(ids[0]) is False
+    assert tareas.esperar(timeout=10)
+    assert estados == [purga.ESTADO_ELIMINANDO]
+    verificar_purgado(*ids)
+    assert PurgaPendiente.query.count() == 0
+
+
+# Si no se puede programar o el proceso cae a mitad, la purga queda registrada y se reanuda
+def test_reanudar_purga_interrumpida(app, monkeypatch):
+    monkeypatch.setattr(purga, "UMBRAL_SINCRONO", 3)
+    monkeypatch.setattr(tareas, "encolar", lambda *a, **k: False)
+    ids = poblar()
+
+    assert purga.eliminar_usuario(ids[0]) is False
+    db.session.expire_all()
+    assert db.session.get(Usuario, ids[0]).estado == purga.ESTADO_ELIMINANDO
+    pendiente = PurgaPendiente.query.one()
+    assert (pendiente.tipo, pendiente.objetivo_id) == ("usuario", ids[0])
+
+    # Recién reclamada: otro proceso podría estar purgándola todavía
+    assert purga.reanudar_purgas() == 0
+    assert purga.reanudar_purgas(reanudar_tras=0) == 1
+    verificar_purgado(*ids)
+    assert PurgaPendiente.query.count() == 0
+
+
+# Un error deja la purga liberada para el siguiente intento, con el motivo
+def test_purga_fallida_queda_pendiente(app, monkeypatch):
+    monkeypatch.setattr(purga, "UMBRAL_SINCRONO", 3)
+    monkeypatch.setattr(tareas, "encolar", lambda *a, **k: False)
+    ids = poblar()
+    purga.eliminar_usuario(ids[0])
+
+    def fallar(usuario_id):
+        raise RuntimeError("conexión perdida")
+    monkeypatch.setattr(purga, "purgar_usuario", fallar)
+    assert purga.reanudar_purgas(reanudar_tras=0) == 0
+    pendiente = PurgaPendiente.query.one()
+    assert (pendiente.intentos, pendiente.error, pendiente.reclamada) == (1, "conexión perdida", None)
+
+    monkeypatch.undo()
+    assert purga.reanudar_purgas() == 1
+    verificar_purgado(*ids)
+
+
+def test_eliminar_producto_con_ventas(app):
+    vendedor_id, comprador_id, ajeno_id, compra_ajena_id = poblar()
+    producto_id = CompraProducto.query.filter_by(compra_id=compra_ajena_id).one().producto_id
+    assert purga.eliminar_producto(producto_id) is True
+    db.session.expire_all()
+    assert db.session.get(Producto, producto_id) is None
+    assert db.session.get(Compra, compra_ajena_id) is not None
+    assert HistorialVenta.query.filter_by(producto_id=producto_id).count() == 0
+    assert HistorialVenta.query.count() == 2
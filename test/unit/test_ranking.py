@@ -0,0 +1,175 @@
+from datetime import date, datetime
+import pytest
+from flask import Flask
+from flask_login import LoginManager
+from sqlalchemy import select
+from app.extensions import db
+from app.models.categoria import Categoria
+from app.models.historial_ventas import HistorialVenta
+from app.models.producto import Producto
+from app.models.resumen_venta import ResumenVenta, ResumenVentaPendiente
+from app.models.tipo_comprobante import TipoComprobante
+from app.models.usuario import Usuario
+from app.routes.historial_ventas import dashboard_ventas_bp
+from app.servicios import ranking
+from app.servicios.compras import registrar_compra
+
+
+@pytest.fixture
+def app():
+    app = Flask(__name__)
+    app.config['SECRET_KEY'] = 'clave-test'
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
+    app.config['TESTING'] = True
+    db.init_app(app)
+    login_manager = LoginManager(app)
+    login_manager.user_loader(lambda user_id: db.session.get(Usuario, int(user_id)))
+    app.register_blueprint(dashboard_ventas_bp)
+
+    with app.app_context():
+        db.create_all()
+        db.session.add_all([
+            Usuario(id=1, nombre="Ana", email="ana@gmail.com", rol="cliente"),
+            Categoria(id=1, nombre="Periféricos"), Categoria(id=2, nombre="Audio"),
+            TipoComprobante(id=1, nombre="boleta"), TipoComprobante(id=2, nombre="factura"),
+        ])
+        db.session.flush()
+        db.session.add_all([
+            Producto(id=1, nombre="Teclado", marca="Logitech", precio=50, stock=100, cliente_id=1, categoria_id=1),
+            Producto(id=2, nombre="Mouse", marca="Logitech", precio=20, stock=100, cliente_id=1, categoria_id=1),
+            Producto(id=3, nombre="Audífonos", marca="HyperX", precio=80, stock=100, cliente_id=1, categoria_id=2),
+        ])
+        db.session.commit()
+        yield app
+
+
+def _comprar(items, tipo="boleta"):
+    return registrar_compra(1, tipo, items, "ana@gmail.com", dni="12345678" if tipo == "boleta" else "",
+                            ruc="20123456789" if tipo == "factura" else "")
+
+
+def test_compra_actualiza_acumulados(app):
+    with app.app_context():
+        _comprar({"1": 2, "3": 1})
+        _comprar({"2": 1, "1": 1}, tipo="factura")
+        ranking.consolidar_pendientes()
+
+        productos = ranking.top("producto", ventana="total")
+        assert [(p["etiqueta"], p["monto"], p["cantidad"], p["ventas"]) for p in productos] == [
+            ("Teclado", 150.0, 3, 2), ("Audífonos", 80.0, 1, 1), ("Mouse", 20.0, 1, 1),
+        ]
+        assert [(m["clave"], m["monto"]) for m in ranking.top("marca")] == [("Logitech", 170.0), ("HyperX", 80.0)]
+        assert [c["etiqueta"] for c in ranking.top("categoria")] == ["Periféricos", "Audio"]
+        assert [(t["etiqueta"], t["ventas"]) for t in ranking.top("tipo_comprobante")] == [("boleta", 2), ("factura", 2)]
+        # Las ventanas de hoy contienen lo mismo que el total
+        assert ranking.top("producto", ventana="dia") == productos
+        assert ranking.top("producto", ventana="semana") == productos
+        assert ranking.top("producto", ventana="mes") == productos
+
+
+# La compra solo inserta una fila pendiente por línea; los rankings la ven tras consolidar
+def test_consolidar_pendientes(app):
+    with app.app_context():
+        _comprar({"1": 2, "3": 1})
+        _comprar({"1": 1}, tipo="factura")
+        assert db.session.query(ResumenVenta).count() == 0
+        assert db.session.query(ResumenVentaPendiente).count() == 3
+        assert ranking.top("producto") == []
+
+        assert ranking.consolidar_pendientes(tamano_lote=2) == 3
+        assert db.session.query(ResumenVentaPendiente).count() == 0
+        assert [(p["etiqueta"], p["monto"]) for p in ranking.top("producto", ventana="dia")] == [
+            ("Teclado", 150.0), ("Audífonos", 80.0)]
+        assert [(v["etiqueta"], v["ventas"]) for v in ranking.top("vendedor")] == [("Ana", 3)]
+        fila = db.session.query(ResumenVenta).filter_by(dimension="producto", clave="1", periodo="total").one()
+        assert (fila.monto, fila.cantidad, fila.ventas) == (150.0, 3, 2)
+
+        # Ventas nuevas sobre filas ya consolidadas
+        _comprar({"1": 1})
+        ranking.consolidar_pendientes()
+        assert ranking.totales("producto", 1)["total"] == {"monto": 200.0, "cantidad": 4, "ventas": 3}
+
+
+# dia/mes/total se leen del índice de la métrica, ya ordenados y con LIMIT (sin ordenar aparte)
+def test_top_lee_del_indice(app):
+    with app.app_context():
+        c = ResumenVenta.__table__.c
+        for metrica in ranking.METRICAS:
+            consulta = (select(c.clave).where(c.dimension == "producto", c.periodo == "total",
+                                               c.inicio == ranking.INICIO_TOTAL)
+                        .order_by(c[metrica].desc(), c.clave).limit(10))
+            sql = str(consulta.compile(db.engine, compile_kwargs={"literal_binds": True}))
+            plan = " ".join(str(fila) for fila in db.session.execute(db.text(f"EXPLAIN QUERY PLAN {sql}")))
+            assert f"ix_resumen_ventas_top_{metrica}" in plan and "TEMP B-TREE" not in plan
+
+
+def test_top_n_y_metrica(app):
+    with app.app_context():
+        _comprar({"2": 5, "1": 1, "3": 1})
+        ranking.consolidar_pendientes()
+        assert [p["etiqueta"] for p in ranking.top("producto", n=2)] == ["Mouse", "Audífonos"]
+        assert [p["etiqueta"] for p in ranking.top("producto", n=1, metrica="cantidad")] == ["Mouse"]
+        with pytest.raises(ValueError):
+            ranking.top("cliente")
+        with pytest.raises(ValueError):
+            ranking.top("producto", ventana="siglo")
+
+
+def test_ventanas_por_dia(app):
+    with app.app_context():
+        # 2025-06-15 03:00 UTC es todavía el 14 de junio en Lima
+        for cantidad, fecha in [(1, datetime(2025, 5, 20, 12, 0)), (2, datetime(2025, 6, 10, 12, 0)),
+                                (4, datetime(2025, 6, 15, 3, 0))]:
+            db.session.add(HistorialVenta(cliente_id=1, producto_id=1, cantidad=cantidad, total_venta=50.0 * cantidad,
+                                          tipo_comprobante_id=1, fecha_venta=fecha))
+        db.session.commit()
+        ranking.consolidar_pendientes()
+
+        def cantidad(ventana):
+            filas = ranking.top("producto", ventana=ventana, hoy=date(2025, 6, 14))
+            return filas[0]["cantidad"] if filas else 0
+
+        assert cantidad("dia") == 4
+        assert cantidad("semana") == 6
+        assert cantidad("mes") == 6
+        assert cantidad("anio") == 7
+        assert cantidad("total") == 7
+        assert ranking.top("producto", ventana="dia", hoy=date(2025, 6, 15)) == []
+
+
+def test_reconstruir_desde_historial(app):
+    with app.app_context():
+        _comprar({"1": 2, "3": 1})
+        _comprar({"2": 1}, tipo="factura")
+        ranking.consolidar_pendientes()
+        incremental = {(d, v): ranking.top(d, ventana=v) for d in ranking.DIMENSIONES for v in ("dia", "total")}
+
+        # Venta antigua sin producto (borrado): solo cuenta por tipo de comprobante
+        db.session.add(HistorialVenta(cliente_id=1, producto_id=None, cantidad=1, total_venta=10.0,
+                                      tipo_comprobante_id=1, fecha_venta=datetime(2024, 1, 10, 15, 0)))
+        db.session.commit()
+        ranking.reconstruir(tamano_lote=2)
+
+        for dimension in ("producto", "marca", "categoria"):
+            assert ranking.top(dimension, ventana="total") == incremental[(dimension, "total")]
+            assert ranking.top(dimension, ventana="dia") == incremental[(dimension, "dia")]
+        assert ranking.top("producto")[0] == {"clave": "1", "etiqueta": "Teclado", "monto": 100.0,
+                                              "cantidad": 2, "ventas": 1}
+        assert [(t["etiqueta"], t["monto"], t["ventas"]) for t in ranking.top("tipo_comprobante")] == [
+            ("boleta", 190.0, 3), ("factura", 20.0, 1)]
+        assert db.session.query(ResumenVenta).filter_by(periodo="mes", inicio=date(2024, 1, 1)).count() == 1
+
+
+def test_api_ranking(app):
+    with app.app_context():
+        _comprar({"1": 1, "2": 3})
+        ranking.consolidar_pendientes()
+    client = app.test_client()
+    with client.session_transaction() as sesion:
+        sesion["_user_id"] = "1"
+
+    respuesta = client.get("/api/dashboard/ranking?dimension=producto&n=1&metrica=cantidad")
+    assert respuesta.status_code == 200
+    assert [p["etiqueta"] for p in respuesta.get_json()] == ["Mouse"]
+    assert client.get("/api/dashboard/ranking?dimension=cliente").status_code == 400
+    assert client.get("/api/dashboard/ranking?n=muchos").status_code == 400
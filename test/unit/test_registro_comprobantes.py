@@ -0,0 +1,101 @@
+import json
+import pytest
+from flask import Flask
+from app.extensions import db
+from app.models.comprobante_emitido import ComprobanteEmitido
+from app.consumidores.registro import RegistroComprobantes, DestinoArchivo, DestinoBaseDatos, _a_fila
+
+
+class DestinoMemoria:
+    def __init__(self):
+        self.lotes = []
+
+    def escribir(self, filas):
+        self.lotes.append(list(filas))
+
+
+def mensaje(compra_id):
+    return {"compra_id": compra_id, "tipo_comprobante": "boleta", "dni": "72257140",
+            "email_destino": "cliente@gmail.com", "total": 10.5}
+
+
+# El buffer en memoria nunca supera su capacidad
+def test_buffer_circular_acotado():
+    registro = RegistroComprobantes("boleta", DestinoMemoria(), capacidad_memoria=5)
+    for i in range(50):
+        registro.registrar(mensaje(i))
+
+    assert len(registro.recientes) == 5
+    assert registro.recientes[0]["compra_id"] == 45
+
+
+# Cada comprobante queda escrito antes de que registrar() devuelva (antes del ack del mensaje)
+def test_escritura_sincrona():
+    destino = DestinoMemoria()
+    registro = RegistroComprobantes("boleta", destino)
+    for i in range(3):
+        registro.registrar(mensaje(i))
+
+    assert [lote[0]["compra_id"] for lote in destino.lotes] == [0, 1, 2]
+
+
+# Si el destino falla, la excepción llega al manejador y nada queda retenido en memoria
+def test_fallo_destino_propaga():
+    class DestinoCaido:
+        def escribir(self, filas):
+            raise IOError("sin conexión")
+
+    registro = RegistroComprobantes("factura", DestinoCaido())
+    with pytest.raises(IOError):
+        registro.registrar(mensaje(1))
+    assert len(registro.recientes) == 0
+
+
+# El destino en archivo escribe una línea JSON por comprobante
+def test_destino_archivo_jsonl(tmp_path):
+    ruta = tmp_path / "comprobantes" / "boletas.jsonl"
+    registro = RegistroComprobantes("boleta", DestinoArchivo(str(ruta)))
+    registro.registrar(mensaje(1))
+    registro.registrar(mensaje(2))
+
+    lineas = ruta.read_text(encoding="utf-8").splitlines()
+    assert len(lineas) == 2
+    assert json.loads(lineas[1])["compra_id"] == 2
+
+
+# El destino en base de datos inserta cada comprobante en comprobantes_emitidos
+def test_destino_base_datos(tmp_path):
+    url = f"sqlite:///{tmp_path / 'comprobantes.db'}"
+    app = Flask(__name__)
+    app.config["SQLALCHEMY_DATABASE_URI"] = url
+    app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
+    db.init_app(app)
+    with app.app_context():
+        db.create_all()
+
+    registro = RegistroComprobantes("boleta", DestinoBaseDatos(url))
+    for i in range(3):
+        registro.registrar(mensaje(i))
+
+    with app.app_context():
+        assert ComprobanteEmitido.query.count() == 3
+        assert ComprobanteEmitido.query.first().documento == "72257140"
+
+
+# Un reintento del mismo comprobante no duplica la fila
+def test_destino_base_datos_ignora_duplicados(tmp_path):
+    url = f"sqlite:///{tmp_path / 'comprobantes.db'}"
+    app = Flask(__name__)
+    app.config["SQLALCHEMY_DATABASE_URI"] = url
+    app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
+    db.init_app(app)
+    with app.app_context():
+        db.create_all()
+
+    destino = DestinoBaseDatos(url)
+    destino.escribir([_a_fila("boleta", mensaje(1)), _a_fila("boleta", mensaje(2))])
+    destino.escribir([_a_fila("boleta", mensaje(1))])
+    destino.escribir([_a_fila("factura", mensaje(1))])
+
+    with app.app_context():
+        assert ComprobanteEmitido.query.count() == 3
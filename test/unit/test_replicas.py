@@ -0,0 +1,115 @@
+import pytest
+from flask import Blueprint, Flask, jsonify
+from sqlalchemy import select
+from app.extensions import db
+from app.models.categoria import Categoria
+from app.routes.categoria import bp_categoria
+from app.servicios import replicas as modulo_replicas
+from app.servicios.replicas import EnrutadorReplicas, binds_replicas
+
+# Blueprint de pruebas que no está en REPLICA_BLUEPRINTS
+bp_escritura = Blueprint("escritura", __name__)
+
+
+@bp_escritura.route("/nombres")
+def nombres_primario():
+    return jsonify([c.nombre for c in Categoria.query.order_by(Categoria.id)])
+
+
+@pytest.fixture
+def app(tmp_path):
+    app = Flask(__name__)
+    app.config['SECRET_KEY'] = 'clave-test'
+    app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{tmp_path / 'primario.db'}"
+    app.config['SQLALCHEMY_REPLICAS'] = f"sqlite:///{tmp_path / 'replica.db'}"
+    app.config['REPLICA_MAX_RETRASO'] = 5
+    app.config['REPLICA_INTERVALO_CHEQUEO'] = 0
+    app.config['REPLICA_BLUEPRINTS'] = ("bp_categoria", "lectura")
+    app.config['TESTING'] = True
+    db.init_app(app)
+    enrutador = EnrutadorReplicas(app)
+
+    lectura = Blueprint("lectura", __name__)
+
+    # Escribe en el primario y vuelve a leer: debe ver su propia escritura
+    @lectura.route("/escribir-y-leer")
+    def escribir_y_leer():
+        db.session.add(Categoria(nombre="Nueva"))
+        db.session.commit()
+        return jsonify(db.session.execute(select(Categoria.nombre).order_by(Categoria.id)).scalars().all())
+
+    @lectura.route("/bloquear")
+    def bloquear():
+        return jsonify(db.session.execute(select(Categoria.nombre).with_for_update()).scalars().all())
+
+    app.register_blueprint(bp_categoria)
+    app.register_blueprint(lectura)
+    app.register_blueprint(bp_escritura)
+
+    with app.app_context():
+        db.create_all()
+        replica = enrutador.motores["replica_1"]
+        db.metadata.create_all(replica)
+        db.session.add(Categoria(nombre="Primario"))
+        db.session.commit()
+        # La "réplica" tiene otros datos para saber de dónde se leyó
+        with replica.begin() as conexion:
+            conexion.execute(Categoria.__table__.insert(), [{"nombre": "Replica"}])
+    yield app
+    replica.dispose()
+
+
+def _nombres(respuesta):
+    return [c["nombre"] if isinstance(c, dict) else c for c in respuesta.get_json()]
+
+
+def test_binds_desde_urls():
+    assert binds_replicas("sqlite:///a.db, sqlite:///b.db,") == {
+        "replica_1": "sqlite:///a.db", "replica_2": "sqlite:///b.db"}
+    assert binds_replicas("") == {}
+
+
+def test_get_de_blueprint_de_lectura_usa_replica(app):
+    client = app.test_client()
+    assert _nombres(client.get("/categorias/")) == ["Replica"]
+    # Blueprint que no es de solo lectura: primario
+    assert client.get("/nombres").get_json() == ["Primario"]
+    # SELECT ... FOR UPDATE siempre al primario
+    assert client.get("/bloquear").get_json() == ["Primario"]
+
+
+def test_escritura_fija_el_primario(app):
+    client = app.test_client()
+    assert client.get("/escribir-y-leer").get_json() == ["Primario", "Nueva"]
+    # El mismo cliente sigue leyendo del primario mientras dure el retraso tolerado
+    assert _nombres(client.get("/categorias/")) == ["Primario", "Nueva"]
+    assert _nombres(app.test_client().get("/categorias/")) == ["Replica"]
+
+
+def test_replica_con_retraso_o_caida_vuelve_al_primario(app, monkeypatch):
+    client = app.test_client()
+    monkeypatch.setattr(modulo_replicas, "medir_retraso", lambda motor: 30.0)
+    assert _nombres(client.get("/categorias/")) == ["Primario"]
+
+    def caida(motor):
+        raise ConnectionError("sin conexión")
+    monkeypatch.setattr(modulo_replicas, "medir_retraso", caida)
+    assert _nombres(client.get("/categorias/")) == ["Primario"]
+
+    monkeypatch.setattr(modulo_replicas, "medir_retraso", lambda motor: 0.5)
+    assert _nombres(client.get("/categorias/")) == ["Replica"]
+
+
+def test_retraso_se_cachea(app, monkeypatch):
+    app.config['REPLICA_INTERVALO_CHEQUEO'] = 60
+    llamadas = []
+    monkeypatch.setattr(modulo_replicas, "medir_retraso", lambda motor: llamadas.append(1) or 0.0)
+    client = app.test_client()
+    for _ in range(3):
+        client.get("/categorias/")
+    assert len(llamadas) == 1
+
+
+def test_fuera_de_peticion_usa_primario(app):
+    with app.app_context():
+        assert db.session.execute(select(Categoria.nombre)).scalars().all() == ["Primario"]
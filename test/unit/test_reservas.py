@@ -0,0 +1,246 @@
+import threading
+from datetime import datetime, timedelta
+
+import pytest
+from flask import Flask
+from app.extensions import db
+from app.models.producto import Producto
+from app.models.reserva_stock import ReservaStock
+from app.models.tipo_comprobante import TipoComprobante
+from app.models.usuario import Usuario
+from app.servicios import inventario, reservas
+from app.servicios.compras import ErrorCompra, registrar_compra
+from app.servicios.reservas import ContadoresMemoria
+
+
+@pytest.fixture
+def app(tmp_path):
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{tmp_path / 'reservas.db'}"
+    app.config['TESTING'] = True
+    db.init_app(app)
+    reservas.init_app(app)
+    with app.app_context():
+        db.create_all()
+        db.session.add_all([Usuario(id=1, nombre="Ana", email="ana@gmail.com", rol="cliente"),
+                            Usuario(id=2, nombre="Luis", email="luis@gmail.com", rol="cliente"),
+                            TipoComprobante(id=1, nombre="boleta")])
+        db.session.flush()
+        db.session.add(Producto(id=1, nombre="Teclado", precio=50, stock=5, cliente_id=1))
+        db.session.commit()
+        yield app
+
+
+def disponible(app):
+    return app.extensions["reservas"].contadores.disponible(1)
+
+
+def comprar(cliente_id, cantidad):
+    return registrar_compra(cliente_id, "boleta", {"1": cantidad}, "ana@gmail.com", dni="12345678")
+
+
+def test_reservar_hasta_agotar_y_liberar(app):
+    with app.app_context():
+        assert reservas.reservar(1, 1, 3)
+        assert not reservas.reservar(2, 1, 3)
+        assert reservas.reservar(2, 1, 2)
+        assert disponible(app) == 0
+
+        # Cambiar la cantidad reemplaza la reserva anterior; 0 la libera
+        assert reservas.reservar(1, 1, 1)
+        assert reservas.reservadas(1) == {1: 1}
+        assert reservas.reservar(2, 1, 0)
+        assert reservas.reservadas(2) == {}
+        assert disponible(app) == 4
+        assert db.session.get(Producto, 1).stock == 5
+
+
+def test_compra_confirma_la_reserva(app):
+    with app.app_context():
+        assert reservas.reservar(1, 1, 3)
+        assert reservas.reservar(2, 1, 2)
+
+        # Todo está reservado: quien no reservó no puede llevarse las unidades de otro
+        with pytest.raises(ErrorCompra):
+            comprar(2, 3)
+        compra = comprar(1, 2)
+
+        confirmada = ReservaStock.query.filter_by(cliente_id=1, estado="confirmada").one()
+        assert (confirmada.compra_id, confirmada.cantidad) == (compra.id, 2)
+        # La unidad reservada de más vuelve al disponible
+        assert disponible(app) == 1
+        assert reservas.reservadas(2) == {1: 2}
+
+        # La compra no toca productos: el barrido resta lo confirmado y el disponible no cambia
+        assert db.session.get(Producto, 1).stock == 5
+        assert reservas.aplicar_confirmadas() == 1
+        assert db.session.get(Producto, 1).stock == 3
+        assert ReservaStock.query.filter_by(cliente_id=1).one().estado == "aplicada"
+        app.extensions["reservas"].contadores.limpiar()
+        assert reservas.reservar(1, 1, 1) and disponible(app) == 0
+
+
+def test_compra_sin_reserva_usa_el_disponible(app):
+    with app.app_context():
+        assert reservas.reservar(2, 1, 4)
+        compra = comprar(1, 1)
+        # Lo tomado del disponible queda como una reserva confirmada de la compra
+        assert ReservaStock.query.filter_by(cliente_id=1).one().compra_id == compra.id
+        assert disponible(app) == 0
+        with pytest.raises(ErrorCompra):
+            comprar(1, 1)
+        assert disponible(app) == 0
+        reservas.aplicar_confirmadas()
+        assert db.session.get(Producto, 1).stock == 4
+
+
+# Otro proceso (CLI, otro worker) cambia la tabla: el contador en memoria se corrige al barrer
+def test_barrido_resincroniza_contadores_en_memoria(app):
+    with app.app_context():
+        assert reservas.reservar(1, 1, 2, ttl=60)
+        assert disponible(app) == 3
+        db.session.execute(db.update(ReservaStock).values(estado="vencida"))
+        db.session.commit()
+        assert disponible(app) == 3
+
+        app.extensions["reservas"].barrer()
+        assert not reservas.reservar(2, 1, 6)
+        assert reservas.reservar(2, 1, 5)
+
+
+# Sin reservas activadas la compra descuenta el stock en el mismo commit
+def test_compra_sin_reservas_descuenta_stock(app):
+    app.extensions.pop("reservas")
+    with app.app_context():
+        comprar(1, 2)
+        assert db.session.get(Producto, 1).stock == 3
+        with pytest.raises(ErrorCompra):
+            comprar(1, 4)
+        assert db.session.get(Producto, 1).stock == 3
+
+
+def test_barrido_libera_vencidas(app):
+    with app.app_context():
+        assert reservas.reservar(1, 1, 2, ttl=60)
+        assert reservas.reservar(2, 1, 3, ttl=600)
+        assert reservas.liberar_vencidas() == 0
+
+        assert reservas.liberar_vencidas(ahora=datetime.utcnow() + timedelta(seconds=120)) == 1
+        assert ReservaStock.query.filter_by(cliente_id=1).one().estado == "vencida"
+        assert disponible(app) == 2
+
+        # La compra de una reserva vencida toma lo que falte del disponible
+        comprar(1, 2)
+        assert disponible(app) == 0
+
+
+def test_contador_se_reconstruye_desde_la_tabla(app):
+    with app.app_context():
+        assert reservas.reservar(1, 1, 2)
+        app.extensions["reservas"].contadores.limpiar()  # p. ej. reinicio del proceso
+
+        assert not reservas.reservar(2, 1, 4)
+        assert reservas.reservar(2, 1, 3)
+        assert disponible(app) == 0
+
+
+def test_cambio_de_stock_invalida_el_contador(app):
+    with app.app_context():
+        assert reservas.reservar(1, 1, 5)
+        inventario.actualizar_producto(1, {"stock": 8})
+        assert disponible(app) is None
+        assert reservas.reservar(2, 1, 3)
+        assert not reservas.reservar(2, 1, 4)
+
+
+def test_contadores_memoria_concurrentes():
+    contadores = ContadoresMemoria(shards=4)
+    contadores.inicializar(7, 100)
+    contadores.inicializar(8, 100)
+    exitos = []
+
+    def reservar(producto_id):
+        for _ in range(50):
+            if contadores.tomar(producto_id, 1):
+                exitos.append(producto_id)
+
+    hilos = [threading.Thread(target=reservar, args=(7 + i % 2,)) for i in range(8)]
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+
+    assert exitos.count(7) == exitos.count(8) == 100
+    assert contadores.disponible(7) == contadores.disponible(8) == 0
+    assert contadores.tomar(9, 1) is None
+
+
+# La resincronización no pisa productos con una operación en curso ni los que cambiaron mientras leía
+def test_resincronizar_respeta_operaciones_en_curso():
+    contadores = ContadoresMemoria(shards=4)
+    contadores.inicializar(1, 5)
+    contadores.inicializar(2, 5)
+
+    # Reserva tomada del contador pero aún sin commit: la tabla no la ve
+    contadores.retener(1)
+    assert contadores.tomar(1, 2)
+    assert contadores.resincronizar(lambda ids: {1: 5, 2: 4}) == 1
+    assert (contadores.disponible(1), contadores.disponible(2)) == (3, 4)
+    contadores.soltar(1)
+
+    # Una operación empieza y termina (commit + devolver) mientras se lee la tabla
+    def leer(ids):
+        contadores.retener(2)
+        contadores.devolver(2, 1)
+        contadores.soltar(2)
+        return {1: 3, 2: 4}
+
+    assert contadores.resincronizar(leer) == 1
+    assert contadores.disponible(2) == 5
+    assert contadores.resincronizar(lambda ids: {1: 3}) == 2
+    assert (contadores.disponible(1), contadores.disponible(2)) == (3, None)
+
+
+# init_app no inicia hilos: el barrido arranca solo con iniciar_barrido (proceso que sirve peticiones)
+def test_init_app_no_inicia_el_barrido():
+    app = Flask(__name__)
+    app.config['TESTING'] = False
+    gestor = reservas.init_app(app)
+    assert app.config["RESERVA_BARRIDO_ACTIVO"]
+    assert gestor._barrido is None
+
+
+# Si lo vendido supera el stock, el barrido no lo deja negativo: las reservas siguen confirmadas
+def test_aplicar_confirmadas_sin_stock_suficiente(app):
+    with app.app_context():
+        assert reservas.reservar(1, 1, 3)
+        comprar(1, 3)
+        db.session.execute(db.update(Producto).values(stock=2))  # p. ej. edición fuera de la app
+        db.session.commit()
+
+        assert reservas.aplicar_confirmadas() == 0
+        assert db.session.get(Producto, 1).stock == 2
+        assert ReservaStock.query.filter_by(cliente_id=1).one().estado == "confirmada"
+        assert not reservas.reservar(2, 1, 1)
+
+        db.session.execute(db.update(Producto).values(stock=4))
+        db.session.commit()
+        assert reservas.aplicar_confirmadas() == 1
+        assert db.session.get(Producto, 1).stock == 1
+
+
+# El contador en memoria va por delante de la tabla (otro proceso vendió): la compra se rechaza
+def test_compra_comprueba_la_tabla(app):
+    with app.app_context():
+        assert disponible(app) is None
+        assert reservas.reservar(2, 1, 1)
+        assert disponible(app) == 4
+        with db.engine.begin() as otra:
+            otra.execute(db.insert(ReservaStock), {"cliente_id": 2, "producto_id": 1, "cantidad": 3,
+                                                   "estado": "confirmada", "expira": datetime.utcnow()})
+
+        with pytest.raises(ErrorCompra):
+            comprar(1, 2)
+        assert disponible(app) is None
+        comprar(1, 1)
+        assert ReservaStock.query.filter_by(cliente_id=1).one().cantidad == 1
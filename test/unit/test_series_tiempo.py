@@ -0,0 +1,88 @@
+from datetime import date, datetime, timedelta, timezone
+import numpy as np
+import pytz
+from app.servicios import series_tiempo as st
+
+LIMA = pytz.timezone("America/Lima")
+NUEVA_YORK = pytz.timezone("America/New_York")
+
+
+def epochs(*fechas):
+    return st.arreglo_epoch(list(fechas))
+
+
+def referencia(epoch, zona):
+    return datetime.fromtimestamp(int(epoch), timezone.utc).astimezone(zona).replace(tzinfo=None)
+
+
+# Mismo resultado que convertir fila a fila con pytz, incluidos los cambios de horario
+def test_a_local_coincide_con_pytz():
+    for zona, inicio in ((NUEVA_YORK, datetime(2024, 3, 9)), (NUEVA_YORK, datetime(2024, 11, 2)),
+                         (LIMA, datetime(1994, 3, 30)), (LIMA, datetime(2025, 1, 1))):
+        muestras = st.arreglo_epoch([inicio + timedelta(minutes=17 * i) for i in range(400)])
+        locales = st.a_local(muestras, zona).astype("datetime64[s]").astype(datetime)
+        assert list(locales) == [referencia(e, zona) for e in muestras]
+
+
+def test_fechas_sin_zona_son_utc():
+    assert st.a_epoch(datetime(2025, 6, 1, 5, 0)) == st.a_epoch(LIMA.localize(datetime(2025, 6, 1, 0, 0)))
+    assert st.desde_epoch(st.a_epoch(datetime(2025, 6, 1, 5, 0))) == datetime(2025, 6, 1, 5, 0)
+
+
+def test_agrupar_por_granularidad():
+    # 04:30 UTC del día 2 todavía es el día 1 en Lima
+    fechas = epochs(datetime(2025, 6, 2, 4, 30), datetime(2025, 6, 2, 5, 30), datetime(2025, 6, 30, 23, 0),
+                    datetime(2025, 7, 1, 4, 59), datetime(2025, 7, 1, 5, 0))
+    valores = [10, 20, 30, 40, 50]
+
+    inicios, sumas, conteos = st.agrupar(fechas, valores, "dia")
+    assert [st.etiqueta(i, "dia") for i in inicios] == ["2025-06-01", "2025-06-02", "2025-06-30", "2025-07-01"]
+    assert list(sumas) == [10, 20, 70, 50]
+    assert list(conteos) == [1, 1, 2, 1]
+
+    inicios, sumas, _ = st.agrupar(fechas, valores, "mes")
+    assert [st.etiqueta(i, "mes") for i in inicios] == ["2025-06", "2025-07"]
+    assert list(sumas) == [100, 50]
+
+    # Semanas ISO: empiezan en lunes (2025-06-02 y 2025-06-30 son lunes)
+    inicios, sumas, _ = st.agrupar(fechas, valores, "semana")
+    assert [i.astype(datetime).date() for i in inicios] == [date(2025, 5, 26), date(2025, 6, 2), date(2025, 6, 30)]
+    assert [st.etiqueta(i, "semana") for i in inicios] == ["2025-W22", "2025-W23", "2025-W27"]
+    assert list(sumas) == [10, 20, 120]
+
+    inicios, _, _ = st.agrupar(fechas, valores, "hora")
+    assert st.etiqueta(inicios[0], "hora") == "2025-06-01 23:00"
+
+
+def test_agrupar_vacio():
+    inicios, sumas, conteos = st.agrupar([], [], "dia")
+    assert len(inicios) == len(sumas) == len(conteos) == 0
+
+
+# Los días 29 a 31 caen en la "Semana 5"; febrero no bisiesto solo tiene 4 semanas
+def test_serie_dashboard_mes():
+    hoy = date(2025, 7, 31)
+    fechas = epochs(datetime(2025, 7, 1, 5, 0), datetime(2025, 7, 29, 15, 0), datetime(2025, 8, 1, 4, 0),
+                    datetime(2025, 6, 30, 12, 0))
+    etiquetas, montos = st.serie_dashboard(fechas, [1, 2, 4, 8], "mes", hoy)
+    assert etiquetas == ["Semana 1", "Semana 2", "Semana 3", "Semana 4", "Semana 5"]
+    assert montos == [1, 0, 0, 0, 6]
+
+    etiquetas, _ = st.serie_dashboard(np.array([], dtype=np.int64), [], "mes", date(2025, 2, 10))
+    assert len(etiquetas) == 4
+
+
+def test_serie_dashboard_dia_y_semana():
+    hoy = date(2025, 7, 3)  # jueves
+    fechas = epochs(datetime(2025, 7, 3, 5, 0), datetime(2025, 7, 4, 4, 30), datetime(2025, 6, 30, 17, 0),
+                    datetime(2025, 6, 26, 17, 0))
+    etiquetas, montos = st.serie_dashboard(fechas, [1, 2, 4, 8], "dia", hoy)
+    assert montos[0] == 1 and montos[23] == 2 and sum(montos) == 3
+
+    etiquetas, montos = st.serie_dashboard(fechas, [1, 2, 4, 8], "semana", hoy)
+    assert etiquetas[0] == "Lunes"
+    assert montos == [4, 0, 0, 3, 0, 0, 0]
+
+
+def test_limites_utc():
+    assert st.limites_utc(date(2025, 7, 1), date(2025, 7, 2)) == (datetime(2025, 7, 1, 5), datetime(2025, 7, 2, 5))
@@ -0,0 +1,77 @@
+import json
+from types import SimpleNamespace
+from app.consumidores.supervisor import Supervisor
+from app.consumidores.factura_consumer import ManejadorFactura
+from app.consumidores.idempotencia import AlmacenIdempotenciaMemoria
+
+
+class ConexionFalsa:
+    is_open = True
+
+    def __init__(self):
+        self.callbacks = []
+        self.cerrada = False
+
+    def add_callback_threadsafe(self, callback):
+        self.callbacks.append(callback)
+
+    def close(self):
+        self.cerrada = True
+        self.is_open = False
+
+
+class CanalFalso:
+    is_open = True
+
+    def __init__(self):
+        self.detenido = False
+        self.acks = []
+
+    def stop_consuming(self):
+        self.detenido = True
+
+    def basic_ack(self, delivery_tag):
+        self.acks.append(delivery_tag)
+
+
+class RegistroFalso:
+    def registrar(self, data):
+        pass
+
+
+# Un solo proceso atiende ambas colas compartiendo recursos e idempotencia
+def test_supervisor_comparte_recursos():
+    supervisor = Supervisor(["boleta", "factura"])
+    boleta, factura = supervisor.manejadores
+
+    assert [boleta.cola, factura.cola] == ["cola_boletas", "cola_facturas"]
+    assert boleta.recursos is factura.recursos
+    assert boleta.idempotencia is factura.idempotencia
+    supervisor.recursos.cerrar()
+
+
+# La parada se agenda en el hilo de la conexión y al cerrar se liberan las conexiones
+def test_parada_ordenada():
+    supervisor = Supervisor(["boleta", "factura"])
+    supervisor.connection = ConexionFalsa()
+    supervisor.channel = CanalFalso()
+
+    supervisor.detener()
+    assert supervisor.channel.detenido is False  # aún no: se ejecuta tras el mensaje en curso
+    for callback in supervisor.connection.callbacks:
+        callback()
+    assert supervisor.channel.detenido is True
+
+    supervisor.cerrar()
+    assert supervisor.connection.cerrada
+
+
+# El manejador de facturas descarta mensajes de otro tipo sin consultar SUNAT
+def test_manejador_factura_descarta_boletas():
+    recursos = SimpleNamespace(post_json=lambda url, payload: (_ for _ in ()).throw(AssertionError("no debe consultar")))
+    manejador = ManejadorFactura(recursos, registro=RegistroFalso(), idempotencia=AlmacenIdempotenciaMemoria())
+    canal = CanalFalso()
+
+    manejador(canal, SimpleNamespace(delivery_tag=1), SimpleNamespace(headers={}),
+              json.dumps({"compra_id": 1, "tipo_comprobante": "boleta", "dni": "72257140"}))
+    assert canal.acks == [1]
@@ -0,0 +1,121 @@
+import datetime
+import time
+import pytest
+from cryptography import x509
+from cryptography.hazmat.primitives import hashes, serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+from cryptography.x509.oid import NameOID
+from google.auth import crypt, jwt as google_jwt
+from app.servicios.verificador_google import VerificadorGoogle, max_age
+
+AUDIENCIA = "cliente-test.apps.googleusercontent.com"
+
+
+# Par de claves RSA con su certificado autofirmado, como los que publica Google
+def generar_clave(kid):
+    clave = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    nombre = x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, kid)])
+    ahora = datetime.datetime.now(datetime.timezone.utc)
+    cert = (x509.CertificateBuilder().subject_name(nombre).issuer_name(nombre)
+            .public_key(clave.public_key()).serial_number(1)
+            .not_valid_before(ahora - datetime.timedelta(days=1))
+            .not_valid_after(ahora + datetime.timedelta(days=1))
+            .sign(clave, hashes.SHA256()))
+    pem_privada = clave.private_bytes(serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8,
+                                      serialization.NoEncryption())
+    signer = crypt.RSASigner.from_string(pem_privada, key_id=kid)
+    return signer, cert.public_bytes(serialization.Encoding.PEM).decode()
+
+
+def firmar(signer, **extra):
+    ahora = int(time.time())
+    payload = {"iss": "https://accounts.google.com", "aud": AUDIENCIA, "sub": "123",
+               "email": "ana@gmail.com", "iat": ahora, "exp": ahora + 600, **extra}
+    return google_jwt.encode(signer, payload).decode()
+
+
+class Respuesta:
+    def __init__(self, certs):
+        self.certs = dict(certs)
+        self.headers = {"Cache-Control": "public, max-age=19800, must-revalidate"}
+
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        return self.certs
+
+
+class SesionFalsa:
+    def __init__(self, certs):
+        self.certs = certs
+        self.descargas = 0
+
+    def get(self, url, timeout=None):
+        self.descargas += 1
+        return Respuesta(self.certs)
+
+
+@pytest.fixture
+def claves():
+    signer, cert = generar_clave("clave-1")
+    return signer, {"clave-1": cert}
+
+
+def test_max_age():
+    assert max_age("public, max-age=19800, must-revalidate") == 19800
+    assert max_age(None) == 3600
+
+
+# Los certificados se descargan una vez y los tokens verificados se memorizan
+def test_cachea_certs_y_tokens(claves):
+    signer, certs = claves
+    sesion = SesionFalsa(certs)
+    verificador = VerificadorGoogle(audiencia=AUDIENCIA, sesion=sesion)
+
+    token = firmar(signer)
+    assert verificador.verificar(token)["email"] == "ana@gmail.com"
+    assert verificador.verificar(token)["email"] == "ana@gmail.com"
+    assert verificador.verificar(firmar(signer, sub="456"))["sub"] == "456"
+    assert sesion.descargas == 1
+
+
+# Una clave rotada que aún no estaba en caché obliga a recargar los certificados
+def test_recarga_certs_ante_clave_nueva(claves):
+    signer, certs = claves
+    sesion = SesionFalsa(certs)
+    verificador = VerificadorGoogle(audiencia=AUDIENCIA, sesion=sesion)
+    verificador.verificar(firmar(signer))
+
+    nuevo_signer, nuevo_cert = generar_clave("clave-2")
+    sesion.certs = {**certs, "clave-2": nuevo_cert}
+    assert verificador.verificar(firmar(nuevo_signer))["sub"] == "123"
+    assert sesion.descargas == 2
+
+
+@pytest.mark.parametrize("extra", [{"aud": "otra-app"}, {"iss": "https://evil.example.com"},
+                                   {"exp": int(time.time()) - 3600, "iat": int(time.time()) - 7200}])
+def test_rechaza_tokens_invalidos(claves, extra):
+    signer, certs = claves
+    verificador = VerificadorGoogle(audiencia=AUDIENCIA, sesion=SesionFalsa(certs))
+    with pytest.raises(ValueError):
+        verificador.verificar(firmar(signer, **extra))
+
+
+# Tokens con kid inventados: una sola recarga por intervalo, el resto se rechaza sin red
+def test_kid_desconocido_limita_recargas(claves):
+    signer, certs = claves
+    sesion = SesionFalsa(certs)
+    verificador = VerificadorGoogle(audiencia=AUDIENCIA, sesion=sesion)
+    verificador.verificar(firmar(signer))
+
+    for i in range(5):
+        falso, _ = generar_clave(f"falsa-{i}")
+        with pytest.raises(ValueError):
+            verificador.verificar(firmar(falso))
+    assert sesion.descargas == 2
+
+    verificador._ultima_recarga_forzada -= verificador.intervalo_recarga
+    with pytest.raises(ValueError):
+        verificador.verificar(firmar(generar_clave("falsa-6")[0]))
+    assert sesion.descargas == 3